@@ -1,7 +1,11 @@
 import os
 from flask import Flask
 from .models import db
-from .extensions import mail
+from .extensions import mail, response_cache, live_events, reference_data
+from .services.db_routing import init_db_routing, replica_binds_from_env
+from .services.json_provider import FastJSONProvider
+from .services.compression import init_compression
+from .services.shared_state import configure_shared_state
 
 def create_app():
     """
@@ -13,20 +17,105 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///maintech.db' # Usando SQLite para pruebas
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Réplicas de lectura (opcional): SQLALCHEMY_REPLICA_URIS="uri1,uri2"
+    if os.environ.get('SQLALCHEMY_REPLICA_URIS'):
+        binds, replica_binds = replica_binds_from_env(os.environ['SQLALCHEMY_REPLICA_URIS'])
+        app.config['SQLALCHEMY_BINDS'] = binds
+        app.config['SQLALCHEMY_REPLICA_BINDS'] = replica_binds
+
     app.config['MAIL_SERVER'] = 'smtp.gmail.com'
     app.config['MAIL_PORT'] = 587
     app.config['MAIL_USE_TLS'] = True
     app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
     app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
 
+    # Documentos: con un proxy (nginx/Apache) delante, X-Sendfile delega el envío del archivo
+    app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'
+    app.config['DOCUMENT_STORAGE_ROOT'] = os.environ.get('DOCUMENT_STORAGE_ROOT')
+    # Tamaño máximo (bytes) de un documento subido; por defecto 2 GiB
+    if os.environ.get('DOCUMENT_MAX_UPLOAD_SIZE'):
+        app.config['DOCUMENT_MAX_UPLOAD_SIZE'] = int(os.environ['DOCUMENT_MAX_UPLOAD_SIZE'])
+
+    # Multi-tenant: cabecera con el ID de usuario fijada por un proxy autenticado (opcional)
+    app.config['TENANT_USER_HEADER'] = os.environ.get('TENANT_USER_HEADER')
+
+    # Claves de Asset.specs indexadas para filtrar (flask assets index-specs): "power_kw:number,seal_type:text"
+    from .modules.assets.spec_index import spec_indexes_from_env
+    app.config['ASSET_SPEC_INDEXES'] = spec_indexes_from_env(os.environ.get('ASSET_SPEC_INDEXES', ''))
+
+    # Redis compartido (opcional): eventos en vivo y caché de respuestas comunes a
+    # todos los procesos (workers web, flask ingest serve, flask jobs worker)
+    if os.environ.get('REDIS_URL'):
+        configure_shared_state(app, os.environ['REDIS_URL'])
+
+    # Serialización JSON rápida (orjson si está instalado) y compresión de respuestas
+    app.json = FastJSONProvider(app)
+    init_compression(app)
+
     # Inicializar extensiones
     db.init_app(app)
+    init_db_routing(app)
     mail.init_app(app)
+    response_cache.init_app(app)
+    reference_data.init_app(app, response_cache)
+    live_events.init_app(app)
+
+    # Aislamiento por planta/empresa en las consultas ORM
+    from .services.tenancy import init_tenancy
+    init_tenancy(app, response_cache)
 
     # Registrar Blueprints
     from .modules.assets.assets_blueprint import assets_bp
     from .modules.maintenance.maintenance_blueprint import maintenance_bp
+    from .modules.inventory.inventory_blueprint import inventory_bp
+    from .modules.kpi.kpi_blueprint import kpi_bp
+    from .modules.expiry.expiry_blueprint import expiry_bp
+    from .modules.reports.reports_blueprint import reports_bp
+    from .modules.documents.documents_blueprint import documents_bp
+    from .modules.live.live_blueprint import live_bp
+    from .modules.ingestion.ingestion_blueprint import ingestion_bp
+    from .modules.predictive.predictive_blueprint import predictive_bp
+    from .modules.planning.planning_blueprint import planning_bp
+    from .modules.sync.sync_blueprint import sync_bp
+    from .modules.jobs.jobs_blueprint import jobs_bp
+    from .modules.fleet.fleet_blueprint import fleet_bp
+    from .modules.safety.safety_blueprint import safety_bp
+    from .modules.notifications.notifications_blueprint import notifications_bp
+    from .modules.layouts.layouts_blueprint import layouts_bp
     app.register_blueprint(assets_bp)
     app.register_blueprint(maintenance_bp)
+    app.register_blueprint(inventory_bp)
+    app.register_blueprint(kpi_bp)
+    app.register_blueprint(expiry_bp)
+    app.register_blueprint(reports_bp)
+    app.register_blueprint(documents_bp)
+    app.register_blueprint(live_bp)
+    app.register_blueprint(ingestion_bp)
+    app.register_blueprint(predictive_bp)
+    app.register_blueprint(planning_bp)
+    app.register_blueprint(sync_bp)
+    app.register_blueprint(jobs_bp)
+    app.register_blueprint(fleet_bp)
+    app.register_blueprint(safety_bp)
+    app.register_blueprint(notifications_bp)
+    app.register_blueprint(layouts_bp)
+
+    # Registrar eventos de SQLAlchemy
+    from .modules.kpi.events import register_events as register_kpi_events
+    from .modules.expiry.events import register_events as register_expiry_events
+    from .modules.live.events import register_events as register_live_events
+    from .modules.maintenance.events import register_events as register_maintenance_events
+    from .modules.sync.events import register_events as register_sync_events
+    from .modules.safety.events import register_events as register_safety_events
+    from .modules.notifications.events import register_events as register_notification_events
+    from .modules.layouts.events import register_events as register_layout_events
+    register_kpi_events()
+    register_expiry_events()
+    register_live_events()
+    register_maintenance_events()
+    register_sync_events()
+    register_safety_events()
+    register_notification_events()
+    register_layout_events()
 
     return app
@@ -1,4 +1,10 @@
 from flask_mail import Mail
+from .services.response_cache import ResponseCache
+from .services.event_bus import EventBus
+from .services.reference_cache import ReferenceCache
 
-# Se crea la instancia sin asociarla a una app
+# Se crean las instancias sin asociarlas a una app
 mail = Mail()
+response_cache = ResponseCache()
+live_events = EventBus()
+reference_data = ReferenceCache()
@@ -2,8 +2,9 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import enum
 import json
+from app.services.db_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Company(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -15,6 +16,9 @@ class Site(db.Model):
     name = db.Column(db.String(255), nullable=False)
     address = db.Column(db.Text)
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'))
+    # Coordenadas (WGS84) para las consultas de flota por distancia
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
     users = db.relationship('User', backref='site', lazy=True)
     locations = db.relationship('Location', backref='site', lazy=True)
     assets = db.relationship('Asset', backref='site', lazy=True)
@@ -69,7 +73,7 @@ class Location(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
     parent_id = db.Column(db.Integer, db.ForeignKey('location.id'))
-    site_id = db.Column(db.Integer, db.ForeignKey('site.id'))
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id'), index=True)
     layout = db.Column(db.JSON)
     children = db.relationship('Location', backref=db.backref('parent', remote_side=[id]), lazy=True)
     assets = db.relationship('Asset', backref='location', lazy=True)
@@ -100,6 +104,32 @@ class Asset(db.Model):
     vehicle_detail = db.relationship('VehicleDetail', backref='asset', uselist=False, lazy=True)
     incidents = db.relationship('Incident', backref='asset', lazy=True)
 
+    # Índices compuestos encabezados por site_id (consultas por planta)
+    __table_args__ = (
+        db.Index('ix_asset_site_location', 'site_id', 'location_id'),
+        db.Index('ix_asset_site_category', 'site_id', 'category_id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'unique_code': self.unique_code,
+            'name': self.name,
+            'category_id': self.category_id,
+            'model_id': self.model_id,
+            'manufacturer_id': self.manufacturer_id,
+            'specs': self.specs,
+            'location_id': self.location_id,
+            'site_id': self.site_id,
+            'value_initial': float(self.value_initial) if self.value_initial is not None else None,
+            'value_current': float(self.value_current) if self.value_current is not None else None,
+            'depreciation_method': self.depreciation_method,
+            'purchase_date': self.purchase_date.isoformat() if self.purchase_date else None,
+            'hierarchy_parent_id': self.hierarchy_parent_id,
+            'criticality': self.criticality,
+            'warranty_expiry': self.warranty_expiry.isoformat() if self.warranty_expiry else None,
+        }
+
 class EntityType(enum.Enum):
     asset = 'asset'
     work_order = 'work_order'
@@ -122,6 +152,46 @@ class Document(db.Model):
     entity_type = db.Column(db.Enum(EntityType))
     entity_id = db.Column(db.Integer, nullable=False)
     type = db.Column(db.Enum(DocumentType))
+    sha256 = db.Column(db.String(64), index=True)
+    size = db.Column(db.BigInteger)
+    mime_type = db.Column(db.String(255))
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'entity_type': self.entity_type.name if self.entity_type else None,
+            'entity_id': self.entity_id,
+            'type': self.type.name if self.type else None,
+            'sha256': self.sha256,
+            'size': self.size,
+            'mime_type': self.mime_type,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+        }
+
+# Carga de archivos por partes (reanudable)
+class UploadSession(db.Model):
+    id = db.Column(db.String(32), primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    entity_type = db.Column(db.Enum(EntityType))
+    entity_id = db.Column(db.Integer, nullable=False)
+    type = db.Column(db.Enum(DocumentType))
+    mime_type = db.Column(db.String(255))
+    photo_slot = db.Column(db.Enum('before', 'after'))
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received_size = db.Column(db.BigInteger, nullable=False, default=0)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'))
+
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'name': self.name,
+            'total_size': self.total_size,
+            'received_size': self.received_size,
+            'document_id': self.document_id,
+        }
 
 class SkillType(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -132,6 +202,13 @@ class UserSkill(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
     skill_id = db.Column(db.Integer, db.ForeignKey('skill_type.id'), primary_key=True)
 
+# Minutos disponibles de un técnico en un día concreto (ausencias, turnos reducidos)
+class TechnicianAvailability(db.Model):
+    __tablename__ = 'technician_availability'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    available_minutes = db.Column(db.Integer, nullable=False, default=0)
+
 class Certification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -141,7 +218,7 @@ class Certification(db.Model):
 class Warehouse(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
-    site_id = db.Column(db.Integer, db.ForeignKey('site.id'))
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id'), index=True)
     location_id = db.Column(db.Integer, db.ForeignKey('location.id'))
     spare_parts = db.relationship('SparePart', backref='warehouse', lazy=True)
 
@@ -180,6 +257,20 @@ class PurchaseRequest(db.Model):
     request_date = db.Column(db.DateTime, default=datetime.utcnow)
     purchase_orders = db.relationship('PurchaseOrder', backref='purchase_request', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_purchase_request_part_status', 'spare_part_id', 'status'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'spare_part_id': self.spare_part_id,
+            'quantity': self.quantity,
+            'requested_by_user_id': self.requested_by_user_id,
+            'status': self.status.name if self.status else None,
+            'request_date': self.request_date.isoformat() if self.request_date else None,
+        }
+
 class PurchaseOrderStatus(enum.Enum):
     ordered = 'ordered'
     received = 'received'
@@ -215,6 +306,11 @@ class InventoryMovement(db.Model):
     from_warehouse = db.relationship('Warehouse', foreign_keys=[from_warehouse_id], backref='movements_from', lazy=True)
     to_warehouse = db.relationship('Warehouse', foreign_keys=[to_warehouse_id], backref='movements_to', lazy=True)
 
+    __table_args__ = (
+        # Cubre la agregación de consumo (salidas por repuesto en una ventana de fechas)
+        db.Index('ix_inventory_movement_part_type_date', 'spare_part_id', 'type', 'movement_date'),
+    )
+
 class WorkOrderType(enum.Enum):
     preventive = 'preventive'
     corrective = 'corrective'
@@ -253,9 +349,16 @@ class WorkOrder(db.Model):
     photos_before = db.Column(db.JSON)
     photos_after = db.Column(db.JSON)
     site_id = db.Column(db.Integer, db.ForeignKey('site.id'))
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
     checklists = db.relationship('Checklist', backref='work_order', lazy=True)
     permits = db.relationship('Permit', backref='work_order', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_work_order_site_status_type', 'site_id', 'status', 'type'),
+        db.Index('ix_work_order_site_created', 'site_id', 'created_date'),
+        db.Index('ix_work_order_site_asset', 'site_id', 'asset_id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -271,6 +374,40 @@ class WorkOrder(db.Model):
             'end_date': self.end_date.isoformat() if self.end_date else None,
         }
 
+# Respuestas ya enviadas por clave de idempotencia (reintentos de clientes móviles)
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_key'
+    key = db.Column(db.String(128), primary_key=True)
+    endpoint = db.Column(db.String(128), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    response = db.Column(db.JSON)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+# Agregados diarios de KPIs de mantenimiento (MTBF, MTTR, disponibilidad, backlog, PM)
+class KpiDailyBase:
+    day = db.Column(db.Date, primary_key=True)
+    orders_opened = db.Column(db.Integer, nullable=False, default=0)
+    orders_closed = db.Column(db.Integer, nullable=False, default=0)
+    # Suma de los ordinales (date.toordinal) de creación: permite calcular la edad del backlog
+    opened_day_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    closed_day_sum = db.Column(db.BigInteger, nullable=False, default=0)
+    failures = db.Column(db.Integer, nullable=False, default=0)
+    repairs = db.Column(db.Integer, nullable=False, default=0)
+    repair_minutes = db.Column(db.BigInteger, nullable=False, default=0)
+    downtime_minutes = db.Column(db.BigInteger, nullable=False, default=0)
+    pm_scheduled = db.Column(db.Integer, nullable=False, default=0)
+    pm_completed = db.Column(db.Integer, nullable=False, default=0)
+
+class AssetKpiDaily(db.Model, KpiDailyBase):
+    __tablename__ = 'asset_kpi_daily'
+    asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'), primary_key=True)
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id'))
+
+class SiteKpiDaily(db.Model, KpiDailyBase):
+    __tablename__ = 'site_kpi_daily'
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id'), primary_key=True)
+
 class Checklist(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -280,6 +417,76 @@ class Checklist(db.Model):
     asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'))
     preventive_schedules = db.relationship('PreventiveSchedule', backref='checklist', lazy=True)
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'tasks': self.tasks,
+            'is_template': self.is_template,
+            'work_order_id': self.work_order_id,
+            'asset_id': self.asset_id,
+        }
+
+# Resultado del planificador: técnico y día asignados a cada preventivo u OT abierta
+class PlannedTask(db.Model):
+    __tablename__ = 'planned_task'
+    id = db.Column(db.Integer, primary_key=True)
+    source_type = db.Column(db.Enum('preventive', 'work_order', name='planned_task_source'), nullable=False)
+    source_id = db.Column(db.Integer, nullable=False)
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id'))
+    asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    skill_id = db.Column(db.Integer, db.ForeignKey('skill_type.id'))
+    planned_date = db.Column(db.Date)
+    due_date = db.Column(db.Date)
+    duration_minutes = db.Column(db.Integer, nullable=False)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('source_type', 'source_id', name='uq_planned_task_source'),
+        db.Index('ix_planned_task_site_date', 'site_id', 'planned_date'),
+        db.Index('ix_planned_task_user_date', 'user_id', 'planned_date'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source_type': self.source_type,
+            'source_id': self.source_id,
+            'site_id': self.site_id,
+            'asset_id': self.asset_id,
+            'user_id': self.user_id,
+            'skill_id': self.skill_id,
+            'planned_date': self.planned_date.isoformat() if self.planned_date else None,
+            'due_date': self.due_date.isoformat() if self.due_date else None,
+            'duration_minutes': self.duration_minutes,
+            'late_days': max((self.planned_date - self.due_date).days, 0) if self.planned_date and self.due_date else None,
+        }
+
+# Registro de cada ejecución de checklist (autónomo) y su eventual escalamiento
+class ChecklistExecution(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    checklist_id = db.Column(db.Integer, db.ForeignKey('checklist.id'))
+    asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    executed_date = db.Column(db.DateTime, default=datetime.utcnow)
+    results = db.Column(db.JSON)
+    notes = db.Column(db.Text)
+    anomalies_found = db.Column(db.Integer, default=0)
+    work_order_id = db.Column(db.Integer, db.ForeignKey('work_order.id'))
+    work_order = db.relationship('WorkOrder', backref='checklist_executions', lazy=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'checklist_id': self.checklist_id,
+            'asset_id': self.asset_id,
+            'user_id': self.user_id,
+            'executed_date': self.executed_date.isoformat() if self.executed_date else None,
+            'anomalies_found': self.anomalies_found,
+            'work_order_id': self.work_order_id,
+        }
+
 class PreventiveScheduleType(enum.Enum):
     time = 'time'
     usage = 'usage'
@@ -335,6 +542,50 @@ class SensorReading(db.Model):
     reading_date = db.Column(db.DateTime, default=datetime.utcnow)
     is_anomalous = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        # Ventanas de lecturas por activo (features del modelo predictivo)
+        db.Index('ix_sensor_reading_asset_date', 'asset_id', 'reading_date'),
+    )
+
+# Caché del puntaje de riesgo de falla por activo (modelo predictivo)
+class AssetRiskScore(db.Model):
+    __tablename__ = 'asset_risk_score'
+    asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'), primary_key=True)
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id'))
+    score = db.Column(db.Float, nullable=False, default=0.0)
+    rms = db.Column(db.Float)
+    slope = db.Column(db.Float)
+    peaks = db.Column(db.Integer)
+    days_since_pm = db.Column(db.Float)
+    corrective_rate = db.Column(db.Float)
+    readings = db.Column(db.Integer, nullable=False, default=0)
+    # Mayor id de lectura considerado: las lecturas con id superior disparan el recálculo
+    last_reading_id = db.Column(db.Integer, nullable=False, default=0)
+    model_version = db.Column(db.String(64))
+    computed_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    asset = db.relationship('Asset', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_asset_risk_score_site_score', 'site_id', 'score'),
+    )
+
+    def to_dict(self):
+        return {
+            'asset_id': self.asset_id,
+            'site_id': self.site_id,
+            'score': round(self.score, 4),
+            'features': {
+                'rms': self.rms,
+                'slope': self.slope,
+                'peaks': self.peaks,
+                'days_since_pm': self.days_since_pm,
+                'corrective_rate': self.corrective_rate,
+            },
+            'readings': self.readings,
+            'model_version': self.model_version,
+            'computed_date': self.computed_date.isoformat() if self.computed_date else None,
+        }
+
 class FuelType(enum.Enum):
     gasoline = 'gasoline'
     diesel = 'diesel'
@@ -353,6 +604,46 @@ class VehicleDetail(db.Model):
     fuel_consumption = db.Column(db.Numeric(5,2))
     gps_enabled = db.Column(db.Boolean, default=False)
 
+# Recorrido GPS de un vehículo: arrays por columnas (tiempo, latitud, longitud)
+# codificados por deltas y comprimidos con zlib; un segmento por lote recibido,
+# compactados a uno por vehículo y día (flask fleet compact).
+class VehicleTrackSegment(db.Model):
+    __tablename__ = 'vehicle_track_segment'
+    id = db.Column(db.Integer, primary_key=True)
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle_detail.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    points = db.Column(db.Integer, nullable=False)
+    distance_m = db.Column(db.Float, nullable=False, default=0)
+    # Caja envolvente para descartar segmentos sin descomprimirlos
+    min_lat = db.Column(db.Float)
+    max_lat = db.Column(db.Float)
+    min_lon = db.Column(db.Float)
+    max_lon = db.Column(db.Float)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_vehicle_track_segment_vehicle_day', 'vehicle_id', 'day', 'start_time'),
+        db.Index('ix_vehicle_track_segment_day', 'day'),
+    )
+
+# Última posición de cada vehículo, indexada por celda de una grilla de CELL_DEGREES
+class VehiclePosition(db.Model):
+    __tablename__ = 'vehicle_position'
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle_detail.id'), primary_key=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    cell_x = db.Column(db.Integer, nullable=False)
+    cell_y = db.Column(db.Integer, nullable=False)
+    recorded_date = db.Column(db.DateTime, nullable=False)
+    # Metros recorridos aún no sumados a VehicleDetail.current_mileage (km enteros)
+    pending_m = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_vehicle_position_cell', 'cell_y', 'cell_x'),
+    )
+
 class IncidentType(enum.Enum):
     incident = 'incident'
     near_miss = 'near_miss'
@@ -392,6 +683,39 @@ class Procedure(db.Model):
     description = db.Column(db.Text)
     type = db.Column(db.Enum(ProcedureType))
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'type': self.type.name if self.type else None,
+        }
+
+# Registro compactado de cambios para la sincronización de dispositivos móviles:
+# una fila por entidad (y por técnico, en las OTs) con la secuencia de su último cambio.
+class ChangeLog(db.Model):
+    __tablename__ = 'change_log'
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    entity = db.Column(db.String(32), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.Enum('upsert', 'delete', name='change_log_op'), nullable=False)
+    site_id = db.Column(db.Integer)
+    # Técnico destinatario en las OTs: al reasignar, el anterior recibe un 'delete'
+    user_id = db.Column(db.Integer)
+    changed_date = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_change_log_entity', 'entity', 'entity_id'),
+        db.Index('ix_change_log_op_date', 'op', 'changed_date'),
+    )
+
+# Contador de secuencia de cambios (fila única) y límite de purga de borrados
+class SyncState(db.Model):
+    __tablename__ = 'sync_state'
+    id = db.Column(db.Integer, primary_key=True)
+    last_seq = db.Column(db.Integer, nullable=False, default=0)
+    purged_through = db.Column(db.Integer, nullable=False, default=0)
+
 class AuditType(enum.Enum):
     internal = 'internal'
     external = 'external'
@@ -405,12 +729,89 @@ class Audit(db.Model):
     auditor_user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     type = db.Column(db.Enum(AuditType))
 
+# Cubo de seguridad: eventos por mes, planta, categoría de activo, origen
+# (incidente, auditoría, permiso), tipo y severidad. Se mantiene al insertar;
+# 0 y '' marcan una dimensión sin valor (por eso sin claves foráneas).
+class SafetyCubeCell(db.Model):
+    __tablename__ = 'safety_cube_cell'
+    month = db.Column(db.Date, primary_key=True)
+    site_id = db.Column(db.Integer, primary_key=True, default=0)
+    category_id = db.Column(db.Integer, primary_key=True, default=0)
+    source = db.Column(db.String(16), primary_key=True)
+    kind = db.Column(db.String(64), primary_key=True, default='')
+    severity = db.Column(db.String(16), primary_key=True, default='')
+    events = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_safety_cube_cell_source_month', 'source', 'month'),
+    )
+
+class ExpirySource(enum.Enum):
+    certification = 'certification'
+    permit = 'permit'
+    warranty = 'warranty'
+    insurance = 'insurance'
+    registration = 'registration'
+
+# Índice unificado de vencimientos (certificaciones, permisos, garantías, documentos de vehículos)
+class ExpiryEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    source_type = db.Column(db.Enum(ExpirySource), nullable=False)
+    source_id = db.Column(db.Integer, nullable=False)
+    expiry_date = db.Column(db.Date, nullable=False, index=True)
+    label = db.Column(db.String(255))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    asset_id = db.Column(db.Integer, db.ForeignKey('asset.id'))
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id'))
+    warned_date = db.Column(db.Date)
+
+    __table_args__ = (
+        db.UniqueConstraint('source_type', 'source_id', name='uq_expiry_entry_source'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'source_type': self.source_type.name if self.source_type else None,
+            'source_id': self.source_id,
+            'expiry_date': self.expiry_date.isoformat() if self.expiry_date else None,
+            'label': self.label,
+            'user_id': self.user_id,
+            'asset_id': self.asset_id,
+            'site_id': self.site_id,
+            'warned_date': self.warned_date.isoformat() if self.warned_date else None,
+        }
+
 class NotificationType(enum.Enum):
     email = 'email'
     sms = 'sms'
     whatsapp = 'whatsapp'
     push = 'push'
 
+# Aviso enviado a muchos usuarios: cada destinatario recibe su fila en 'notification'
+class NotificationBroadcast(db.Model):
+    __tablename__ = 'notification_broadcast'
+    id = db.Column(db.Integer, primary_key=True)
+    message = db.Column(db.Text, nullable=False)
+    type = db.Column(db.Enum(NotificationType))
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id'))
+    role = db.Column(db.Enum(Role))
+    created_by_user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    recipients = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'message': self.message,
+            'type': self.type.name if self.type else None,
+            'site_id': self.site_id,
+            'role': self.role.name if self.role else None,
+            'created_by_user_id': self.created_by_user_id,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'recipients': self.recipients,
+        }
+
 class Notification(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
@@ -418,6 +819,108 @@ class Notification(db.Model):
     type = db.Column(db.Enum(NotificationType))
     sent_date = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
+    archived = db.Column(db.Boolean, nullable=False, default=False)
+    broadcast_id = db.Column(db.Integer, db.ForeignKey('notification_broadcast.id'))
+
+    __table_args__ = (
+        # Paginación por clave de la bandeja: (user_id, sent_date, id)
+        db.Index('ix_notification_user_sent', 'user_id', 'sent_date', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'message': self.message,
+            'type': self.type.name if self.type else None,
+            'sent_date': self.sent_date.isoformat() if self.sent_date else None,
+            'is_read': bool(self.is_read),
+            'archived': self.archived,
+            'broadcast_id': self.broadcast_id,
+        }
+
+# Contador de no leídas por usuario (no archivadas): el globo de la bandeja
+# se lee de aquí y se mantiene en la misma transacción que las notificaciones
+class NotificationCounter(db.Model):
+    __tablename__ = 'notification_counter'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+
+class JobStatus(enum.Enum):
+    queued = 'queued'
+    running = 'running'
+    succeeded = 'succeeded'
+    failed = 'failed'
+
+# Trabajos en segundo plano (flask jobs worker); 'lease_*' evita que dos nodos corran el mismo
+class Job(db.Model):
+    __tablename__ = 'job'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), nullable=False)
+    params = db.Column(db.JSON)
+    status = db.Column(db.Enum(JobStatus), nullable=False, default=JobStatus.queued)
+    priority = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    lease_owner = db.Column(db.String(128))
+    lease_expires = db.Column(db.DateTime)
+    schedule_id = db.Column(db.Integer, db.ForeignKey('job_schedule.id'))
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+    started_date = db.Column(db.DateTime)
+    finished_date = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Integer)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+        db.Index('ix_job_name_finished', 'name', 'finished_date'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'params': self.params,
+            'status': self.status.name if self.status else None,
+            'priority': self.priority,
+            'run_after': self.run_after.isoformat() if self.run_after else None,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'lease_owner': self.lease_owner,
+            'schedule_id': self.schedule_id,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'started_date': self.started_date.isoformat() if self.started_date else None,
+            'finished_date': self.finished_date.isoformat() if self.finished_date else None,
+            'duration_ms': self.duration_ms,
+            'result': self.result,
+            'error': self.error,
+        }
+
+# Programación tipo cron de trabajos recurrentes
+class JobSchedule(db.Model):
+    __tablename__ = 'job_schedule'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, nullable=False)
+    job_name = db.Column(db.String(64), nullable=False)
+    cron = db.Column(db.String(64), nullable=False)
+    params = db.Column(db.JSON)
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    next_run = db.Column(db.DateTime, index=True)
+    last_run = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'job_name': self.job_name,
+            'cron': self.cron,
+            'params': self.params,
+            'enabled': self.enabled,
+            'next_run': self.next_run.isoformat() if self.next_run else None,
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+        }
 
 # Historia models (similar, pero para audit logs; no siempre necesarios en app, pero para completitud)
 class HistoryBase:
@@ -1,9 +1,17 @@
-from flask import Blueprint, jsonify, request, render_template
+from datetime import date
+import click
+from flask import Blueprint, current_app, jsonify, request, render_template
 from .services import (
-    get_assets, get_asset_by_id, create_asset,
-    update_asset, delete_asset
+    get_asset_rows, get_asset_by_id, create_asset,
+    update_asset, delete_asset, serialize_assets, ASSET_RESPONSE_TABLES
 )
-from .validations import validate_asset_data
+from .valuation_service import revalue_assets, get_valuation
+from app.extensions import response_cache
+from app.models import db
+from app.services.db_routing import read_only
+from .spec_index import ensure_spec_indexes
+from .json_benchmark import benchmark_asset_list
+from .validations import validate_asset_data, parse_spec_filters
 
 assets_bp = Blueprint(
     'assets',
@@ -21,21 +29,32 @@ def list_page():
 
 # --- Rutas de la API (JSON) ---
 @assets_bp.route('/api/assets', methods=['GET'])
+@read_only
+@response_cache.cached(*ASSET_RESPONSE_TABLES)
 def api_list_assets():
+    """
+    Lista de activos. Admite filtros por especificación, p. ej.
+    ?spec.power_kw__gt=50&spec.seal_type=mechanical
+    """
     filters = request.args.to_dict()
-    assets, error = get_assets(filters)
+    filters['specs'], errors = parse_spec_filters(filters)
+    if errors:
+        return jsonify({'errors': errors}), 400
+    rows, error = get_asset_rows(filters)
     if error:
         return jsonify({'error': error['message']}), error['status']
-    return jsonify([asset.to_dict() for asset in assets]), 200
+    return jsonify(serialize_assets(rows)), 200
 
 @assets_bp.route('/api/assets/<int:asset_id>', methods=['GET'])
+@read_only
+@response_cache.cached(*ASSET_RESPONSE_TABLES)
 def api_get_asset(asset_id):
     asset, error = get_asset_by_id(asset_id)
     if error:
         return jsonify({'error': error['message']}), error['status']
     if not asset:
         return jsonify({'error': 'Activo no encontrado'}), 404
-    return jsonify(asset.to_dict()), 200
+    return jsonify(serialize_assets([asset.to_dict()])[0]), 200
 
 @assets_bp.route('/api/assets', methods=['POST'])
 def api_create_asset():
@@ -46,7 +65,7 @@ def api_create_asset():
     asset, error = create_asset(data)
     if error:
         return jsonify({'error': error['message']}), error['status']
-    return jsonify(asset.to_dict()), 201
+    return jsonify(serialize_assets([asset.to_dict()])[0]), 201
 
 @assets_bp.route('/api/assets/<int:asset_id>', methods=['PUT'])
 def api_update_asset(asset_id):
@@ -57,7 +76,7 @@ def api_update_asset(asset_id):
     asset, error = update_asset(asset_id, data)
     if error:
         return jsonify({'error': error['message']}), error['status']
-    return jsonify(asset.to_dict()), 200
+    return jsonify(serialize_assets([asset.to_dict()])[0]), 200
 
 @assets_bp.route('/api/assets/<int:asset_id>', methods=['DELETE'])
 def api_delete_asset(asset_id):
@@ -65,3 +84,58 @@ def api_delete_asset(asset_id):
     if error:
         return jsonify({'error': error['message']}), error['status']
     return jsonify({'message': 'Activo eliminado correctamente'}), 200
+
+@assets_bp.route('/api/assets/valuation', methods=['GET'])
+def api_get_valuation():
+    """
+    Valoración de la cartera a una fecha ('as_of', YYYY-MM-DD; por defecto hoy).
+    """
+    try:
+        as_of = date.fromisoformat(request.args['as_of']) if request.args.get('as_of') else date.today()
+    except ValueError:
+        return jsonify({'errors': {'as_of': "El campo 'as_of' debe tener formato YYYY-MM-DD."}}), 400
+
+    detail = request.args.get('detail') in ('1', 'true')
+    valuation, error = get_valuation(as_of, detail=detail)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(valuation), 200
+
+@assets_bp.route('/api/assets/revalue', methods=['POST'])
+def api_revalue_assets():
+    result, error = revalue_assets()
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 200
+
+# --- Comandos CLI ---
+
+@assets_bp.cli.command('revalue')
+@click.option('--as-of', default=None, help='Fecha de valoración (YYYY-MM-DD).')
+def revalue_command(as_of):
+    """
+    Recalcula el valor actual de todos los activos: flask assets revalue
+    """
+    result, error = revalue_assets(date.fromisoformat(as_of) if as_of else None)
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"Activos: {result['assets']} - Actualizados: {result['updated']} - Valor total: {result['total_value']}")
+
+@assets_bp.cli.command('index-specs')
+def index_specs_command():
+    """
+    Crea los índices de las especificaciones declaradas en ASSET_SPEC_INDEXES: flask assets index-specs
+    """
+    created, error = ensure_spec_indexes(db.engine)
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"Índices creados: {', '.join(created) if created else 'ninguno (ya existían)'}")
+
+@assets_bp.cli.command('benchmark-json')
+@click.option('--repeat', default=5, show_default=True, help='Repeticiones por camino (se toma la mejor).')
+def benchmark_json_command(repeat):
+    """
+    Compara los caminos de serialización del listado de activos: flask assets benchmark-json
+    """
+    for result in benchmark_asset_list(current_app, repeat=repeat):
+        click.echo(f"{result['path']:<22} {result['ms']:>9.1f} ms {result['bytes']:>12} bytes")
@@ -0,0 +1,45 @@
+import gzip
+import json
+import time
+from app.models import Asset
+from .services import get_asset_rows
+
+
+def _best_ms(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark_asset_list(app, repeat=5):
+    """
+    Mide el listado de activos (consulta + serialización) por caminos:
+    ORM + to_dict() + json estándar (el anterior), ORM + to_dict() + proveedor
+    de la app, y filas SQL + proveedor de la app; más el costo de gzip.
+    """
+    provider = app.json
+
+    def orm_stdlib():
+        return json.dumps([a.to_dict() for a in Asset.query.all()]).encode('utf-8')
+
+    def orm_fast():
+        return provider.dumps_bytes([a.to_dict() for a in Asset.query.all()])
+
+    def rows_fast():
+        rows, error = get_asset_rows({})
+        if error:
+            raise RuntimeError(error['message'])
+        return provider.dumps_bytes(rows)
+
+    results = []
+    for name, fn in [('orm+to_dict+json', orm_stdlib), ('orm+to_dict+app.json', orm_fast), ('rows+app.json', rows_fast)]:
+        ms, body = _best_ms(fn, repeat)
+        results.append({'path': name, 'ms': round(ms, 1), 'bytes': len(body)})
+
+    ms, compressed = _best_ms(lambda: gzip.compress(body, compresslevel=app.config.get('COMPRESS_GZIP_LEVEL', 6)), repeat)
+    results.append({'path': 'gzip', 'ms': round(ms, 1), 'bytes': len(compressed)})
+    return results
@@ -1,29 +1,82 @@
+from app.extensions import reference_data
 from app.models import db, Asset, WorkOrder
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
+from .spec_index import spec_conditions
 
-def get_assets(filters):
+# Columnas de Asset.to_dict(), leídas como filas para los listados
+ASSET_COLUMNS = [
+    'id', 'unique_code', 'name', 'category_id', 'model_id', 'manufacturer_id', 'specs',
+    'location_id', 'site_id', 'value_initial', 'value_current', 'depreciation_method',
+    'purchase_date', 'hierarchy_parent_id', 'criticality', 'warranty_expiry',
+]
+
+# Nombres que se agregan al activo serializado: (campo id, tabla de referencia, campo nombre)
+REFERENCE_NAMES = [
+    ('category_id', 'category', 'category_name'),
+    ('location_id', 'location', 'location_name'),
+    ('manufacturer_id', 'manufacturer', 'manufacturer_name'),
+    ('model_id', 'model', 'model_name'),
+]
+# Tablas de las que dependen las respuestas de activos (caché de respuestas)
+ASSET_RESPONSE_TABLES = ('asset', *(table for _, table, _ in REFERENCE_NAMES))
+
+def serialize_assets(items):
     """
-    Obtiene una lista de activos, aplicando filtros.
+    Convierte activos (filas de get_asset_rows o diccionarios de to_dict())
+    en diccionarios con los nombres de categoría, ubicación, fabricante y
+    modelo resueltos en la caché de referencia, sin consultas.
     """
-    try:
-        query = Asset.query
+    tables = [(id_field, reference_data.table(table), name_field) for id_field, table, name_field in REFERENCE_NAMES]
+    result = []
+    for item in items:
+        data = item._asdict() if hasattr(item, '_asdict') else dict(item)
+        for id_field, table, name_field in tables:
+            data[name_field] = table.name_of(data.get(id_field))
+        result.append(data)
+    return result
 
-        if 'category_id' in filters and filters['category_id']:
-            query = query.filter_by(category_id=filters['category_id'])
-        if 'location_id' in filters and filters['location_id']:
-            query = query.filter_by(location_id=filters['location_id'])
-        if 'criticality' in filters and filters['criticality']:
-            query = query.filter_by(criticality=filters['criticality'])
+def _apply_filters(query, filters):
+    """
+    Aplica los filtros del listado a una Query o a un select().
+    """
+    if 'category_id' in filters and filters['category_id']:
+        query = query.filter_by(category_id=filters['category_id'])
+    if 'location_id' in filters and filters['location_id']:
+        query = query.filter_by(location_id=filters['location_id'])
+    if 'criticality' in filters and filters['criticality']:
+        query = query.filter_by(criticality=filters['criticality'])
+
+    if 'search' in filters and filters['search']:
+        search_term = f"%{filters['search']}%"
+        query = query.filter(Asset.name.ilike(search_term) | Asset.unique_code.ilike(search_term))
 
-        if 'search' in filters and filters['search']:
-            search_term = f"%{filters['search']}%"
-            query = query.filter(Asset.name.ilike(search_term) | Asset.unique_code.ilike(search_term))
+    # Filtros por especificación ya validados (validations.parse_spec_filters)
+    if filters.get('specs'):
+        query = query.filter(spec_conditions(db.engine.dialect.name, filters['specs']))
+    return query
 
-        assets = query.all()
+def get_assets(filters):
+    """
+    Obtiene una lista de activos, aplicando filtros.
+    """
+    try:
+        assets = _apply_filters(Asset.query, filters).all()
         return assets, None
     except SQLAlchemyError as e:
         return None, {'message': 'Error al consultar la base de datos', 'status': 500}
 
+def get_asset_rows(filters):
+    """
+    Como get_assets, pero devuelve filas con las columnas de to_dict() para
+    serializarlas directamente, sin construir objetos ORM.
+    """
+    try:
+        query = _apply_filters(select(*(getattr(Asset, c) for c in ASSET_COLUMNS)), filters)
+        return db.session.execute(query).all(), None
+    except SQLAlchemyError as e:
+        return None, {'message': 'Error al consultar la base de datos', 'status': 500}
+
 def get_asset_by_id(asset_id):
     try:
         asset = Asset.query.get(asset_id)
@@ -0,0 +1,169 @@
+"""
+Consultas por atributos de Asset.specs (JSON).
+
+Las claves declaradas en ASSET_SPEC_INDEXES ({'power_kw': 'number', ...}) se
+consultan con la misma expresión con la que se indexan, así el planificador
+usa el índice de expresión (SQLite, PostgreSQL, MySQL 8.0.13+). Las claves no
+declaradas también se filtran en SQL, sin índice y con la extracción protegida
+por el tipo del valor JSON: su tipo se deduce del valor consultado, así que
+'spec.volts=220' solo encuentra el número 220 y no el texto "220". Para
+consultar una clave guardada como texto hay que declararla con tipo 'text'.
+"""
+import re
+from flask import current_app
+from sqlalchemy import Boolean, Numeric, String, and_, literal_column, text
+from sqlalchemy.exc import SQLAlchemyError
+
+SPEC_TYPES = ('number', 'text', 'boolean')
+OPERATORS = {
+    'eq': lambda col, v: col == v,
+    'ne': lambda col, v: col != v,
+    'gt': lambda col, v: col > v,
+    'gte': lambda col, v: col >= v,
+    'lt': lambda col, v: col < v,
+    'lte': lambda col, v: col <= v,
+    'in': lambda col, v: col.in_(v),
+}
+_SQL_TYPES = {'number': Numeric(20, 6), 'text': String(255), 'boolean': Boolean()}
+# La clave se incrusta en el SQL de la expresión (debe coincidir con la del índice)
+KEY_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]{0,62}$')
+
+
+def spec_indexes_from_env(raw):
+    """
+    'power_kw:number,seal_type:text' -> {'power_kw': 'number', 'seal_type': 'text'}
+    Lanza ValueError con una clave o un tipo no válidos.
+    """
+    declared = {}
+    for item in raw.split(','):
+        key, _, type_ = item.strip().partition(':')
+        if key:
+            declared[key.strip()] = type_.strip() or 'text'
+    return validate_spec_indexes(declared)
+
+
+def validate_spec_indexes(declared):
+    for key, type_ in declared.items():
+        if not KEY_PATTERN.match(key):
+            raise ValueError(f"ASSET_SPEC_INDEXES: clave de especificación no válida: '{key}'")
+        if type_ not in SPEC_TYPES:
+            raise ValueError(f"ASSET_SPEC_INDEXES: tipo '{type_}' no válido para la clave '{key}' "
+                             f"(opciones: {', '.join(SPEC_TYPES)})")
+    return declared
+
+
+def declared_specs():
+    return current_app.config.get('ASSET_SPEC_INDEXES', {})
+
+
+def _sqlite(column, key, type_, declared):
+    expression = f"json_extract({column}, '$.{key}')"
+    if declared or type_ == 'text':
+        return expression
+    json_type = "('integer', 'real')" if type_ == 'number' else "('true', 'false')"
+    return f"CASE WHEN json_type({column}, '$.{key}') IN {json_type} THEN {expression} END"
+
+
+def _postgresql(column, key, type_, declared):
+    value = f"({column} ->> '{key}')"
+    if type_ == 'text':
+        return value
+    cast = f"CAST({value} AS {'NUMERIC' if type_ == 'number' else 'BOOLEAN'})"
+    if declared:
+        return cast
+    return f"CASE WHEN json_typeof({column} -> '{key}') = '{type_}' THEN {cast} END"
+
+
+def _mysql(column, key, type_, declared):
+    value = f"JSON_UNQUOTE(JSON_EXTRACT({column}, '$.{key}'))"
+    if type_ != 'number':
+        # Los booleanos se comparan como 'true'/'false'
+        return f"CAST({value} AS CHAR(255))"
+    cast = f"CAST({value} AS DECIMAL(20,6))"
+    if declared:
+        return cast
+    return f"CASE WHEN JSON_TYPE(JSON_EXTRACT({column}, '$.{key}')) IN ('INTEGER', 'DOUBLE', 'DECIMAL') THEN {cast} END"
+
+
+_DIALECTS = {'sqlite': _sqlite, 'postgresql': _postgresql, 'mysql': _mysql, 'mariadb': _mysql}
+
+
+def spec_sql(dialect, key, type_, declared, column='asset.specs'):
+    if not KEY_PATTERN.match(key):
+        raise ValueError(f"Clave de especificación no válida: '{key}'")
+    if dialect not in _DIALECTS:
+        raise ValueError(f"Dialecto sin soporte para consultar especificaciones: '{dialect}'")
+    return _DIALECTS[dialect](column, key, type_, declared)
+
+
+def _bind_value(dialect, type_, value):
+    if type_ == 'boolean':
+        if dialect == 'sqlite':
+            return int(value)
+        if dialect in ('mysql', 'mariadb'):
+            return 'true' if value else 'false'
+    return value
+
+
+def spec_condition(dialect, key, op, value, type_):
+    """
+    Condición SQL para un filtro ya validado (ver validations.parse_spec_filters).
+    """
+    declared = declared_specs().get(key) == type_
+    sql_type = String(255) if dialect in ('mysql', 'mariadb') and type_ == 'boolean' else _SQL_TYPES[type_]
+    column = literal_column(spec_sql(dialect, key, type_, declared), sql_type)
+    if op == 'in':
+        value = [_bind_value(dialect, type_, v) for v in value]
+    else:
+        value = _bind_value(dialect, type_, value)
+    return OPERATORS[op](column, value)
+
+
+def spec_conditions(dialect, filters):
+    return and_(*(spec_condition(dialect, f['key'], f['op'], f['value'], f['type']) for f in filters))
+
+
+def index_name(key):
+    return f'ix_asset_spec_{key}'
+
+
+# El reflejo de SQLAlchemy omite los índices de expresión: se consulta el catálogo
+_INDEX_CATALOG = {
+    'sqlite': "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'asset'",
+    'postgresql': "SELECT indexname FROM pg_indexes WHERE tablename = 'asset'",
+    'mysql': "SELECT DISTINCT index_name FROM information_schema.statistics "
+             "WHERE table_schema = DATABASE() AND table_name = 'asset'",
+}
+_INDEX_CATALOG['mariadb'] = _INDEX_CATALOG['mysql']
+
+
+def _existing_indexes(connection, dialect):
+    if dialect not in _INDEX_CATALOG:
+        raise ValueError(f"Dialecto sin soporte para consultar especificaciones: '{dialect}'")
+    return set(connection.execute(text(_INDEX_CATALOG[dialect])).scalars())
+
+
+def ensure_spec_indexes(engine):
+    """
+    Crea los índices de expresión de las claves declaradas que aún no existen.
+    Devuelve (creados, error).
+    """
+    dialect = engine.dialect.name
+    try:
+        created = []
+        with engine.begin() as connection:
+            existing = _existing_indexes(connection, dialect)
+            for key, type_ in declared_specs().items():
+                if type_ not in SPEC_TYPES:
+                    return None, {'message': f"Tipo '{type_}' no válido para la clave '{key}'", 'status': 400}
+                name = index_name(key)
+                if name in existing:
+                    continue
+                expression = spec_sql(dialect, key, type_, declared=True, column='specs')
+                connection.execute(text(f'CREATE INDEX {name} ON asset (({expression}))'))
+                created.append(name)
+        return created, None
+    except ValueError as e:
+        return None, {'message': str(e), 'status': 400}
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al crear los índices de especificaciones: {e}", 'status': 500}
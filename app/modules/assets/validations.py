@@ -1,4 +1,17 @@
+from decimal import Decimal, InvalidOperation
+from app.extensions import reference_data
 from app.models import Asset
+from app.services.tenancy import accessible_site_ids
+from .spec_index import OPERATORS, KEY_PATTERN, declared_specs
+
+SPEC_PREFIX = 'spec.'
+# Campo -> (tabla de referencia, descripción para el mensaje de error)
+REFERENCE_FIELDS = {
+    'category_id': ('category', 'la categoría'),
+    'location_id': ('location', 'la ubicación'),
+    'manufacturer_id': ('manufacturer', 'el fabricante'),
+    'model_id': ('model', 'el modelo'),
+}
 
 def validate_asset_data(data, is_update=False, asset_id=None):
     """
@@ -30,4 +43,109 @@ def validate_asset_data(data, is_update=False, asset_id=None):
         if data['criticality'] not in ['low', 'medium', 'high', 'critical']:
             errors['criticality'] = "El valor de criticidad no es válido."
 
+    if data.get('specs') is not None:
+        errors.update(_validate_specs(data['specs']))
+
+    errors.update(_validate_references(data, errors))
+
+    return errors
+
+def _validate_references(data, errors):
+    """
+    Las referencias se resuelven en la caché de tablas de referencia, sin
+    consultas. Una ubicación de otra planta cuenta como inexistente.
+    """
+    found = {}
+    reference_errors = {}
+    for field, (table, label) in REFERENCE_FIELDS.items():
+        value = data.get(field)
+        if value in (None, '') or field in errors:
+            continue
+        try:
+            ref_id = int(value)
+        except (TypeError, ValueError):
+            reference_errors[field] = f"El campo '{field}' debe ser un entero."
+            continue
+        site_ids = accessible_site_ids() if table == 'location' else None
+        found[field] = reference_data.get(table, ref_id, site_ids)
+        if found[field] is None:
+            reference_errors[field] = f"No existe {label} con id {ref_id}."
+
+    model, manufacturer = found.get('model_id'), found.get('manufacturer_id')
+    if model and manufacturer and model.manufacturer_id not in (None, manufacturer.id):
+        reference_errors['model_id'] = f"El modelo '{model.name}' no pertenece al fabricante '{manufacturer.name}'."
+    return reference_errors
+
+def _matches_type(value, type_):
+    if type_ == 'number':
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if type_ == 'boolean':
+        return isinstance(value, bool)
+    return isinstance(value, str)
+
+def _validate_specs(specs):
+    """
+    Las claves declaradas en ASSET_SPEC_INDEXES deben tener el tipo declarado:
+    sus índices y filtros dependen de él.
+    """
+    if not isinstance(specs, dict):
+        return {'specs': "El campo 'specs' debe ser un objeto."}
+    errors = {}
+    for key, type_ in declared_specs().items():
+        if specs.get(key) is not None and not _matches_type(specs[key], type_):
+            errors[f'specs.{key}'] = f"La especificación '{key}' debe ser de tipo '{type_}'."
     return errors
+
+def _parse_spec_value(raw, type_):
+    if type_ == 'number':
+        value = Decimal(raw)
+        if not value.is_finite():
+            raise ValueError
+        return value
+    if type_ == 'boolean':
+        if raw.lower() not in ('true', 'false'):
+            raise ValueError
+        return raw.lower() == 'true'
+    return raw
+
+def _infer_type(raw):
+    if raw.lower() in ('true', 'false'):
+        return 'boolean'
+    try:
+        _parse_spec_value(raw, 'number')
+        return 'number'
+    except (InvalidOperation, ValueError):
+        return 'text'
+
+def parse_spec_filters(args):
+    """
+    Filtros por especificación: 'spec.<clave>[__<op>]=<valor>' con op en
+    eq (por defecto), ne, gt, gte, lt, lte o in (valores separados por comas).
+    El tipo es el declarado en ASSET_SPEC_INDEXES o, si no, se deduce del valor.
+    Devuelve (filters, errors).
+    """
+    filters, errors = [], {}
+    declared = declared_specs()
+    for name, raw in args.items():
+        if not name.startswith(SPEC_PREFIX):
+            continue
+        key, _, op = name[len(SPEC_PREFIX):].partition('__')
+        op = op or 'eq'
+        if not KEY_PATTERN.match(key):
+            errors[name] = f"La clave '{key}' no es válida."
+            continue
+        if op not in OPERATORS:
+            errors[name] = f"Operador no válido. Opciones: {', '.join(OPERATORS)}."
+            continue
+        raws = [v.strip() for v in raw.split(',')] if op == 'in' else [raw]
+        type_ = declared.get(key) or _infer_type(raws[0])
+        try:
+            values = [_parse_spec_value(v, type_) for v in raws]
+        except (InvalidOperation, ValueError):
+            errors[name] = f"El valor debe ser de tipo '{type_}'."
+            continue
+        if type_ == 'boolean' and op not in ('eq', 'ne'):
+            errors[name] = "Las especificaciones booleanas solo admiten 'eq' y 'ne'."
+            continue
+        filters.append({'key': key, 'op': op, 'type': type_, 'value': values if op == 'in' else values[0]})
+    return filters, errors
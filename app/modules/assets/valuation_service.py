@@ -0,0 +1,138 @@
+from datetime import date
+import numpy as np
+from flask import current_app
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db, Asset
+from app.modules.sync.events import record_bulk_changes
+
+DEFAULT_USEFUL_LIFE_YEARS = 10
+DEFAULT_SALVAGE_RATE = 0.0     # Valor residual como fracción del valor inicial
+DAYS_PER_YEAR = 365.25
+
+METHOD_CODES = {'none': 0, 'straight_line': 1, 'declining_balance': 2}
+
+
+def _load_portfolio():
+    """
+    Carga las columnas de valoración de todos los activos en arreglos NumPy.
+    """
+    rows = db.session.execute(select(
+        Asset.id, Asset.value_initial, Asset.value_current,
+        Asset.depreciation_method, Asset.purchase_date
+    )).all()
+    n = len(rows)
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+    initial = np.fromiter((float(r[1]) if r[1] is not None else np.nan for r in rows), dtype=np.float64, count=n)
+    current = np.fromiter((float(r[2]) if r[2] is not None else np.nan for r in rows), dtype=np.float64, count=n)
+    methods = np.fromiter((METHOD_CODES.get(r[3], 0) for r in rows), dtype=np.int8, count=n)
+    purchased = np.fromiter((r[4].toordinal() if r[4] else -1 for r in rows), dtype=np.int64, count=n)
+    return ids, initial, current, methods, purchased
+
+
+def compute_values(initial, methods, purchased, as_of, useful_life=None, salvage_rate=None):
+    """
+    Calcula el valor de todos los activos a la fecha 'as_of' en una sola pasada vectorizada.
+
+    - straight_line: pérdida lineal hasta el valor residual al final de la vida útil.
+    - declining_balance: saldo decreciente doble (tasa 2 / vida útil), con piso en el valor residual.
+      Con vida útil menor a 2 años la tasa se limita al 100 %: el activo queda en
+      el valor residual al pasar la fecha de compra.
+    - none / sin fecha de compra: se conserva el valor inicial.
+    Los activos comprados después de 'as_of' devuelven NaN (no existían a esa fecha).
+    """
+    useful_life = useful_life or current_app.config.get('ASSET_USEFUL_LIFE_YEARS', DEFAULT_USEFUL_LIFE_YEARS)
+    if salvage_rate is None:
+        salvage_rate = current_app.config.get('ASSET_SALVAGE_RATE', DEFAULT_SALVAGE_RATE)
+    if useful_life <= 0:
+        raise ValueError(f"La vida útil debe ser positiva (ASSET_USEFUL_LIFE_YEARS={useful_life}).")
+
+    has_date = purchased >= 0
+    years = np.where(has_date, (as_of.toordinal() - purchased) / DAYS_PER_YEAR, 0.0)
+    salvage = initial * salvage_rate
+
+    straight = initial - (initial - salvage) * np.clip(years / useful_life, 0.0, 1.0)
+    # Con una tasa mayor a 1 la base sería negativa y la potencia fraccionaria daría NaN
+    rate = min(2.0 / useful_life, 1.0)
+    declining = np.maximum(initial * (1.0 - rate) ** np.maximum(years, 0.0), salvage)
+
+    values = np.select([methods == 1, methods == 2], [straight, declining], default=initial)
+    values = np.where(has_date & (years < 0), np.nan, values)
+    return np.round(values, 2)
+
+
+def revalue_assets(as_of=None):
+    """
+    Recalcula 'value_current' de toda la cartera y lo escribe con un UPDATE en bloque.
+    Solo se escriben las filas cuyo valor cambió.
+    """
+    as_of = as_of or date.today()
+    try:
+        ids, initial, current, methods, purchased = _load_portfolio()
+        values = compute_values(initial, methods, purchased, as_of)
+
+        writable = ~np.isnan(values)
+        changed = writable & ((np.isnan(current)) | (np.abs(values - current) >= 0.005))
+        params = [
+            {'b_id': int(i), 'b_value': float(v)}
+            for i, v in zip(ids[changed].tolist(), values[changed].tolist())
+        ]
+        if params:
+            table = Asset.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('b_id')).values(value_current=bindparam('b_value')),
+                params
+            )
+            # El UPDATE de Core no pasa por el flush: los dispositivos se enteran por aquí
+            record_bulk_changes(db.session, 'asset', [p['b_id'] for p in params])
+        db.session.commit()
+        return {
+            'as_of': as_of.isoformat(),
+            'assets': int(len(ids)),
+            'updated': len(params),
+            'total_value': round(float(np.nansum(values)), 2),
+        }, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
+    except ValueError as e:
+        # Configuración de la valoración no válida
+        db.session.rollback()
+        return None, {'message': str(e), 'status': 500}
+
+
+def get_valuation(as_of, detail=False):
+    """
+    Valoración de la cartera a una fecha dada (modo 'punto en el tiempo'), sin escribir nada.
+    """
+    try:
+        ids, initial, current, methods, purchased = _load_portfolio()
+        values = compute_values(initial, methods, purchased, as_of)
+        owned = ~np.isnan(values)
+
+        by_method = {}
+        for name, code in METHOD_CODES.items():
+            mask = owned & (methods == code)
+            by_method[name] = {
+                'assets': int(mask.sum()),
+                'initial_value': round(float(np.nansum(initial[mask])), 2),
+                'value': round(float(np.nansum(values[mask])), 2),
+            }
+
+        result = {
+            'as_of': as_of.isoformat(),
+            'assets': int(owned.sum()),
+            'initial_value': round(float(np.nansum(initial[owned])), 2),
+            'total_value': round(float(np.nansum(values)), 2),
+            'by_method': by_method,
+        }
+        if detail:
+            result['items'] = [
+                {'id': i, 'value': v}
+                for i, v in zip(ids[owned].tolist(), values[owned].tolist())
+            ]
+        return result, None
+    except SQLAlchemyError as e:
+        return None, {'message': 'Error al consultar la base de datos', 'status': 500}
+    except ValueError as e:
+        return None, {'message': str(e), 'status': 500}
@@ -0,0 +1 @@
+# This file makes the 'documents' directory a Python package
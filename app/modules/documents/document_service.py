@@ -0,0 +1,192 @@
+import os
+import uuid
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import (
+    db, Document, DocumentType, EntityType, UploadSession, WorkOrder
+)
+from . import storage
+
+try:
+    from PIL import Image
+    from PIL.Image import DecompressionBombError
+except ImportError:  # Pillow es opcional: sin él no hay miniaturas
+    Image = None
+    DecompressionBombError = None
+
+THUMBNAIL_SIZES = (128, 256, 512)
+
+
+def create_upload(data):
+    """
+    Abre una sesión de carga reanudable.
+    """
+    try:
+        upload = UploadSession(
+            id=uuid.uuid4().hex,
+            name=data['name'],
+            entity_type=EntityType(data['entity_type']),
+            entity_id=data['entity_id'],
+            type=DocumentType(data.get('type', 'other')),
+            mime_type=data.get('mime_type'),
+            photo_slot=data.get('photo_slot'),
+            total_size=data['size'],
+            received_size=0,
+        )
+        db.session.add(upload)
+        db.session.commit()
+        return upload, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
+
+
+def get_upload(upload_id):
+    try:
+        upload = db.session.get(UploadSession, upload_id)
+        if not upload:
+            return None, {'message': 'Carga no encontrada', 'status': 404}
+        return upload, None
+    except SQLAlchemyError as e:
+        return None, {'message': 'Error al consultar la base de datos', 'status': 500}
+
+
+def receive_chunk(upload_id, start, end, stream):
+    """
+    Escribe un fragmento [start, end] de la carga. Solo se aceptan fragmentos que
+    continúan (o repiten) lo ya recibido, de modo que un cliente puede reanudar
+    consultando 'received_size' tras un corte.
+    """
+    upload, error = get_upload(upload_id)
+    if error:
+        return None, error
+    if upload.document_id:
+        return None, {'message': 'La carga ya fue completada', 'status': 409}
+    if end >= upload.total_size:
+        return None, {'message': 'El fragmento excede el tamaño declarado', 'status': 416}
+    if start > upload.received_size:
+        return None, {'message': f'Se esperaba el byte {upload.received_size}', 'status': 409}
+
+    length = end - start + 1
+    written = storage.write_chunk(upload_id, start, stream, length)
+    if written != length:
+        return None, {'message': 'Fragmento incompleto', 'status': 400}
+
+    try:
+        db.session.execute(
+            update(UploadSession)
+            .where(UploadSession.id == upload_id, UploadSession.received_size < start + written)
+            .values(received_size=start + written)
+        )
+        db.session.commit()
+        db.session.refresh(upload)
+        return upload, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
+
+
+def complete_upload(upload_id):
+    """
+    Cierra la carga: calcula el SHA-256 en streaming, la mueve al almacenamiento
+    por contenido (deduplicando) y crea el Document.
+    """
+    upload, error = get_upload(upload_id)
+    if error:
+        return None, error
+    if upload.document_id:
+        return db.session.get(Document, upload.document_id), None
+    if upload.received_size != upload.total_size:
+        return None, {'message': f'Faltan bytes: recibidos {upload.received_size} de {upload.total_size}', 'status': 409}
+
+    try:
+        sha256, relpath, size = storage.commit_upload(upload_id)
+        document = Document(
+            name=upload.name,
+            file_path=relpath,
+            entity_type=upload.entity_type,
+            entity_id=upload.entity_id,
+            type=upload.type,
+            sha256=sha256,
+            size=size,
+            mime_type=upload.mime_type,
+        )
+        db.session.add(document)
+        db.session.flush()
+        upload.document_id = document.id
+
+        if upload.photo_slot and upload.entity_type == EntityType.work_order:
+            work_order = db.session.get(WorkOrder, upload.entity_id)
+            if work_order:
+                attribute = 'photos_before' if upload.photo_slot == 'before' else 'photos_after'
+                # Se reasigna la lista para que SQLAlchemy detecte el cambio en la columna JSON
+                setattr(work_order, attribute, (getattr(work_order, attribute) or []) + [document.id])
+
+        db.session.commit()
+        return document, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
+    except OSError as e:
+        db.session.rollback()
+        return None, {'message': f'Error de almacenamiento: {str(e)}', 'status': 500}
+
+
+def cancel_upload(upload_id):
+    upload, error = get_upload(upload_id)
+    if error:
+        return False, error
+    try:
+        storage.discard_upload(upload_id)
+        db.session.delete(upload)
+        db.session.commit()
+        return True, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return False, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
+
+
+def get_document_file(document_id):
+    """
+    Devuelve el documento y la ruta absoluta de su contenido.
+    """
+    try:
+        document = db.session.get(Document, document_id)
+    except SQLAlchemyError as e:
+        return None, None, {'message': 'Error al consultar la base de datos', 'status': 500}
+    if not document or not document.file_path:
+        return None, None, {'message': 'Documento no encontrado', 'status': 404}
+    path = storage.absolute_path(document.file_path)
+    if not os.path.exists(path):
+        return None, None, {'message': 'El archivo del documento no existe', 'status': 404}
+    return document, path, None
+
+
+def get_thumbnail(document_id, size):
+    """
+    Miniatura de una foto, generada la primera vez que se pide y luego servida desde disco.
+    """
+    document, path, error = get_document_file(document_id)
+    if error:
+        return None, None, error
+    if document.type != DocumentType.photo:
+        return None, None, {'message': 'Solo las fotos tienen miniatura', 'status': 400}
+
+    thumb = storage.thumbnail_path(document.sha256 or f'doc-{document.id}', size)
+    if os.path.exists(thumb):
+        return document, thumb, None
+    if Image is None:
+        return None, None, {'message': 'Miniaturas no disponibles (falta Pillow)', 'status': 501}
+
+    try:
+        tmp = f'{thumb}.{uuid.uuid4().hex}.tmp'
+        with Image.open(path) as image:
+            image.thumbnail((size, size))
+            image.convert('RGB').save(tmp, 'JPEG', quality=85)
+        os.replace(tmp, thumb)  # Escritura atómica: evita servir miniaturas a medias
+        return document, thumb, None
+    except DecompressionBombError:
+        # Dimensiones declaradas por encima de Image.MAX_IMAGE_PIXELS: no se decodifica
+        return None, None, {'message': 'La imagen es demasiado grande para generar una miniatura', 'status': 400}
+    except (OSError, ValueError) as e:
+        return None, None, {'message': f'No se pudo generar la miniatura: {str(e)}', 'status': 422}
@@ -0,0 +1,107 @@
+from flask import Blueprint, jsonify, request, send_file, current_app
+from .document_service import (
+    create_upload, get_upload, receive_chunk, complete_upload, cancel_upload,
+    get_document_file, get_thumbnail, THUMBNAIL_SIZES
+)
+from .validations import validate_upload_data, parse_content_range, DEFAULT_MAX_UPLOAD_SIZE, INLINE_MIME_TYPES
+
+documents_bp = Blueprint(
+    'documents',
+    __name__,
+    url_prefix='/documents'
+)
+
+# Tamaño de fragmento sugerido a los clientes
+RECOMMENDED_CHUNK_SIZE = 8 * 1024 * 1024
+
+# --- Carga por partes (API JSON) ---
+
+@documents_bp.route('/api/uploads', methods=['POST'])
+def api_create_upload():
+    data = request.get_json()
+    errors = validate_upload_data(data, current_app.config.get('DOCUMENT_MAX_UPLOAD_SIZE', DEFAULT_MAX_UPLOAD_SIZE))
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    upload, error = create_upload(data)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(dict(upload.to_dict(), chunk_size=RECOMMENDED_CHUNK_SIZE)), 201
+
+@documents_bp.route('/api/uploads/<upload_id>', methods=['GET'])
+def api_get_upload(upload_id):
+    """
+    Estado de la carga: el cliente reanuda desde 'received_size'.
+    """
+    upload, error = get_upload(upload_id)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(upload.to_dict()), 200
+
+@documents_bp.route('/api/uploads/<upload_id>', methods=['PUT'])
+def api_upload_chunk(upload_id):
+    start, end, message = parse_content_range(request.headers.get('Content-Range'), request.content_length)
+    if message:
+        return jsonify({'errors': {'Content-Range': message}}), 400
+
+    # request.stream se lee por bloques: el fragmento nunca se carga completo en memoria
+    upload, error = receive_chunk(upload_id, start, end, request.stream)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(upload.to_dict()), 200
+
+@documents_bp.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def api_complete_upload(upload_id):
+    document, error = complete_upload(upload_id)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(document.to_dict()), 201
+
+@documents_bp.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def api_cancel_upload(upload_id):
+    success, error = cancel_upload(upload_id)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify({'message': 'Carga cancelada'}), 200
+
+# --- Descargas ---
+
+def _send(path, document, mimetype=None, download=False):
+    # conditional=True: ETag/If-None-Match y peticiones Range (206).
+    # Con USE_X_SENDFILE el servidor web envía el archivo; si no, wsgi.file_wrapper (sendfile).
+    # Solo imágenes y PDF se muestran en el navegador: el resto (p. ej. HTML) se
+    # descarga, para que un archivo subido no ejecute scripts en el origen de la app
+    mimetype = mimetype or document.mime_type or 'application/octet-stream'
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=download or mimetype not in INLINE_MIME_TYPES,
+        download_name=document.name,
+        conditional=True,
+        etag=document.sha256,
+        max_age=current_app.config.get('DOCUMENT_CACHE_MAX_AGE', 86400),
+    )
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+@documents_bp.route('/<int:document_id>/file', methods=['GET'])
+def download_document(document_id):
+    document, path, error = get_document_file(document_id)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return _send(path, document, download=request.args.get('download') == '1')
+
+@documents_bp.route('/<int:document_id>/thumbnail', methods=['GET'])
+def document_thumbnail(document_id):
+    size = request.args.get('size', 256, type=int)
+    if size not in THUMBNAIL_SIZES:
+        return jsonify({'errors': {'size': f"Tamaños disponibles: {list(THUMBNAIL_SIZES)}."}}), 400
+
+    document, path, error = get_thumbnail(document_id, size)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    response = send_file(path, mimetype='image/jpeg', conditional=True,
+                         etag=f'{document.sha256 or document.id}-{size}',
+                         max_age=current_app.config.get('DOCUMENT_CACHE_MAX_AGE', 86400))
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import shutil
+from flask import current_app
+
+BLOCK_SIZE = 64 * 1024
+
+
+def storage_root():
+    root = current_app.config.get('DOCUMENT_STORAGE_ROOT') or os.path.join(current_app.instance_path, 'documents')
+    return root
+
+
+def _ensure_dir(path):
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def upload_path(upload_id):
+    return os.path.join(_ensure_dir(os.path.join(storage_root(), 'uploads')), f'{upload_id}.part')
+
+
+def object_relpath(sha256):
+    """
+    Ruta relativa dentro del almacenamiento direccionado por contenido (objects/ab/cd/<sha256>).
+    """
+    return os.path.join('objects', sha256[:2], sha256[2:4], sha256)
+
+
+def absolute_path(relpath):
+    return os.path.join(storage_root(), relpath)
+
+
+def thumbnail_path(key, size):
+    """
+    Ruta de la miniatura: 'key' es el SHA-256 del documento o, en documentos
+    anteriores al almacenamiento por contenido (sin hash), 'doc-<id>'.
+    """
+    return os.path.join(_ensure_dir(os.path.join(storage_root(), 'thumbs', key[:2])), f'{key}_{size}.jpg')
+
+
+def write_chunk(upload_id, offset, stream, length):
+    """
+    Copia 'length' bytes del flujo de la petición al archivo parcial a partir de 'offset',
+    en bloques, sin cargar el fragmento completo en memoria. Devuelve los bytes escritos.
+    """
+    path = upload_path(upload_id)
+    mode = 'r+b' if os.path.exists(path) else 'w+b'
+    written = 0
+    with open(path, mode) as target:
+        target.seek(offset)
+        while written < length:
+            block = stream.read(min(BLOCK_SIZE, length - written))
+            if not block:
+                break
+            target.write(block)
+            written += len(block)
+    return written
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def commit_upload(upload_id):
+    """
+    Mueve el archivo completo al almacenamiento por contenido.
+    Si ya existe un objeto con el mismo SHA-256, se descarta la copia (deduplicación).
+    Devuelve (sha256, ruta relativa, tamaño).
+    """
+    path = upload_path(upload_id)
+    sha256 = file_sha256(path)
+    relpath = object_relpath(sha256)
+    target = absolute_path(relpath)
+    size = os.path.getsize(path)
+    if os.path.exists(target):
+        os.remove(path)
+    else:
+        _ensure_dir(os.path.dirname(target))
+        shutil.move(path, target)
+    return sha256, relpath, size
+
+
+def discard_upload(upload_id):
+    path = upload_path(upload_id)
+    if os.path.exists(path):
+        os.remove(path)
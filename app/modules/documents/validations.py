@@ -0,0 +1,59 @@
+import re
+from app.models import EntityType, DocumentType
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+# Tipos MIME admitidos; los que no están en INLINE_MIME_TYPES se descargan como adjunto
+ALLOWED_MIME_TYPES = {
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/bmp', 'image/tiff',
+    'application/pdf', 'text/plain', 'text/csv', 'application/zip', 'application/octet-stream',
+    'application/msword', 'application/vnd.ms-excel', 'application/vnd.ms-powerpoint',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+    'application/vnd.oasis.opendocument.text', 'application/vnd.oasis.opendocument.spreadsheet',
+}
+INLINE_MIME_TYPES = {t for t in ALLOWED_MIME_TYPES if t.startswith('image/')} | {'application/pdf'}
+# Tamaño máximo de un documento si no se configura DOCUMENT_MAX_UPLOAD_SIZE
+DEFAULT_MAX_UPLOAD_SIZE = 2 * 1024 * 1024 * 1024
+
+def validate_upload_data(data, max_size=DEFAULT_MAX_UPLOAD_SIZE):
+    """
+    Valida los datos para abrir una carga reanudable; 'size' (bytes) no puede
+    superar 'max_size'.
+    """
+    errors = {}
+    if not isinstance(data, dict):
+        return {'general': "Se esperaba un objeto JSON."}
+
+    for field in ['name', 'entity_type', 'entity_id', 'size']:
+        if not data.get(field) and data.get(field) != 0:
+            errors[field] = f"El campo '{field}' es obligatorio."
+
+    if data.get('entity_type') and data['entity_type'] not in EntityType.__members__:
+        errors['entity_type'] = "El tipo de entidad no es válido."
+    if data.get('type') and data['type'] not in DocumentType.__members__:
+        errors['type'] = "El tipo de documento no es válido."
+    size = data.get('size')
+    if 'size' in data and (not isinstance(size, int) or isinstance(size, bool) or size <= 0):
+        errors['size'] = "El tamaño debe ser un entero positivo."
+    elif isinstance(size, int) and size > max_size:
+        errors['size'] = f"El documento supera el tamaño máximo de {max_size} bytes."
+    if data.get('mime_type') is not None and data['mime_type'] not in ALLOWED_MIME_TYPES:
+        errors['mime_type'] = "El tipo MIME no está permitido."
+    if data.get('photo_slot') not in (None, 'before', 'after'):
+        errors['photo_slot'] = "El campo 'photo_slot' debe ser 'before' o 'after'."
+    return errors
+
+def parse_content_range(header, content_length):
+    """
+    Interpreta 'Content-Range: bytes start-end/total'. Devuelve (start, end, error).
+    """
+    match = CONTENT_RANGE.match(header or '')
+    if not match:
+        return None, None, "Se requiere la cabecera 'Content-Range: bytes inicio-fin/total'."
+    start, end, _ = (int(g) for g in match.groups())
+    if end < start:
+        return None, None, "Rango de bytes inválido."
+    if content_length is not None and content_length != end - start + 1:
+        return None, None, "El tamaño del cuerpo no coincide con 'Content-Range'."
+    return start, end, None
@@ -0,0 +1 @@
+# This file makes the 'expiry' directory a Python package
@@ -0,0 +1,67 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models import Asset, Certification, Permit, VehicleDetail
+from .expiry_service import (
+    SOURCES, entry_values, upsert_entry, delete_entries, apply_heap_changes
+)
+
+# Atributos que, al cambiar, obligan a actualizar la entrada del índice
+_TRACKED = {
+    Certification: ('name', 'user_id'),
+    Permit: ('type', 'issued_by_user_id'),
+    Asset: ('name', 'site_id'),
+    VehicleDetail: ('license_plate', 'asset_id'),
+}
+
+
+def _sources_for(obj):
+    return [(source_type, column) for source_type, (model, column) in SOURCES.items() if isinstance(obj, model)]
+
+
+def _update_index_after_flush(session, flush_context):
+    """
+    Mantiene ExpiryEntry sincronizado en la misma transacción que la escritura de origen.
+    Los cambios para la vista en memoria se aplican recién tras el commit.
+    """
+    changes = session.info.setdefault('expiry_changes', [])
+    connection = None
+
+    for obj in list(session.new) + list(session.dirty):
+        sources = _sources_for(obj)
+        if not sources:
+            continue
+        state = inspect(obj)
+        for source_type, column in sources:
+            date_changed = obj in session.new or state.attrs[column].history.has_changes()
+            others_changed = any(state.attrs[a].history.has_changes() for a in _TRACKED[type(obj)])
+            if not (date_changed or others_changed):
+                continue
+            connection = connection or session.connection()
+            expiry_date = getattr(obj, column)
+            values = entry_values(source_type, obj)
+            upsert_entry(connection, source_type, obj.id, expiry_date, values, date_changed)
+            changes.append((source_type, obj.id, expiry_date, values))
+
+    for obj in session.deleted:
+        for source_type, _ in _sources_for(obj):
+            connection = connection or session.connection()
+            delete_entries(connection, source_type, obj.id)
+            changes.append((source_type, obj.id, None, None))
+
+
+def _apply_after_commit(session):
+    changes = session.info.pop('expiry_changes', None)
+    if changes:
+        apply_heap_changes(changes)
+
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('expiry_changes', None)
+
+
+def register_events():
+    for name, fn in [('after_flush', _update_index_after_flush),
+                     ('after_commit', _apply_after_commit),
+                     ('after_soft_rollback', _discard_after_rollback)]:
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
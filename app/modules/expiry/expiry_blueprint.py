@@ -0,0 +1,71 @@
+import click
+from flask import Blueprint, jsonify, request
+from .expiry_service import get_upcoming, run_expiry_sweep, rebuild_index, DEFAULT_WARNING_DAYS, MAX_WARNING_DAYS
+
+expiry_bp = Blueprint(
+    'expiry',
+    __name__,
+    url_prefix='/expiry'
+)
+
+def _positive_int(value, default, maximum=None):
+    try:
+        value = int(value) if value is not None else default
+        return value if 0 < value <= (maximum or value) else None
+    except (ValueError, TypeError):
+        return None
+
+# --- Rutas de la API (JSON) ---
+
+@expiry_bp.route('/api/upcoming', methods=['GET'])
+def api_upcoming():
+    """
+    Próximos N vencimientos (opcionalmente limitados a los próximos 'days' días).
+    """
+    limit = _positive_int(request.args.get('limit'), 50)
+    days = _positive_int(request.args.get('days'), DEFAULT_WARNING_DAYS, MAX_WARNING_DAYS)
+    if limit is None or days is None:
+        return jsonify({'errors': {'limit': "Los parámetros 'limit' y 'days' deben ser enteros positivos "
+                                            f"('days' hasta {MAX_WARNING_DAYS})."}}), 400
+
+    entries, error = get_upcoming(limit=limit, days=days)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(entries), 200
+
+@expiry_bp.route('/api/sweep', methods=['POST'])
+def api_run_sweep():
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'errors': {'general': "Se esperaba un objeto JSON."}}), 400
+    days = _positive_int(data.get('days'), DEFAULT_WARNING_DAYS, MAX_WARNING_DAYS)
+    if days is None:
+        return jsonify({'errors': {'days': f"El campo 'days' debe ser un entero entre 1 y {MAX_WARNING_DAYS}."}}), 400
+
+    result, error = run_expiry_sweep(days=days)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 200
+
+# --- Comandos CLI ---
+
+@expiry_bp.cli.command('sweep')
+@click.option('--days', default=DEFAULT_WARNING_DAYS, show_default=True, type=click.IntRange(1, MAX_WARNING_DAYS))
+def sweep_command(days):
+    """
+    Barrido diario de vencimientos: flask expiry sweep
+    """
+    result, error = run_expiry_sweep(days=days)
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"Vencimientos avisados: {result['entries']} - Notificaciones: {result['notifications']}")
+
+@expiry_bp.cli.command('rebuild')
+def rebuild_command():
+    """
+    Reconstruye el índice de vencimientos desde las tablas de origen: flask expiry rebuild
+    """
+    result, error = rebuild_index()
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"Entradas indexadas: {result['entries']}")
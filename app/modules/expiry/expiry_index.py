@@ -0,0 +1,89 @@
+import heapq
+import itertools
+import time
+from datetime import date
+from threading import Lock
+
+
+class ExpiryHeap:
+    """
+    Vista en memoria de los próximos vencimientos, ordenada como un min-heap por fecha.
+
+    Las actualizaciones no reordenan el heap: se inserta la nueva entrada y la
+    anterior queda obsoleta (borrado perezoso). Las entradas obsoletas se
+    descartan al recorrer y se compactan cuando superan la mitad del heap.
+    Cada entrada lleva un número de secuencia tras la fecha: con fechas
+    iguales se desempata por él y nunca se comparan los ExpirySource.
+    """
+
+    def __init__(self, ttl_seconds=300):
+        self._heap = []
+        self._current = {}  # (source_type, source_id) -> (expiry_date, payload)
+        self._lock = Lock()
+        self._loaded_at = None
+        self._sequence = itertools.count()
+        self.ttl_seconds = ttl_seconds
+
+    def is_stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def load(self, entries):
+        """
+        Reconstruye la vista a partir de (source_type, source_id, expiry_date, payload).
+        """
+        with self._lock:
+            self._current = {(t, i): (d, p) for t, i, d, p in entries}
+            self._heap = self._entries()
+            heapq.heapify(self._heap)
+            self._loaded_at = time.monotonic()
+
+    def upsert(self, source_type, source_id, expiry_date, payload):
+        with self._lock:
+            self._current[(source_type, source_id)] = (expiry_date, payload)
+            heapq.heappush(self._heap, (expiry_date, next(self._sequence), source_type, source_id))
+            self._maybe_compact()
+
+    def discard(self, source_type, source_id):
+        with self._lock:
+            self._current.pop((source_type, source_id), None)
+            self._maybe_compact()
+
+    def _entries(self):
+        return [(d, next(self._sequence), t, i) for (t, i), (d, _) in self._current.items()]
+
+    def _maybe_compact(self):
+        if len(self._heap) > 2 * len(self._current) + 64:
+            self._heap = self._entries()
+            heapq.heapify(self._heap)
+
+    def upcoming(self, limit, until=None, since=None):
+        """
+        Devuelve los 'limit' vencimientos más próximos (>= since, <= until) en orden.
+
+        Recorre el heap como un árbol con una frontera propia, de modo que el
+        costo es O(k log k) sobre los elementos visitados y no sobre todo el heap.
+        """
+        since = since or date.today()
+        result = []
+        seen = set()
+        with self._lock:
+            heap = self._heap
+            if not heap:
+                return result
+            frontier = [(heap[0], 0)]
+            while frontier and len(result) < limit:
+                (expiry_date, _, source_type, source_id), index = heapq.heappop(frontier)
+                if until and expiry_date > until:
+                    break
+                current = self._current.get((source_type, source_id))
+                key = (source_type, source_id)
+                if current and current[0] == expiry_date and expiry_date >= since and key not in seen:
+                    seen.add(key)
+                    result.append(dict(current[1], expiry_date=expiry_date.isoformat()))
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(heap):
+                        heapq.heappush(frontier, (heap[child], child))
+        return result
+
+
+expiry_heap = ExpiryHeap()
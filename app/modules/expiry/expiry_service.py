@@ -0,0 +1,256 @@
+from datetime import date, timedelta
+from sqlalchemy import select, update, insert, delete, func, literal, null, bindparam
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import mail
+from app.models import (
+    db, Asset, Certification, Permit, VehicleDetail, User, Role,
+    ExpiryEntry, ExpirySource, NotificationType
+)
+from app.modules.notifications.inbox_service import deliver_notifications
+from app.services.notifications import NotificationService
+from app.services.upsert import upsert_row
+from .expiry_index import expiry_heap
+
+DEFAULT_WARNING_DAYS = 30
+# Ventana máxima de aviso/consulta: más allá, date + timedelta desborda
+MAX_WARNING_DAYS = 3650
+
+# Fuente -> (modelo, columna de vencimiento)
+SOURCES = {
+    ExpirySource.certification: (Certification, 'expiry_date'),
+    ExpirySource.permit: (Permit, 'expiry_date'),
+    ExpirySource.warranty: (Asset, 'warranty_expiry'),
+    ExpirySource.insurance: (VehicleDetail, 'insurance_expiry'),
+    ExpirySource.registration: (VehicleDetail, 'registration_expiry'),
+}
+
+SOURCE_LABELS = {
+    ExpirySource.certification: 'Certificación',
+    ExpirySource.permit: 'Permiso',
+    ExpirySource.warranty: 'Garantía',
+    ExpirySource.insurance: 'Seguro',
+    ExpirySource.registration: 'Matrícula',
+}
+
+
+def entry_values(source_type, obj):
+    """
+    Construye los valores de la entrada del índice para un objeto de origen.
+    """
+    if source_type == ExpirySource.certification:
+        return {'label': obj.name, 'user_id': obj.user_id, 'asset_id': None, 'site_id': None}
+    if source_type == ExpirySource.permit:
+        return {'label': obj.type, 'user_id': obj.issued_by_user_id, 'asset_id': None, 'site_id': None}
+    if source_type == ExpirySource.warranty:
+        return {'label': obj.name, 'user_id': None, 'asset_id': obj.id, 'site_id': obj.site_id}
+    return {'label': obj.license_plate, 'user_id': None, 'asset_id': obj.asset_id, 'site_id': None}
+
+
+def _heap_payload(source_type, source_id, values):
+    return {
+        'source_type': source_type.name,
+        'source_id': source_id,
+        'label': values.get('label'),
+        'user_id': values.get('user_id'),
+        'asset_id': values.get('asset_id'),
+        'site_id': values.get('site_id'),
+    }
+
+
+def upsert_entry(connection, source_type, source_id, expiry_date, values, date_changed):
+    """
+    Inserta o actualiza la entrada del índice con un único upsert sobre
+    (source_type, source_id). Si cambia la fecha, se reinicia el aviso.
+    """
+    if expiry_date is None:
+        delete_entries(connection, source_type, source_id)
+        return
+    row = dict(values, expiry_date=expiry_date)
+    if date_changed:
+        row['warned_date'] = None
+    upsert_row(connection, ExpiryEntry.__table__,
+               {'source_type': source_type, 'source_id': source_id}, row)
+
+
+def delete_entries(connection, source_type, source_id):
+    connection.execute(delete(ExpiryEntry).where(
+        ExpiryEntry.source_type == source_type, ExpiryEntry.source_id == source_id
+    ))
+
+
+def apply_heap_changes(changes):
+    """
+    Refleja en la vista en memoria los cambios ya confirmados en la base de datos.
+    """
+    for source_type, source_id, expiry_date, values in changes:
+        if expiry_date is None:
+            expiry_heap.discard(source_type, source_id)
+        else:
+            expiry_heap.upsert(source_type, source_id, expiry_date,
+                               _heap_payload(source_type, source_id, values))
+
+
+def load_heap():
+    """
+    Carga en memoria los vencimientos futuros (una sola consulta por índice de fecha).
+    """
+    rows = db.session.execute(
+        select(ExpiryEntry).where(ExpiryEntry.expiry_date >= date.today())
+    ).scalars()
+    expiry_heap.load(
+        (e.source_type, e.source_id, e.expiry_date,
+         _heap_payload(e.source_type, e.source_id, e.to_dict()))
+        for e in rows
+    )
+
+
+def get_upcoming(limit=50, days=None):
+    """
+    Próximos vencimientos servidos desde el heap en memoria.
+    """
+    try:
+        if expiry_heap.is_stale():
+            load_heap()
+        until = date.today() + timedelta(days=days) if days else None
+        return expiry_heap.upcoming(limit, until=until), None
+    except SQLAlchemyError as e:
+        return None, {'message': 'Error al consultar la base de datos', 'status': 500}
+
+
+def rebuild_index():
+    """
+    Reconstruye el índice completo con un INSERT ... SELECT por fuente.
+    """
+    try:
+        # Se conservan los avisos ya emitidos para vencimientos que no cambiaron
+        warned = db.session.execute(
+            select(ExpiryEntry.source_type, ExpiryEntry.source_id, ExpiryEntry.expiry_date, ExpiryEntry.warned_date)
+            .where(ExpiryEntry.warned_date.isnot(None))
+        ).all()
+        db.session.execute(delete(ExpiryEntry))
+        sources = [
+            (ExpirySource.certification, select(
+                literal(ExpirySource.certification.name), Certification.id, Certification.expiry_date,
+                Certification.name, Certification.user_id, null(), null()
+            ).where(Certification.expiry_date.isnot(None))),
+            (ExpirySource.permit, select(
+                literal(ExpirySource.permit.name), Permit.id, Permit.expiry_date,
+                Permit.type, Permit.issued_by_user_id, null(), null()
+            ).where(Permit.expiry_date.isnot(None))),
+            (ExpirySource.warranty, select(
+                literal(ExpirySource.warranty.name), Asset.id, Asset.warranty_expiry,
+                Asset.name, null(), Asset.id, Asset.site_id
+            ).where(Asset.warranty_expiry.isnot(None))),
+            (ExpirySource.insurance, select(
+                literal(ExpirySource.insurance.name), VehicleDetail.id, VehicleDetail.insurance_expiry,
+                VehicleDetail.license_plate, null(), VehicleDetail.asset_id, null()
+            ).where(VehicleDetail.insurance_expiry.isnot(None))),
+            (ExpirySource.registration, select(
+                literal(ExpirySource.registration.name), VehicleDetail.id, VehicleDetail.registration_expiry,
+                VehicleDetail.license_plate, null(), VehicleDetail.asset_id, null()
+            ).where(VehicleDetail.registration_expiry.isnot(None))),
+        ]
+        columns = ['source_type', 'source_id', 'expiry_date', 'label', 'user_id', 'asset_id', 'site_id']
+        for _, query in sources:
+            db.session.execute(insert(ExpiryEntry).from_select(columns, query))
+        if warned:
+            table = ExpiryEntry.__table__
+            db.session.execute(
+                update(table)
+                .where(
+                    table.c.source_type == bindparam('b_type'),
+                    table.c.source_id == bindparam('b_id'),
+                    table.c.expiry_date == bindparam('b_date'),
+                )
+                .values(warned_date=bindparam('b_warned')),
+                [{'b_type': t, 'b_id': i, 'b_date': d, 'b_warned': w} for t, i, d, w in warned]
+            )
+        db.session.commit()
+        load_heap()
+        count = db.session.execute(select(func.count(ExpiryEntry.id))).scalar()
+        return {'entries': count}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
+
+
+def _site_managers(site_ids):
+    """
+    Supervisores y administradores por planta, en una sola consulta.
+    """
+    if not site_ids:
+        return {}
+    managers = {}
+    rows = db.session.execute(
+        select(User.id, User.email, User.site_id).where(
+            User.site_id.in_(site_ids), User.role.in_([Role.admin, Role.supervisor])
+        )
+    )
+    for user_id, email, site_id in rows:
+        managers.setdefault(site_id, []).append((user_id, email))
+    return managers
+
+
+def run_expiry_sweep(days=DEFAULT_WARNING_DAYS, today=None):
+    """
+    Barrido diario: avisa de todo lo que vence en los próximos 'days' días y aún no fue avisado.
+
+    Las notificaciones se insertan en bloque (junto con los contadores de no leídas),
+    los correos se envían en un único lote a través de NotificationService y las
+    entradas se marcan con un solo UPDATE.
+    """
+    today = today or date.today()
+    try:
+        rows = db.session.execute(
+            select(
+                ExpiryEntry.id, ExpiryEntry.source_type, ExpiryEntry.expiry_date, ExpiryEntry.label,
+                ExpiryEntry.user_id, func.coalesce(ExpiryEntry.site_id, Asset.site_id).label('site_id'),
+                User.email,
+            )
+            .outerjoin(Asset, Asset.id == ExpiryEntry.asset_id)
+            .outerjoin(User, User.id == ExpiryEntry.user_id)
+            .where(
+                ExpiryEntry.expiry_date >= today,
+                ExpiryEntry.expiry_date <= today + timedelta(days=days),
+                ExpiryEntry.warned_date.is_(None),
+            )
+            .order_by(ExpiryEntry.expiry_date)
+        ).all()
+        if not rows:
+            return {'entries': 0, 'notifications': 0}, None
+
+        managers = _site_managers({r.site_id for r in rows if r.user_id is None and r.site_id})
+
+        notifications = []
+        messages = []
+        for row in rows:
+            text = (f"{SOURCE_LABELS[row.source_type]} '{row.label or row.id}' vence el "
+                    f"{row.expiry_date.isoformat()} ({(row.expiry_date - today).days} días).")
+            recipients = [(row.user_id, row.email)] if row.user_id else managers.get(row.site_id, [])
+            for user_id, email in recipients:
+                notifications.append({
+                    'user_id': user_id,
+                    'message': text,
+                    'type': NotificationType.email,
+                    'is_read': False,
+                })
+                if email:
+                    messages.append(('Aviso de vencimiento', [email], text))
+
+        deliver_notifications(notifications)
+        db.session.execute(
+            update(ExpiryEntry)
+            .where(ExpiryEntry.id.in_([r.id for r in rows]))
+            .values(warned_date=today)
+        )
+        db.session.commit()
+
+        if messages:
+            NotificationService(mail).send_bulk(
+                [(subject, recipients, 'expiry_warning', {'message': text})
+                 for subject, recipients, text in messages]
+            )
+        return {'entries': len(rows), 'notifications': len(notifications), 'emails': len(messages)}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
@@ -0,0 +1 @@
+# This file makes the 'fleet' directory a Python package
@@ -0,0 +1,89 @@
+import click
+from flask import Blueprint, jsonify, request
+from app.services.db_routing import read_only
+from .track_service import ingest_tracks, get_track, get_daily_distance, vehicles_near_site, compact_tracks
+from .validations import validate_ingest, parse_day, parse_radius
+
+fleet_bp = Blueprint(
+    'fleet',
+    __name__,
+    url_prefix='/fleet'
+)
+
+# --- Rutas de la API ---
+
+@fleet_bp.route('/api/tracks', methods=['POST'])
+def api_ingest_tracks():
+    """
+    Carga masiva de posiciones GPS:
+    {'tracks': [{'vehicle_id': 1, 'points': [[epoch, lat, lon], ...]}]}
+    """
+    tracks, errors = validate_ingest(request.get_json(silent=True))
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    summary, error = ingest_tracks(tracks)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(summary), 201
+
+@fleet_bp.route('/api/vehicles/<int:vehicle_id>/track', methods=['GET'])
+@read_only
+def api_get_track(vehicle_id):
+    day, error = parse_day(request.args.get('date'))
+    if error:
+        return jsonify({'errors': {'date': error}}), 400
+
+    track, error = get_track(vehicle_id, day)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(track), 200
+
+@fleet_bp.route('/api/vehicles/<int:vehicle_id>/distance', methods=['GET'])
+@read_only
+def api_get_daily_distance(vehicle_id):
+    date_from, error_from = parse_day(request.args.get('from'))
+    date_to, error_to = parse_day(request.args.get('to'))
+    errors = {k: v.replace("'date'", f"'{k}'") for k, v in (('from', error_from), ('to', error_to)) if v}
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    days, error = get_daily_distance(vehicle_id, date_from, date_to)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify({'vehicle_id': vehicle_id, 'days': days,
+                    'total_km': round(sum(d['distance_km'] for d in days), 3)}), 200
+
+@fleet_bp.route('/api/sites/<int:site_id>/vehicles', methods=['GET'])
+@read_only
+def api_vehicles_near_site(site_id):
+    """
+    Vehículos a menos de 'radius_km' de la planta según su última posición;
+    'max_age_minutes' descarta posiciones viejas.
+    """
+    params, errors = parse_radius(request.args)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    vehicles, error = vehicles_near_site(site_id, params['radius_km'], params['max_age_minutes'])
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(vehicles), 200
+
+# --- Comandos CLI ---
+
+@fleet_bp.cli.command('compact')
+@click.option('--date', 'day', default=None, help='Día a compactar (YYYY-MM-DD); por defecto, ayer.')
+def compact_command(day):
+    """
+    Une los segmentos GPS de cada vehículo en uno por día: flask fleet compact
+    """
+    if day:
+        day, error = parse_day(day)
+        if error:
+            raise click.BadParameter(error)
+    summary, error = compact_tracks(day)
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"{summary['vehicles']} vehículos compactados ({summary['segments']} segmentos, "
+               f"{summary['bytes_before']} → {summary['bytes_after']} bytes).")
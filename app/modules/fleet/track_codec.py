@@ -0,0 +1,119 @@
+"""
+Codificación compacta de recorridos GPS.
+
+Un recorrido se guarda por columnas (tiempo, latitud, longitud) como enteros:
+segundos epoch y grados × 1e6 (~11 cm). El tiempo se codifica por deltas
+(a 1 Hz casi todo vale 1) y las coordenadas por deltas de segundo orden (con
+velocidad constante el valor queda cerca de 0). Cada columna se pasa a
+zigzag, se guarda con el ancho mínimo (1, 2, 4 u 8 bytes) y el bloque se
+comprime con zlib. Un vehículo en marcha ocupa alrededor de 1 byte por punto.
+"""
+import struct
+import zlib
+import numpy as np
+
+COORD_SCALE = 1_000_000
+EARTH_RADIUS_M = 6_371_008.8
+_VERSION = 1
+_HEADER = struct.Struct('<BIqqq')  # versión, puntos, t0, lat0, lon0
+_WIDTHS = [(1, np.uint8), (2, np.uint16), (4, np.uint32), (8, np.uint64)]
+_DTYPES = dict(_WIDTHS)
+_ZLIB_LEVEL = 6
+
+
+def _zigzag(values):
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def _unzigzag(values):
+    values = values.astype(np.uint64)
+    return ((values >> np.uint64(1)).astype(np.int64)) ^ -((values & np.uint64(1)).astype(np.int64))
+
+
+def _pack(values):
+    encoded = _zigzag(values)
+    top = int(encoded.max()) if len(encoded) else 0
+    for width, dtype in _WIDTHS:
+        if top < 1 << (8 * width):
+            return bytes([width]) + encoded.astype(dtype).tobytes()
+
+
+def _unpack(buffer, offset, count):
+    width = buffer[offset]
+    offset += 1
+    values = np.frombuffer(buffer, dtype=_DTYPES[width], count=count, offset=offset)
+    return _unzigzag(values), offset + width * count
+
+
+def to_fixed(coordinates):
+    return np.round(np.asarray(coordinates, dtype=np.float64) * COORD_SCALE).astype(np.int64)
+
+
+def _scaled(coordinates):
+    coordinates = np.asarray(coordinates)
+    if coordinates.size and not np.issubdtype(coordinates.dtype, np.integer):
+        raise ValueError("Las coordenadas escaladas deben ser enteros (ver to_fixed)")
+    return coordinates.astype(np.int64)
+
+
+def encode_track(times, lats, lons, scaled=False):
+    """
+    Codifica un recorrido ya ordenado por tiempo. 'times' en segundos epoch;
+    'lats' y 'lons' en grados, o ya escalados por COORD_SCALE (enteros de
+    to_fixed) si 'scaled' es True.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    if scaled:
+        lats, lons = _scaled(lats), _scaled(lons)
+    else:
+        lats, lons = to_fixed(lats), to_fixed(lons)
+    count = len(times)
+    if count == 0:
+        raise ValueError("El recorrido no tiene puntos")
+    if len(lats) != count or len(lons) != count:
+        raise ValueError("Las columnas del recorrido tienen distinto largo")
+    header = _HEADER.pack(_VERSION, count, int(times[0]), int(lats[0]), int(lons[0]))
+    body = [_pack(np.diff(times))]
+    for column in (lats, lons):
+        speed = np.diff(column)
+        body.append(_pack(np.diff(speed, prepend=0) if len(speed) else speed))
+    return zlib.compress(header + b''.join(body), _ZLIB_LEVEL)
+
+
+def decode_track(blob):
+    """
+    Devuelve (times, lats, lons) como arrays int64; las coordenadas escaladas
+    por COORD_SCALE.
+    """
+    buffer = zlib.decompress(blob)
+    version, count, t0, lat0, lon0 = _HEADER.unpack_from(buffer)
+    if version != _VERSION:
+        raise ValueError(f"Versión de recorrido no soportada: {version}")
+    offset = _HEADER.size
+    deltas, offset = _unpack(buffer, offset, count - 1)
+    times = np.concatenate(([t0], t0 + np.cumsum(deltas)))
+    columns = []
+    for first in (lat0, lon0):
+        accel, offset = _unpack(buffer, offset, count - 1)
+        columns.append(np.concatenate(([first], first + np.cumsum(np.cumsum(accel)))))
+    return times, columns[0], columns[1]
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """
+    Distancia en metros entre puntos (grados); admite arrays.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def step_distances(times, lats, lons, max_speed_kmh):
+    """
+    Distancia de cada tramo entre puntos consecutivos (coordenadas en grados).
+    Los tramos que implican más de 'max_speed_kmh' son saltos del GPS y cuentan 0.
+    """
+    steps = haversine_m(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    elapsed = np.maximum(np.diff(times), 1)
+    steps[steps / elapsed > max_speed_kmh / 3.6] = 0.0
+    return steps
@@ -0,0 +1,314 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select, insert, update, delete, func, bindparam
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.models import db, Asset, Site, VehicleDetail, VehiclePosition, VehicleTrackSegment
+from .track_codec import COORD_SCALE, decode_track, encode_track, haversine_m, step_distances, to_fixed
+
+# Grilla de la última posición: celdas de 0,1° (~11 km de lado en latitud)
+CELL_DEGREES = 0.1
+KM_PER_DEGREE = 111.32
+# Un tramo más rápido que esto es un salto del GPS y no suma kilometraje
+DEFAULT_MAX_SPEED_KMH = 250
+INGEST_ATTEMPTS = 3
+
+_segments = VehicleTrackSegment.__table__
+_positions = VehiclePosition.__table__
+_vehicles = VehicleDetail.__table__
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_datetime(epoch):
+    return _EPOCH + timedelta(seconds=int(epoch))
+
+
+def _to_epoch(moment):
+    return int((moment - _EPOCH).total_seconds())
+
+
+def cell_of(lat, lon):
+    """
+    Celda (x, y) de la grilla que contiene el punto.
+    """
+    return int(math.floor((lon + 180) / CELL_DEGREES)), int(math.floor((lat + 90) / CELL_DEGREES))
+
+
+def _segment_row(vehicle_id, times, lats, lons, distance):
+    blob = encode_track(times, lats, lons, scaled=True)
+    return {
+        'vehicle_id': vehicle_id, 'day': _to_datetime(times[0]).date(),
+        'start_time': _to_datetime(times[0]), 'end_time': _to_datetime(times[-1]),
+        'points': len(times), 'distance_m': float(distance),
+        'min_lat': int(lats.min()) / COORD_SCALE, 'max_lat': int(lats.max()) / COORD_SCALE,
+        'min_lon': int(lons.min()) / COORD_SCALE, 'max_lon': int(lons.max()) / COORD_SCALE,
+        'data': blob,
+    }
+
+
+def _prepare_vehicle(vehicle_id, chunks, last, max_speed_kmh):
+    """
+    Ordena y depura los puntos de un vehículo y los parte en un segmento por día
+    (UTC). Los puntos con tiempo repetido o anterior a la última posición
+    conocida se descartan. Devuelve (filas de segmento, posición, distancia, descartados).
+    """
+    points = np.concatenate(chunks)
+    points = points[np.argsort(points[:, 0], kind='stable')]
+    times = points[:, 0].astype(np.int64)
+    keep = np.ones(len(times), dtype=bool)
+    keep[1:] = times[1:] != times[:-1]
+    if last is not None:
+        keep &= times > _to_epoch(last.recorded_date)
+    skipped = int((~keep).sum())
+    times = times[keep]
+    if not len(times):
+        return [], None, 0.0, skipped
+
+    # Las distancias se calculan con las coordenadas ya redondeadas (las guardadas)
+    lats, lons = to_fixed(points[keep, 1]), to_fixed(points[keep, 2])
+    if last is not None:
+        all_times = np.concatenate(([_to_epoch(last.recorded_date)], times))
+        all_lats = np.concatenate(([round(last.latitude * COORD_SCALE)], lats))
+        all_lons = np.concatenate(([round(last.longitude * COORD_SCALE)], lons))
+        arriving = step_distances(all_times, all_lats / COORD_SCALE, all_lons / COORD_SCALE, max_speed_kmh)
+    else:
+        arriving = np.concatenate(([0.0], step_distances(times, lats / COORD_SCALE, lons / COORD_SCALE, max_speed_kmh)))
+
+    days = times // 86400
+    bounds = [0, *(np.flatnonzero(np.diff(days)) + 1), len(times)]
+    rows = [
+        _segment_row(vehicle_id, times[start:end], lats[start:end], lons[start:end], arriving[start:end].sum())
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+    latitude, longitude = int(lats[-1]) / COORD_SCALE, int(lons[-1]) / COORD_SCALE
+    cell_x, cell_y = cell_of(latitude, longitude)
+    position = {'vehicle_id': vehicle_id, 'latitude': latitude, 'longitude': longitude,
+                'cell_x': cell_x, 'cell_y': cell_y, 'recorded_date': _to_datetime(times[-1])}
+    return rows, position, float(arriving.sum()), skipped
+
+
+class _PositionConflict(Exception):
+    pass
+
+
+def _ingest_once(by_vehicle, max_speed_kmh):
+    vehicle_ids = list(by_vehicle)
+    # Como en _load_vehicle, el join con Asset aplica el filtro de planta: los
+    # vehículos de otras plantas se informan como desconocidos
+    known = set(db.session.execute(
+        select(VehicleDetail.id).join(Asset, Asset.id == VehicleDetail.asset_id)
+        .where(VehicleDetail.id.in_(vehicle_ids))
+    ).scalars())
+    positions = {row.vehicle_id: row for row in db.session.execute(
+        select(_positions).where(_positions.c.vehicle_id.in_(sorted(known)))
+    )}
+
+    summary = {'vehicles': 0, 'points': 0, 'skipped': 0, 'segments': 0, 'bytes': 0, 'distance_km': 0.0,
+               'unknown_vehicles': sorted(set(vehicle_ids) - known)}
+    segments, created, moved, mileage = [], [], [], []
+    for vehicle_id in vehicle_ids:
+        if vehicle_id not in known:
+            continue
+        last = positions.get(vehicle_id)
+        rows, position, distance, skipped = _prepare_vehicle(vehicle_id, by_vehicle[vehicle_id], last, max_speed_kmh)
+        summary['skipped'] += skipped
+        if not rows:
+            continue
+        # El kilometraje (km enteros) avanza con lo recorrido; el resto queda pendiente
+        pending = (last.pending_m if last else 0.0) + distance
+        km = int(pending // 1000)
+        position['pending_m'] = pending - km * 1000
+        if km:
+            mileage.append({'vid': vehicle_id, 'km': km})
+        if last is None:
+            created.append(position)
+        else:
+            moved.append({**{f'new_{k}': v for k, v in position.items() if k != 'vehicle_id'},
+                          'vid': vehicle_id, 'previous': last.recorded_date})
+        segments.extend(rows)
+        summary['vehicles'] += 1
+        summary['points'] += sum(row['points'] for row in rows)
+        summary['distance_km'] += distance / 1000
+
+    if segments:
+        db.session.execute(insert(_segments), segments)
+    if created:
+        db.session.execute(insert(_positions), created)
+    if moved:
+        # Compare-and-set sobre la última posición: si otra carga del mismo
+        # vehículo se adelantó, se reintenta todo para no contar dos veces
+        updated = db.session.execute(
+            update(_positions)
+            .where(_positions.c.vehicle_id == bindparam('vid'), _positions.c.recorded_date == bindparam('previous'))
+            .values({k: bindparam(f'new_{k}') for k in ('latitude', 'longitude', 'cell_x', 'cell_y',
+                                                        'recorded_date', 'pending_m')}),
+            moved, execution_options={'synchronize_session': False}
+        ).rowcount
+        if updated != len(moved):
+            raise _PositionConflict()
+    if mileage:
+        db.session.execute(
+            update(_vehicles).where(_vehicles.c.id == bindparam('vid'))
+            .values(current_mileage=func.coalesce(_vehicles.c.current_mileage, 0) + bindparam('km')),
+            mileage, execution_options={'synchronize_session': False}
+        )
+    db.session.commit()
+    summary['segments'] = len(segments)
+    summary['bytes'] = sum(len(row['data']) for row in segments)
+    summary['distance_km'] = round(summary['distance_km'], 3)
+    return summary
+
+
+def ingest_tracks(tracks, max_speed_kmh=DEFAULT_MAX_SPEED_KMH):
+    """
+    Carga masiva de puntos GPS ([{'vehicle_id', 'points': array (n, 3)}], ya
+    validados). Guarda un segmento comprimido por vehículo y día, actualiza la
+    última posición y suma a VehicleDetail.current_mileage los km recorridos,
+    todo en una transacción.
+    """
+    by_vehicle = defaultdict(list)
+    for track in tracks:
+        by_vehicle[track['vehicle_id']].append(track['points'])
+    for attempt in range(1, INGEST_ATTEMPTS + 1):
+        try:
+            return _ingest_once(by_vehicle, max_speed_kmh), None
+        except (_PositionConflict, IntegrityError) as e:
+            db.session.rollback()
+            if attempt == INGEST_ATTEMPTS:
+                return None, {'message': f"Carga concurrente de los mismos vehículos, reintente: {e}", 'status': 409}
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return None, {'message': f"Error al guardar los recorridos: {e}", 'status': 500}
+
+
+def _load_vehicle(vehicle_id):
+    # El join con Asset aplica el filtro de planta del usuario
+    return db.session.execute(
+        select(VehicleDetail).join(Asset, Asset.id == VehicleDetail.asset_id).where(VehicleDetail.id == vehicle_id)
+    ).scalar_one_or_none()
+
+
+def _decode_segments(segments):
+    decoded = [decode_track(segment.data) for segment in segments]
+    return [np.concatenate(column) for column in zip(*decoded)]
+
+
+def get_track(vehicle_id, day):
+    """
+    Recorrido de un vehículo en un día (UTC) en formato columnar: 't' (epoch),
+    'lat' y 'lon' (grados).
+    """
+    try:
+        if _load_vehicle(vehicle_id) is None:
+            return None, {'message': 'Vehículo no encontrado', 'status': 404}
+        segments = db.session.execute(
+            select(_segments.c.data, _segments.c.distance_m)
+            .where(_segments.c.vehicle_id == vehicle_id, _segments.c.day == day)
+            .order_by(_segments.c.start_time)
+        ).all()
+        result = {'vehicle_id': vehicle_id, 'date': day.isoformat(), 'points': 0,
+                  'distance_km': round(sum(s.distance_m for s in segments) / 1000, 3), 't': [], 'lat': [], 'lon': []}
+        if segments:
+            times, lats, lons = _decode_segments(segments)
+            result.update(points=len(times), t=times.tolist(),
+                          lat=(lats / COORD_SCALE).tolist(), lon=(lons / COORD_SCALE).tolist())
+        return result, None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al consultar el recorrido: {e}", 'status': 500}
+
+
+def get_daily_distance(vehicle_id, date_from, date_to):
+    """
+    Kilómetros recorridos por día, sumados desde los segmentos sin descomprimirlos.
+    """
+    try:
+        if _load_vehicle(vehicle_id) is None:
+            return None, {'message': 'Vehículo no encontrado', 'status': 404}
+        rows = db.session.execute(
+            select(_segments.c.day, func.sum(_segments.c.distance_m), func.sum(_segments.c.points))
+            .where(_segments.c.vehicle_id == vehicle_id, _segments.c.day.between(date_from, date_to))
+            .group_by(_segments.c.day).order_by(_segments.c.day)
+        ).all()
+        return [{'date': day.isoformat(), 'distance_km': round(distance / 1000, 3), 'points': int(points)}
+                for day, distance, points in rows], None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al calcular el kilometraje: {e}", 'status': 500}
+
+
+def vehicles_near_site(site_id, radius_km, max_age_minutes=None):
+    """
+    Vehículos cuya última posición está a menos de 'radius_km' de la planta.
+    El índice de la grilla reduce la búsqueda a las celdas que cubren el radio;
+    la distancia exacta (haversine) se calcula solo sobre esos candidatos.
+    """
+    try:
+        site = db.session.get(Site, site_id)
+        if not site:
+            return None, {'message': 'Planta no encontrada', 'status': 404}
+        if site.latitude is None or site.longitude is None:
+            return None, {'message': 'La planta no tiene coordenadas', 'status': 400}
+
+        lat_span = radius_km / KM_PER_DEGREE
+        lon_span = min(radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(site.latitude)), 1e-6)), 180)
+        min_x, min_y = cell_of(max(site.latitude - lat_span, -90), max(site.longitude - lon_span, -180))
+        max_x, max_y = cell_of(min(site.latitude + lat_span, 90), min(site.longitude + lon_span, 180))
+
+        query = (
+            select(VehiclePosition, VehicleDetail.license_plate, Asset.id.label('asset_id'), Asset.name)
+            .join(VehicleDetail, VehicleDetail.id == VehiclePosition.vehicle_id)
+            .join(Asset, Asset.id == VehicleDetail.asset_id)
+            .where(VehiclePosition.cell_y.between(min_y, max_y), VehiclePosition.cell_x.between(min_x, max_x))
+        )
+        if max_age_minutes:
+            query = query.where(VehiclePosition.recorded_date >= datetime.utcnow() - timedelta(minutes=max_age_minutes))
+        candidates = db.session.execute(query).all()
+        if not candidates:
+            return [], None
+
+        distances = haversine_m(site.latitude, site.longitude,
+                                [c.VehiclePosition.latitude for c in candidates],
+                                [c.VehiclePosition.longitude for c in candidates]) / 1000
+        nearby = [
+            {'vehicle_id': c.VehiclePosition.vehicle_id, 'asset_id': c.asset_id, 'name': c.name,
+             'license_plate': c.license_plate, 'latitude': c.VehiclePosition.latitude,
+             'longitude': c.VehiclePosition.longitude, 'recorded_date': c.VehiclePosition.recorded_date.isoformat(),
+             'distance_km': round(float(distance), 3)}
+            for c, distance in zip(candidates, distances) if distance <= radius_km
+        ]
+        return sorted(nearby, key=lambda v: v['distance_km']), None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al buscar vehículos cercanos: {e}", 'status': 500}
+
+
+def compact_tracks(day=None):
+    """
+    Une los segmentos de cada vehículo en uno por día (por defecto, ayer UTC):
+    menos filas y mejor compresión. Pensado para correr cuando el día ya cerró.
+    """
+    day = day or (datetime.utcnow().date() - timedelta(days=1))
+    summary = {'date': day.isoformat(), 'vehicles': 0, 'segments': 0, 'bytes_before': 0, 'bytes_after': 0}
+    try:
+        vehicle_ids = db.session.execute(
+            select(_segments.c.vehicle_id).where(_segments.c.day == day)
+            .group_by(_segments.c.vehicle_id).having(func.count() > 1)
+        ).scalars().all()
+        for vehicle_id in vehicle_ids:
+            segments = db.session.execute(
+                select(_segments.c.id, _segments.c.data, _segments.c.distance_m)
+                .where(_segments.c.vehicle_id == vehicle_id, _segments.c.day == day)
+                .order_by(_segments.c.start_time)
+            ).all()
+            times, lats, lons = _decode_segments(segments)
+            row = _segment_row(vehicle_id, times, lats, lons, sum(s.distance_m for s in segments))
+            db.session.execute(delete(_segments).where(_segments.c.id.in_([s.id for s in segments])))
+            db.session.execute(insert(_segments), [row])
+            db.session.commit()
+            summary['vehicles'] += 1
+            summary['segments'] += len(segments)
+            summary['bytes_before'] += sum(len(s.data) for s in segments)
+            summary['bytes_after'] += len(row['data'])
+        return summary, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al compactar los recorridos: {e}", 'status': 500}
@@ -0,0 +1,89 @@
+from datetime import date
+import numpy as np
+
+MAX_POINTS_PER_REQUEST = 200_000
+MAX_RADIUS_KM = 500
+# Rango aceptado para el tiempo de los puntos (2000-01-01 a 2100-01-01 UTC):
+# un epoch en milisegundos queda fuera y se rechaza en lugar de desbordar la fecha
+MIN_EPOCH = 946684800
+MAX_EPOCH = 4102444800
+
+
+def parse_points(points):
+    """
+    Convierte [[epoch, lat, lon], ...] en un array (n, 3) validado de una sola
+    vez con NumPy. Devuelve (array, error).
+    """
+    if not isinstance(points, list) or not points:
+        return None, "Se requiere la lista 'points' con al menos un punto [epoch, lat, lon]."
+    try:
+        array = np.asarray(points, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None, "Cada punto debe ser una lista numérica [epoch, lat, lon]."
+    if array.ndim != 2 or array.shape[1] != 3:
+        return None, "Cada punto debe ser una lista numérica [epoch, lat, lon]."
+    if not np.isfinite(array).all():
+        return None, "Los puntos no pueden contener valores no numéricos."
+    if ((array[:, 0] < MIN_EPOCH) | (array[:, 0] >= MAX_EPOCH)).any():
+        return None, "El tiempo de cada punto debe ser un epoch en segundos entre los años 2000 y 2100."
+    if (np.abs(array[:, 1]) > 90).any() or (np.abs(array[:, 2]) > 180).any():
+        return None, "Latitud entre -90 y 90 y longitud entre -180 y 180."
+    return array, None
+
+
+def validate_ingest(data):
+    """
+    Valida una carga masiva: {'tracks': [{'vehicle_id', 'points': [[epoch, lat, lon], ...]}]}.
+    Devuelve (tracks, errors) con los puntos ya convertidos a arrays.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('tracks'), list) or not data['tracks']:
+        return None, {'tracks': "Se requiere la lista 'tracks' con al menos un recorrido."}
+    errors = {}
+    tracks = []
+    total = 0
+    for index, track in enumerate(data['tracks']):
+        if not isinstance(track, dict):
+            errors[str(index)] = "Cada recorrido debe ser un objeto con 'vehicle_id' y 'points'."
+            continue
+        vehicle_id = track.get('vehicle_id')
+        if not isinstance(vehicle_id, int) or isinstance(vehicle_id, bool) or vehicle_id <= 0:
+            errors[str(index)] = "El campo 'vehicle_id' debe ser un entero positivo."
+            continue
+        points, error = parse_points(track.get('points'))
+        if error:
+            errors[str(index)] = error
+            continue
+        total += len(points)
+        tracks.append({'vehicle_id': vehicle_id, 'points': points})
+    if total > MAX_POINTS_PER_REQUEST:
+        errors['tracks'] = f"Máximo {MAX_POINTS_PER_REQUEST} puntos por petición."
+    return tracks, errors
+
+
+def parse_day(value):
+    try:
+        return date.fromisoformat(value), None
+    except (TypeError, ValueError):
+        return None, "El parámetro 'date' debe tener formato YYYY-MM-DD."
+
+
+def parse_radius(args):
+    """
+    Valida 'radius_km' y 'max_age_minutes' de la búsqueda por cercanía.
+    """
+    errors = {}
+    params = {'radius_km': None, 'max_age_minutes': None}
+    try:
+        params['radius_km'] = float(args.get('radius_km', ''))
+        if not 0 < params['radius_km'] <= MAX_RADIUS_KM:
+            raise ValueError
+    except ValueError:
+        errors['radius_km'] = f"El campo 'radius_km' debe ser un número entre 0 y {MAX_RADIUS_KM}."
+    if args.get('max_age_minutes'):
+        try:
+            params['max_age_minutes'] = int(args['max_age_minutes'])
+            if params['max_age_minutes'] <= 0:
+                raise ValueError
+        except ValueError:
+            errors['max_age_minutes'] = "El campo 'max_age_minutes' debe ser un entero positivo."
+    return params, errors
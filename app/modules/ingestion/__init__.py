@@ -0,0 +1 @@
+# This file makes the 'ingestion' directory a Python package
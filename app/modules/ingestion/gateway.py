@@ -0,0 +1,304 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from .protocol import parse_line
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_SIZE = 20000
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_PENDING = 500000
+ASSET_RELOAD_SECONDS = 30
+# Una línea más larga no es una lectura: se descarta y se corta la conexión
+MAX_LINE_BYTES = 4096
+
+
+class IngestionGateway:
+    """
+    Pasarela asyncio de lecturas de sensores.
+
+    Las líneas llegan por TCP o UDP, se validan y se acumulan por activo en
+    memoria. Un lote se escribe cuando se juntan 'flush_size' lecturas o pasan
+    'flush_interval' segundos, en un hilo aparte para no bloquear el bucle y
+    con una sola escritura en curso. Si la base de datos se atrasa y lo
+    pendiente supera 'max_pending', se deja de leer de los sockets TCP (el
+    emisor queda frenado por TCP) y los datagramas UDP se descartan y cuentan.
+    """
+
+    def __init__(self, write_batch, load_assets, flush_size=DEFAULT_FLUSH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, max_pending=DEFAULT_MAX_PENDING):
+        self.write_batch = write_batch
+        self.load_assets = load_assets
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.counters = Counter()
+        self.asset_sites = {}
+        self._assets_loaded_at = 0
+        self._buffers = {}
+        self._pending = 0
+        self._in_flight = 0
+        self._flushing = None
+        self._transports = set()
+        self._paused = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingest-writer')
+
+    # --- Entrada ---
+
+    @property
+    def saturated(self):
+        return self._pending + self._in_flight >= self.max_pending
+
+    def ingest(self, lines, droppable=False):
+        """
+        Valida y encola líneas (bytes). Con droppable=True (UDP) se descartan si
+        la pasarela está saturada en lugar de aplicar contrapresión.
+        """
+        self.counters['received'] += len(lines)
+        if droppable and self.saturated:
+            self.counters['dropped'] += len(lines)
+            return
+
+        now = datetime.utcnow()
+        buffers, asset_sites = self._buffers, self.asset_sites
+        unknown = set()
+        accepted = 0
+        for raw in lines:
+            try:
+                reading = parse_line(raw, now)
+            except (ValueError, KeyError, OverflowError):
+                self.counters['invalid'] += 1
+                continue
+            asset_id = reading[0]
+            if asset_id not in asset_sites:
+                unknown.add(asset_id)
+                self.counters['unknown_asset'] += 1
+                continue
+            buffer = buffers.get(asset_id)
+            if buffer is None:
+                buffer = buffers[asset_id] = []
+            buffer.append(reading)
+            accepted += 1
+
+        self._pending += accepted
+        if unknown:
+            self._maybe_reload_assets()
+        if self._pending >= self.flush_size:
+            self._schedule_flush()
+        self._apply_backpressure()
+
+    def _maybe_reload_assets(self):
+        # Activos creados después del arranque: se recargan como mucho cada ASSET_RELOAD_SECONDS
+        if time.monotonic() - self._assets_loaded_at < ASSET_RELOAD_SECONDS:
+            return
+        self._assets_loaded_at = time.monotonic()
+        asyncio.get_running_loop().run_in_executor(self._executor, self._reload_assets)
+
+    def _reload_assets(self):
+        sites, error = self.load_assets()
+        if error:
+            logger.error(error['message'])
+        else:
+            self.asset_sites = sites
+
+    # --- Contrapresión ---
+
+    def attach(self, transport):
+        self._transports.add(transport)
+        if self._paused:
+            transport.pause_reading()
+
+    def detach(self, transport):
+        self._transports.discard(transport)
+
+    def _apply_backpressure(self):
+        if not self._paused and self.saturated:
+            self._paused = True
+            self.counters['backpressure_events'] += 1
+            for transport in self._transports:
+                transport.pause_reading()
+        elif self._paused and self._pending + self._in_flight < self.max_pending // 2:
+            self._paused = False
+            for transport in self._transports:
+                transport.resume_reading()
+
+    # --- Escritura ---
+
+    def _schedule_flush(self):
+        if self._flushing is None and self._pending:
+            self._flushing = asyncio.ensure_future(self._flush())
+
+    async def _write(self, batch):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self.write_batch, batch, self.asset_sites
+        )
+
+    async def _write_isolating(self, batch):
+        """
+        Escribe el lote. Si la base rechaza los datos (error 500, no una caída)
+        lo parte en mitades hasta aislar las lecturas inválidas, que se
+        descartan y registran. Devuelve (escritas, filas a reintentar, error):
+        solo se reintenta lo que no se escribió porque la base no respondía.
+        """
+        written, error = await self._write(batch)
+        if not error:
+            return written, [], None
+        if error['status'] == 503:
+            return 0, batch, error
+        if len(batch) == 1:
+            logger.error("Lectura descartada (%s): %r", error['message'], batch[0])
+            self.counters['rejected'] += 1
+            return 0, [], None
+        middle = len(batch) // 2
+        written_a, retry_a, error_a = await self._write_isolating(batch[:middle])
+        written_b, retry_b, error_b = await self._write_isolating(batch[middle:])
+        return written_a + written_b, retry_a + retry_b, error_a or error_b
+
+    async def _flush(self):
+        try:
+            while self._pending:
+                buffers, self._buffers = self._buffers, {}
+                batch = [row for rows in buffers.values() for row in rows]
+                self._in_flight, self._pending = len(batch), 0
+                started = time.perf_counter()
+                written, retry, error = await self._write_isolating(batch)
+                self.counters['flush_ms_total'] += int((time.perf_counter() - started) * 1000)
+                self.counters['flushed'] += written
+                if error:
+                    # Lo no escrito vuelve al buffer; mientras la base no
+                    # responda la contrapresión frena a los emisores.
+                    logger.error(error['message'])
+                    self.counters['flush_errors'] += 1
+                    for row in retry:
+                        self._buffers.setdefault(row[0], []).append(row)
+                    self._pending += len(retry)
+                    self._in_flight = 0
+                    self._apply_backpressure()
+                    await asyncio.sleep(self.flush_interval)
+                    continue
+                self.counters['flush_batches'] += 1
+                self._in_flight = 0
+                self._apply_backpressure()
+                if self._pending < self.flush_size:
+                    break
+        finally:
+            # Si la escritura lanzó una excepción el lote en curso no puede
+            # dejar la contrapresión activada para siempre
+            if self._in_flight:
+                self._in_flight = 0
+                self._apply_backpressure()
+            self._flushing = None
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self._schedule_flush()
+
+    # --- Estadísticas ---
+
+    def stats(self):
+        stats = dict(self.counters)
+        for name in ('received', 'invalid', 'unknown_asset', 'dropped', 'flushed', 'flush_batches', 'flush_errors',
+                     'rejected'):
+            stats.setdefault(name, 0)
+        stats.update(pending=self._pending, in_flight=self._in_flight,
+                     paused=self._paused, connections=len(self._transports))
+        return stats
+
+    def prometheus(self):
+        lines = []
+        for name, value in self.stats().items():
+            lines.append(f'maintech_ingest_{name} {int(value)}')
+        return '\n'.join(lines) + '\n'
+
+    # --- Servidores ---
+
+    async def serve(self, host='0.0.0.0', tcp_port=None, udp_port=None, stats_port=None):
+        loop = asyncio.get_running_loop()
+        self._reload_assets()
+        self._assets_loaded_at = time.monotonic()
+        servers = []
+        if tcp_port:
+            servers.append(await loop.create_server(lambda: _TcpProtocol(self), host, tcp_port))
+        if udp_port:
+            transport, _ = await loop.create_datagram_endpoint(lambda: _UdpProtocol(self), local_addr=(host, udp_port))
+            servers.append(transport)
+        if stats_port:
+            servers.append(await asyncio.start_server(self._serve_stats, host, stats_port))
+        periodic = asyncio.ensure_future(self._flush_periodically())
+        try:
+            await asyncio.Event().wait()
+        finally:
+            periodic.cancel()
+            for server in servers:
+                server.close()
+            await self.drain()
+
+    async def drain(self):
+        """
+        Escribe todo lo pendiente (al detener la pasarela).
+        """
+        while self._pending or self._flushing is not None:
+            self._schedule_flush()
+            if self._flushing is not None:
+                await self._flushing
+
+    async def _serve_stats(self, reader, writer):
+        await reader.readline()
+        body = self.prometheus().encode()
+        writer.write(b'HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                     b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+        await writer.drain()
+        writer.close()
+
+
+class _TcpProtocol(asyncio.Protocol):
+    """
+    Una línea por lectura; la última línea incompleta espera al siguiente bloque.
+    Un emisor que supera MAX_LINE_BYTES sin enviar '\n' se desconecta.
+    """
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+        self.transport = None
+        self._tail = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.gateway.attach(transport)
+
+    def connection_lost(self, exc):
+        self.gateway.detach(self.transport)
+        if self._tail.strip():
+            self.gateway.ingest([bytes(self._tail)])
+
+    def data_received(self, data):
+        if self.transport.is_closing():
+            return
+        end = data.rfind(b'\n')
+        if end < 0:
+            # Sin fin de línea solo se acumula: no se vuelve a recorrer lo ya recibido
+            self._tail += data
+        else:
+            lines = (bytes(self._tail) + data[:end]).split(b'\n')
+            self._tail = bytearray(data[end + 1:])
+            lines = [line for line in lines if line.strip()]
+            if lines:
+                self.gateway.ingest(lines)
+        if len(self._tail) > MAX_LINE_BYTES:
+            self.gateway.counters['dropped'] += 1
+            logger.warning("Línea de más de %s bytes sin fin de línea: se cierra la conexión", MAX_LINE_BYTES)
+            self._tail.clear()
+            self.transport.close()
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    def datagram_received(self, data, addr):
+        self.gateway.ingest([line for line in data.split(b'\n') if line], droppable=True)
@@ -0,0 +1,58 @@
+import asyncio
+import click
+from flask import Blueprint, current_app
+from app.extensions import live_events, response_cache
+from app.services.shared_state import local_state_components
+from .gateway import IngestionGateway, DEFAULT_FLUSH_SIZE, DEFAULT_FLUSH_INTERVAL, DEFAULT_MAX_PENDING
+from .ingestion_service import load_asset_sites, write_readings
+
+# Sin rutas HTTP: la pasarela corre como proceso aparte junto a la app Flask
+ingestion_bp = Blueprint(
+    'ingest',
+    __name__
+)
+
+@ingestion_bp.cli.command('serve')
+@click.option('--host', default='0.0.0.0', show_default=True)
+@click.option('--tcp-port', default=8094, show_default=True, help='0 para desactivar')
+@click.option('--udp-port', default=8095, show_default=True, help='0 para desactivar')
+@click.option('--stats-port', default=9102, show_default=True, help='Contadores en formato Prometheus; 0 para desactivar')
+@click.option('--flush-size', default=DEFAULT_FLUSH_SIZE, show_default=True)
+@click.option('--flush-interval', default=DEFAULT_FLUSH_INTERVAL, show_default=True)
+@click.option('--max-pending', default=DEFAULT_MAX_PENDING, show_default=True)
+@click.option('--allow-local', is_flag=True,
+              help='Arrancar sin REDIS_URL: las anomalías no llegan a los workers web (solo desarrollo)')
+def serve_command(host, tcp_port, udp_port, stats_port, flush_size, flush_interval, max_pending, allow_local):
+    """
+    Pasarela de lecturas de sensores (line protocol / tópicos MQTT): flask ingest serve
+    """
+    app = current_app._get_current_object()
+
+    # La pasarela es siempre otro proceso: sin broker y caché compartidos sus
+    # eventos de anomalía y sus invalidaciones no salen de él
+    local = local_state_components(live_events, response_cache)
+    if local:
+        message = (f"{' y '.join(local)} son locales a este proceso: los workers web no recibirán "
+                   f"las anomalías ni invalidarán sus cachés. Defina REDIS_URL.")
+        if not allow_local:
+            raise click.ClickException(message + " (--allow-local para arrancar igualmente)")
+        app.logger.warning(message)
+        click.echo(f"AVISO: {message}", err=True)
+
+    def write_batch(rows, asset_sites):
+        with app.app_context():
+            return write_readings(rows, asset_sites)
+
+    def load_assets():
+        with app.app_context():
+            return load_asset_sites()
+
+    gateway = IngestionGateway(write_batch, load_assets, flush_size=flush_size,
+                               flush_interval=flush_interval, max_pending=max_pending)
+    click.echo(f"Escuchando en {host} (TCP {tcp_port or '-'}, UDP {udp_port or '-'}, stats {stats_port or '-'})")
+    try:
+        asyncio.run(gateway.serve(host, tcp_port, udp_port, stats_port))
+    except KeyboardInterrupt:
+        pass
+    stats = gateway.stats()
+    click.echo(f"Recibidas: {stats['received']} - Guardadas: {stats['flushed']} - Descartadas: {stats['dropped']}")
@@ -0,0 +1,65 @@
+import logging
+from datetime import datetime
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError, OperationalError, SQLAlchemyError
+from app.extensions import live_events, response_cache
+from app.models import db, Asset, SensorReading
+from app.modules.layouts.layout_service import ANOMALY_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Orden de los campos de cada lectura en los buffers de la pasarela
+READING_COLUMNS = ('asset_id', 'sensor_type', 'value', 'reading_date', 'is_anomalous')
+
+
+def load_asset_sites():
+    """
+    Mapa asset_id -> site_id de todos los activos, para validar lecturas sin
+    consultar la base de datos por cada mensaje.
+    """
+    try:
+        with db.engine.connect() as connection:
+            return dict(connection.execute(select(Asset.id, Asset.site_id)).all()), None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al cargar los activos: {e}", 'status': 500}
+
+
+def write_readings(rows, asset_sites):
+    """
+    Inserta un lote de lecturas (tuplas en el orden de READING_COLUMNS) con un
+    único INSERT executemany de Core y publica las anómalas como eventos en vivo.
+    """
+    if not rows:
+        return 0, None
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(insert(SensorReading.__table__),
+                               [dict(zip(READING_COLUMNS, row)) for row in rows])
+    except SQLAlchemyError as e:
+        # 503: la base no está disponible y el lote puede reintentarse tal cual;
+        # 500: la base rechazó los datos de alguna lectura
+        unavailable = isinstance(e, OperationalError) or (isinstance(e, DBAPIError) and e.connection_invalidated)
+        return 0, {'message': f"Error al guardar las lecturas: {e}", 'status': 503 if unavailable else 500}
+
+    now = datetime.utcnow().isoformat()
+    anomalies = [{
+        'type': 'sensor_reading.anomaly',
+        'site_id': asset_sites.get(asset_id),
+        'asset_id': asset_id,
+        'time': now,
+        'data': {'sensor_reading_id': None, 'sensor_type': sensor_type.name,
+                 'value': value, 'reading_date': reading_date.isoformat()},
+    } for asset_id, sensor_type, value, reading_date, anomalous in rows if anomalous]
+    if anomalies:
+        # Las lecturas ya están guardadas: un fallo del broker o de la caché no
+        # debe devolver el lote a la pasarela para reescribirlo
+        try:
+            live_events.publish(anomalies)
+        except Exception as e:
+            logger.error(f"Error al publicar anomalías en vivo: {e}")
+        try:
+            # El INSERT no pasa por la sesión: se avisa a mano a los planos de planta
+            response_cache.bump([ANOMALY_VERSION])
+        except Exception as e:
+            logger.error(f"Error al invalidar los planos: {e}")
+    return len(rows), None
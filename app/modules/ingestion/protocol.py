@@ -0,0 +1,71 @@
+import math
+from datetime import datetime, timezone
+from functools import lru_cache
+from app.models import SensorType
+
+SENSOR_TYPES = {member.value.encode(): member for member in SensorType}
+_TRUE = {b't', b'true', b'1', b'yes'}
+# Marcas de tiempo aceptadas: 2000-01-01 a 2100-01-01 (UTC)
+MIN_EPOCH = 946684800
+MAX_EPOCH = 4102444800
+
+
+def _finite(raw):
+    value = float(raw)
+    if not math.isfinite(value):
+        raise ValueError('valor no finito')
+    return value
+
+
+@lru_cache(maxsize=4096)
+def _timestamp(raw):
+    """
+    Segundos epoch (con decimales) o nanosegundos epoch como en InfluxDB.
+    Los emisores repiten mucho la marca de tiempo: se memoriza la conversión.
+    """
+    value = _finite(raw)
+    if value > 1e12:
+        value /= 1e9
+    if not MIN_EPOCH <= value < MAX_EPOCH:
+        raise ValueError('marca de tiempo fuera de rango')
+    return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+
+
+def parse_line(line, now):
+    """
+    Convierte una línea (bytes) en (asset_id, sensor_type, value, reading_date, is_anomalous).
+    Admite dos formatos:
+      - line protocol: b'vibration,asset=12 value=4.2,anomalous=t 1700000000'
+      - tópico estilo MQTT: b'assets/12/vibration 4.2 1700000000'
+    Lanza ValueError o KeyError si la línea no es válida (incluidos valores
+    no finitos y marcas de tiempo fuera de rango).
+    """
+    parts = line.split()
+    count = len(parts)
+    if count < 2 or count > 3:
+        raise ValueError('número de campos inválido')
+    reading_date = _timestamp(parts[2]) if count == 3 else now
+
+    if parts[0].startswith(b'assets/'):
+        _, asset, sensor = parts[0].split(b'/')
+        return int(asset), SENSOR_TYPES.get(sensor, SensorType.other), _finite(parts[1]), reading_date, False
+
+    measurement, _, tag_str = parts[0].partition(b',')
+    asset = sensor = None
+    for tag in tag_str.split(b','):
+        key, _, value = tag.partition(b'=')
+        if key == b'asset':
+            asset = value
+        elif key == b'type':
+            sensor = value
+    value = anomalous = None
+    for field in parts[1].split(b','):
+        key, _, raw = field.partition(b'=')
+        if key == b'value':
+            value = raw
+        elif key == b'anomalous':
+            anomalous = raw
+    if asset is None or value is None:
+        raise ValueError("faltan 'asset' o 'value'")
+    sensor_type = SENSOR_TYPES.get(sensor or measurement, SensorType.other)
+    return int(asset), sensor_type, _finite(value), reading_date, anomalous is not None and anomalous.lower() in _TRUE
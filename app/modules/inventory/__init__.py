@@ -0,0 +1 @@
+# This file makes the 'inventory' directory a Python package
@@ -0,0 +1,80 @@
+import click
+from flask import Blueprint, jsonify, request
+from .reorder_service import (
+    run_reorder, request_parts,
+    DEFAULT_WINDOW_DAYS, DEFAULT_LEAD_TIME_DAYS, DEFAULT_COVERAGE_DAYS
+)
+from .validations import validate_reorder_params, validate_parts_request
+
+inventory_bp = Blueprint(
+    'inventory',
+    __name__,
+    url_prefix='/inventory'
+)
+
+def _reorder_params(data):
+    return {
+        'window_days': int(data.get('window_days') or DEFAULT_WINDOW_DAYS),
+        'lead_time_days': int(data.get('lead_time_days') or DEFAULT_LEAD_TIME_DAYS),
+        'coverage_days': int(data.get('coverage_days') or DEFAULT_COVERAGE_DAYS),
+    }
+
+# --- Rutas de la API (JSON) ---
+
+@inventory_bp.route('/api/reorder', methods=['GET'])
+def api_preview_reorder():
+    """
+    Muestra los repuestos que necesitan reposición sin crear solicitudes.
+    """
+    data = request.args.to_dict()
+    errors = validate_reorder_params(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    result, error = run_reorder(dry_run=True, **_reorder_params(data))
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 200
+
+@inventory_bp.route('/api/reorder', methods=['POST'])
+def api_run_reorder():
+    data = request.get_json(silent=True) or {}
+    errors = validate_reorder_params(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    result, error = run_reorder(user_id=data.get('user_id'), **_reorder_params(data))
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 201
+
+@inventory_bp.route('/api/purchase-requests', methods=['POST'])
+def api_request_parts():
+    data = request.get_json()
+    errors = validate_parts_request(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    requests_, error = request_parts(data['parts'], user_id=data.get('user_id'))
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify([r.to_dict() for r in requests_]), 201
+
+# --- Comandos CLI ---
+
+@inventory_bp.cli.command('reorder')
+@click.option('--window-days', default=DEFAULT_WINDOW_DAYS, show_default=True)
+@click.option('--lead-time-days', default=DEFAULT_LEAD_TIME_DAYS, show_default=True)
+@click.option('--coverage-days', default=DEFAULT_COVERAGE_DAYS, show_default=True)
+@click.option('--dry-run', is_flag=True, help='Solo muestra los candidatos.')
+def reorder_command(window_days, lead_time_days, coverage_days, dry_run):
+    """
+    Ejecuta el motor de reposición: flask inventory reorder
+    """
+    result, error = run_reorder(
+        window_days=window_days, lead_time_days=lead_time_days,
+        coverage_days=coverage_days, dry_run=dry_run
+    )
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"Candidatos: {len(result['candidates'])} - Solicitudes creadas: {result['created']}")
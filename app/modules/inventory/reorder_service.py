@@ -0,0 +1,168 @@
+import math
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, insert
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import (
+    db, SparePart, InventoryMovement, InventoryMovementType,
+    PurchaseRequest, PurchaseRequestStatus
+)
+
+# Parámetros por defecto del motor de reposición
+DEFAULT_WINDOW_DAYS = 90      # Ventana de consumo histórico
+DEFAULT_LEAD_TIME_DAYS = 14   # Tiempo de entrega del proveedor
+DEFAULT_COVERAGE_DAYS = 30    # Días de consumo que debe cubrir cada pedido
+
+
+def _consumption_subquery(since):
+    """
+    Consumo total (salidas) por repuesto desde 'since', agregado en la base de datos.
+    """
+    return (
+        select(
+            InventoryMovement.spare_part_id.label('spare_part_id'),
+            func.sum(InventoryMovement.quantity).label('consumed'),
+        )
+        .where(
+            InventoryMovement.type == InventoryMovementType.out,
+            InventoryMovement.movement_date >= since,
+        )
+        .group_by(InventoryMovement.spare_part_id)
+        .subquery()
+    )
+
+
+def _pending_subquery():
+    """
+    Repuestos que ya tienen una solicitud de compra pendiente.
+    """
+    return (
+        select(PurchaseRequest.spare_part_id.label('spare_part_id'))
+        .where(PurchaseRequest.status == PurchaseRequestStatus.pending)
+        .group_by(PurchaseRequest.spare_part_id)
+        .subquery()
+    )
+
+
+def find_reorder_candidates(window_days=DEFAULT_WINDOW_DAYS,
+                            lead_time_days=DEFAULT_LEAD_TIME_DAYS,
+                            coverage_days=DEFAULT_COVERAGE_DAYS):
+    """
+    Evalúa todos los repuestos contra su stock mínimo y su tasa de consumo.
+
+    Un repuesto necesita reposición cuando su stock actual no cubre el punto de
+    pedido: min_stock + consumo diario * tiempo de entrega. La evaluación se hace
+    en una sola consulta (repuestos + consumo agregado + pendientes), sin bucles
+    por repuesto; solo los candidatos vuelven a Python.
+    """
+    since = datetime.utcnow() - timedelta(days=window_days)
+    consumption = _consumption_subquery(since)
+    pending = _pending_subquery()
+
+    consumed = func.coalesce(consumption.c.consumed, 0)
+    daily_rate = consumed * 1.0 / window_days
+    reorder_point = func.coalesce(SparePart.min_stock, 0) + daily_rate * lead_time_days
+
+    query = (
+        select(
+            SparePart.id,
+            SparePart.min_stock,
+            SparePart.current_stock,
+            consumed.label('consumed'),
+        )
+        .outerjoin(consumption, consumption.c.spare_part_id == SparePart.id)
+        .outerjoin(pending, pending.c.spare_part_id == SparePart.id)
+        .where(
+            pending.c.spare_part_id.is_(None),  # Deduplicación contra pendientes
+            func.coalesce(SparePart.current_stock, 0) < reorder_point,
+        )
+        .order_by(SparePart.id)
+    )
+
+    candidates = []
+    for part_id, min_stock, current_stock, consumed_qty in db.session.execute(query):
+        rate = (consumed_qty or 0) / window_days
+        point = (min_stock or 0) + rate * lead_time_days
+        target = point + rate * coverage_days
+        quantity = max(1, math.ceil(target - (current_stock or 0)))
+        candidates.append({
+            'spare_part_id': part_id,
+            'current_stock': current_stock or 0,
+            'min_stock': min_stock or 0,
+            'daily_consumption': round(rate, 4),
+            'reorder_point': round(point, 2),
+            'quantity': quantity,
+        })
+    return candidates
+
+
+def run_reorder(user_id=None, window_days=DEFAULT_WINDOW_DAYS,
+                lead_time_days=DEFAULT_LEAD_TIME_DAYS,
+                coverage_days=DEFAULT_COVERAGE_DAYS, dry_run=False):
+    """
+    Genera en bloque las solicitudes de compra para los repuestos bajo el punto de pedido.
+    """
+    try:
+        candidates = find_reorder_candidates(window_days, lead_time_days, coverage_days)
+        if candidates and not dry_run:
+            now = datetime.utcnow()
+            db.session.execute(insert(PurchaseRequest), [
+                {
+                    'spare_part_id': c['spare_part_id'],
+                    'quantity': c['quantity'],
+                    'requested_by_user_id': user_id,
+                    'status': PurchaseRequestStatus.pending,
+                    'request_date': now,
+                }
+                for c in candidates
+            ])
+            db.session.commit()
+        return {'created': 0 if dry_run else len(candidates), 'candidates': candidates}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
+
+
+def request_parts(parts, user_id=None):
+    """
+    Crea solicitudes de compra manuales (urgentes) para una lista de repuestos.
+    'parts' es una lista de diccionarios con 'spare_part_id' y 'quantity'.
+    Si el repuesto ya tiene una solicitud pendiente, se suma la cantidad a esa solicitud.
+    """
+    try:
+        part_ids = {p['spare_part_id'] for p in parts}
+        existing_ids = set(db.session.scalars(
+            select(SparePart.id).where(SparePart.id.in_(part_ids))
+        ))
+        missing = part_ids - existing_ids
+        if missing:
+            return None, {'message': f'Repuestos no encontrados: {sorted(missing)}', 'status': 404}
+
+        pending = {
+            pr.spare_part_id: pr
+            for pr in PurchaseRequest.query.filter(
+                PurchaseRequest.spare_part_id.in_(part_ids),
+                PurchaseRequest.status == PurchaseRequestStatus.pending,
+            )
+        }
+
+        result = []
+        for part in parts:
+            request_ = pending.get(part['spare_part_id'])
+            if request_:
+                request_.quantity += part['quantity']
+            else:
+                request_ = PurchaseRequest(
+                    spare_part_id=part['spare_part_id'],
+                    quantity=part['quantity'],
+                    requested_by_user_id=user_id,
+                    status=PurchaseRequestStatus.pending,
+                )
+                db.session.add(request_)
+                pending[part['spare_part_id']] = request_
+            result.append(request_)
+
+        db.session.commit()
+        return list(dict.fromkeys(result)), None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
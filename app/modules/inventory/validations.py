@@ -0,0 +1,38 @@
+
+def validate_reorder_params(data):
+    """
+    Valida los parámetros opcionales del motor de reposición.
+    """
+    errors = {}
+    for field in ['window_days', 'lead_time_days', 'coverage_days']:
+        value = data.get(field)
+        if value is None:
+            continue
+        try:
+            if int(value) <= 0:
+                raise ValueError
+        except (ValueError, TypeError):
+            errors[field] = f"El campo '{field}' debe ser un entero positivo."
+    return errors
+
+def validate_parts_request(data):
+    """
+    Valida una solicitud manual de repuestos.
+    """
+    if not isinstance(data, dict):
+        return {'parts': "Se requiere un objeto JSON con la lista 'parts'."}
+    errors = {}
+    parts = data.get('parts')
+    if not isinstance(parts, list) or not parts:
+        errors['parts'] = "Se requiere una lista de repuestos."
+        return errors
+
+    for i, part in enumerate(parts):
+        spare_part_id = part.get('spare_part_id') if isinstance(part, dict) else None
+        if not isinstance(spare_part_id, int) or isinstance(spare_part_id, bool) or spare_part_id <= 0:
+            errors[f'parts[{i}]'] = "Cada repuesto debe incluir 'spare_part_id' como entero positivo."
+            continue
+        quantity = part.get('quantity')
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            errors[f'parts[{i}]'] = "La cantidad debe ser un entero positivo."
+    return errors
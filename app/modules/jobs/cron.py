@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+# (mínimo, máximo) de cada campo: minuto, hora, día del mes, mes, día de la semana (0 = domingo)
+_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+_MAX_SEARCH_DAYS = 366 * 5
+
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        expr, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if step <= 0:
+            raise ValueError(f"Paso no válido en '{part}'")
+        if expr == '*':
+            start, end = low, high
+        elif '-' in expr:
+            start, end = (int(v) for v in expr.split('-', 1))
+        else:
+            start = int(expr)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"Valor fuera de rango en '{part}' ({low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronExpression:
+    """
+    Expresión cron de 5 campos ('*/15 6-18 * * 1-5') o alias (@daily, @hourly...).
+    Como en cron, si día del mes y día de la semana están restringidos basta
+    con que coincida uno de los dos. Las horas son UTC.
+    """
+
+    def __init__(self, text):
+        self.text = _ALIASES.get(text.strip(), text.strip())
+        fields = self.text.split()
+        if len(fields) != 5:
+            raise ValueError("La expresión cron debe tener 5 campos: minuto hora día mes día_semana")
+        if fields[4] == '7':
+            fields[4] = '0'
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_field(field, low, high) for field, (low, high) in zip(fields, _FIELDS)
+        )
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def _day_matches(self, day):
+        weekday = (day.weekday() + 1) % 7
+        if self._any_day or self._any_weekday:
+            return day.day in self.days and weekday in self.weekdays
+        return day.day in self.days or weekday in self.weekdays
+
+    def next_after(self, moment):
+        """
+        Primer instante (a minuto exacto) estrictamente posterior a 'moment'.
+        Salta por meses, días y horas enteros en lugar de recorrer minuto a minuto.
+        """
+        current = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=_MAX_SEARCH_DAYS)
+        while current <= limit:
+            if current.month not in self.months:
+                year, month = (current.year + 1, 1) if current.month == 12 else (current.year, current.month + 1)
+                current = datetime(year, month, 1)
+                continue
+            if not self._day_matches(current):
+                current = datetime(current.year, current.month, current.day) + timedelta(days=1)
+                continue
+            if current.hour not in self.hours:
+                current = current.replace(minute=0) + timedelta(hours=1)
+                continue
+            later = [m for m in self.minutes if m >= current.minute]
+            if not later:
+                current = current.replace(minute=0) + timedelta(hours=1)
+                continue
+            return current.replace(minute=min(later))
+        raise ValueError(f"La expresión '{self.text}' no tiene ejecuciones próximas")
@@ -0,0 +1,284 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, insert, delete, func, and_, or_, case
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db, Job, JobSchedule, JobStatus
+from .cron import CronExpression
+from .registry import JOBS, DEFAULT_SCHEDULES, job_option, params_error
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 300
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+DEFAULT_RETENTION_DAYS = 30
+
+_jobs = Job.__table__
+_schedules = JobSchedule.__table__
+
+
+def _job_values(name, params, run_after, priority, schedule_id=None):
+    return {
+        'name': name, 'params': params or {}, 'status': JobStatus.queued, 'priority': priority,
+        'run_after': run_after, 'attempts': 0, 'max_attempts': job_option(name, 'max_attempts'),
+        'schedule_id': schedule_id, 'created_date': datetime.utcnow(),
+    }
+
+
+def enqueue_job(name, params=None, run_after=None, priority=0):
+    """
+    Encola un trabajo registrado.
+    """
+    if name not in JOBS:
+        return None, {'message': f"Trabajo desconocido: '{name}'", 'status': 400}
+    error = params_error(name, params)
+    if error:
+        return None, {'message': error, 'status': 400}
+    try:
+        job = Job(**_job_values(name, params, run_after or datetime.utcnow(), priority))
+        db.session.add(job)
+        db.session.commit()
+        return job, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al encolar el trabajo: {e}", 'status': 500}
+
+
+def ensure_default_schedules():
+    """
+    Crea las programaciones por defecto que aún no existen (por nombre).
+    """
+    existing = set(db.session.execute(select(JobSchedule.name)).scalars())
+    now = datetime.utcnow()
+    rows = [
+        {'name': s['name'], 'job_name': s['job_name'], 'cron': s['cron'], 'params': s.get('params') or {},
+         'enabled': True, 'next_run': CronExpression(s['cron']).next_after(now)}
+        for s in DEFAULT_SCHEDULES if s['name'] not in existing
+    ]
+    if rows:
+        db.session.execute(insert(_schedules), rows)
+        db.session.commit()
+    return len(rows)
+
+
+def enqueue_due_schedules(now=None):
+    """
+    Encola los trabajos de las programaciones vencidas. El avance de 'next_run'
+    es condicional (compare-and-set): con varios workers solo uno encola cada
+    ejecución. Si la ejecución anterior sigue pendiente, no se acumula otra.
+    Una programación con cron, trabajo o parámetros no válidos (la tabla se
+    edita a mano) se desactiva y se registra, sin frenar a las demás.
+    """
+    now = now or datetime.utcnow()
+    due = db.session.execute(
+        select(JobSchedule.id, JobSchedule.job_name, JobSchedule.cron, JobSchedule.params, JobSchedule.next_run)
+        .where(JobSchedule.enabled.is_(True), or_(JobSchedule.next_run <= now, JobSchedule.next_run.is_(None)))
+    ).all()
+    pending = set(db.session.execute(
+        select(Job.schedule_id).where(Job.schedule_id.isnot(None), Job.status.in_([JobStatus.queued, JobStatus.running]))
+    ).scalars())
+
+    enqueued = 0
+    for schedule in due:
+        try:
+            next_run = CronExpression(schedule.cron).next_after(now)
+            problem = (f"trabajo desconocido '{schedule.job_name}'" if schedule.job_name not in JOBS
+                       else params_error(schedule.job_name, schedule.params))
+        except ValueError as e:
+            problem = f"cron '{schedule.cron}' no válido: {e}"
+        if problem:
+            logger.error("Programación %s desactivada: %s", schedule.id, problem)
+            db.session.execute(update(_schedules).where(_schedules.c.id == schedule.id).values(enabled=False))
+            continue
+        moved = db.session.execute(
+            update(_schedules)
+            .where(_schedules.c.id == schedule.id,
+                   _schedules.c.next_run == schedule.next_run if schedule.next_run else _schedules.c.next_run.is_(None))
+            .values(next_run=next_run, last_run=now if schedule.next_run else _schedules.c.last_run)
+        ).rowcount
+        # Una programación nueva (sin next_run) solo se agenda, no se ejecuta al instante
+        if moved and schedule.next_run and schedule.id not in pending:
+            db.session.execute(insert(_jobs), [_job_values(schedule.job_name, schedule.params, now, 0, schedule.id)])
+            enqueued += 1
+    db.session.commit()
+    return enqueued
+
+
+def _claimable(now):
+    return or_(
+        and_(_jobs.c.status == JobStatus.queued, _jobs.c.run_after <= now),
+        and_(_jobs.c.status == JobStatus.running, _jobs.c.lease_expires < now,
+             _jobs.c.attempts < _jobs.c.max_attempts),
+    )
+
+
+def claim_jobs(owner, names, limit, lease_seconds=DEFAULT_LEASE_SECONDS, now=None):
+    """
+    Toma hasta 'limit' trabajos de los tipos indicados. Cada toma es un UPDATE
+    condicional sobre la fila (estado y lease), así dos nodos nunca toman el
+    mismo trabajo, también con SQLite. Un trabajo cuyo lease venció (el nodo
+    murió) vuelve a tomarse y cuenta como un intento más.
+    """
+    now = now or datetime.utcnow()
+    if limit <= 0 or not names:
+        return []
+    candidates = db.session.execute(
+        select(_jobs.c.id).where(_jobs.c.name.in_(names), _claimable(now))
+        .order_by(_jobs.c.priority.desc(), _jobs.c.run_after, _jobs.c.id)
+        .limit(limit * 2)
+    ).scalars().all()
+
+    claimed = []
+    for job_id in candidates:
+        taken = db.session.execute(
+            update(_jobs).where(_jobs.c.id == job_id, _claimable(now)).values(
+                status=JobStatus.running, lease_owner=owner, lease_expires=now + timedelta(seconds=lease_seconds),
+                attempts=_jobs.c.attempts + 1, started_date=now, error=None,
+            )
+        ).rowcount
+        if taken:
+            claimed.append(job_id)
+            if len(claimed) == limit:
+                break
+    db.session.commit()
+    if not claimed:
+        return []
+    return db.session.execute(
+        select(_jobs.c.id, _jobs.c.name, _jobs.c.params, _jobs.c.attempts, _jobs.c.max_attempts)
+        .where(_jobs.c.id.in_(claimed))
+    ).all()
+
+
+def renew_leases(owner, job_ids, lease_seconds=DEFAULT_LEASE_SECONDS):
+    if not job_ids:
+        return 0
+    renewed = db.session.execute(
+        update(_jobs).where(_jobs.c.id.in_(job_ids), _jobs.c.lease_owner == owner, _jobs.c.status == JobStatus.running)
+        .values(lease_expires=datetime.utcnow() + timedelta(seconds=lease_seconds))
+    ).rowcount
+    db.session.commit()
+    return renewed
+
+
+def _retry_delay(attempts):
+    return min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+
+
+def finish_job(job_id, owner, attempts, max_attempts, outcome):
+    """
+    Registra el resultado de un trabajo tomado por 'owner'. Si falló y le quedan
+    intentos, vuelve a la cola con espera exponencial. Si el lease pasó a otro
+    nodo, el resultado se descarta.
+    """
+    now = datetime.utcnow()
+    values = {'finished_date': now, 'duration_ms': outcome['duration_ms'], 'lease_owner': None, 'lease_expires': None}
+    if outcome['error'] is None:
+        values.update(status=JobStatus.succeeded, result=outcome['result'], error=None)
+    elif attempts < max_attempts:
+        values.update(status=JobStatus.queued, error=outcome['error'],
+                      run_after=now + timedelta(seconds=_retry_delay(attempts)))
+    else:
+        values.update(status=JobStatus.failed, error=outcome['error'])
+    updated = db.session.execute(
+        update(_jobs).where(_jobs.c.id == job_id, _jobs.c.lease_owner == owner, _jobs.c.status == JobStatus.running)
+        .values(**values)
+    ).rowcount
+    db.session.commit()
+    return bool(updated)
+
+
+def release_job(job_id, owner):
+    """
+    Devuelve a la cola un trabajo tomado por 'owner' que se interrumpió sin
+    fallar (p. ej. al reiniciar el pool de procesos), sin contarlo como intento.
+    """
+    released = db.session.execute(
+        update(_jobs).where(_jobs.c.id == job_id, _jobs.c.lease_owner == owner, _jobs.c.status == JobStatus.running)
+        .values(status=JobStatus.queued, lease_owner=None, lease_expires=None, run_after=datetime.utcnow(),
+                attempts=_jobs.c.attempts - 1)
+    ).rowcount
+    db.session.commit()
+    return bool(released)
+
+
+def fail_abandoned_jobs(now=None):
+    """
+    Marca como fallidos los trabajos con lease vencido que ya agotaron sus intentos.
+    """
+    now = now or datetime.utcnow()
+    failed = db.session.execute(
+        update(_jobs).where(_jobs.c.status == JobStatus.running, _jobs.c.lease_expires < now,
+                            _jobs.c.attempts >= _jobs.c.max_attempts)
+        .values(status=JobStatus.failed, finished_date=now, lease_owner=None, lease_expires=None,
+                error='Lease vencido: el worker dejó de responder')
+    ).rowcount
+    db.session.commit()
+    return failed
+
+
+def purge_finished_jobs(days=DEFAULT_RETENTION_DAYS):
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        result = db.session.execute(
+            delete(_jobs).where(_jobs.c.status.in_([JobStatus.succeeded, JobStatus.failed]),
+                                _jobs.c.finished_date < cutoff)
+        )
+        db.session.commit()
+        return {'purged': result.rowcount}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al purgar trabajos: {e}", 'status': 500}
+
+
+def get_jobs(status=None, name=None, limit=100):
+    try:
+        query = select(Job).order_by(Job.id.desc()).limit(limit)
+        if status:
+            query = query.where(Job.status == JobStatus[status])
+        if name:
+            query = query.where(Job.name == name)
+        return db.session.execute(query).scalars().all(), None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al consultar los trabajos: {e}", 'status': 500}
+
+
+def get_schedules():
+    try:
+        return db.session.execute(select(JobSchedule).order_by(JobSchedule.name)).scalars().all(), None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al consultar las programaciones: {e}", 'status': 500}
+
+
+def get_job_stats(days=7):
+    """
+    Métricas por trabajo en los últimos 'days' días: ejecuciones, fallos y
+    duración media y máxima (ms), más lo que hay en cola o corriendo.
+    """
+    try:
+        since = datetime.utcnow() - timedelta(days=days)
+        finished = db.session.execute(
+            select(
+                Job.name,
+                func.count(),
+                func.sum(case((Job.status == JobStatus.failed, 1), else_=0)),
+                func.avg(Job.duration_ms),
+                func.max(Job.duration_ms),
+            )
+            .where(Job.finished_date >= since, Job.status.in_([JobStatus.succeeded, JobStatus.failed]))
+            .group_by(Job.name)
+        ).all()
+        open_counts = db.session.execute(
+            select(Job.name, Job.status, func.count())
+            .where(Job.status.in_([JobStatus.queued, JobStatus.running]))
+            .group_by(Job.name, Job.status)
+        ).all()
+
+        stats = {}
+        for name, runs, failures, avg_ms, max_ms in finished:
+            stats[name] = {'runs': runs, 'failed': int(failures or 0),
+                           'avg_ms': round(float(avg_ms), 1) if avg_ms is not None else None, 'max_ms': max_ms}
+        for name, status, count in open_counts:
+            stats.setdefault(name, {'runs': 0, 'failed': 0, 'avg_ms': None, 'max_ms': None})[status.name] = count
+        return stats, None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al calcular las métricas de trabajos: {e}", 'status': 500}
@@ -0,0 +1,95 @@
+import json
+from datetime import datetime
+import click
+from flask import Blueprint, current_app, jsonify, request
+from .job_service import enqueue_job, get_jobs, get_schedules, get_job_stats, purge_finished_jobs, DEFAULT_RETENTION_DAYS
+from .validations import validate_job_data, parse_list_params
+from .worker import JobWorker, DEFAULT_POLL_INTERVAL
+
+jobs_bp = Blueprint(
+    'jobs',
+    __name__,
+    url_prefix='/jobs'
+)
+
+# --- Rutas de la API (JSON) ---
+
+@jobs_bp.route('/api/jobs', methods=['GET'])
+def api_list_jobs():
+    params, errors = parse_list_params(request.args)
+    if errors:
+        return jsonify({'errors': errors}), 400
+    jobs, error = get_jobs(**params)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify([job.to_dict() for job in jobs]), 200
+
+@jobs_bp.route('/api/jobs', methods=['POST'])
+def api_enqueue_job():
+    data = request.get_json()
+    errors = validate_job_data(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+    job, error = enqueue_job(
+        data['name'], params=data.get('params'),
+        run_after=datetime.fromisoformat(data['run_after']) if data.get('run_after') else None,
+        priority=int(data.get('priority') or 0),
+    )
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(job.to_dict()), 201
+
+@jobs_bp.route('/api/schedules', methods=['GET'])
+def api_list_schedules():
+    schedules, error = get_schedules()
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify([s.to_dict() for s in schedules]), 200
+
+@jobs_bp.route('/api/stats', methods=['GET'])
+def api_job_stats():
+    stats, error = get_job_stats(days=request.args.get('days', 7, type=int))
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(stats), 200
+
+# --- Comandos CLI ---
+
+@jobs_bp.cli.command('worker')
+@click.option('--processes', type=int, default=None, help='Procesos para trabajos CPU (por defecto, núcleos).')
+@click.option('--threads', default=4, show_default=True, help='Hilos para trabajos de E/S.')
+@click.option('--poll-interval', default=DEFAULT_POLL_INTERVAL, show_default=True)
+@click.option('--once', is_flag=True, help='Corre lo pendiente y termina.')
+def worker_command(processes, threads, poll_interval, once):
+    """
+    Worker de trabajos en segundo plano y programaciones: flask jobs worker
+    """
+    JobWorker(current_app._get_current_object(), processes=processes, threads=threads,
+              poll_interval=poll_interval).run(once=once)
+
+@jobs_bp.cli.command('enqueue')
+@click.argument('name')
+@click.option('--params', default='{}', help='Parámetros en JSON.')
+def enqueue_command(name, params):
+    """
+    Encola un trabajo: flask jobs enqueue inventory.reorder --params '{"dry_run": true}'
+    """
+    try:
+        params = json.loads(params)
+    except ValueError:
+        raise click.ClickException("--params debe ser JSON válido")
+    job, error = enqueue_job(name, params=params)
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"Trabajo {job.id} ({job.name}) encolado")
+
+@jobs_bp.cli.command('purge')
+@click.option('--days', default=DEFAULT_RETENTION_DAYS, show_default=True)
+def purge_command(days):
+    """
+    Borra los trabajos terminados hace más de 'days' días: flask jobs purge
+    """
+    result, error = purge_finished_jobs(days)
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"Trabajos purgados: {result['purged']}")
@@ -0,0 +1,104 @@
+"""
+Catálogo de trabajos en segundo plano.
+
+Cada trabajo apunta a una función por su ruta de importación (así un proceso
+del pool puede resolverla sin recibir objetos de la app) que devuelve
+(resultado, error) como los servicios. 'kind' decide dónde corre: 'cpu' en el
+pool de procesos (NumPy, cálculos largos) e 'io' en el pool de hilos.
+"""
+import importlib
+import inspect
+from datetime import date
+
+JOBS = {
+    'inventory.reorder': {'target': 'app.modules.inventory.reorder_service:run_reorder', 'kind': 'io'},
+    'assets.revalue': {'target': 'app.modules.assets.valuation_service:revalue_assets', 'kind': 'cpu'},
+    'kpi.backfill': {'target': 'app.modules.jobs.tasks:backfill_recent_kpis', 'kind': 'cpu', 'timeout': 3600},
+    'expiry.sweep': {'target': 'app.modules.expiry.expiry_service:run_expiry_sweep', 'kind': 'io'},
+    'idempotency.purge': {'target': 'app.services.idempotency:purge_expired_keys', 'kind': 'io'},
+    'predictive.refresh': {'target': 'app.modules.predictive.risk_service:refresh_scores', 'kind': 'cpu'},
+    'planning.plan': {'target': 'app.modules.planning.planning_service:plan_all_sites', 'kind': 'cpu', 'timeout': 3600},
+    'sync.purge': {'target': 'app.modules.sync.sync_service:purge_tombstones', 'kind': 'io'},
+    'jobs.purge': {'target': 'app.modules.jobs.job_service:purge_finished_jobs', 'kind': 'io'},
+    'fleet.compact': {'target': 'app.modules.fleet.track_service:compact_tracks', 'kind': 'cpu'},
+}
+DEFAULT_TIMEOUT = 900
+DEFAULT_MAX_ATTEMPTS = 3
+# Parámetros de fecha: llegan como 'YYYY-MM-DD' (JSON) y la función recibe un date
+DATE_PARAMS = ('as_of', 'day', 'today')
+
+# Programaciones que el worker crea si no existen (luego se editan en job_schedule)
+DEFAULT_SCHEDULES = [
+    {'name': 'reorder-daily', 'job_name': 'inventory.reorder', 'cron': '0 6 * * *'},
+    {'name': 'revalue-monthly', 'job_name': 'assets.revalue', 'cron': '0 2 1 * *'},
+    {'name': 'kpi-reconcile-nightly', 'job_name': 'kpi.backfill', 'cron': '0 3 * * *', 'params': {'days': 7}},
+    {'name': 'expiry-sweep-daily', 'job_name': 'expiry.sweep', 'cron': '0 7 * * *'},
+    {'name': 'idempotency-purge-hourly', 'job_name': 'idempotency.purge', 'cron': '30 * * * *'},
+    {'name': 'predictive-refresh-hourly', 'job_name': 'predictive.refresh', 'cron': '15 * * * *'},
+    {'name': 'planning-daily', 'job_name': 'planning.plan', 'cron': '0 5 * * *'},
+    {'name': 'sync-purge-daily', 'job_name': 'sync.purge', 'cron': '0 4 * * *'},
+    {'name': 'jobs-purge-daily', 'job_name': 'jobs.purge', 'cron': '10 4 * * *'},
+    {'name': 'fleet-compact-daily', 'job_name': 'fleet.compact', 'cron': '20 1 * * *'},
+]
+
+
+def register_job(name, target, kind='io', timeout=DEFAULT_TIMEOUT, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    if kind not in ('cpu', 'io'):
+        raise ValueError("El tipo de trabajo debe ser 'cpu' o 'io'")
+    JOBS[name] = {'target': target, 'kind': kind, 'timeout': timeout, 'max_attempts': max_attempts}
+
+
+def job_option(name, option):
+    defaults = {'timeout': DEFAULT_TIMEOUT, 'max_attempts': DEFAULT_MAX_ATTEMPTS, 'kind': 'io'}
+    return JOBS[name].get(option, defaults[option])
+
+
+def resolve(name):
+    module_name, _, attribute = JOBS[name]['target'].partition(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def params_error(name, params):
+    """
+    Comprueba los parámetros de un trabajo contra la firma de su función:
+    nombres admitidos y, si el parámetro tiene un valor por defecto, el mismo
+    tipo ('days': 'x' no vale donde el defecto es 7). Los parámetros sin
+    defecto útil (None) aceptan escalares JSON; los de fecha (DATE_PARAMS),
+    solo 'YYYY-MM-DD'. Devuelve el mensaje de error o None.
+    """
+    if params is None:
+        return None
+    if not isinstance(params, dict):
+        return "Los parámetros deben ser un objeto."
+    signature = inspect.signature(resolve(name))
+    try:
+        signature.bind(**params)
+    except TypeError as e:
+        return f"Parámetros no válidos para '{name}': {e}"
+    for key, value in params.items():
+        default = signature.parameters[key].default
+        if default is None or default is inspect.Parameter.empty:
+            if value is not None and not isinstance(value, (str, int, float, bool)):
+                return f"El parámetro '{key}' debe ser un valor simple."
+            if key in DATE_PARAMS and value is not None:
+                try:
+                    date.fromisoformat(value)
+                except (TypeError, ValueError):
+                    return f"El parámetro '{key}' debe tener formato YYYY-MM-DD."
+            continue
+        expected = type(default)
+        valid = isinstance(value, expected) and not (expected is int and isinstance(value, bool))
+        if expected is float:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if not valid:
+            return f"El parámetro '{key}' debe ser de tipo {expected.__name__}."
+    return None
+
+
+def call_params(params):
+    """
+    Argumentos con que se llama a la función de un trabajo: los parámetros
+    guardados (ya validados por params_error) con las fechas convertidas a date.
+    """
+    return {key: date.fromisoformat(value) if key in DATE_PARAMS and isinstance(value, str) else value
+            for key, value in (params or {}).items()}
@@ -0,0 +1,49 @@
+import logging
+import time
+from flask import current_app
+from app.models import db
+from .registry import resolve, call_params
+
+logger = logging.getLogger(__name__)
+
+# App propia de cada proceso del pool (se crea una vez, en el inicializador)
+_process_app = None
+
+
+def _jsonable(result):
+    # El resultado se guarda en una columna JSON y cruza procesos: se normaliza aquí
+    provider = current_app.json
+    try:
+        return provider.loads(provider.dumps(result))
+    except TypeError:
+        return {'repr': repr(result)}
+
+
+def execute(app, name, params):
+    """
+    Corre un trabajo en un contexto de app propio y devuelve
+    {'result', 'error', 'duration_ms'}; nunca lanza excepciones.
+    """
+    started = time.perf_counter()
+    with app.app_context():
+        try:
+            outcome = resolve(name)(**call_params(params))
+            result, error = outcome if isinstance(outcome, tuple) and len(outcome) == 2 else (outcome, None)
+            error = error['message'] if isinstance(error, dict) else error
+            result = _jsonable(result) if error is None else None
+        except Exception as e:
+            logger.exception("Error en el trabajo %s", name)
+            result, error = None, f"{type(e).__name__}: {e}"
+        finally:
+            db.session.remove()
+    return {'result': result, 'error': error, 'duration_ms': int((time.perf_counter() - started) * 1000)}
+
+
+def init_process():
+    global _process_app
+    from app import create_app
+    _process_app = create_app()
+
+
+def execute_in_process(name, params):
+    return execute(_process_app, name, params)
@@ -0,0 +1,10 @@
+from datetime import date, timedelta
+from app.modules.kpi.rollup_service import backfill_kpis
+
+
+def backfill_recent_kpis(days=7):
+    """
+    Recalcula los KPIs de los últimos 'days' días: corrige lo que los eventos no
+    ven (p. ej. escrituras en bloque fuera del ORM).
+    """
+    return backfill_kpis(start=date.today() - timedelta(days=days), end=date.today())
@@ -0,0 +1,50 @@
+from datetime import datetime
+from app.models import JobStatus
+from .registry import JOBS, params_error
+
+MAX_LIST_LIMIT = 500
+
+
+def validate_job_data(data):
+    """
+    Valida el alta de un trabajo: 'name' (registrado), 'params' (objeto),
+    'run_after' (ISO 8601, opcional) y 'priority' (entero, opcional).
+    """
+    errors = {}
+    if not isinstance(data, dict):
+        return {'body': 'Se requiere un objeto JSON.'}
+    known = isinstance(data.get('name'), str) and data['name'] in JOBS
+    if not known:
+        errors['name'] = f"Trabajo desconocido. Opciones: {', '.join(sorted(JOBS))}."
+    if data.get('params') is not None and not isinstance(data['params'], dict):
+        errors['params'] = "El campo 'params' debe ser un objeto."
+    elif known:
+        error = params_error(data['name'], data.get('params'))
+        if error:
+            errors['params'] = error
+    if data.get('run_after'):
+        try:
+            datetime.fromisoformat(data['run_after'])
+        except (ValueError, TypeError):
+            errors['run_after'] = "El campo 'run_after' debe tener formato ISO 8601."
+    if data.get('priority') is not None:
+        try:
+            int(data['priority'])
+        except (ValueError, TypeError):
+            errors['priority'] = "El campo 'priority' debe ser un número entero."
+    return errors
+
+
+def parse_list_params(args):
+    errors = {}
+    params = {'status': args.get('status') or None, 'name': args.get('name') or None, 'limit': 100}
+    if params['status'] and params['status'] not in JobStatus.__members__:
+        errors['status'] = f"Estado no válido. Opciones: {', '.join(JobStatus.__members__)}."
+    if args.get('limit'):
+        try:
+            params['limit'] = int(args['limit'])
+            if not 0 < params['limit'] <= MAX_LIST_LIMIT:
+                raise ValueError
+        except ValueError:
+            errors['limit'] = f"El campo 'limit' debe ser un entero entre 1 y {MAX_LIST_LIMIT}."
+    return params, errors
@@ -0,0 +1,206 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db
+from .job_service import (
+    DEFAULT_LEASE_SECONDS, claim_jobs, enqueue_due_schedules, ensure_default_schedules,
+    fail_abandoned_jobs, finish_job, release_job, renew_leases
+)
+from .registry import JOBS, job_option
+from .runner import execute, execute_in_process, init_process
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+class JobWorker:
+    """
+    Worker de trabajos: solo necesita la base de datos (sin broker).
+
+    En cada vuelta encola las programaciones vencidas, toma tantos trabajos
+    como huecos libres tenga cada pool y espera a que alguno termine o pase
+    'poll_interval'. Los trabajos 'cpu' corren en un ProcessPoolExecutor (cada
+    proceso crea su propia app y conexiones) y los 'io' en hilos. Mientras un
+    trabajo corre, su lease se renueva; si el nodo muere, el lease vence y
+    otro worker lo retoma. Un trabajo que excede su tiempo nunca corre dos
+    veces a la vez: un hilo no se puede interrumpir, así que conserva su lease
+    y su hueco hasta terminar y recién entonces vuelve a la cola; en los 'cpu'
+    se terminan los procesos del pool.
+    """
+
+    def __init__(self, app, processes=None, threads=4, poll_interval=DEFAULT_POLL_INTERVAL,
+                 lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.app = app
+        self.processes = processes or os.cpu_count() or 1
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._running = {}      # future -> (job, kind, started)
+        self._timed_out = {}    # future -> (job, kind, started) vencidos que aún ocupan hueco y lease
+        self._last_renewal = 0
+        self._stopping = False
+
+    def stop(self, *args):
+        self._stopping = True
+
+    def _busy(self, kind):
+        return sum(1 for entries in (self._running, self._timed_out)
+                   for _, k, _ in entries.values() if k == kind)
+
+    def _new_cpu_pool(self):
+        context = multiprocessing.get_context(self.app.config.get('JOBS_MP_START_METHOD', 'spawn'))
+        return ProcessPoolExecutor(self.processes, mp_context=context, initializer=init_process)
+
+    def _names(self, kind):
+        return [name for name in JOBS if job_option(name, 'kind') == kind]
+
+    def _dispatch(self, pools):
+        enqueued = enqueue_due_schedules()
+        if enqueued:
+            logger.info("%s trabajos programados encolados", enqueued)
+        fail_abandoned_jobs()
+        for kind, pool, size in [('cpu', pools['cpu'], self.processes), ('io', pools['io'], self.threads)]:
+            for job in claim_jobs(self.owner, self._names(kind), size - self._busy(kind), self.lease_seconds):
+                if kind == 'cpu':
+                    future = pool.submit(execute_in_process, job.name, job.params)
+                else:
+                    future = pool.submit(execute, self.app, job.name, job.params)
+                self._running[future] = (job, kind, time.monotonic())
+                logger.info("Trabajo %s (%s) iniciado, intento %s", job.id, job.name, job.attempts)
+
+    def _renew(self):
+        if time.monotonic() - self._last_renewal < self.lease_seconds / 3:
+            return
+        self._last_renewal = time.monotonic()
+        jobs = [job.id for entries in (self._running, self._timed_out) for job, _, _ in entries.values()]
+        renew_leases(self.owner, jobs, self.lease_seconds)
+
+    @staticmethod
+    def _timeout_outcome(job, started):
+        return {'result': None, 'duration_ms': int((time.monotonic() - started) * 1000),
+                'error': f"Tiempo máximo excedido ({job_option(job.name, 'timeout')} s)"}
+
+    def _check_timeouts(self, pools):
+        now = time.monotonic()
+        expired = [future for future, (job, _, started) in self._running.items()
+                   if now - started > job_option(job.name, 'timeout')]
+        if not expired:
+            return
+        for future in expired:
+            job, kind, started = self._running.pop(future)
+            self._timed_out[future] = (job, kind, started)
+            logger.warning("Trabajo %s (%s) excedió su tiempo máximo", job.id, job.name)
+        if any(kind == 'cpu' for _, kind, _ in self._timed_out.values()):
+            self._restart_cpu_pool(pools)
+
+    def _restart_cpu_pool(self, pools):
+        """
+        Termina los procesos del pool 'cpu' (no se puede cancelar una tarea en
+        curso) y crea otro. Los vencidos fallan con reintento; los demás
+        trabajos 'cpu' interrumpidos vuelven a la cola sin gastar un intento.
+        """
+        pool = pools['cpu']
+        terminate = getattr(pool, 'terminate_workers', None)  # Python 3.14+
+        if terminate is not None:
+            terminate()
+        else:
+            for process in list((getattr(pool, '_processes', None) or {}).values()):
+                process.kill()
+        pool.shutdown(wait=True, cancel_futures=True)
+        pools['cpu'] = self._new_cpu_pool()
+
+        for future, (job, kind, started) in list(self._timed_out.items()):
+            if kind == 'cpu':
+                del self._timed_out[future]
+                finish_job(job.id, self.owner, job.attempts, job.max_attempts, self._timeout_outcome(job, started))
+        for future, (job, kind, _) in list(self._running.items()):
+            if kind == 'cpu':
+                del self._running[future]
+                release_job(job.id, self.owner)
+                logger.info("Trabajo %s (%s) interrumpido al reiniciar el pool; vuelve a la cola", job.id, job.name)
+
+    def _collect(self, done):
+        for future in done:
+            late = self._timed_out.pop(future, None)
+            if late is not None:
+                # El resultado tardío se descarta; recién ahora el trabajo puede reintentarse
+                job, _, started = late
+                finish_job(job.id, self.owner, job.attempts, job.max_attempts, self._timeout_outcome(job, started))
+                continue
+            entry = self._running.pop(future, None)
+            if entry is None:
+                continue
+            job, _, started = entry
+            try:
+                outcome = future.result()
+            except Exception as e:  # El proceso del pool murió (p. ej. sin memoria)
+                outcome = {'result': None, 'error': f"{type(e).__name__}: {e}",
+                           'duration_ms': int((time.monotonic() - started) * 1000)}
+            finish_job(job.id, self.owner, job.attempts, job.max_attempts, outcome)
+            level = logging.INFO if outcome['error'] is None else logging.WARNING
+            logger.log(level, "Trabajo %s (%s) terminado en %s ms%s", job.id, job.name, outcome['duration_ms'],
+                       f": {outcome['error']}" if outcome['error'] else '')
+
+    def _in_app(self, step, *args):
+        """
+        Corre un paso del bucle en un contexto de app. Un error de base de datos
+        (p. ej. 'database is locked') se registra y el worker sigue: los trabajos
+        tomados conservan su lease y se retoman si vence.
+        """
+        with self.app.app_context():
+            try:
+                step(*args)
+                return True
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                logger.error("Error de base de datos en el worker: %s", e)
+                return False
+            finally:
+                db.session.remove()
+
+    def _tick(self, pools):
+        self._dispatch(pools)
+        self._renew()
+        self._check_timeouts(pools)
+
+    def run(self, once=False):
+        """
+        Bucle principal. Con once=True toma lo pendiente, espera a que termine y sale.
+        """
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self.stop)
+        pools = {'cpu': self._new_cpu_pool()}
+        with ThreadPoolExecutor(self.threads, thread_name_prefix='job-io') as io_pool:
+            pools['io'] = io_pool
+            try:
+                self._loop(pools, once)
+            finally:
+                pools['cpu'].shutdown()
+
+    def _loop(self, pools, once):
+        self._in_app(ensure_default_schedules)
+        while not self._stopping:
+            healthy = self._in_app(self._tick, pools)
+            pending = set(self._running) | set(self._timed_out)
+            if once and not pending and healthy:
+                break
+            if pending:
+                done, _ = wait(pending, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+            else:
+                done = set()
+                time.sleep(self.poll_interval)
+            self._in_app(self._collect, done)
+        # Al detenerse se espera a lo que está corriendo; si se corta antes, el lease vence
+        pending = set(self._running) | set(self._timed_out)
+        if pending:
+            logger.info("Esperando %s trabajos en curso", len(pending))
+            done, _ = wait(pending)
+            self._in_app(self._collect, done)
@@ -0,0 +1 @@
+# This file makes the 'kpi' directory a Python package
@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from app.models import Asset, WorkOrder, WorkOrderStatus
+from .rollup_service import apply_asset_deltas, apply_site_deltas, opened_deltas, closed_deltas
+
+
+def _site_for(connection, work_order):
+    if work_order.site_id is not None or work_order.asset_id is None:
+        return work_order.site_id
+    return connection.execute(
+        select(Asset.site_id).where(Asset.id == work_order.asset_id)
+    ).scalar()
+
+
+# Campos de la orden que entran en los incrementos del cierre
+CLOSE_FIELDS = ('type', 'actual_time', 'start_date', 'end_date')
+
+
+def _created_at(work_order):
+    # Misma fecha de apertura que backfill_kpis
+    return work_order.created_date or work_order.start_date
+
+
+def _counted_close(work_order, previous=False):
+    """
+    La orden tal como cuenta en los cierres, con los valores actuales o, con
+    previous=True, los anteriores a este flush. None si no cuenta: no está
+    cerrada o, igual que en backfill_kpis, no tiene 'end_date' o fecha de apertura.
+    """
+    attrs = inspect(work_order).attrs
+    values = {}
+    for field in ('status',) + CLOSE_FIELDS:
+        history = attrs[field].history
+        if previous and history.has_changes():
+            values[field] = history.deleted[0] if history.deleted else None
+        else:
+            values[field] = getattr(work_order, field)
+    if values.pop('status') != WorkOrderStatus.closed or values['end_date'] is None:
+        return None
+    closed = SimpleNamespace(asset_id=work_order.asset_id, site_id=work_order.site_id,
+                             created_date=work_order.created_date, **values)
+    return closed if _created_at(closed) else None
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+def _update_kpis_after_flush(session, flush_context):
+    """
+    Mantiene los agregados diarios al crear y cerrar órdenes de trabajo,
+    dentro de la misma transacción que la escritura de la orden.
+    """
+    created = [o for o in session.new if isinstance(o, WorkOrder) and _created_at(o)]
+    # Cierres que dejan de contar (reapertura o cambio de datos) y que pasan a contar:
+    # al editar una orden cerrada se descuenta la versión anterior y se suma la nueva
+    uncounted, counted = [], []
+    for work_order in session.new | session.dirty:
+        if not isinstance(work_order, WorkOrder):
+            continue
+        before = None if work_order in session.new else _counted_close(work_order, previous=True)
+        after = _counted_close(work_order)
+        if before == after:
+            continue
+        if before:
+            uncounted.append(before)
+        if after:
+            counted.append(after)
+    if not created and not uncounted and not counted:
+        return
+
+    connection = session.connection()
+    site_cache = {}
+    asset_totals = {}
+    site_totals = {}
+
+    def add(work_order, day, deltas):
+        site_key = (work_order.asset_id, work_order.site_id)
+        if site_key not in site_cache:
+            site_cache[site_key] = _site_for(connection, work_order)
+        site_id = site_cache[site_key]
+        targets = []
+        if work_order.asset_id is not None:
+            targets.append(asset_totals.setdefault((work_order.asset_id, site_id, day), {}))
+        if site_id is not None:
+            targets.append(site_totals.setdefault((site_id, day), {}))
+        for totals in targets:
+            for name, delta in deltas.items():
+                totals[name] = totals.get(name, 0) + delta
+
+    for work_order in created:
+        created_on = _created_at(work_order).date()
+        add(work_order, created_on, opened_deltas(work_order, created_on))
+    for work_order in counted:
+        add(work_order, work_order.end_date.date(), closed_deltas(work_order, _created_at(work_order).date()))
+    for work_order in uncounted:
+        deltas = closed_deltas(work_order, _created_at(work_order).date())
+        add(work_order, work_order.end_date.date(), {name: -delta for name, delta in deltas.items()})
+
+    # Los incrementos se agrupan por clave antes de escribir: una fila por activo/planta y día
+    for (asset_id, site_id, day), deltas in asset_totals.items():
+        apply_asset_deltas(connection, asset_id, site_id, day, deltas)
+    for (site_id, day), deltas in site_totals.items():
+        apply_site_deltas(connection, site_id, day, deltas)
+
+
+def register_events():
+    # Con active_history se conoce el estado anterior aunque la orden esté expirada
+    for field in ('status',) + CLOSE_FIELDS:
+        attribute = getattr(WorkOrder, field)
+        if not event.contains(attribute, 'set', _keep_previous_value):
+            event.listen(attribute, 'set', _keep_previous_value, retval=True, active_history=True)
+    if not event.contains(Session, 'after_flush', _update_kpis_after_flush):
+        event.listen(Session, 'after_flush', _update_kpis_after_flush)
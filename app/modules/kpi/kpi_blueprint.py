@@ -0,0 +1,62 @@
+from datetime import datetime, date
+import click
+from flask import Blueprint, jsonify, request
+from .kpi_service import get_asset_kpis, get_site_kpis, default_range
+from .rollup_service import backfill_kpis
+from .validations import parse_date_range
+
+kpi_bp = Blueprint(
+    'kpi',
+    __name__,
+    url_prefix='/kpi'
+)
+
+def _resolve_range():
+    start, end, errors = parse_date_range(request.args)
+    if errors:
+        return None, None, errors
+    default_start, default_end = default_range(datetime.utcnow().date())
+    end = end or default_end
+    start = start or min(default_start, end)
+    return start, end, None
+
+# --- Rutas de la API (JSON) ---
+
+@kpi_bp.route('/api/assets/<int:asset_id>', methods=['GET'])
+def api_asset_kpis(asset_id):
+    start, end, errors = _resolve_range()
+    if errors:
+        return jsonify({'errors': errors}), 400
+    kpis, error = get_asset_kpis(asset_id, start, end)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(kpis), 200
+
+@kpi_bp.route('/api/sites/<int:site_id>', methods=['GET'])
+def api_site_kpis(site_id):
+    start, end, errors = _resolve_range()
+    if errors:
+        return jsonify({'errors': errors}), 400
+    kpis, error = get_site_kpis(site_id, start, end)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(kpis), 200
+
+# --- Comandos CLI ---
+
+@kpi_bp.cli.command('backfill')
+@click.option('--start', default=None, help='Fecha inicial (YYYY-MM-DD).')
+@click.option('--end', default=None, help='Fecha final (YYYY-MM-DD).')
+@click.option('--batch-size', default=50000, show_default=True)
+def backfill_command(start, end, batch_size):
+    """
+    Recalcula los agregados diarios de KPIs: flask kpi backfill
+    """
+    result, error = backfill_kpis(
+        start=date.fromisoformat(start) if start else None,
+        end=date.fromisoformat(end) if end else None,
+        batch_size=batch_size,
+    )
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"Filas por activo: {result['asset_rows']} - Filas por planta: {result['site_rows']}")
@@ -0,0 +1,84 @@
+from datetime import timedelta
+from sqlalchemy import select, func
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db, Asset, AssetKpiDaily, SiteKpiDaily
+from .rollup_service import METRICS
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _sum_rows(model, key_column, key_value, start=None, end=None):
+    """
+    Suma las métricas de los agregados diarios de una entidad en el rango dado.
+    """
+    query = select(*[func.coalesce(func.sum(getattr(model, m)), 0) for m in METRICS]).where(key_column == key_value)
+    if start:
+        query = query.where(model.day >= start)
+    if end:
+        query = query.where(model.day <= end)
+    return dict(zip(METRICS, db.session.execute(query).one()))
+
+
+def _ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def compute_kpis(totals, backlog, start, end, asset_count):
+    """
+    Deriva MTBF, MTTR, disponibilidad, edad del backlog y cumplimiento PM
+    a partir de las métricas sumadas.
+    """
+    period_minutes = ((end - start).days + 1) * MINUTES_PER_DAY * asset_count
+    operating_minutes = max(0, period_minutes - totals['downtime_minutes'])
+    mtbf = _ratio(operating_minutes, totals['failures'])
+    mttr = _ratio(totals['repair_minutes'], totals['repairs'])
+
+    backlog_count = backlog['orders_opened'] - backlog['orders_closed']
+    open_day_sum = backlog['opened_day_sum'] - backlog['closed_day_sum']
+    backlog_age = _ratio(backlog_count * end.toordinal() - open_day_sum, backlog_count)
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'mtbf_minutes': mtbf,
+        'mttr_minutes': mttr,
+        'availability': _ratio(period_minutes - totals['downtime_minutes'], period_minutes),
+        'inherent_availability': _ratio(mtbf, mtbf + mttr) if mtbf is not None and mttr is not None else None,
+        'backlog_count': backlog_count,
+        'backlog_avg_age_days': backlog_age,
+        'pm_compliance': _ratio(totals['pm_completed'], totals['pm_scheduled']),
+        'totals': totals,
+    }
+
+
+def get_asset_kpis(asset_id, start, end):
+    """
+    KPIs de un activo en un rango de fechas, calculados solo con los agregados diarios.
+    """
+    try:
+        totals = _sum_rows(AssetKpiDaily, AssetKpiDaily.asset_id, asset_id, start, end)
+        backlog = _sum_rows(AssetKpiDaily, AssetKpiDaily.asset_id, asset_id, end=end)
+        return compute_kpis(totals, backlog, start, end, asset_count=1), None
+    except SQLAlchemyError as e:
+        return None, {'message': 'Error al consultar la base de datos', 'status': 500}
+
+
+def get_site_kpis(site_id, start, end):
+    """
+    KPIs de una planta en un rango de fechas, calculados solo con los agregados diarios.
+    """
+    try:
+        totals = _sum_rows(SiteKpiDaily, SiteKpiDaily.site_id, site_id, start, end)
+        backlog = _sum_rows(SiteKpiDaily, SiteKpiDaily.site_id, site_id, end=end)
+        asset_count = db.session.execute(
+            select(func.count(Asset.id)).where(Asset.site_id == site_id)
+        ).scalar() or 1
+        result = compute_kpis(totals, backlog, start, end, asset_count=asset_count)
+        result['asset_count'] = asset_count
+        return result, None
+    except SQLAlchemyError as e:
+        return None, {'message': 'Error al consultar la base de datos', 'status': 500}
+
+
+def default_range(today, days=30):
+    return today - timedelta(days=days - 1), today
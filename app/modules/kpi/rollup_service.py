@@ -0,0 +1,204 @@
+from datetime import date
+import numpy as np
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import (
+    db, Asset, WorkOrder, WorkOrderType, WorkOrderStatus,
+    AssetKpiDaily, SiteKpiDaily
+)
+from app.services.upsert import increment_row
+
+# Orden de las métricas en los vectores de agregación
+METRICS = (
+    'orders_opened', 'orders_closed', 'opened_day_sum', 'closed_day_sum',
+    'failures', 'repairs', 'repair_minutes', 'downtime_minutes',
+    'pm_scheduled', 'pm_completed',
+)
+_IDX = {name: i for i, name in enumerate(METRICS)}
+
+BACKFILL_BATCH_SIZE = 50000
+
+
+def _minutes_between(start, end):
+    if not start or not end:
+        return 0
+    return max(0, int((end - start).total_seconds() // 60))
+
+
+def opened_deltas(work_order, created):
+    """
+    Incrementos de KPIs que produce la creación de una orden de trabajo.
+    """
+    deltas = {'orders_opened': 1, 'opened_day_sum': created.toordinal()}
+    if work_order.type == WorkOrderType.corrective:
+        deltas['failures'] = 1
+    elif work_order.type == WorkOrderType.preventive:
+        deltas['pm_scheduled'] = 1
+    return deltas
+
+
+def closed_deltas(work_order, created):
+    """
+    Incrementos de KPIs que produce el cierre de una orden de trabajo.
+    """
+    downtime = _minutes_between(work_order.start_date, work_order.end_date)
+    deltas = {'orders_closed': 1, 'closed_day_sum': created.toordinal()}
+    if work_order.type == WorkOrderType.corrective:
+        deltas['repairs'] = 1
+        deltas['repair_minutes'] = work_order.actual_time if work_order.actual_time is not None else downtime
+        deltas['downtime_minutes'] = downtime
+    elif work_order.type == WorkOrderType.preventive:
+        deltas['pm_completed'] = 1
+    return deltas
+
+
+def _increment(connection, model, keys, deltas, extra=None):
+    """
+    Suma 'deltas' a la fila diaria identificada por 'keys'; las métricas que
+    no cambian arrancan en 0 si la fila es nueva.
+    """
+    defaults = {name: 0 for name in METRICS}
+    defaults.update(extra or {})
+    increment_row(connection, model.__table__, keys, deltas, defaults)
+
+
+def apply_asset_deltas(connection, asset_id, site_id, day, deltas):
+    """
+    Aplica los incrementos al agregado diario del activo.
+    """
+    _increment(connection, AssetKpiDaily, {'asset_id': asset_id, 'day': day}, deltas, {'site_id': site_id})
+
+
+def apply_site_deltas(connection, site_id, day, deltas):
+    """
+    Aplica los incrementos al agregado diario de la planta.
+    """
+    _increment(connection, SiteKpiDaily, {'site_id': site_id, 'day': day}, deltas)
+
+
+# --- Backfill vectorizado ---
+
+def _to_ordinals(values):
+    """
+    Convierte una lista de datetimes (o None) en ordinales de día; -1 para vacíos.
+    """
+    return np.fromiter((v.toordinal() if v else -1 for v in values), dtype=np.int64, count=len(values))
+
+
+def _accumulate(totals, key_a, key_b, day, matrix, mask):
+    """
+    Agrupa (key_a, key_b, day) con np.unique y suma las métricas de 'matrix'.
+    """
+    valid = mask & (key_a >= 0) & (day >= 0)
+    if not valid.any():
+        return
+    keys = np.stack([key_a[valid], key_b[valid], day[valid]], axis=1)
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    sums = np.zeros((len(unique_keys), len(METRICS)), dtype=np.int64)
+    np.add.at(sums, inverse.ravel(), matrix[valid])
+    for key, row in zip(map(tuple, unique_keys.tolist()), sums):
+        if key in totals:
+            totals[key] += row
+        else:
+            totals[key] = row
+
+
+def _batch_matrices(rows):
+    """
+    Calcula, para un lote de órdenes, las matrices de métricas de apertura y cierre.
+    """
+    n = len(rows)
+    asset_ids = np.fromiter((r.asset_id if r.asset_id is not None else -1 for r in rows), dtype=np.int64, count=n)
+    site_ids = np.fromiter((r.site_id if r.site_id is not None else -1 for r in rows), dtype=np.int64, count=n)
+    types = np.array([r.type.value if r.type else '' for r in rows])
+    is_closed = np.array([r.status == WorkOrderStatus.closed for r in rows], dtype=bool)
+    created_day = _to_ordinals([r.created_date or r.start_date for r in rows])
+    closed_day = _to_ordinals([r.end_date for r in rows])
+    downtime = np.fromiter(
+        (_minutes_between(r.start_date, r.end_date) for r in rows), dtype=np.int64, count=n
+    )
+    actual = np.fromiter(
+        (r.actual_time if r.actual_time is not None else -1 for r in rows), dtype=np.int64, count=n
+    )
+
+    corrective = types == WorkOrderType.corrective.value
+    preventive = types == WorkOrderType.preventive.value
+
+    opened = np.zeros((n, len(METRICS)), dtype=np.int64)
+    opened[:, _IDX['orders_opened']] = 1
+    opened[:, _IDX['opened_day_sum']] = created_day
+    opened[:, _IDX['failures']] = corrective
+    opened[:, _IDX['pm_scheduled']] = preventive
+
+    closed = np.zeros((n, len(METRICS)), dtype=np.int64)
+    closed[:, _IDX['orders_closed']] = 1
+    closed[:, _IDX['closed_day_sum']] = created_day
+    closed[:, _IDX['repairs']] = corrective
+    closed[:, _IDX['repair_minutes']] = np.where(corrective, np.where(actual >= 0, actual, downtime), 0)
+    closed[:, _IDX['downtime_minutes']] = np.where(corrective, downtime, 0)
+    closed[:, _IDX['pm_completed']] = preventive
+
+    return asset_ids, site_ids, created_day, closed_day, is_closed & (created_day >= 0), opened, closed
+
+
+def backfill_kpis(start=None, end=None, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Recalcula los agregados diarios a partir de las órdenes de trabajo existentes.
+
+    Las órdenes se leen por lotes y cada lote se agrega de forma vectorizada con
+    NumPy; al final se reemplazan las filas del rango [start, end] en bloque.
+    """
+    start_ord = start.toordinal() if start else -1
+    end_ord = end.toordinal() if end else date.max.toordinal()
+
+    asset_totals = {}
+    site_totals = {}
+    try:
+        query = (
+            select(
+                WorkOrder.asset_id,
+                func.coalesce(WorkOrder.site_id, Asset.site_id).label('site_id'),
+                WorkOrder.type, WorkOrder.status, WorkOrder.created_date,
+                WorkOrder.start_date, WorkOrder.end_date, WorkOrder.actual_time,
+            )
+            .outerjoin(Asset, Asset.id == WorkOrder.asset_id)
+            .execution_options(yield_per=batch_size)
+        )
+        for rows in db.session.execute(query).partitions():
+            asset_ids, site_ids, created_day, closed_day, closed_mask, opened, closed = _batch_matrices(rows)
+            in_range_open = (created_day >= start_ord) & (created_day <= end_ord)
+            in_range_close = closed_mask & (closed_day >= start_ord) & (closed_day <= end_ord)
+            zeros = np.zeros_like(asset_ids)
+
+            _accumulate(asset_totals, asset_ids, site_ids, created_day, opened, in_range_open)
+            _accumulate(asset_totals, asset_ids, site_ids, closed_day, closed, in_range_close)
+            _accumulate(site_totals, site_ids, zeros, created_day, opened, in_range_open)
+            _accumulate(site_totals, site_ids, zeros, closed_day, closed, in_range_close)
+
+        asset_range = [AssetKpiDaily.day >= date.fromordinal(max(start_ord, 1)), AssetKpiDaily.day <= date.fromordinal(end_ord)]
+        site_range = [SiteKpiDaily.day >= date.fromordinal(max(start_ord, 1)), SiteKpiDaily.day <= date.fromordinal(end_ord)]
+        db.session.execute(delete(AssetKpiDaily).where(*asset_range))
+        db.session.execute(delete(SiteKpiDaily).where(*site_range))
+
+        def rows_for(totals, with_asset):
+            for (key_a, key_b, day), values in totals.items():
+                row = dict(zip(METRICS, values.tolist()))
+                row['day'] = date.fromordinal(day)
+                if with_asset:
+                    row['asset_id'] = key_a
+                    row['site_id'] = key_b if key_b >= 0 else None
+                else:
+                    row['site_id'] = key_a
+                yield row
+
+        asset_rows = list(rows_for(asset_totals, True))
+        site_rows = list(rows_for(site_totals, False))
+        if asset_rows:
+            db.session.execute(insert(AssetKpiDaily), asset_rows)
+        if site_rows:
+            db.session.execute(insert(SiteKpiDaily), site_rows)
+        db.session.commit()
+        return {'asset_rows': len(asset_rows), 'site_rows': len(site_rows)}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
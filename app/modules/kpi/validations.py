@@ -0,0 +1,22 @@
+from datetime import date
+
+def parse_date_range(args):
+    """
+    Valida y convierte los parámetros 'start' y 'end' (YYYY-MM-DD).
+    Devuelve (start, end, errors).
+    """
+    errors = {}
+    values = {}
+    for field in ['start', 'end']:
+        raw = args.get(field)
+        if not raw:
+            values[field] = None
+            continue
+        try:
+            values[field] = date.fromisoformat(raw)
+        except ValueError:
+            errors[field] = f"El campo '{field}' debe tener formato YYYY-MM-DD."
+
+    if not errors and values['start'] and values['end'] and values['start'] > values['end']:
+        errors['start'] = "La fecha de inicio no puede ser posterior a la fecha de fin."
+    return values.get('start'), values.get('end'), errors
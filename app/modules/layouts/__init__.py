@@ -0,0 +1 @@
+# This file makes the 'layouts' directory a Python package
@@ -0,0 +1,91 @@
+import logging
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.extensions import response_cache
+from app.models import Asset, Location, SensorReading
+from .layout_service import ALL_LAYOUTS_VERSION, ANOMALY_VERSION, LAYOUT_VERSION_PREFIX
+
+logger = logging.getLogger(__name__)
+
+TOUCHED_KEY = 'layout_touched_versions'
+# Columnas del activo que se ven en el plano
+ASSET_FIELDS = ('location_id', 'name', 'unique_code', 'criticality')
+
+
+def _track_previous_location(target, value, oldvalue, initiator):
+    return value
+
+
+def _location_versions(session):
+    for obj in session.new | session.deleted:
+        if isinstance(obj, Location):
+            yield obj.id
+        elif isinstance(obj, Asset) and obj.location_id is not None:
+            yield obj.location_id
+    for obj in session.dirty:
+        if isinstance(obj, Location):
+            if inspect(obj).attrs.layout.history.has_changes():
+                yield obj.id
+        elif isinstance(obj, Asset):
+            attrs = inspect(obj).attrs
+            if any(attrs[field].history.has_changes() for field in ASSET_FIELDS):
+                # La ubicación de origen y la de destino
+                yield from attrs.location_id.history.deleted
+                yield obj.location_id
+
+
+def _collect_after_flush(session, flush_context):
+    """
+    Anota qué planos quedan desactualizados; sus versiones suben recién tras
+    el commit, igual que las de la caché de respuestas.
+    """
+    touched = {f'{LAYOUT_VERSION_PREFIX}{location_id}'
+               for location_id in _location_versions(session) if location_id is not None}
+    for reading in session.new:
+        if isinstance(reading, SensorReading) and reading.is_anomalous:
+            touched.add(ANOMALY_VERSION)
+    for reading in session.dirty:
+        if isinstance(reading, SensorReading) and inspect(reading).attrs.is_anomalous.history.has_changes():
+            touched.add(ANOMALY_VERSION)
+    if touched:
+        session.info.setdefault(TOUCHED_KEY, set()).update(touched)
+
+
+def _collect_bulk_statement(orm_execute_state):
+    # Un UPDATE/DELETE en bloque no dice qué ubicaciones toca: se invalidan todos los planos
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is None or table.name not in (Asset.__tablename__, Location.__tablename__):
+        return
+    values = getattr(orm_execute_state.statement, '_values', None)
+    if orm_execute_state.is_update and values is not None:
+        columns = {getattr(column, 'key', column) for column in values}
+        if not columns & set(ASSET_FIELDS + ('layout',)):
+            return
+    orm_execute_state.session.info.setdefault(TOUCHED_KEY, set()).add(ALL_LAYOUTS_VERSION)
+
+
+def _bump_after_commit(session):
+    touched = session.info.pop(TOUCHED_KEY, None)
+    if touched:
+        try:
+            response_cache.bump(touched)
+        except Exception as e:
+            logger.error(f"Error al invalidar los planos: {e}")
+
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop(TOUCHED_KEY, None)
+
+
+def register_events():
+    # Con active_history la ubicación anterior se carga antes de cambiarla y su plano también se invalida
+    if not event.contains(Asset.location_id, 'set', _track_previous_location):
+        event.listen(Asset.location_id, 'set', _track_previous_location, retval=True, active_history=True)
+    for name, fn in [('after_flush', _collect_after_flush),
+                     ('do_orm_execute', _collect_bulk_statement),
+                     ('after_commit', _bump_after_commit),
+                     ('after_soft_rollback', _discard_after_rollback)]:
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
@@ -0,0 +1,310 @@
+"""
+Índice espacial y dibujo en teselas del plano de una ubicación (Location.layout).
+
+El plano es un JSON en unidades del dibujo, con 'y' hacia abajo:
+
+    {"width": 1200, "height": 800,
+     "shapes": [{"type": "rect", "x": 0, "y": 0, "w": 300, "h": 200, "label": "Nave A"},
+                {"type": "polygon" | "line", "points": [[x, y], ...]},
+                {"type": "text", "x": 10, "y": 20, "text": "Acceso"}],
+     "assets": [{"asset_id": 12, "x": 100, "y": 120, "w": 20, "h": 20}]}
+
+Coordenadas y tamaños van en valor absoluto hasta MAX_COORDINATE.
+
+Se interpreta una sola vez por versión del plano: las formas y los activos
+ubicados quedan en tuplas inmutables y en una grilla uniforme, de modo que
+una consulta por ventana solo mira las celdas que toca.
+"""
+import math
+from collections import namedtuple
+from xml.sax.saxutils import escape, quoteattr
+
+TILE_SIZE = 256
+MAX_ZOOM = 8
+# Celdas por lado de la grilla; un elemento que cubre más de MAX_ITEM_CELLS
+# celdas por lado (muros, naves) va a una lista aparte que se revisa siempre
+GRID_CELLS = 64
+MAX_ITEM_CELLS = 8
+DEFAULT_ASSET_SIZE = 10
+# Módulo máximo de coordenadas y tamaños: x + w siempre es finito y la grilla
+# no calcula celdas con números desbordados
+MAX_COORDINATE = 1e7
+SHAPE_TYPES = ('rect', 'polygon', 'line', 'text')
+
+Shape = namedtuple('Shape', 'kind bbox points label')
+PlacedAsset = namedtuple('PlacedAsset', 'asset_id name unique_code criticality x y w h')
+
+STATUS_COLORS = {'anomaly': '#d9363e', 'open': '#f0a202', 'ok': '#2f9e44'}
+CRITICALITY_STROKE = {'critical': 3, 'high': 2}
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value) if math.isfinite(value) and abs(value) <= MAX_COORDINATE else None
+
+
+def _finite_box(box):
+    return box if all(map(math.isfinite, box)) else None
+
+
+def _points(raw):
+    if not isinstance(raw, list):
+        return None
+    points = []
+    for point in raw:
+        if not isinstance(point, (list, tuple)) or len(point) != 2:
+            return None
+        x, y = _number(point[0]), _number(point[1])
+        if x is None or y is None:
+            return None
+        points.append((x, y))
+    return tuple(points) if len(points) >= 2 else None
+
+
+def _bbox(points):
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def parse_shape(raw):
+    """
+    Convierte una forma del JSON en Shape, o None si no es válida.
+    """
+    if not isinstance(raw, dict) or raw.get('type') not in SHAPE_TYPES:
+        return None
+    kind = raw['type']
+    label = raw.get('label') if kind != 'text' else raw.get('text')
+    label = str(label) if label not in (None, '') else None
+    if kind in ('polygon', 'line'):
+        points = _points(raw.get('points'))
+        return Shape(kind, _bbox(points), points, label) if points else None
+    x, y = _number(raw.get('x')), _number(raw.get('y'))
+    if x is None or y is None:
+        return None
+    if kind == 'text':
+        return Shape(kind, (x, y, x, y), ((x, y),), label) if label else None
+    w, h = _number(raw.get('w')), _number(raw.get('h'))
+    if not w or not h or w < 0 or h < 0:
+        return None
+    bbox = _finite_box((x, y, x + w, y + h))
+    return Shape(kind, bbox, (bbox[:2], bbox[2:]), label) if bbox else None
+
+
+def parse_placement(raw):
+    """
+    Devuelve (asset_id, x, y, w, h) de una ubicación de activo, o None.
+    """
+    if not isinstance(raw, dict):
+        return None
+    asset_id = raw.get('asset_id')
+    x, y = _number(raw.get('x')), _number(raw.get('y'))
+    if isinstance(asset_id, bool) or not isinstance(asset_id, int) or x is None or y is None:
+        return None
+    w = _number(raw.get('w')) or DEFAULT_ASSET_SIZE
+    h = _number(raw.get('h')) or DEFAULT_ASSET_SIZE
+    if w <= 0 or h <= 0 or _finite_box((x + w, y + h)) is None:
+        return None
+    return asset_id, x, y, w, h
+
+
+def _intersects(box, x0, y0, x1, y1):
+    return box[0] <= x1 and box[2] >= x0 and box[1] <= y1 and box[3] >= y0
+
+
+class GridIndex:
+    """
+    Grilla uniforme sobre las cajas (x0, y0, x1, y1) de los elementos.
+    """
+
+    __slots__ = ('cell_size', 'boxes', '_cells', '_large')
+
+    def __init__(self, boxes, extent):
+        self.cell_size = max(extent / GRID_CELLS, 1.0)
+        self.boxes = tuple(boxes)
+        cells, large = {}, []
+        for i, (x0, y0, x1, y1) in enumerate(self.boxes):
+            cx0, cy0, cx1, cy1 = self._cell_range(x0, y0, x1, y1)
+            if cx1 - cx0 >= MAX_ITEM_CELLS or cy1 - cy0 >= MAX_ITEM_CELLS:
+                large.append(i)
+                continue
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    cells.setdefault((cx, cy), []).append(i)
+        self._cells = {key: tuple(items) for key, items in cells.items()}
+        self._large = tuple(large)
+
+    def _cell_range(self, x0, y0, x1, y1):
+        size = self.cell_size
+        return (math.floor(x0 / size), math.floor(y0 / size), math.floor(x1 / size), math.floor(y1 / size))
+
+    def query(self, x0, y0, x1, y1):
+        """
+        Índices (ordenados) de los elementos cuya caja corta la ventana.
+        """
+        cx0, cy0, cx1, cy1 = self._cell_range(x0, y0, x1, y1)
+        found = set(i for i in self._large if _intersects(self.boxes[i], x0, y0, x1, y1))
+        # Una ventana enorme recorre los elementos en vez de las celdas vacías
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._cells):
+            candidates = (i for items in self._cells.values() for i in items)
+        else:
+            candidates = (i for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)
+                          for i in self._cells.get((cx, cy), ()))
+        for i in candidates:
+            if i not in found and _intersects(self.boxes[i], x0, y0, x1, y1):
+                found.add(i)
+        return sorted(found)
+
+
+class LayoutIndex:
+    """
+    Plano interpretado de una ubicación en una versión dada. Inmutable: se
+    comparte entre peticiones y se reemplaza entero cuando la versión cambia.
+
+    'assets' son los activos de la ubicación con posición en el plano; las
+    posiciones de activos que ya no están en la ubicación se descartan y los
+    activos de la ubicación sin posición quedan en 'unplaced'.
+    """
+
+    __slots__ = ('location_id', 'site_id', 'version', 'width', 'height', 'extent',
+                 'shapes', 'assets', 'unplaced', '_shape_grid', '_asset_grid', '_by_asset')
+
+    def __init__(self, location_id, site_id, version, layout, asset_rows):
+        layout = layout if isinstance(layout, dict) else {}
+        rows = {row.id: row for row in asset_rows}
+        self.location_id = location_id
+        self.site_id = site_id
+        self.version = version
+        self.shapes = tuple(s for s in map(parse_shape, layout.get('shapes') or ()) if s is not None)
+
+        placed = {}
+        for placement in map(parse_placement, layout.get('assets') or ()):
+            if placement is None or placement[0] not in rows or placement[0] in placed:
+                continue
+            row = rows[placement[0]]
+            placed[row.id] = PlacedAsset(row.id, row.name, row.unique_code, row.criticality, *placement[1:])
+        self.assets = tuple(placed.values())
+        self.unplaced = tuple(sorted(set(rows) - set(placed)))
+
+        boxes = [s.bbox for s in self.shapes] + [(a.x, a.y, a.x + a.w, a.y + a.h) for a in self.assets]
+        right = max((b[2] for b in boxes), default=0)
+        bottom = max((b[3] for b in boxes), default=0)
+        self.width = _number(layout.get('width')) or right or TILE_SIZE
+        self.height = _number(layout.get('height')) or bottom or TILE_SIZE
+        self.extent = max(self.width, self.height)
+        self._shape_grid = GridIndex((s.bbox for s in self.shapes), self.extent)
+        self._asset_grid = GridIndex(((a.x, a.y, a.x + a.w, a.y + a.h) for a in self.assets), self.extent)
+        self._by_asset = {a.asset_id: a for a in self.assets}
+
+    def asset(self, asset_id):
+        return self._by_asset.get(asset_id)
+
+    def assets_in(self, x0, y0, x1, y1):
+        return [self.assets[i] for i in self._asset_grid.query(x0, y0, x1, y1)]
+
+    def shapes_in(self, x0, y0, x1, y1):
+        return [self.shapes[i] for i in self._shape_grid.query(x0, y0, x1, y1)]
+
+    def tile_bounds(self, z, x, y):
+        """
+        Ventana (x0, y0, x1, y1) de la tesela z/x/y. En el zoom 0 una tesela
+        cuadrada cubre el plano entero; cada zoom divide el lado en dos.
+        """
+        side = self.extent / (2 ** z)
+        return x * side, y * side, (x + 1) * side, (y + 1) * side
+
+    def tile_window(self, z, x, y):
+        """
+        Ventana de la tesela ampliada con el margen de las etiquetas e
+        insignias que asoman desde las teselas vecinas.
+        """
+        x0, y0, x1, y1 = self.tile_bounds(z, x, y)
+        margin = tile_font_size(x1 - x0)
+        return x0 - margin, y0 - margin, x1 + margin, y1 + margin
+
+    def valid_tile(self, z, x, y):
+        if not 0 <= z <= MAX_ZOOM:
+            return False
+        count = 2 ** z
+        return 0 <= x < count and 0 <= y < count
+
+
+def tile_font_size(side):
+    # Tamaño en unidades del dibujo equivalente a 11 px en pantalla
+    return side * 11 / TILE_SIZE
+
+
+def asset_state(status):
+    """
+    Estado visual de un activo a partir de (órdenes abiertas, anomalías).
+    """
+    open_orders, anomalies = status
+    if anomalies:
+        return 'anomaly'
+    return 'open' if open_orders else 'ok'
+
+
+def _fmt(value):
+    return f'{value:.2f}'.rstrip('0').rstrip('.')
+
+
+def _shape_svg(shape, font_size):
+    if shape.kind == 'rect':
+        (x0, y0), (x1, y1) = shape.points
+        parts = [f'<rect x="{_fmt(x0)}" y="{_fmt(y0)}" width="{_fmt(x1 - x0)}" height="{_fmt(y1 - y0)}" '
+                 'class="s"/>']
+        if shape.label:
+            parts.append(f'<text x="{_fmt(x0 + font_size / 2)}" y="{_fmt(y0 + font_size * 1.2)}" '
+                         f'class="l">{escape(shape.label)}</text>')
+        return ''.join(parts)
+    if shape.kind == 'text':
+        x, y = shape.points[0]
+        return f'<text x="{_fmt(x)}" y="{_fmt(y)}" class="l">{escape(shape.label)}</text>'
+    points = ' '.join(f'{_fmt(x)},{_fmt(y)}' for x, y in shape.points)
+    tag = 'polygon' if shape.kind == 'polygon' else 'polyline'
+    return f'<{tag} points="{points}" class="{"s" if tag == "polygon" else "w"}"/>'
+
+
+def _asset_svg(asset, status, font_size):
+    state = asset_state(status)
+    stroke = CRITICALITY_STROKE.get(asset.criticality, 1)
+    title = f'{asset.unique_code} · {asset.name}'
+    parts = [
+        f'<g data-asset-id="{asset.asset_id}"><title>{escape(title)}</title>',
+        f'<rect x="{_fmt(asset.x)}" y="{_fmt(asset.y)}" width="{_fmt(asset.w)}" height="{_fmt(asset.h)}" '
+        f'fill={quoteattr(STATUS_COLORS[state])} stroke-width="{stroke}" class="a"/>',
+    ]
+    if status[0]:
+        # Insignia con el número de órdenes abiertas en la esquina superior derecha
+        radius = font_size * 0.7
+        cx, cy = asset.x + asset.w, asset.y
+        parts.append(f'<circle cx="{_fmt(cx)}" cy="{_fmt(cy)}" r="{_fmt(radius)}" class="b"/>'
+                     f'<text x="{_fmt(cx)}" y="{_fmt(cy + radius * 0.4)}" class="n">{status[0]}</text>')
+    parts.append('</g>')
+    return ''.join(parts)
+
+
+def render_tile(index, z, x, y, statuses):
+    """
+    SVG de la tesela z/x/y: formas del plano y activos coloreados según
+    'statuses' (asset_id -> (órdenes abiertas, anomalías)).
+    """
+    x0, y0, x1, y1 = index.tile_bounds(z, x, y)
+    side = x1 - x0
+    font_size = tile_font_size(side)
+    window = index.tile_window(z, x, y)
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{TILE_SIZE}" height="{TILE_SIZE}" '
+        f'viewBox="{_fmt(x0)} {_fmt(y0)} {_fmt(side)} {_fmt(side)}">',
+        '<style>.s{fill:#f4f5f7;stroke:#8a94a6}.w{fill:none;stroke:#5c6578}'
+        '.a{stroke:#1f2937}.b{fill:#1f2937}'
+        f'.l{{font:{_fmt(font_size)}px sans-serif;fill:#4a5263}}'
+        f'.n{{font:bold {_fmt(font_size)}px sans-serif;fill:#fff;text-anchor:middle}}'
+        '.s,.w,.a{vector-effect:non-scaling-stroke}</style>',
+    ]
+    parts.extend(_shape_svg(s, font_size) for s in index.shapes_in(*window))
+    for asset in index.assets_in(*window):
+        parts.append(_asset_svg(asset, statuses.get(asset.asset_id, (0, 0)), font_size))
+    parts.append('</svg>')
+    return ''.join(parts)
@@ -0,0 +1,229 @@
+import hashlib
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from threading import Lock
+from flask import current_app
+from sqlalchemy import select, func
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import reference_data, response_cache
+from app.models import db, Asset, Location, SensorReading, WorkOrder, WorkOrderStatus
+from app.services.response_cache import LocalBackend
+from app.services.tenancy import SKIP_OPTION, accessible_site_ids
+from .layout_index import MAX_ZOOM, TILE_SIZE, LayoutIndex, asset_state, parse_placement, render_tile
+
+# Contadores de versión (en el backend de la caché de respuestas) que invalidan
+# el índice de una ubicación: el suyo propio y uno común para cambios en bloque
+LAYOUT_VERSION_PREFIX = 'location_layout:'
+ALL_LAYOUTS_VERSION = 'location_layout:*'
+# Sube con cada lectura anómala nueva; junto con 'work_order' invalida los estados
+ANOMALY_VERSION = 'sensor_reading_anomaly'
+OVERLAY_VERSIONS = ('work_order', ANOMALY_VERSION)
+DEFAULT_ANOMALY_HOURS = 24
+# Las anomalías salen de la ventana con el tiempo: los estados se recalculan al menos así de seguido
+OVERLAY_REFRESH_SECONDS = 300
+
+_indexes = LocalBackend(max_entries=64)
+_overlays = LocalBackend(max_entries=256)
+_tiles = LocalBackend(max_entries=4096)
+_build_locks = {}
+_build_locks_guard = Lock()
+
+
+def layout_version_names(location_id):
+    return [f'{LAYOUT_VERSION_PREFIX}{location_id}', ALL_LAYOUTS_VERSION]
+
+
+def _lock_for(location_id):
+    with _build_locks_guard:
+        return _build_locks.setdefault(location_id, Lock())
+
+
+def _accessible_location(location_id):
+    location = reference_data.get('location', location_id, accessible_site_ids())
+    if location is None:
+        return None, {'message': 'Ubicación no encontrada', 'status': 404}
+    return location, None
+
+
+def _build_index(location, version):
+    # Del primario y sin filtro de planta: el acceso ya se comprobó y el índice se comparte
+    with db.engine.connect() as connection:
+        layout = connection.execute(select(Location.layout).where(Location.id == location.id)).scalar()
+        rows = connection.execute(
+            select(Asset.id, Asset.name, Asset.unique_code, Asset.criticality)
+            .where(Asset.location_id == location.id)
+        ).all()
+    return LayoutIndex(location.id, location.site_id, version, layout, rows)
+
+
+def get_layout_index(location_id):
+    """
+    Índice del plano de la ubicación. Se construye una vez por versión: solo
+    se rehace cuando cambia el plano o algún activo de esa ubicación.
+    """
+    location, error = _accessible_location(location_id)
+    if error:
+        return None, error
+    try:
+        version = '.'.join(map(str, response_cache.versions(layout_version_names(location_id))))
+        index = _indexes.get(location_id)
+        if index is not None and index.version == version:
+            return index, None
+        with _lock_for(location_id):
+            index = _indexes.get(location_id)
+            if index is None or index.version != version:
+                index = _build_index(location, version)
+                _indexes.set(location_id, index)
+        return index, None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al cargar el plano: {e}", 'status': 500}
+
+
+def get_statuses(index):
+    """
+    Órdenes abiertas y anomalías recientes por activo de la ubicación:
+    {asset_id: (órdenes abiertas, anomalías)}. Se recalculan solo cuando
+    cambian las órdenes de trabajo, llegan anomalías o vence la ventana.
+    """
+    hours = current_app.config.get('LAYOUT_ANOMALY_HOURS', DEFAULT_ANOMALY_HOURS)
+    key = (index.version, tuple(response_cache.versions(list(OVERLAY_VERSIONS))),
+           int(time.time() // OVERLAY_REFRESH_SECONDS), hours)
+    cached = _overlays.get(index.location_id)
+    if cached is not None and cached[0] == key:
+        return cached[1], None
+    try:
+        since = datetime.utcnow() - timedelta(hours=hours)
+        open_orders = db.session.execute(
+            select(WorkOrder.asset_id, func.count())
+            .join(Asset, Asset.id == WorkOrder.asset_id)
+            .where(Asset.location_id == index.location_id, WorkOrder.status != WorkOrderStatus.closed)
+            .group_by(WorkOrder.asset_id),
+            execution_options={SKIP_OPTION: True}
+        ).all()
+        anomalies = db.session.execute(
+            select(SensorReading.asset_id, func.count())
+            .join(Asset, Asset.id == SensorReading.asset_id)
+            .where(Asset.location_id == index.location_id, SensorReading.is_anomalous.is_(True),
+                   SensorReading.reading_date >= since)
+            .group_by(SensorReading.asset_id),
+            execution_options={SKIP_OPTION: True}
+        ).all()
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al calcular el estado de los activos: {e}", 'status': 500}
+
+    statuses = {asset_id: (count, 0) for asset_id, count in open_orders}
+    for asset_id, count in anomalies:
+        statuses[asset_id] = (statuses.get(asset_id, (0, 0))[0], count)
+    _overlays.set(index.location_id, (key, statuses))
+    return statuses, None
+
+
+def _asset_dict(asset, status):
+    return {
+        'asset_id': asset.asset_id,
+        'name': asset.name,
+        'unique_code': asset.unique_code,
+        'criticality': asset.criticality,
+        'x': asset.x, 'y': asset.y, 'w': asset.w, 'h': asset.h,
+        'open_work_orders': status[0],
+        'anomalies': status[1],
+        'state': asset_state(status),
+    }
+
+
+def get_layout_summary(location_id):
+    index, error = get_layout_index(location_id)
+    if error:
+        return None, error
+    statuses, error = get_statuses(index)
+    if error:
+        return None, error
+    states = Counter(asset_state(statuses.get(a.asset_id, (0, 0))) for a in index.assets)
+    return {
+        'location_id': index.location_id,
+        'site_id': index.site_id,
+        'version': index.version,
+        'width': index.width,
+        'height': index.height,
+        'tile_size': TILE_SIZE,
+        'max_zoom': MAX_ZOOM,
+        'shapes': len(index.shapes),
+        'assets': len(index.assets),
+        'unplaced_asset_ids': list(index.unplaced),
+        'states': {state: states.get(state, 0) for state in ('ok', 'open', 'anomaly')},
+    }, None
+
+
+def query_viewport(location_id, x0, y0, x1, y1, state=None):
+    """
+    Activos del plano cuya caja corta la ventana, con su estado.
+    """
+    index, error = get_layout_index(location_id)
+    if error:
+        return None, error
+    statuses, error = get_statuses(index)
+    if error:
+        return None, error
+    assets = [_asset_dict(a, statuses.get(a.asset_id, (0, 0))) for a in index.assets_in(x0, y0, x1, y1)]
+    if state:
+        assets = [a for a in assets if a['state'] == state]
+    return {'location_id': location_id, 'version': index.version, 'bbox': [x0, y0, x1, y1],
+            'count': len(assets), 'assets': assets}, None
+
+
+def get_tile(location_id, z, x, y):
+    """
+    Tesela SVG z/x/y del plano. Devuelve ((svg en bytes, etag), error).
+
+    La clave incluye la versión del plano y el estado de los activos que
+    aparecen en la tesela, de modo que un cambio de estado en otra zona del
+    plano no invalida esta tesela. Con RESPONSE_CACHE_BACKEND compartido
+    las teselas dibujadas se comparten entre workers.
+    """
+    index, error = get_layout_index(location_id)
+    if error:
+        return None, error
+    if not index.valid_tile(z, x, y):
+        return None, {'message': 'Tesela fuera del plano', 'status': 404}
+    statuses, error = get_statuses(index)
+    if error:
+        return None, error
+
+    visible = [(a.asset_id,) + statuses.get(a.asset_id, (0, 0)) for a in index.assets_in(*index.tile_window(z, x, y))]
+    etag = hashlib.sha1(repr((location_id, index.version, z, x, y, visible)).encode()).hexdigest()[:32]
+    store = response_cache.shared or _tiles
+    key = f'layout-tile:{etag}'
+    svg = store.get(key)
+    if svg is None:
+        svg = render_tile(index, z, x, y, {asset_id: (orders, anomalies) for asset_id, orders, anomalies in visible})
+        svg = svg.encode('utf-8')
+        store.set(key, svg)
+    return (svg, etag), None
+
+
+def save_layout(location_id, layout):
+    """
+    Reemplaza el plano de la ubicación. Las posiciones de activos que no
+    pertenecen a la ubicación se guardan pero no se dibujan.
+    """
+    location, error = _accessible_location(location_id)
+    if error:
+        return None, error
+    try:
+        record = db.session.get(Location, location.id)
+        if record is None:
+            return None, {'message': 'Ubicación no encontrada', 'status': 404}
+        record.layout = layout
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al guardar el plano: {e}", 'status': 500}
+
+    summary, error = get_layout_summary(location_id)
+    if error:
+        return None, error
+    index = _indexes.get(location_id)
+    placed = {p[0] for p in map(parse_placement, layout.get('assets', ())) if p is not None}
+    summary['ignored_asset_ids'] = sorted(placed - {a.asset_id for a in index.assets})
+    return summary, None
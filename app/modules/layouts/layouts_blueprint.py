@@ -0,0 +1,72 @@
+from flask import Blueprint, jsonify, request, make_response
+from app.services.db_routing import read_only
+from .layout_service import get_layout_summary, query_viewport, get_tile, save_layout
+from .validations import validate_layout, parse_bbox
+
+layouts_bp = Blueprint(
+    'layouts',
+    __name__,
+    url_prefix='/layouts'
+)
+
+# --- Rutas de la API ---
+
+@layouts_bp.route('/api/locations/<int:location_id>', methods=['GET'])
+@read_only
+def api_get_layout(location_id):
+    """
+    Datos del plano para el visor: tamaño, zooms de teselas, versión y
+    cantidad de activos por estado.
+    """
+    summary, error = get_layout_summary(location_id)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(summary), 200
+
+@layouts_bp.route('/api/locations/<int:location_id>', methods=['PUT'])
+def api_save_layout(location_id):
+    layout, errors = validate_layout(request.get_json(silent=True))
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    summary, error = save_layout(location_id, layout)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(summary), 200
+
+@layouts_bp.route('/api/locations/<int:location_id>/viewport', methods=['GET'])
+@read_only
+def api_query_viewport(location_id):
+    """
+    Activos dentro de la ventana 'bbox=x0,y0,x1,y1' con órdenes abiertas y
+    anomalías; 'state=ok|open|anomaly' filtra por estado.
+    """
+    params, errors = parse_bbox(request.args)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    viewport, error = query_viewport(location_id, *params['bbox'], state=params['state'])
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(viewport), 200
+
+@layouts_bp.route('/api/locations/<int:location_id>/tiles/<int:z>/<int:x>/<int:y>.svg', methods=['GET'])
+@read_only
+def api_get_tile(location_id, z, x, y):
+    """
+    Tesela SVG del plano con el estado de los activos. La ETag cambia solo si
+    cambia lo que la tesela dibuja; con 'If-None-Match' vigente responde 304.
+    """
+    tile, error = get_tile(location_id, z, x, y)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    svg, etag = tile
+    # La compresión agrega '-br'/'-gzip' a la ETag: cualquiera de las formas vale
+    # y el 304 repite la que tiene el cliente
+    matched = next((candidate for candidate in (etag, f'{etag}-br', f'{etag}-gzip')
+                    if candidate in request.if_none_match), None)
+    response = make_response(svg if matched is None else '', 200 if matched is None else 304)
+    response.mimetype = 'image/svg+xml'
+    response.set_etag(matched or etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
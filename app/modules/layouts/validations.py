@@ -0,0 +1,70 @@
+import math
+from .layout_index import MAX_COORDINATE, SHAPE_TYPES, parse_placement, parse_shape
+
+MAX_SHAPES = 20_000
+MAX_PLACEMENTS = 50_000
+VIEWPORT_STATES = ('ok', 'open', 'anomaly')
+
+
+def validate_layout(data):
+    """
+    Valida un plano completo: {'width', 'height', 'shapes': [...], 'assets': [...]}.
+    Devuelve (layout, errors) con el plano tal como se guardará.
+    """
+    if not isinstance(data, dict):
+        return None, {'layout': 'Se requiere un objeto JSON con el plano.'}
+    errors = {}
+    for field in ('width', 'height'):
+        value = data.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))
+                                  or not 0 < value <= MAX_COORDINATE):
+            errors[field] = f"El campo '{field}' debe ser un número positivo de hasta {int(MAX_COORDINATE)}."
+
+    shapes = data.get('shapes') or []
+    if not isinstance(shapes, list) or len(shapes) > MAX_SHAPES:
+        errors['shapes'] = f"El campo 'shapes' debe ser una lista de hasta {MAX_SHAPES} formas."
+    else:
+        invalid = [i for i, shape in enumerate(shapes) if parse_shape(shape) is None]
+        if invalid:
+            errors['shapes'] = (f"Formas inválidas en las posiciones {invalid[:10]}: tipos {list(SHAPE_TYPES)}, "
+                                "'rect' con x, y, w, h; 'polygon'/'line' con 'points'; 'text' con x, y, text; "
+                                f"coordenadas de hasta {int(MAX_COORDINATE)} en valor absoluto.")
+
+    placements = data.get('assets') or []
+    if not isinstance(placements, list) or len(placements) > MAX_PLACEMENTS:
+        errors['assets'] = f"El campo 'assets' debe ser una lista de hasta {MAX_PLACEMENTS} posiciones."
+    else:
+        parsed = [parse_placement(p) for p in placements]
+        invalid = [i for i, p in enumerate(parsed) if p is None]
+        ids = [p[0] for p in parsed if p is not None]
+        if invalid:
+            errors['assets'] = (f"Posiciones inválidas en {invalid[:10]}: cada una requiere "
+                                "'asset_id' entero, 'x', 'y' y opcionalmente 'w', 'h' positivos, "
+                                f"de hasta {int(MAX_COORDINATE)} en valor absoluto.")
+        elif len(ids) != len(set(ids)):
+            errors['assets'] = 'Cada activo puede aparecer una sola vez en el plano.'
+
+    if errors:
+        return None, errors
+    layout = {key: data[key] for key in ('width', 'height') if data.get(key) is not None}
+    layout['shapes'] = shapes
+    layout['assets'] = placements
+    return layout, None
+
+
+def parse_bbox(args):
+    """
+    Ventana 'bbox=x0,y0,x1,y1' en unidades del plano y filtro opcional 'state'.
+    """
+    errors = {}
+    bbox = None
+    try:
+        bbox = [float(v) for v in (args.get('bbox') or '').split(',')]
+        if len(bbox) != 4 or not all(map(math.isfinite, bbox)) or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise ValueError
+    except ValueError:
+        errors['bbox'] = "El parámetro 'bbox' debe ser 'x0,y0,x1,y1' con x0 <= x1 e y0 <= y1."
+    state = args.get('state')
+    if state and state not in VIEWPORT_STATES:
+        errors['state'] = f"El parámetro 'state' debe ser uno de {list(VIEWPORT_STATES)}."
+    return {'bbox': bbox, 'state': state}, errors
@@ -0,0 +1 @@
+# This file makes the 'live' directory a Python package
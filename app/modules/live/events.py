@@ -0,0 +1,132 @@
+import logging
+from datetime import datetime
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from app.extensions import live_events, reference_data
+from app.models import Asset, SensorReading, SparePart, Warehouse, WorkOrder
+
+logger = logging.getLogger(__name__)
+
+
+def _name(value):
+    return value.name if value is not None else None
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _work_order_events(session):
+    for wo in session.new:
+        if isinstance(wo, WorkOrder):
+            yield wo, 'work_order.created', {'status': _name(wo.status)}
+    for wo in session.dirty:
+        if not isinstance(wo, WorkOrder):
+            continue
+        history = inspect(wo).attrs.status.history
+        if history.has_changes():
+            previous = history.deleted[0] if history.deleted else None
+            yield wo, 'work_order.status_changed', {'status': _name(wo.status), 'previous_status': _name(previous)}
+
+
+def _collect_after_flush(session, flush_context):
+    """
+    Arma los eventos en vivo de este flush (ids ya asignados). Se publican recién
+    tras el commit, así ningún cliente ve cambios que luego se deshacen.
+    """
+    pending = []
+    asset_ids, warehouse_ids = set(), set()
+
+    for wo, kind, extra in _work_order_events(session):
+        data = {'work_order_id': wo.id, 'type': _name(wo.type), 'priority': _name(wo.priority),
+                'description': wo.description, 'assigned_to_user_id': wo.assigned_to_user_id, **extra}
+        pending.append([kind, wo.site_id, wo.asset_id, data])
+        if wo.site_id is None and wo.asset_id:
+            asset_ids.add(wo.asset_id)
+
+    for reading in list(session.new) + list(session.dirty):
+        if not isinstance(reading, SensorReading) or not reading.is_anomalous:
+            continue
+        if reading not in session.new and not inspect(reading).attrs.is_anomalous.history.has_changes():
+            continue
+        data = {'sensor_reading_id': reading.id, 'sensor_type': _name(reading.sensor_type),
+                'value': float(reading.value) if reading.value is not None else None,
+                'reading_date': _iso(reading.reading_date)}
+        pending.append(['sensor_reading.anomaly', None, reading.asset_id, data])
+        if reading.asset_id:
+            asset_ids.add(reading.asset_id)
+
+    for part in list(session.new) + list(session.dirty):
+        if not isinstance(part, SparePart) or part.current_stock is None:
+            continue
+        history = inspect(part).attrs.current_stock.history
+        if part not in session.new and not history.has_changes():
+            continue
+        previous = history.deleted[0] if history.deleted else None
+        min_stock = part.min_stock or 0
+        # Solo al cruzar el mínimo, no en cada movimiento por debajo de él
+        if part.current_stock <= min_stock and (previous is None or previous > min_stock):
+            data = {'spare_part_id': part.id, 'code': part.code, 'name': part.name,
+                    'current_stock': part.current_stock, 'min_stock': min_stock,
+                    'warehouse_id': part.warehouse_id}
+            pending.append(['stock.low', None, None, data])
+            if part.warehouse_id:
+                warehouse_ids.add(part.warehouse_id)
+
+    if not pending:
+        return
+
+    # Planta de cada evento: una consulta para los activos; los almacenes salen de la caché de
+    # referencia y, los que aún no están (creados en esta misma transacción), de la sesión
+    connection = session.connection()
+    asset_sites = dict(connection.execute(
+        select(Asset.id, Asset.site_id).where(Asset.id.in_(asset_ids))
+    ).all()) if asset_ids else {}
+    warehouse_sites = {}
+    if warehouse_ids:
+        warehouses = reference_data.table('warehouse')
+        warehouse_sites = {w: warehouses.get(w).site_id for w in warehouse_ids if w in warehouses}
+        missing = warehouse_ids - warehouse_sites.keys()
+        if missing:
+            warehouse_sites.update(connection.execute(
+                select(Warehouse.id, Warehouse.site_id).where(Warehouse.id.in_(missing))
+            ).all())
+
+    now = datetime.utcnow().isoformat()
+    events = session.info.setdefault('live_events', [])
+    for kind, site_id, asset_id, data in pending:
+        if site_id is None:
+            site_id = asset_sites.get(asset_id) if asset_id else warehouse_sites.get(data.get('warehouse_id'))
+        events.append({'type': kind, 'site_id': site_id, 'asset_id': asset_id, 'time': now, 'data': data})
+
+
+def _publish_after_commit(session):
+    events = session.info.pop('live_events', None)
+    if events:
+        # El commit ya ocurrió: si el broker falla se pierden los eventos, no la escritura
+        try:
+            live_events.publish(events)
+        except Exception as e:
+            logger.error(f"Error al publicar eventos en vivo: {e}")
+
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('live_events', None)
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+def register_events():
+    # Con active_history el valor anterior se carga al asignar aunque el objeto
+    # esté expirado tras un commit: hace falta para 'previous_status' y para
+    # detectar el cruce del stock mínimo.
+    for attribute in (WorkOrder.status, SparePart.current_stock):
+        if not event.contains(attribute, 'set', _keep_previous_value):
+            event.listen(attribute, 'set', _keep_previous_value, retval=True, active_history=True)
+    for name, fn in [('after_flush', _collect_after_flush),
+                     ('after_commit', _publish_after_commit),
+                     ('after_soft_rollback', _discard_after_rollback)]:
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
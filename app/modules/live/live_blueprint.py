@@ -0,0 +1,108 @@
+import json
+import time
+from flask import Blueprint, Response, current_app, jsonify, request
+from app.extensions import live_events
+from app.models import db
+from app.services.tenancy import accessible_site_ids
+from .validations import DEFAULT_POLL_TIMEOUT, parse_stream_filters
+
+live_bp = Blueprint(
+    'live',
+    __name__,
+    url_prefix='/live'
+)
+
+def _resolve_filters():
+    max_timeout = current_app.config.get('LIVE_EVENTS_POLL_TIMEOUT_SECONDS', DEFAULT_POLL_TIMEOUT)
+    filters, errors = parse_stream_filters(request.args, request.headers, max_timeout)
+    if errors:
+        return None, errors
+    allowed = accessible_site_ids()
+    if allowed is not None:
+        allowed = set(allowed)
+        filters['site_ids'] = filters['site_ids'] & allowed if filters['site_ids'] else allowed
+    if filters['cursor'] is None:
+        filters['cursor'] = live_events.last_id
+    # La espera no usa la base de datos: se libera la conexión antes de bloquear
+    db.session.remove()
+    return filters, None
+
+def _matches(event, filters):
+    if filters['types'] and event['type'] not in filters['types']:
+        return False
+    if filters['site_ids'] is not None and event['site_id'] not in filters['site_ids']:
+        return False
+    if filters['asset_ids'] and event['asset_id'] not in filters['asset_ids']:
+        return False
+    return True
+
+def _sse(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+# --- Rutas de la API ---
+
+@live_bp.route('/api/stream', methods=['GET'])
+def api_stream():
+    """
+    Server-Sent Events. El navegador reenvía Last-Event-ID al reconectar y
+    recibe lo ocurrido mientras tanto, si aún está en el buffer; si no, un
+    evento 'reset' indica que debe recargar su estado.
+    """
+    filters, errors = _resolve_filters()
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    heartbeat = current_app.config.get('LIVE_EVENTS_HEARTBEAT_SECONDS', 15)
+    max_age = current_app.config.get('LIVE_EVENTS_STREAM_MAX_SECONDS', 3600)
+    retry_ms = current_app.config.get('LIVE_EVENTS_RETRY_MS', 3000)
+
+    # No usa la base de datos ni el contexto de la petición: no hace falta stream_with_context
+    def generate(cursor):
+        yield f"retry: {retry_ms}\n\n"
+        deadline = time.monotonic() + max_age
+        while time.monotonic() < deadline:
+            events, lost = live_events.read(cursor, heartbeat)
+            if lost:
+                yield "event: reset\ndata: {}\n\n"
+                cursor = events[-1]['id'] if events else live_events.last_id
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            cursor = events[-1]['id']
+            chunk = ''.join(_sse(event) for event in events if _matches(event, filters))
+            if chunk:
+                yield chunk
+
+    response = Response(generate(filters['cursor']), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@live_bp.route('/api/poll', methods=['GET'])
+def api_poll():
+    """
+    Long-poll para clientes sin EventSource: espera hasta 'timeout' segundos y
+    devuelve los eventos nuevos y el cursor a enviar en la siguiente llamada.
+    """
+    filters, errors = _resolve_filters()
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    deadline = time.monotonic() + filters['timeout']
+    cursor, reset, matched = filters['cursor'], False, []
+    # Se sigue esperando si solo llegaron eventos que el filtro descarta
+    while not matched:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        events, lost = live_events.read(cursor, remaining)
+        if lost:
+            reset = True
+            cursor = events[-1]['id'] if events else live_events.last_id
+        if events:
+            cursor = events[-1]['id']
+            matched = [event for event in events if _matches(event, filters)]
+        if reset:
+            break
+
+    return jsonify({'cursor': cursor, 'reset': reset, 'events': matched}), 200
@@ -0,0 +1,58 @@
+import math
+
+DEFAULT_POLL_TIMEOUT = 25
+EVENT_TYPES = ['work_order.created', 'work_order.status_changed', 'sensor_reading.anomaly', 'stock.low']
+
+
+def _int_list(raw):
+    return [int(v) for v in raw.split(',') if v.strip()]
+
+
+def parse_stream_filters(args, headers, max_timeout=DEFAULT_POLL_TIMEOUT):
+    """
+    Valida los filtros de una suscripción: 'site_id', 'asset_id' y 'type'
+    (listas separadas por comas), el cursor ('Last-Event-ID' o 'last_event_id')
+    y la espera del long-poll ('timeout', como máximo 'max_timeout' segundos).
+    Devuelve (filters, errors).
+    """
+    errors = {}
+    filters = {'site_ids': None, 'asset_ids': None, 'types': None, 'cursor': None}
+
+    for field, key in [('site_id', 'site_ids'), ('asset_id', 'asset_ids')]:
+        raw = args.get(field)
+        if raw:
+            try:
+                filters[key] = set(_int_list(raw))
+            except ValueError:
+                errors[field] = f"El campo '{field}' debe ser una lista de enteros separados por comas."
+
+    raw_types = args.get('type')
+    if raw_types:
+        types = {t.strip() for t in raw_types.split(',') if t.strip()}
+        unknown = types - set(EVENT_TYPES)
+        if unknown:
+            errors['type'] = f"Tipos de evento no válidos: {', '.join(sorted(unknown))}. Opciones: {', '.join(EVENT_TYPES)}."
+        filters['types'] = types
+
+    raw_cursor = headers.get('Last-Event-ID') or args.get('last_event_id')
+    if raw_cursor:
+        try:
+            filters['cursor'] = int(raw_cursor)
+            if filters['cursor'] < 0:
+                raise ValueError
+        except ValueError:
+            errors['last_event_id'] = "El id del último evento debe ser un entero no negativo."
+
+    filters['timeout'] = max_timeout
+    raw_timeout = args.get('timeout')
+    if raw_timeout:
+        try:
+            timeout = float(raw_timeout)
+            # 'nan' e 'inf' dejarían la espera bloqueada para siempre
+            if not math.isfinite(timeout) or timeout <= 0:
+                raise ValueError
+            filters['timeout'] = min(timeout, max_timeout)
+        except ValueError:
+            errors['timeout'] = "El campo 'timeout' debe ser un número positivo de segundos."
+
+    return filters, errors
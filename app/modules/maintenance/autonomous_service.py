@@ -1,34 +1,101 @@
-from app.models import db, WorkOrder, WorkOrderType, WorkOrderPriority
-from .corrective_service import report_fault
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db, Asset, ChecklistExecution
+from .corrective_service import calculate_priority, open_corrective_orders, open_or_merge_corrective
+
+# Impacto por defecto para escalamiento desde un checklist autónomo
+ESCALATION_IMPACT = 'low'
+
+
+def build_anomaly_description(anomalies, notes=None):
+    """
+    Construye la descripción de la OT correctiva a partir de las tareas 'nok'.
+    """
+    lines = ["Anomalías detectadas durante checklist autónomo:"]
+    lines += [f"- Tarea #{anomaly['id']}: {anomaly['description']}" for anomaly in anomalies]
+    if notes:
+        lines += ["", f"Notas adicionales: {notes}"]
+    return '\n'.join(lines) + '\n'
+
+
+def save_checklist_results_bulk(checklists):
+    """
+    Guarda en bloque los resultados de varios checklists autónomos (p. ej. fin de turno).
+
+    Todos los activos se obtienen en una sola consulta, la prioridad se calcula una
+    vez por criticidad y las ejecuciones y OTs correctivas escaladas se crean en
+    una única transacción. Como en los reportes de falla, una anomalía en un
+    activo con una correctiva abierta se agrega a esa OT en lugar de abrir otra.
+    """
+    try:
+        asset_ids = {data['asset_id'] for data in checklists}
+        assets = {
+            row.id: row
+            for row in db.session.execute(
+                select(Asset.id, Asset.criticality, Asset.site_id).where(Asset.id.in_(asset_ids))
+            )
+        }
+        missing = asset_ids - assets.keys()
+        if missing:
+            return None, {'message': f'Activos no encontrados: {sorted(missing)}', 'status': 404}
+
+        priorities = {
+            criticality: calculate_priority(criticality, ESCALATION_IMPACT)
+            for criticality in {row.criticality for row in assets.values()}
+        }
+
+        open_orders = open_corrective_orders(asset_ids)
+        executions = []
+        work_orders = []
+        for data in checklists:
+            asset = assets[data['asset_id']]
+            anomalies = [task for task in data['tasks'] if task['status'] == 'nok']
+            execution = ChecklistExecution(
+                checklist_id=data.get('checklist_id'),
+                asset_id=asset.id,
+                user_id=data['user_id'],
+                results=data['tasks'],
+                notes=data.get('notes'),
+                anomalies_found=len(anomalies),
+            )
+            if anomalies:
+                # Escalar a Mantenimiento Correctivo
+                report = {'description': build_anomaly_description(anomalies, data.get('notes')),
+                          'user_id': data['user_id']}
+                execution.work_order, _ = open_or_merge_corrective(
+                    asset, report, priorities[asset.criticality], open_orders
+                )
+                if execution.work_order not in work_orders:
+                    work_orders.append(execution.work_order)
+            executions.append(execution)
+
+        db.session.add_all(executions)
+        db.session.flush()
+        # El resumen se arma antes del commit para no recargar cada objeto expirado
+        result = {
+            'status': 'success',
+            'executions': len(executions),
+            'anomalies_found': sum(e.anomalies_found for e in executions),
+            'work_order_ids': [wo.id for wo in work_orders],
+        }
+        db.session.commit()
+
+        return result, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
+
 
 def save_checklist_results(data):
     """
     Guarda los resultados de un checklist de mantenimiento autónomo.
     Si hay anomalías, escala a un mantenimiento correctivo.
     """
-    try:
-        anomalies = [task for task in data['tasks'] if task['status'] == 'nok']
-
-        if anomalies:
-            # Escalar a Mantenimiento Correctivo
-            description = "Anomalías detectadas durante checklist autónomo:\n"
-            for anomaly in anomalies:
-                description += f"- Tarea #{anomaly['id']}: {anomaly['description']}\n"
-            if data.get('notes'):
-                description += f"\nNotas adicionales: {data['notes']}"
-
-            fault_data = {
-                'asset_id': data['asset_id'],
-                'description': description,
-                'user_id': data['user_id'],
-                'operational_impact': 'low' # Impacto por defecto para escalamiento
-            }
-            report_fault(fault_data)
-
-        # Aquí se guardaría un registro del checklist completado (si el modelo existiera)
-        # Por ahora, solo se escala si hay anomalías.
-
-        return {'status': 'success', 'anomalies_found': len(anomalies)}, None
-
-    except Exception as e:
-        return None, {'message': f'Error al procesar el checklist: {str(e)}', 'status': 500}
+    result, error = save_checklist_results_bulk([data])
+    if error:
+        return None, error
+    return {
+        'status': 'success',
+        'anomalies_found': result['anomalies_found'],
+        'work_order_id': result['work_order_ids'][0] if result['work_order_ids'] else None,
+    }, None
@@ -1,34 +1,199 @@
-from app.models import db, WorkOrder, Asset, WorkOrderStatus, WorkOrderType, WorkOrderPriority
-from sqlalchemy.exc import SQLAlchemyError
-
-def report_fault(data):
-    """
-    Crea una nueva Orden de Trabajo para un mantenimiento correctivo a partir de un reporte de falla.
-    """
-    try:
-        asset = Asset.query.get(data['asset_id'])
-        if not asset:
-            return None, {'message': 'Activo no encontrado', 'status': 404}
-
-        # Lógica para determinar la prioridad
-        priority = calculate_priority(asset.criticality, data.get('operational_impact'))
-
-        new_work_order = WorkOrder(
-            asset_id=data['asset_id'],
-            type=WorkOrderType.corrective,
-            priority=priority,
-            status=WorkOrderStatus.created,
-            description=data['description'],
-            created_by_user_id=data['user_id'], # Asumiendo que el ID del usuario se envía
-            # Aquí se podrían añadir fotos, documentos, etc.
-        )
-        db.session.add(new_work_order)
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.models import db, WorkOrder, Asset, IdempotencyKey, WorkOrderStatus, WorkOrderType, WorkOrderPriority
+from app.services.idempotency import request_fingerprint, find_responses, check_replay, remember
+from app.services.tenancy import SKIP_OPTION
+from .fault_index import open_corrective_index
+
+PRIORITY_RANK = {
+    WorkOrderPriority.urgent: 0, WorkOrderPriority.high: 1,
+    WorkOrderPriority.medium: 2, WorkOrderPriority.low: 3,
+}
+
+
+def load_fault_index():
+    """
+    Reconstruye el índice de correctivas abiertas por activo (todas las plantas).
+    """
+    rows = db.session.execute(
+        select(WorkOrder.asset_id, WorkOrder.id).where(
+            WorkOrder.type == WorkOrderType.corrective,
+            WorkOrder.status != WorkOrderStatus.closed,
+            WorkOrder.asset_id.isnot(None),
+        ),
+        execution_options={SKIP_OPTION: True}
+    ).all()
+    open_corrective_index.load(rows)
+
+
+def open_corrective_orders(asset_ids):
+    """
+    OT correctiva abierta de cada activo según el índice, verificada contra la
+    base en una sola consulta. Las entradas que ya no están abiertas, o cuya OT
+    pasó a otro activo, se quitan.
+    """
+    if open_corrective_index.is_stale():
+        load_fault_index()
+    hits = open_corrective_index.lookup(asset_ids)
+    if not hits:
+        return {}
+    orders = {
+        wo.id: wo
+        for wo in db.session.execute(
+            select(WorkOrder).where(
+                WorkOrder.id.in_(hits.values()),
+                WorkOrder.type == WorkOrderType.corrective,
+                WorkOrder.status != WorkOrderStatus.closed,
+            )
+        ).scalars()
+    }
+    valid = {asset_id: orders[wo_id] for asset_id, wo_id in hits.items()
+             if wo_id in orders and orders[wo_id].asset_id == asset_id}
+    stale = [(asset_id, wo_id, False) for asset_id, wo_id in hits.items() if asset_id not in valid]
+    if stale:
+        open_corrective_index.apply(stale)
+    return valid
+
+
+def _merge_report(work_order, data, priority):
+    """
+    Agrega un reporte repetido a la OT abierta y eleva su prioridad si corresponde.
+    """
+    note = f"[{datetime.utcnow():%Y-%m-%d %H:%M}] Reporte adicional (usuario {data['user_id']}): {data['description']}"
+    work_order.comments = f"{work_order.comments}\n{note}" if work_order.comments else note
+    if work_order.priority is None or PRIORITY_RANK[priority] < PRIORITY_RANK[work_order.priority]:
+        work_order.priority = priority
+
+
+def open_or_merge_corrective(asset, data, priority, open_orders):
+    """
+    Abre una OT correctiva para el activo con 'description' y 'user_id' de
+    'data', o la fusiona en la correctiva abierta que tenga en 'open_orders'
+    (resultado de open_corrective_orders), que queda actualizado.
+    Devuelve (work_order, 'created' | 'merged').
+    """
+    work_order = open_orders.get(asset.id)
+    if work_order is not None:
+        _merge_report(work_order, data, priority)
+        return work_order, 'merged'
+    work_order = WorkOrder(
+        asset_id=asset.id,
+        site_id=asset.site_id,
+        type=WorkOrderType.corrective,
+        priority=priority,
+        status=WorkOrderStatus.created,
+        description=data['description'],
+        created_by_user_id=data['user_id'],
+    )
+    db.session.add(work_order)
+    open_orders[asset.id] = work_order
+    return work_order, 'created'
+
+
+def _is_idempotency_conflict(error):
+    """
+    True si el IntegrityError viene de insertar una clave de idempotencia repetida.
+    """
+    table = IdempotencyKey.__tablename__
+    statement = (error.statement or '').lower()
+    return statement.startswith('insert') and table in statement
+
+
+def report_faults_bulk(reports, endpoint):
+    """
+    Registra varios reportes de falla en una sola transacción.
+
+    - Un reporte con 'idempotency_key' ya procesada devuelve la respuesta original.
+    - Si el activo ya tiene una correctiva abierta (o se abrió antes en el mismo
+      lote), el reporte se fusiona en ella en lugar de crear otra OT.
+    Devuelve una lista de resultados en el orden de 'reports'.
+    """
+    for attempt in range(2):
+        try:
+            return _report_faults(reports, endpoint)
+        except IntegrityError as e:
+            db.session.rollback()
+            if not _is_idempotency_conflict(e):
+                return None, {'message': f'Error de integridad: {str(e.orig)}', 'status': 500}
+            # Otro proceso guardó la misma clave de idempotencia en paralelo:
+            # el segundo intento la encuentra y responde con lo ya guardado.
+            if attempt:
+                return None, {'message': 'Conflicto de concurrencia al registrar los reportes', 'status': 409}
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
+
+
+def _report_faults(reports, endpoint):
+    fingerprints = [request_fingerprint({k: v for k, v in r.items() if k != 'idempotency_key'}) for r in reports]
+    stored = find_responses({r.get('idempotency_key') for r in reports})
+
+    results = [None] * len(reports)
+    pending = []
+    first_in_batch = {}
+    for i, (report, fingerprint) in enumerate(zip(reports, fingerprints)):
+        key = report.get('idempotency_key')
+        if key in stored:
+            replay, error = check_replay(stored[key], endpoint, fingerprint)
+            if error:
+                return None, error
+            body, status_code = replay
+            results[i] = dict(body, status='replayed', status_code=status_code)
+        elif key and key in first_in_batch:
+            if fingerprints[first_in_batch[key]] != fingerprint:
+                return None, {'message': f"La clave de idempotencia '{key}' se repite con otro contenido", 'status': 422}
+        else:
+            if key:
+                first_in_batch[key] = i
+            pending.append(i)
+
+    if pending:
+        asset_ids = {reports[i]['asset_id'] for i in pending}
+        assets = {a.id: a for a in db.session.execute(select(Asset).where(Asset.id.in_(asset_ids))).scalars()}
+        missing = asset_ids - assets.keys()
+        if missing:
+            return None, {'message': f'Activos no encontrados: {sorted(missing)}', 'status': 404}
+
+        open_orders = open_corrective_orders(asset_ids)
+        outcomes = {}
+        for i in pending:
+            data = reports[i]
+            asset = assets[data['asset_id']]
+            priority = calculate_priority(asset.criticality, data.get('operational_impact'))
+            work_order, status = open_or_merge_corrective(asset, data, priority, open_orders)
+            outcomes[i] = (work_order, status, 201 if status == 'created' else 200)
+
+        db.session.flush()
+        # Respuestas armadas antes del commit para no recargar objetos expirados
+        for i, (work_order, status, status_code) in outcomes.items():
+            body = {'work_order': work_order.to_dict()}
+            results[i] = dict(body, status=status, status_code=status_code)
+            key = reports[i].get('idempotency_key')
+            if key and first_in_batch.get(key) == i:
+                remember(key, endpoint, fingerprints[i], status_code, dict(body, status=status))
         db.session.commit()
 
-        return new_work_order, None
-    except SQLAlchemyError as e:
-        db.session.rollback()
-        return None, {'message': f'Error de base de datos: {str(e)}', 'status': 500}
+    # Repetidos de una clave dentro del mismo lote
+    for key, i in first_in_batch.items():
+        for j, report in enumerate(reports):
+            if j != i and report.get('idempotency_key') == key and results[j] is None:
+                results[j] = dict(results[i], status='replayed')
+    return results, None
+
+
+def report_fault(data, idempotency_key=None):
+    """
+    Registra un reporte de falla: crea una OT correctiva, o lo fusiona en la
+    correctiva abierta del activo. Devuelve (resultado, error) donde resultado
+    incluye 'work_order', 'status' ('created', 'merged' o 'replayed') y 'status_code'.
+    """
+    report = dict(data, idempotency_key=idempotency_key) if idempotency_key else dict(data)
+    results, error = report_faults_bulk([report], endpoint='maintenance.api_report_fault')
+    if error:
+        return None, error
+    return results[0], None
+
 
 def calculate_priority(asset_criticality, operational_impact):
     """
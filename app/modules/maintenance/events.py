@@ -0,0 +1,50 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models import WorkOrder, WorkOrderType, WorkOrderStatus
+from .fault_index import open_corrective_index
+
+
+def _collect_after_flush(session, flush_context):
+    """
+    Registra altas y cierres de correctivas; el índice se actualiza tras el commit.
+    """
+    changes = session.info.setdefault('fault_index_changes', [])
+    for wo in list(session.new) + list(session.dirty):
+        if not isinstance(wo, WorkOrder):
+            continue
+        # Una OT que cambió de activo deja de ser la abierta del anterior
+        for old_asset_id in inspect(wo).attrs.asset_id.history.deleted:
+            if old_asset_id is not None:
+                changes.append((old_asset_id, wo.id, False))
+        if wo.asset_id is not None:
+            is_open = wo.type == WorkOrderType.corrective and wo.status != WorkOrderStatus.closed
+            changes.append((wo.asset_id, wo.id, is_open))
+    for wo in session.deleted:
+        if isinstance(wo, WorkOrder) and wo.asset_id is not None:
+            changes.append((wo.asset_id, wo.id, False))
+
+
+def _load_previous_asset(target, value, oldvalue, initiator):
+    # Sin efecto propio: con active_history el valor anterior de asset_id se
+    # carga al asignarlo aunque esté expirado, y after_flush lo ve en history.deleted
+    return value
+
+
+def _apply_after_commit(session):
+    changes = session.info.pop('fault_index_changes', None)
+    if changes:
+        open_corrective_index.apply(changes)
+
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('fault_index_changes', None)
+
+
+def register_events():
+    if not event.contains(WorkOrder.asset_id, 'set', _load_previous_asset):
+        event.listen(WorkOrder.asset_id, 'set', _load_previous_asset, active_history=True, retval=True)
+    for name, fn in [('after_flush', _collect_after_flush),
+                     ('after_commit', _apply_after_commit),
+                     ('after_soft_rollback', _discard_after_rollback)]:
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
@@ -0,0 +1,57 @@
+import time
+from threading import Lock
+
+
+class OpenCorrectiveIndex:
+    """
+    Índice en memoria de la OT correctiva abierta de cada activo (asset_id -> work_order_id).
+
+    Se reconstruye desde la base de datos al primer uso y cada 'ttl_seconds'
+    (cambios hechos por otros workers), y se mantiene al día con los commits
+    de este proceso. Un acierto se verifica contra la base antes de fusionar.
+    """
+
+    def __init__(self, ttl_seconds=60):
+        self._orders = {}
+        self._lock = Lock()
+        self._loaded_at = None
+        self.ttl_seconds = ttl_seconds
+
+    def is_stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def load(self, pairs):
+        """
+        pairs: (asset_id, work_order_id) de las correctivas abiertas.
+        """
+        orders = {}
+        for asset_id, work_order_id in pairs:
+            # Si hay varias abiertas se fusiona en la más antigua
+            if asset_id not in orders or work_order_id < orders[asset_id]:
+                orders[asset_id] = work_order_id
+        with self._lock:
+            self._orders = orders
+            self._loaded_at = time.monotonic()
+
+    def lookup(self, asset_ids):
+        with self._lock:
+            return {a: self._orders[a] for a in asset_ids if a in self._orders}
+
+    def apply(self, changes):
+        """
+        changes: (asset_id, work_order_id, is_open) confirmados en la base.
+        """
+        with self._lock:
+            for asset_id, work_order_id, is_open in changes:
+                current = self._orders.get(asset_id)
+                if is_open:
+                    if current is None or work_order_id < current:
+                        self._orders[asset_id] = work_order_id
+                elif current == work_order_id:
+                    del self._orders[asset_id]
+
+    def __len__(self):
+        return len(self._orders)
+
+
+open_corrective_index = OpenCorrectiveIndex()
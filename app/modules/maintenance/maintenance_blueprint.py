@@ -1,8 +1,14 @@
 from flask import Blueprint, render_template, request, jsonify
 from .preventive_service import create_preventive_schedule, get_preventive_schedules_for_asset
-from .corrective_service import report_fault
-from .autonomous_service import save_checklist_results
-from .validations import validate_preventive_data, validate_fault_report
+from .corrective_service import report_fault, report_faults_bulk
+from .autonomous_service import save_checklist_results, save_checklist_results_bulk
+from .validations import (
+    validate_preventive_data, validate_fault_report, validate_fault_batch,
+    validate_checklist_results, validate_checklist_batch
+)
+from app.extensions import response_cache
+from app.services.db_routing import read_only
+from app.services.idempotency import HEADER as IDEMPOTENCY_HEADER
 
 maintenance_bp = Blueprint(
     'maintenance',
@@ -52,6 +58,8 @@ def api_create_preventive():
     return jsonify(schedule.to_dict()), 201
 
 @maintenance_bp.route('/api/assets/<int:asset_id>/preventive', methods=['GET'])
+@read_only
+@response_cache.cached('preventive_schedule', 'asset')
 def api_get_preventive_for_asset(asset_id):
     schedules, error = get_preventive_schedules_for_asset(asset_id)
     if error:
@@ -61,18 +69,48 @@ def api_get_preventive_for_asset(asset_id):
 
 @maintenance_bp.route('/api/fault', methods=['POST'])
 def api_report_fault():
+    """
+    Reporte de falla. Con la cabecera 'Idempotency-Key' un reintento devuelve la
+    respuesta original; un activo con correctiva abierta recibe el reporte en ella (200).
+    """
     data = request.get_json()
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if isinstance(data, dict) and key:
+        data = dict(data, idempotency_key=key)
     errors = validate_fault_report(data)
     if errors:
         return jsonify({'errors': errors}), 400
 
-    work_order, error = report_fault(data)
+    result, error = report_fault(data, idempotency_key=data.get('idempotency_key'))
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+
+    body = dict(result['work_order'], merged=result['status'] == 'merged')
+    response = jsonify(body)
+    if result['status'] == 'replayed':
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response, result['status_code']
+
+@maintenance_bp.route('/api/faults/batch', methods=['POST'])
+def api_report_faults_batch():
+    """
+    Muchos reportes de falla en una sola transacción (p. ej. cola de un cliente móvil).
+    """
+    data = request.get_json()
+    errors = validate_fault_batch(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    results, error = report_faults_bulk(data['reports'], endpoint='maintenance.api_report_faults_batch')
     if error:
         return jsonify({'error': error['message']}), error['status']
 
-    return jsonify(work_order.to_dict()), 201
+    summary = {status: sum(1 for r in results if r['status'] == status) for status in ('created', 'merged', 'replayed')}
+    return jsonify({'results': results, **summary}), 201 if summary['created'] else 200
 
 @maintenance_bp.route('/api/calendar', methods=['GET'])
+@read_only
+@response_cache.cached('preventive_schedule', 'work_order', 'asset')
 def api_get_calendar_events():
     from app.models import PreventiveSchedule, WorkOrder, WorkOrderType
 
@@ -112,10 +150,28 @@ def api_get_calendar_events():
 @maintenance_bp.route('/api/autonomous/checklist', methods=['POST'])
 def api_save_checklist():
     data = request.get_json()
-    # Aquí iría la validación de los datos del checklist
+    errors = validate_checklist_results(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
 
     result, error = save_checklist_results(data)
     if error:
         return jsonify({'error': error['message']}), error['status']
 
     return jsonify(result), 200
+
+@maintenance_bp.route('/api/autonomous/checklists/bulk', methods=['POST'])
+def api_save_checklists_bulk():
+    """
+    Recibe los checklists de fin de turno de muchas máquinas en una sola petición.
+    """
+    data = request.get_json()
+    errors = validate_checklist_batch(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    result, error = save_checklist_results_bulk(data['checklists'])
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+
+    return jsonify(result), 201
@@ -1,13 +1,108 @@
+from app.services.idempotency import MAX_KEY_LENGTH as MAX_IDEMPOTENCY_KEY_LENGTH
+
+MAX_CHECKLIST_BATCH = 1000
+MAX_FAULT_BATCH = 500
+
+def _positive_int(value):
+    # Los formularios envían los ids como texto ("12")
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    return value if isinstance(value, int) and value > 0 else None
+
+def validate_checklist_results(data):
+    """
+    Valida los resultados de un checklist autónomo. 'asset_id', 'user_id' y
+    'checklist_id' se normalizan a enteros en el propio diccionario.
+    """
+    errors = {}
+    if not isinstance(data, dict):
+        return {'general': "Se esperaba un objeto JSON."}
+
+    for field in ['asset_id', 'user_id', 'tasks']:
+        if not data.get(field):
+            errors[field] = f"El campo '{field}' es obligatorio."
+    for field in ('asset_id', 'user_id', 'checklist_id'):
+        if field in errors or data.get(field) is None:
+            continue
+        value = _positive_int(data[field])
+        if value is None:
+            errors[field] = f"El campo '{field}' debe ser un entero positivo."
+        else:
+            data[field] = value
+
+    tasks = data.get('tasks')
+    if tasks and (not isinstance(tasks, list) or not all(
+        isinstance(t, dict) and 'id' in t and t.get('status') in ('ok', 'nok') and t.get('description')
+        for t in tasks
+    )):
+        errors['tasks'] = "Cada tarea debe tener 'id', 'description' y 'status' ('ok' o 'nok')."
+    return errors
+
+def validate_checklist_batch(data):
+    """
+    Valida un lote de checklists autónomos. Los errores se indexan por posición.
+    """
+    if not isinstance(data, dict):
+        return {'checklists': "Se esperaba un objeto JSON con la lista 'checklists'."}
+    checklists = data.get('checklists')
+    if not isinstance(checklists, list) or not checklists:
+        return {'checklists': "Se requiere una lista de checklists."}
+    if len(checklists) > MAX_CHECKLIST_BATCH:
+        return {'checklists': f"El lote no puede superar {MAX_CHECKLIST_BATCH} checklists."}
+
+    errors = {}
+    for i, checklist in enumerate(checklists):
+        item_errors = validate_checklist_results(checklist)
+        if item_errors:
+            errors[f'checklists[{i}]'] = item_errors
+    return errors
 
 def validate_fault_report(data):
     """
-    Valida los datos para un reporte de falla.
+    Valida los datos para un reporte de falla. 'asset_id' y 'user_id' se
+    normalizan a enteros en el propio diccionario.
     """
     errors = {}
+    if not isinstance(data, dict):
+        return {'general': "Se esperaba un objeto JSON."}
     required_fields = ['asset_id', 'description', 'user_id']
     for field in required_fields:
         if not data.get(field):
             errors[field] = f"El campo '{field}' es obligatorio."
+    for field in ('asset_id', 'user_id'):
+        if field in errors:
+            continue
+        value = _positive_int(data[field])
+        if value is None:
+            errors[field] = f"El campo '{field}' debe ser un entero positivo."
+        else:
+            data[field] = value
+    if 'description' not in errors and not isinstance(data['description'], str):
+        errors['description'] = "El campo 'description' debe ser un texto."
+    key = data.get('idempotency_key')
+    if key is not None and (not isinstance(key, str) or not 0 < len(key) <= MAX_IDEMPOTENCY_KEY_LENGTH):
+        errors['idempotency_key'] = f"La clave de idempotencia debe ser un texto de hasta {MAX_IDEMPOTENCY_KEY_LENGTH} caracteres."
+    return errors
+
+def validate_fault_batch(data):
+    """
+    Valida un lote de reportes de falla. Los errores se indexan por posición.
+    """
+    if not isinstance(data, dict):
+        return {'reports': "Se esperaba un objeto JSON con la lista 'reports'."}
+    reports = data.get('reports')
+    if not isinstance(reports, list) or not reports:
+        return {'reports': "Se requiere una lista de reportes."}
+    if len(reports) > MAX_FAULT_BATCH:
+        return {'reports': f"El lote no puede superar {MAX_FAULT_BATCH} reportes."}
+
+    errors = {}
+    for i, report in enumerate(reports):
+        item_errors = validate_fault_report(report)
+        if item_errors:
+            errors[f'reports[{i}]'] = item_errors
     return errors
 
 def validate_preventive_data(data):
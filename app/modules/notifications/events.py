@@ -0,0 +1,71 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models import Notification
+from .inbox_service import apply_unread_deltas
+
+
+def _is_unread(is_read, archived):
+    return not is_read and not archived
+
+
+def _previous(obj, attr):
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.added:
+        return None
+    return history.unchanged[0] if history.unchanged else getattr(obj, attr)
+
+
+def _collect_deleted_before_flush(session, flush_context, instances):
+    # Los borrados se leen antes del flush, mientras sus atributos se pueden cargar
+    session.info['inbox_deleted'] = [
+        (obj.user_id, _is_unread(obj.is_read, obj.archived))
+        for obj in session.deleted if isinstance(obj, Notification)
+    ]
+
+
+def _update_counters_after_flush(session, flush_context):
+    """
+    Mantiene los contadores de no leídas cuando las notificaciones se crean,
+    leen, archivan o borran a través del ORM. Los caminos masivos (Core) de
+    inbox_service los actualizan ellos mismos.
+    """
+    deltas = {}
+
+    def add(user_id, delta):
+        deltas[user_id] = deltas.get(user_id, 0) + delta
+
+    for obj in session.new:
+        if isinstance(obj, Notification) and _is_unread(obj.is_read, obj.archived):
+            add(obj.user_id, 1)
+    for user_id, unread in session.info.pop('inbox_deleted', ()):
+        if unread:
+            add(user_id, -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Notification) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[a].history.has_changes() for a in ('is_read', 'archived', 'user_id')):
+            continue
+        if _is_unread(_previous(obj, 'is_read'), _previous(obj, 'archived')):
+            add(_previous(obj, 'user_id'), -1)
+        if _is_unread(obj.is_read, obj.archived):
+            add(obj.user_id, 1)
+    if deltas:
+        apply_unread_deltas(session.connection(), deltas)
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+def register_events():
+    # El valor anterior hace falta para saber si la notificación contaba como no leída
+    for attr in (Notification.is_read, Notification.archived, Notification.user_id):
+        if not event.contains(attr, 'set', _keep_previous_value):
+            event.listen(attr, 'set', _keep_previous_value, retval=True, active_history=True)
+    for name, fn in [('before_flush', _collect_deleted_before_flush),
+                     ('after_flush', _update_counters_after_flush)]:
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
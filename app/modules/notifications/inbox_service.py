@@ -0,0 +1,285 @@
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete, func, literal, and_, or_, bindparam, exists
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.models import db, Notification, NotificationBroadcast, NotificationCounter, NotificationType, User
+from app.services.tenancy import accessible_site_ids
+
+DEFAULT_PAGE_SIZE = 30
+MAX_BATCH_IDS = 1000
+
+_notifications = Notification.__table__
+_counters = NotificationCounter.__table__
+_users = User.__table__
+
+# Condición de "no leída" (is_read admite NULL en filas antiguas)
+_UNREAD = and_(_notifications.c.is_read.isnot(True), _notifications.c.archived.is_(False))
+
+
+# --- Contador de no leídas ---
+
+def _ensure_counters(connection, user_ids):
+    """
+    Crea los contadores que faltan con el conteo de no leídas que ven en ese
+    momento (el mismo COUNT(*) de get_unread_count), dentro de la transacción
+    en curso. Si otra transacción los crea a la vez, el INSERT falla dentro del
+    savepoint y se sigue con el existente. Devuelve los usuarios cuyo contador
+    se creó aquí: ya incluyen los cambios hechos en esta transacción.
+    """
+    existing = set(connection.execute(
+        select(_counters.c.user_id).where(_counters.c.user_id.in_(user_ids))
+    ).scalars())
+    missing = [user_id for user_id in user_ids if user_id not in existing]
+    if not missing:
+        return set()
+    counted = dict(connection.execute(
+        select(_notifications.c.user_id, func.count()).where(_notifications.c.user_id.in_(missing), _UNREAD)
+        .group_by(_notifications.c.user_id)
+    ).all())
+    rows = [{'user_id': user_id, 'unread': counted.get(user_id, 0)} for user_id in missing]
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(_counters), rows)
+        return set(missing)
+    except IntegrityError:
+        created = set()
+        for row in rows:
+            try:
+                with connection.begin_nested():
+                    connection.execute(insert(_counters), [row])
+                created.add(row['user_id'])
+            except IntegrityError:
+                pass
+        return created
+
+
+def apply_unread_deltas(connection, deltas):
+    """
+    Suma a cada contador su incremento ({user_id: delta}) con un único UPDATE
+    por lotes, en la transacción de quien modifica las notificaciones y después
+    de modificarlas: un contador creado aquí ya las cuenta y no recibe el delta.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if user_id is not None and delta}
+    if not deltas:
+        return
+    seeded = _ensure_counters(connection, list(deltas))
+    params = [{'uid': user_id, 'delta': delta} for user_id, delta in deltas.items() if user_id not in seeded]
+    if not params:
+        return
+    connection.execute(
+        update(_counters).where(_counters.c.user_id == bindparam('uid'))
+        .values(unread=_counters.c.unread + bindparam('delta')),
+        params,
+        execution_options={'synchronize_session': False}
+    )
+
+
+def get_unread_count(user_id):
+    """
+    Lee el contador; si el usuario aún no tiene, se cuenta una única vez y se guarda.
+    """
+    try:
+        unread = db.session.execute(
+            select(_counters.c.unread).where(_counters.c.user_id == user_id)
+        ).scalar()
+        if unread is None:
+            unread = db.session.execute(
+                select(func.count()).select_from(_notifications).where(_notifications.c.user_id == user_id, _UNREAD)
+            ).scalar()
+            try:
+                db.session.execute(insert(_counters), [{'user_id': user_id, 'unread': unread}])
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+        return {'user_id': user_id, 'unread': unread}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al consultar las notificaciones no leídas: {e}", 'status': 500}
+
+
+def recount_unread(user_ids=None):
+    """
+    Recalcula los contadores desde las notificaciones (reparación).
+    """
+    try:
+        counted = select(_notifications.c.user_id, func.count().label('unread')).where(
+            _notifications.c.user_id.isnot(None), _UNREAD).group_by(_notifications.c.user_id)
+        target = delete(_counters)
+        if user_ids:
+            counted = counted.where(_notifications.c.user_id.in_(user_ids))
+            target = target.where(_counters.c.user_id.in_(user_ids))
+        db.session.execute(target)
+        db.session.execute(insert(_counters).from_select(['user_id', 'unread'], counted))
+        db.session.commit()
+        return {'counters': db.session.execute(select(func.count()).select_from(_counters)).scalar()}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al recalcular los contadores: {e}", 'status': 500}
+
+
+# --- Envío ---
+
+def deliver_notifications(rows):
+    """
+    Inserta notificaciones en bloque ([{'user_id', 'message', 'type', ...}])
+    y actualiza los contadores en la misma transacción. No hace commit.
+    """
+    if not rows:
+        return 0
+    now = datetime.utcnow()
+    rows = [{'sent_date': now, 'is_read': False, 'archived': False, **row} for row in rows]
+    connection = db.session.connection()
+    connection.execute(insert(_notifications), rows)
+    deltas = {}
+    for row in rows:
+        if not row['is_read'] and not row['archived']:
+            deltas[row['user_id']] = deltas.get(row['user_id'], 0) + 1
+    apply_unread_deltas(connection, deltas)
+    return len(rows)
+
+
+def _audience(site_id=None, role=None):
+    query = select(_users.c.id)
+    site_ids = accessible_site_ids()
+    if site_ids is not None:
+        query = query.where(_users.c.site_id.in_(site_ids))
+    if site_id:
+        query = query.where(_users.c.site_id == site_id)
+    if role:
+        query = query.where(_users.c.role == role)
+    return query
+
+
+def broadcast_notification(message, type=NotificationType.push, site_id=None, role=None, created_by_user_id=None):
+    """
+    Envía un aviso a todos los usuarios de la audiencia (planta y/o rol) con
+    escritura en abanico: un INSERT ... SELECT crea una fila por destinatario
+    y un UPDATE con subconsulta suma 1 a sus contadores, sin traer los
+    usuarios a Python. Todo en una transacción.
+    """
+    try:
+        now = datetime.utcnow()
+        broadcast = NotificationBroadcast(message=message, type=type, site_id=site_id, role=role,
+                                          created_by_user_id=created_by_user_id, created_date=now)
+        db.session.add(broadcast)
+        db.session.flush()
+
+        # Contadores que faltan: se crean antes del envío con las no leídas que
+        # ya tenía cada usuario, y luego todos los de la audiencia suman 1
+        audience = _audience(site_id, role)
+        previous_unread = (select(func.count()).select_from(_notifications)
+                           .where(_notifications.c.user_id == _users.c.id, _UNREAD).scalar_subquery())
+        db.session.execute(insert(_counters).from_select(
+            ['user_id', 'unread'],
+            audience.add_columns(previous_unread).where(~exists().where(_counters.c.user_id == _users.c.id))
+        ))
+        recipients = db.session.execute(
+            insert(_notifications).from_select(
+                ['user_id', 'message', 'type', 'sent_date', 'is_read', 'archived', 'broadcast_id'],
+                audience.add_columns(literal(message), literal(type, _notifications.c.type.type), literal(now),
+                                     literal(False), literal(False), literal(broadcast.id))
+            )
+        ).rowcount
+
+        db.session.execute(
+            update(_counters).where(_counters.c.user_id.in_(audience.scalar_subquery()))
+            .values(unread=_counters.c.unread + 1),
+            execution_options={'synchronize_session': False}
+        )
+        broadcast.recipients = recipients
+        db.session.commit()
+        return broadcast, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al enviar el aviso: {e}", 'status': 500}
+
+
+# --- Bandeja ---
+
+def encode_cursor(sent_date, notification_id):
+    return f"{sent_date.isoformat()}_{notification_id}"
+
+
+def get_inbox(user_id, status='inbox', cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Bandeja del usuario de la más nueva a la más vieja. La paginación es por
+    clave (sent_date, id) sobre el índice (user_id, sent_date, id): cada página
+    cuesta lo mismo sin importar cuántas haya antes. 'cursor' es (sent_date, id).
+    """
+    try:
+        query = select(Notification).where(Notification.user_id == user_id)
+        if status == 'unread':
+            query = query.where(Notification.is_read.isnot(True), Notification.archived.is_(False))
+        elif status == 'archived':
+            query = query.where(Notification.archived.is_(True))
+        elif status == 'inbox':
+            query = query.where(Notification.archived.is_(False))
+        if cursor:
+            sent_date, last_id = cursor
+            query = query.where(or_(
+                Notification.sent_date < sent_date,
+                and_(Notification.sent_date == sent_date, Notification.id < last_id),
+            ))
+        items = db.session.execute(
+            query.order_by(Notification.sent_date.desc(), Notification.id.desc()).limit(limit + 1)
+        ).scalars().all()
+
+        next_cursor = encode_cursor(items[limit - 1].sent_date, items[limit - 1].id) if len(items) > limit else None
+        unread, error = get_unread_count(user_id)
+        if error:
+            return None, error
+        return {'items': [n.to_dict() for n in items[:limit]], 'next_cursor': next_cursor,
+                'unread': unread['unread']}, None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al consultar la bandeja: {e}", 'status': 500}
+
+
+def _target(user_id, ids=None, before=None):
+    criteria = [_notifications.c.user_id == user_id]
+    if ids is not None:
+        criteria.append(_notifications.c.id.in_(ids))
+    if before is not None:
+        criteria.append(_notifications.c.sent_date <= before)
+    return criteria
+
+
+def mark_read(user_id, ids=None, before=None):
+    """
+    Marca como leídas las notificaciones indicadas (o todas, o las anteriores a
+    'before') con un solo UPDATE; el contador baja en lo que ese UPDATE cambió.
+    """
+    try:
+        changed = db.session.execute(
+            update(_notifications).where(*_target(user_id, ids, before), _UNREAD).values(is_read=True),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        apply_unread_deltas(db.session.connection(), {user_id: -changed})
+        db.session.commit()
+        return {'updated': changed}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al marcar las notificaciones como leídas: {e}", 'status': 500}
+
+
+def archive(user_id, ids=None, before=None):
+    """
+    Archiva (y da por leídas) las notificaciones indicadas. Las no leídas y las
+    leídas se actualizan por separado para descontar del contador exactamente
+    las que estaban pendientes.
+    """
+    try:
+        target = _target(user_id, ids, before)
+        values = {'is_read': True, 'archived': True}
+        unread = db.session.execute(
+            update(_notifications).where(*target, _UNREAD).values(**values),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        read = db.session.execute(
+            update(_notifications).where(*target, _notifications.c.archived.is_(False)).values(**values),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        apply_unread_deltas(db.session.connection(), {user_id: -unread})
+        db.session.commit()
+        return {'updated': unread + read}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al archivar las notificaciones: {e}", 'status': 500}
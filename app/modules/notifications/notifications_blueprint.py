@@ -0,0 +1,109 @@
+import click
+from flask import Blueprint, jsonify, request
+from app.models import NotificationType, Role
+from app.services.db_routing import read_only
+from app.services.tenancy import current_user_id
+from .inbox_service import get_inbox, get_unread_count, mark_read, archive, broadcast_notification, recount_unread
+from .validations import parse_inbox_params, validate_batch, validate_broadcast
+
+notifications_bp = Blueprint(
+    'notifications',
+    __name__,
+    url_prefix='/notifications'
+)
+
+def _inbox_user():
+    user_id = current_user_id() or request.args.get('user_id', type=int)
+    if not user_id:
+        return None, {'message': "Se requiere un usuario autenticado o el parámetro 'user_id'", 'status': 400}
+    return user_id, None
+
+# --- Rutas de la API ---
+
+@notifications_bp.route('/api/inbox', methods=['GET'])
+@read_only
+def api_get_inbox():
+    """
+    Bandeja paginada por clave: se pide la siguiente página con 'cursor'=next_cursor.
+    """
+    params, errors = parse_inbox_params(request.args)
+    if errors:
+        return jsonify({'errors': errors}), 400
+    user_id, error = _inbox_user()
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+
+    result, error = get_inbox(user_id, params['status'], params['cursor'], params['limit'])
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 200
+
+@notifications_bp.route('/api/unread-count', methods=['GET'])
+def api_get_unread_count():
+    # Sin read_only: la primera lectura puede crear el contador
+    user_id, error = _inbox_user()
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+
+    result, error = get_unread_count(user_id)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 200
+
+def _batch(operation):
+    params, errors = validate_batch(request.get_json(silent=True))
+    if errors:
+        return jsonify({'errors': errors}), 400
+    user_id, error = _inbox_user()
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+
+    result, error = operation(user_id, params['ids'], params['before'])
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    unread, error = get_unread_count(user_id)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify({**result, 'unread': unread['unread']}), 200
+
+@notifications_bp.route('/api/inbox/read', methods=['POST'])
+def api_mark_read():
+    return _batch(mark_read)
+
+@notifications_bp.route('/api/inbox/archive', methods=['POST'])
+def api_archive():
+    return _batch(archive)
+
+@notifications_bp.route('/api/broadcasts', methods=['POST'])
+def api_broadcast():
+    """
+    Aviso a todos los usuarios de una planta y/o rol (o a todos los accesibles).
+    """
+    data = request.get_json(silent=True)
+    errors = validate_broadcast(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    broadcast, error = broadcast_notification(
+        data['message'].strip(),
+        NotificationType[data['type']] if data.get('type') else NotificationType.push,
+        data.get('site_id'),
+        Role[data['role']] if data.get('role') else None,
+        current_user_id(),
+    )
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(broadcast.to_dict()), 201
+
+# --- Comandos CLI ---
+
+@notifications_bp.cli.command('recount')
+@click.option('--user-id', 'user_ids', type=int, multiple=True, help='Usuarios a recalcular (por defecto, todos).')
+def recount_command(user_ids):
+    """
+    Recalcula los contadores de no leídas: flask notifications recount
+    """
+    result, error = recount_unread(list(user_ids) or None)
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"{result['counters']} contadores recalculados.")
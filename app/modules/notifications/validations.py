@@ -0,0 +1,75 @@
+from datetime import datetime
+from app.models import NotificationType, Role
+from .inbox_service import DEFAULT_PAGE_SIZE, MAX_BATCH_IDS
+
+MAX_PAGE_SIZE = 100
+STATUSES = ('inbox', 'unread', 'archived', 'all')
+MAX_MESSAGE_LENGTH = 2000
+
+
+def parse_inbox_params(args):
+    """
+    Valida 'status', 'limit' y 'cursor' ('<sent_date ISO>_<id>'). Devuelve (params, errors).
+    """
+    errors = {}
+    params = {'status': args.get('status') or 'inbox', 'limit': DEFAULT_PAGE_SIZE, 'cursor': None}
+    if params['status'] not in STATUSES:
+        errors['status'] = f"El campo 'status' debe ser uno de: {', '.join(STATUSES)}."
+    if args.get('limit'):
+        try:
+            params['limit'] = int(args['limit'])
+            if not 0 < params['limit'] <= MAX_PAGE_SIZE:
+                raise ValueError
+        except ValueError:
+            errors['limit'] = f"El campo 'limit' debe ser un entero entre 1 y {MAX_PAGE_SIZE}."
+    if args.get('cursor'):
+        try:
+            sent_date, _, last_id = args['cursor'].rpartition('_')
+            params['cursor'] = (datetime.fromisoformat(sent_date), int(last_id))
+        except ValueError:
+            errors['cursor'] = "Cursor de paginación no válido."
+    return params, errors
+
+
+def validate_batch(data):
+    """
+    Lote para marcar como leídas o archivar: {'ids': [...]}, {'all': true} o
+    {'before': ISO} (todas hasta esa fecha). Devuelve (params, errors).
+    """
+    errors = {}
+    params = {'ids': None, 'before': None}
+    if not isinstance(data, dict):
+        return None, {'ids': "Se requiere 'ids', 'all' o 'before'."}
+    if 'ids' in data:
+        ids = data['ids']
+        if (not isinstance(ids, list) or not ids or len(ids) > MAX_BATCH_IDS
+                or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+            errors['ids'] = f"El campo 'ids' debe ser una lista de 1 a {MAX_BATCH_IDS} enteros."
+        else:
+            params['ids'] = ids
+    if data.get('before'):
+        try:
+            params['before'] = datetime.fromisoformat(data['before'])
+        except (TypeError, ValueError):
+            errors['before'] = "El campo 'before' debe ser una fecha ISO 8601."
+    if not errors and params['ids'] is None and params['before'] is None and data.get('all') is not True:
+        errors['ids'] = "Se requiere 'ids', 'all' o 'before'."
+    return params, errors
+
+
+def validate_broadcast(data):
+    errors = {}
+    if not isinstance(data, dict):
+        return {'message': "Se requiere el campo 'message'."}
+    message = data.get('message')
+    if not isinstance(message, str) or not message.strip():
+        errors['message'] = "Se requiere el campo 'message'."
+    elif len(message) > MAX_MESSAGE_LENGTH:
+        errors['message'] = f"El mensaje no puede superar {MAX_MESSAGE_LENGTH} caracteres."
+    for field, enum, label in (('type', NotificationType, 'Tipo'), ('role', Role, 'Rol')):
+        value = data.get(field)
+        if value and (not isinstance(value, str) or value not in enum.__members__):
+            errors[field] = f"{label} no válido. Opciones: {', '.join(enum.__members__)}."
+    if data.get('site_id') is not None and (not isinstance(data['site_id'], int) or isinstance(data['site_id'], bool)):
+        errors['site_id'] = "El campo 'site_id' debe ser un entero."
+    return errors
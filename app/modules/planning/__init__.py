@@ -0,0 +1 @@
+# This file makes the 'planning' directory a Python package
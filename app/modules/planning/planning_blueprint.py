@@ -0,0 +1,89 @@
+from datetime import date
+import click
+from flask import Blueprint, jsonify, request
+from sqlalchemy import select
+from app.models import db, Site
+from .planning_service import plan_site, replan_task, get_plan, DEFAULT_HORIZON_DAYS
+from .validations import validate_plan_params, validate_replan_data
+
+planning_bp = Blueprint(
+    'planning',
+    __name__,
+    url_prefix='/planning'
+)
+
+# --- Rutas de la API (JSON) ---
+
+@planning_bp.route('/api/plan', methods=['POST'])
+def api_plan_site():
+    """
+    Genera el plan nivelado de una planta para el horizonte indicado.
+    """
+    data = request.get_json(silent=True) or {}
+    errors = validate_plan_params(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    result, error = plan_site(
+        int(data['site_id']),
+        start=date.fromisoformat(data['start']) if data.get('start') else None,
+        horizon_days=int(data.get('horizon_days') or DEFAULT_HORIZON_DAYS),
+    )
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 201
+
+@planning_bp.route('/api/plan', methods=['GET'])
+def api_get_plan():
+    args = request.args.to_dict()
+    errors = validate_plan_params(args)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    tasks, error = get_plan(
+        int(args['site_id']),
+        start=date.fromisoformat(args['start']) if args.get('start') else None,
+        end=date.fromisoformat(args['end']) if args.get('end') else None,
+        user_id=int(args['user_id']) if args.get('user_id') else None,
+    )
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify([task.to_dict() for task in tasks]), 200
+
+@planning_bp.route('/api/replan', methods=['POST'])
+def api_replan_task():
+    """
+    Re-planifica solo la OT o el preventivo indicado, sin rehacer el plan.
+    """
+    data = request.get_json(silent=True) or {}
+    errors = validate_replan_data(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    if data.get('work_order_id') is not None:
+        result, error = replan_task('work_order', int(data['work_order_id']))
+    else:
+        result, error = replan_task('preventive', int(data['preventive_schedule_id']))
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 200
+
+# --- Comandos CLI ---
+
+@planning_bp.cli.command('plan')
+@click.option('--site-id', type=int, default=None, help='Por defecto, todas las plantas.')
+@click.option('--horizon-days', default=DEFAULT_HORIZON_DAYS, show_default=True)
+def plan_command(site_id, horizon_days):
+    """
+    Planifica preventivos y OTs abiertas según la capacidad: flask planning plan
+    """
+    site_ids = [site_id] if site_id else db.session.execute(select(Site.id)).scalars().all()
+    for sid in site_ids:
+        result, error = plan_site(sid, horizon_days=horizon_days)
+        if error:
+            raise click.ClickException(error['message'])
+        click.echo(
+            f"Planta {sid}: {result['planned']}/{result['tasks']} tareas planificadas, "
+            f"{result['late']} con atraso, ocupación máxima {result['max_utilization']:.0%} "
+            f"({result['solve_seconds']}s)"
+        )
@@ -0,0 +1,281 @@
+import time
+from datetime import date, timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import (
+    db, Asset, Checklist, PlannedTask, PreventiveSchedule, Role, TechnicianAvailability,
+    Site, User, UserSkill, WorkOrder, WorkOrderStatus
+)
+from .solver import PlanningProblem, solve
+
+DEFAULT_HORIZON_DAYS = 28
+DEFAULT_DAILY_MINUTES = 480
+DEFAULT_WORKDAYS = (0, 1, 2, 3, 4)      # Lunes a viernes
+DEFAULT_TASK_MINUTES = 60
+PREVENTIVE_EARLY_DAYS = 3               # Un preventivo puede adelantarse hasta 3 días
+# Plazo objetivo de una OT abierta según su prioridad (días desde su creación)
+PRIORITY_DUE_DAYS = {'urgent': 0, 'high': 2, 'medium': 7, 'low': 14}
+OPEN_STATUSES = (WorkOrderStatus.created, WorkOrderStatus.approved, WorkOrderStatus.assigned)
+
+
+def _checklist_requirements(tasks):
+    """
+    Duración (suma de 'estimated_minutes') y habilidad ('skill_id' de la
+    primera tarea que la declare) de un checklist.
+    """
+    tasks = tasks if isinstance(tasks, list) else []
+    minutes = sum(t.get('estimated_minutes') or 0 for t in tasks if isinstance(t, dict))
+    skill = next((t['skill_id'] for t in tasks if isinstance(t, dict) and t.get('skill_id')), None)
+    return minutes, skill
+
+
+def _preventive_tasks(site_id, end, schedule_id=None):
+    query = (
+        select(PreventiveSchedule.id, PreventiveSchedule.asset_id, PreventiveSchedule.next_due, Checklist.tasks)
+        .join(Asset, Asset.id == PreventiveSchedule.asset_id)
+        .outerjoin(Checklist, Checklist.id == PreventiveSchedule.checklist_id)
+        .where(Asset.site_id == site_id, PreventiveSchedule.next_due.isnot(None), PreventiveSchedule.next_due <= end)
+    )
+    if schedule_id is not None:
+        query = query.where(PreventiveSchedule.id == schedule_id)
+    tasks = []
+    for schedule_id_, asset_id, next_due, checklist_tasks in db.session.execute(query):
+        minutes, skill = _checklist_requirements(checklist_tasks)
+        tasks.append({
+            'source_type': 'preventive', 'source_id': schedule_id_, 'asset_id': asset_id,
+            'due_date': next_due, 'earliest_date': next_due - timedelta(days=PREVENTIVE_EARLY_DAYS),
+            'duration': minutes or DEFAULT_TASK_MINUTES, 'skill_id': skill,
+        })
+    return tasks
+
+
+def _work_order_tasks(site_id, work_order_id=None):
+    query = (
+        select(WorkOrder.id, WorkOrder.asset_id, WorkOrder.priority, WorkOrder.estimated_time, WorkOrder.created_date)
+        .where(WorkOrder.site_id == site_id, WorkOrder.status.in_(OPEN_STATUSES))
+    )
+    if work_order_id is not None:
+        query = query.where(WorkOrder.id == work_order_id)
+    rows = db.session.execute(query).all()
+    if not rows:
+        return []
+
+    skills = {}
+    for wo_id, checklist_tasks in db.session.execute(
+        select(Checklist.work_order_id, Checklist.tasks).where(Checklist.work_order_id.in_([r[0] for r in rows]))
+    ):
+        _, skill = _checklist_requirements(checklist_tasks)
+        if skill and wo_id not in skills:
+            skills[wo_id] = skill
+
+    tasks = []
+    today = date.today()
+    for wo_id, asset_id, priority, estimated_time, created in rows:
+        created_day = created.date() if created else today
+        due = created_day + timedelta(days=PRIORITY_DUE_DAYS.get(priority.name if priority else 'medium', 7))
+        tasks.append({
+            'source_type': 'work_order', 'source_id': wo_id, 'asset_id': asset_id,
+            'due_date': due, 'earliest_date': today,
+            # estimated_time se carga en horas en el formulario
+            'duration': int(estimated_time * 60) if estimated_time else DEFAULT_TASK_MINUTES,
+            'skill_id': skills.get(wo_id),
+        })
+    return tasks
+
+
+def _build_problem(site_id, start, horizon_days):
+    """
+    Grilla técnico x día con la capacidad de cada técnico de la planta y su
+    matriz de habilidades.
+    """
+    config = current_app.config
+    daily_minutes = config.get('PLANNING_DAILY_MINUTES', DEFAULT_DAILY_MINUTES)
+    workdays = set(config.get('PLANNING_WORKDAYS', DEFAULT_WORKDAYS))
+
+    tech_ids = db.session.execute(
+        select(User.id).where(User.role == Role.technician, User.site_id == site_id).order_by(User.id)
+    ).scalars().all()
+    days = [start + timedelta(days=i) for i in range(horizon_days)]
+    tech_pos = {t: i for i, t in enumerate(tech_ids)}
+
+    base = np.array([daily_minutes if d.weekday() in workdays else 0 for d in days], dtype=np.float64)
+    capacity = np.tile(base, (len(tech_ids), 1))
+    if tech_ids:
+        for user_id, day, minutes in db.session.execute(
+            select(TechnicianAvailability.user_id, TechnicianAvailability.day, TechnicianAvailability.available_minutes)
+            .where(TechnicianAvailability.user_id.in_(tech_ids),
+                   TechnicianAvailability.day >= start, TechnicianAvailability.day < start + timedelta(days=horizon_days))
+        ):
+            capacity[tech_pos[user_id], (day - start).days] = minutes
+
+    skill_rows = db.session.execute(
+        select(UserSkill.user_id, UserSkill.skill_id).where(UserSkill.user_id.in_(tech_ids))
+    ).all() if tech_ids else []
+    skill_ids = sorted({s for _, s in skill_rows})
+    skill_pos = {s: i for i, s in enumerate(skill_ids)}
+    skills = np.zeros((len(tech_ids), len(skill_ids)), dtype=bool)
+    for user_id, skill_id in skill_rows:
+        skills[tech_pos[user_id], skill_pos[skill_id]] = True
+
+    return PlanningProblem(capacity, skills), np.array(tech_ids, dtype=np.int64), tech_pos, skill_pos
+
+
+def _task_arrays(tasks, start, horizon_days, skill_pos):
+    last = horizon_days - 1
+    duration = np.array([t['duration'] for t in tasks], dtype=np.float64)
+    due = np.array([min(max((t['due_date'] - start).days, 0), last) for t in tasks], dtype=np.int64)
+    earliest = np.array([min(max((t['earliest_date'] - start).days, 0), last) for t in tasks], dtype=np.int64)
+    # Una habilidad que ningún técnico tiene deja la tarea sin candidatos
+    skill = np.array([skill_pos.get(t['skill_id'], -2) if t['skill_id'] else -1 for t in tasks], dtype=np.int64)
+    return duration, due, earliest, skill
+
+
+def _planned_row(task, site_id, user_id, planned_date):
+    return {
+        'source_type': task['source_type'], 'source_id': task['source_id'], 'site_id': site_id,
+        'asset_id': task['asset_id'], 'user_id': user_id, 'skill_id': task['skill_id'],
+        'planned_date': planned_date, 'due_date': task['due_date'], 'duration_minutes': int(task['duration']),
+    }
+
+
+def plan_site(site_id, start=None, horizon_days=DEFAULT_HORIZON_DAYS):
+    """
+    Planifica desde cero los preventivos que vencen en el horizonte y las OTs
+    abiertas de una planta, y reemplaza su plan guardado.
+    """
+    start = start or date.today()
+    end = start + timedelta(days=horizon_days - 1)
+    try:
+        tasks = _preventive_tasks(site_id, end) + _work_order_tasks(site_id)
+        problem, tech_ids, _, skill_pos = _build_problem(site_id, start, horizon_days)
+        duration, due, earliest, skill = _task_arrays(tasks, start, horizon_days, skill_pos)
+
+        started = time.perf_counter()
+        seconds = current_app.config.get('PLANNING_LOCAL_SEARCH_SECONDS', 2.0)
+        if len(tech_ids) and tasks:
+            tech_of, day_of = solve(problem, duration, due, earliest, skill, local_search_seconds=seconds)
+        else:
+            tech_of = day_of = np.full(len(tasks), -1, dtype=np.int64)
+        solve_seconds = time.perf_counter() - started
+
+        rows = [
+            _planned_row(task, site_id, int(tech_ids[t]) if t >= 0 else None,
+                         start + timedelta(days=int(d)) if t >= 0 else None)
+            for task, t, d in zip(tasks, tech_of.tolist(), day_of.tolist())
+        ]
+        db.session.execute(delete(PlannedTask).where(PlannedTask.site_id == site_id))
+        if rows:
+            db.session.execute(insert(PlannedTask), rows)
+        db.session.commit()
+
+        placed = tech_of >= 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            utilization = problem.load[problem.capacity > 0] / problem.capacity[problem.capacity > 0]
+        return {
+            'site_id': site_id,
+            'start': start.isoformat(),
+            'horizon_days': horizon_days,
+            'technicians': len(tech_ids),
+            'tasks': len(tasks),
+            'planned': int(placed.sum()),
+            'unscheduled': int((~placed).sum()),
+            'late': int((placed & (day_of > due)).sum()),
+            'max_utilization': round(float(utilization.max()), 3) if utilization.size else 0.0,
+            'mean_utilization': round(float(utilization.mean()), 3) if utilization.size else 0.0,
+            'solve_seconds': round(solve_seconds, 3),
+        }, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al planificar: {e}", 'status': 500}
+
+
+def plan_all_sites(horizon_days=DEFAULT_HORIZON_DAYS):
+    """
+    Planifica todas las plantas (comando CLI y trabajo programado).
+    """
+    try:
+        site_ids = db.session.execute(select(Site.id).order_by(Site.id)).scalars().all()
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al planificar: {e}", 'status': 500}
+    results = []
+    for site_id in site_ids:
+        result, error = plan_site(site_id, horizon_days=horizon_days)
+        if error:
+            return None, error
+        results.append(result)
+    return results, None
+
+
+def replan_task(source_type, source_id):
+    """
+    Re-planificación incremental de una sola tarea (una OT o un preventivo que
+    cambió): el resto del plan queda fijo como carga ya ocupada y solo se busca
+    el mejor hueco para esta tarea, o se la quita si ya no corresponde.
+    """
+    try:
+        if source_type == 'work_order':
+            site_id = db.session.execute(select(WorkOrder.site_id).where(WorkOrder.id == source_id)).scalar()
+        else:
+            site_id = db.session.execute(
+                select(Asset.site_id).join(PreventiveSchedule, PreventiveSchedule.asset_id == Asset.id)
+                .where(PreventiveSchedule.id == source_id)
+            ).scalar()
+        source_filter = (PlannedTask.source_type == source_type, PlannedTask.source_id == source_id)
+        if site_id is None:
+            db.session.execute(delete(PlannedTask).where(*source_filter))
+            db.session.commit()
+            return {'source_type': source_type, 'source_id': source_id, 'removed': True}, None
+
+        start = date.today()
+        last_planned = db.session.execute(
+            select(func.max(PlannedTask.planned_date)).where(PlannedTask.site_id == site_id)
+        ).scalar()
+        horizon_days = max(DEFAULT_HORIZON_DAYS, (last_planned - start).days + 1 if last_planned else 0)
+        end = start + timedelta(days=horizon_days - 1)
+
+        if source_type == 'work_order':
+            tasks = _work_order_tasks(site_id, work_order_id=source_id)
+        else:
+            tasks = _preventive_tasks(site_id, end, schedule_id=source_id)
+        db.session.execute(delete(PlannedTask).where(*source_filter))
+        if not tasks:
+            db.session.commit()
+            return {'source_type': source_type, 'source_id': source_id, 'removed': True}, None
+
+        problem, tech_ids, tech_pos, skill_pos = _build_problem(site_id, start, horizon_days)
+        for user_id, planned_date, minutes in db.session.execute(
+            select(PlannedTask.user_id, PlannedTask.planned_date, PlannedTask.duration_minutes)
+            .where(PlannedTask.site_id == site_id, PlannedTask.planned_date >= start, PlannedTask.planned_date <= end)
+        ):
+            if user_id in tech_pos:
+                problem.place(tech_pos[user_id], (planned_date - start).days, minutes)
+
+        task = tasks[0]
+        duration, due, earliest, skill = _task_arrays(tasks, start, horizon_days, skill_pos)
+        slot = problem.best_slot(duration[0], due[0], earliest[0], skill[0]) if len(tech_ids) else None
+        row = _planned_row(task, site_id, int(tech_ids[slot[0]]) if slot else None,
+                           start + timedelta(days=slot[1]) if slot else None)
+        planned = PlannedTask(**row)
+        db.session.add(planned)
+        db.session.commit()
+        return planned.to_dict(), None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al re-planificar: {e}", 'status': 500}
+
+
+def get_plan(site_id, start=None, end=None, user_id=None):
+    try:
+        query = select(PlannedTask).where(PlannedTask.site_id == site_id)
+        if start:
+            query = query.where(PlannedTask.planned_date >= start)
+        if end:
+            query = query.where(PlannedTask.planned_date <= end)
+        if user_id:
+            query = query.where(PlannedTask.user_id == user_id)
+        query = query.order_by(PlannedTask.planned_date, PlannedTask.user_id, PlannedTask.id)
+        return db.session.execute(query).scalars().all(), None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al consultar el plan: {e}", 'status': 500}
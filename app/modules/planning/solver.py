@@ -0,0 +1,131 @@
+import time
+import numpy as np
+
+LATE_PENALTY = 1.0      # Por día de atraso: domina sobre la nivelación
+EARLY_PENALTY = 0.05    # Por día de adelanto dentro de la ventana permitida
+DEFAULT_LOCAL_SEARCH_SECONDS = 2.0
+DEFAULT_LOCAL_SEARCH_PASSES = 3
+
+
+class PlanningProblem:
+    """
+    Carga de trabajo sobre una grilla técnico x día.
+
+    capacity: minutos disponibles (T x D); skills: técnico x habilidad (T x S).
+    Las tareas son arreglos paralelos: duración (min), día de vencimiento y
+    primer día permitido (índices sobre la grilla) y habilidad requerida (-1 = ninguna).
+    """
+
+    def __init__(self, capacity, skills):
+        self.capacity = np.asarray(capacity, dtype=np.float64)
+        self.load = np.zeros_like(self.capacity)
+        self.n_techs, self.n_days = self.capacity.shape
+        all_techs = np.arange(self.n_techs)
+        self._techs_by_skill = {-1: all_techs}
+        for s in range(skills.shape[1]):
+            self._techs_by_skill[s] = np.flatnonzero(skills[:, s])
+        self._day_index = np.arange(self.n_days)
+
+    def eligible(self, skill):
+        return self._techs_by_skill.get(skill, self._techs_by_skill[-1][:0])
+
+    def penalty(self, days, due):
+        return LATE_PENALTY * np.maximum(days - due, 0) + EARLY_PENALTY * np.maximum(due - days, 0)
+
+    def best_slot(self, duration, due, earliest, skill):
+        """
+        Celda (técnico, día) más conveniente para una tarea: primero dentro de
+        [earliest, due], luego con atraso. Minimiza la ocupación resultante de
+        la celda más la penalización por adelanto/atraso. None si no cabe.
+        """
+        techs = self.eligible(skill)
+        if not len(techs):
+            return None
+        on_time_end = min(self.n_days, max(due, earliest) + 1)
+        for lo, hi in ((earliest, on_time_end), (on_time_end, self.n_days)):
+            if lo >= hi:
+                continue
+            cap = self.capacity[techs, lo:hi]
+            after = self.load[techs, lo:hi] + duration
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cost = after / cap + self.penalty(self._day_index[lo:hi], due)
+            cost[after > cap] = np.inf
+            flat = int(np.argmin(cost))
+            if np.isfinite(cost.flat[flat]):
+                t, d = divmod(flat, hi - lo)
+                return int(techs[t]), int(lo + d)
+        return None
+
+    def place(self, tech, day, duration):
+        self.load[tech, day] += duration
+
+    def remove(self, tech, day, duration):
+        self.load[tech, day] -= duration
+
+
+def solve(problem, duration, due, earliest, skill, local_search_seconds=DEFAULT_LOCAL_SEARCH_SECONDS,
+          passes=DEFAULT_LOCAL_SEARCH_PASSES):
+    """
+    Greedy (vencimiento más próximo primero, las largas antes) y búsqueda local
+    que mueve tareas desde las celdas más cargadas mientras baje el costo
+    Σ(ocupación²) + penalizaciones. Devuelve (técnico, día) por tarea (-1 = sin lugar).
+    """
+    n = len(duration)
+    tech_of = np.full(n, -1, dtype=np.int64)
+    day_of = np.full(n, -1, dtype=np.int64)
+
+    for i in np.lexsort((-duration, due)):
+        slot = problem.best_slot(duration[i], due[i], earliest[i], skill[i])
+        if slot is not None:
+            tech_of[i], day_of[i] = slot
+            problem.place(slot[0], slot[1], duration[i])
+
+    deadline = time.monotonic() + local_search_seconds
+    for _ in range(passes):
+        if _improve(problem, duration, due, earliest, skill, tech_of, day_of, deadline) == 0:
+            break
+        if time.monotonic() >= deadline:
+            break
+    return tech_of, day_of
+
+
+def _improve(problem, duration, due, earliest, skill, tech_of, day_of, deadline):
+    """
+    Una pasada de búsqueda local. El delta de mover una tarea se evalúa para
+    todas las celdas candidatas a la vez: solo cambian la celda de origen y la
+    de destino, así que no hace falta recalcular el costo total.
+    """
+    cap, load = problem.capacity, problem.load
+    placed = np.flatnonzero(tech_of >= 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        source_ratio = load[tech_of[placed], day_of[placed]] / cap[tech_of[placed], day_of[placed]]
+    moves = 0
+    for count, i in enumerate(placed[np.argsort(-source_ratio, kind='stable')]):
+        if count % 256 == 0 and time.monotonic() >= deadline:
+            break
+        techs = problem.eligible(skill[i])
+        if len(techs) < 1:
+            continue
+        t0, d0, dur = tech_of[i], day_of[i], duration[i]
+        lo = earliest[i]
+        c0 = cap[t0, d0]
+        gain_source = ((load[t0, d0] - dur) ** 2 - load[t0, d0] ** 2) / (c0 * c0)
+        sub_cap = cap[techs, lo:]
+        sub_load = load[techs, lo:]
+        after = sub_load + dur
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = (after ** 2 - sub_load ** 2) / (sub_cap * sub_cap) + gain_source
+            delta += problem.penalty(problem._day_index[lo:], due[i]) - problem.penalty(d0, due[i])
+        delta[after > sub_cap] = np.inf
+        # La celda actual no es un destino válido
+        current = np.flatnonzero(techs == t0)
+        if len(current) and d0 >= lo:
+            delta[current[0], d0 - lo] = np.inf
+        flat = int(np.argmin(delta))
+        if delta.flat[flat] < -1e-9:
+            t, d = divmod(flat, delta.shape[1])
+            problem.remove(t0, d0, dur)
+            tech_of[i], day_of[i] = techs[t], lo + d
+            problem.place(tech_of[i], day_of[i], dur)
+            moves += 1
+    return moves
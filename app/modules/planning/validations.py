@@ -0,0 +1,55 @@
+from datetime import date
+
+MAX_HORIZON_DAYS = 180
+
+
+def validate_plan_params(data):
+    """
+    Valida los parámetros de planificación: 'site_id' (obligatorio), 'start'
+    (YYYY-MM-DD) y 'horizon_days'.
+    """
+    if not isinstance(data, dict):
+        return {'general': "Se esperaba un objeto JSON."}
+    errors = {}
+    try:
+        if int(data.get('site_id')) <= 0:
+            raise ValueError
+    except (ValueError, TypeError):
+        errors['site_id'] = "El campo 'site_id' es obligatorio y debe ser un entero positivo."
+
+    for field in ['start', 'end']:
+        if data.get(field):
+            try:
+                date.fromisoformat(data[field])
+            except (ValueError, TypeError):
+                errors[field] = f"El campo '{field}' debe tener formato YYYY-MM-DD."
+
+    for field in ['horizon_days', 'user_id']:
+        if data.get(field) in (None, ''):
+            continue
+        try:
+            if int(data[field]) <= 0:
+                raise ValueError
+        except (ValueError, TypeError):
+            errors[field] = f"El campo '{field}' debe ser un entero positivo."
+    if 'horizon_days' not in errors and data.get('horizon_days') and int(data['horizon_days']) > MAX_HORIZON_DAYS:
+        errors['horizon_days'] = f"El horizonte máximo es de {MAX_HORIZON_DAYS} días."
+    return errors
+
+
+def validate_replan_data(data):
+    """
+    Exactamente uno de 'work_order_id' o 'preventive_schedule_id'.
+    """
+    if not isinstance(data, dict):
+        return {'general': "Se esperaba un objeto JSON."}
+    errors = {}
+    keys = [k for k in ('work_order_id', 'preventive_schedule_id') if data.get(k) is not None]
+    if len(keys) != 1:
+        errors['source'] = "Indique 'work_order_id' o 'preventive_schedule_id' (solo uno)."
+        return errors
+    try:
+        int(data[keys[0]])
+    except (ValueError, TypeError):
+        errors[keys[0]] = f"El campo '{keys[0]}' debe ser un número entero."
+    return errors
@@ -0,0 +1 @@
+# This file makes the 'predictive' directory a Python package
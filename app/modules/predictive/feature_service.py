@@ -0,0 +1,122 @@
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import select, func
+from app.models import (
+    db, SensorReading, SensorType, WorkOrder, WorkOrderType, WorkOrderStatus, PreventiveSchedule
+)
+
+FEATURES = ('rms', 'slope', 'peaks', 'days_since_pm', 'corrective_rate')
+
+DEFAULT_WINDOW_DAYS = 30
+DEFAULT_SENSOR_TYPE = SensorType.vibration
+PEAK_SIGMAS = 3.0               # Pico: lectura sobre la media + 3 desviaciones del propio activo
+CORRECTIVE_LOOKBACK_DAYS = 365
+MAX_DAYS_SINCE_PM = 365.0       # Tope para activos sin preventivo registrado
+READINGS_BATCH_SIZE = 50000
+
+
+def _sensor_features(asset_ids, as_of, window_days, sensor_type):
+    """
+    RMS, pendiente (unidades/día, mínimos cuadrados), picos y número de lecturas
+    de cada activo en la ventana (as_of - window_days, as_of].
+
+    Las lecturas se leen por lotes y se agregan con np.bincount sobre la
+    posición del activo: ninguna operación es por activo en Python.
+    """
+    since = as_of - timedelta(days=window_days)
+    k = len(asset_ids)
+    query = (
+        select(SensorReading.asset_id, SensorReading.reading_date, SensorReading.value)
+        .where(
+            SensorReading.asset_id.in_(asset_ids.tolist()),
+            SensorReading.sensor_type == sensor_type,
+            SensorReading.reading_date > since,
+            SensorReading.reading_date <= as_of,
+            SensorReading.value.isnot(None),
+        )
+        .execution_options(yield_per=READINGS_BATCH_SIZE)
+    )
+    positions, days, values = [], [], []
+    origin = np.datetime64(since, 'us')
+    for rows in db.session.execute(query).partitions():
+        ids, dates, vals = zip(*rows)
+        positions.append(np.searchsorted(asset_ids, np.fromiter(ids, dtype=np.int64, count=len(ids))))
+        days.append((np.array(dates, dtype='datetime64[us]') - origin) / np.timedelta64(1, 'D'))
+        values.append(np.fromiter((float(v) for v in vals), dtype=np.float64, count=len(vals)))
+
+    if not positions:
+        zeros = np.zeros(k)
+        return zeros, zeros.copy(), zeros.copy(), np.zeros(k, dtype=np.int64)
+
+    pos = np.concatenate(positions)
+    t = np.concatenate(days)
+    v = np.concatenate(values)
+
+    n = np.bincount(pos, minlength=k).astype(np.float64)
+    sum_v = np.bincount(pos, weights=v, minlength=k)
+    sum_vv = np.bincount(pos, weights=v * v, minlength=k)
+    sum_t = np.bincount(pos, weights=t, minlength=k)
+    sum_tt = np.bincount(pos, weights=t * t, minlength=k)
+    sum_tv = np.bincount(pos, weights=t * v, minlength=k)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rms = np.where(n > 0, np.sqrt(sum_vv / n), 0.0)
+        denominator = n * sum_tt - sum_t * sum_t
+        slope = np.where(denominator > 1e-12, (n * sum_tv - sum_t * sum_v) / denominator, 0.0)
+        mean = np.where(n > 0, sum_v / n, 0.0)
+        std = np.sqrt(np.maximum(np.where(n > 0, sum_vv / n, 0.0) - mean * mean, 0.0))
+
+    threshold = mean + PEAK_SIGMAS * std
+    is_peak = (std[pos] > 0) & (v > threshold[pos])
+    peaks = np.bincount(pos, weights=is_peak, minlength=k)
+    return rms, slope, peaks, n.astype(np.int64)
+
+
+def _work_order_features(asset_ids, as_of):
+    """
+    Días desde el último preventivo cerrado (o ejecutado según su plan) y
+    correctivos por año en los últimos CORRECTIVE_LOOKBACK_DAYS días.
+    """
+    ids = asset_ids.tolist()
+    k = len(asset_ids)
+
+    last_pm = np.full(k, -np.inf)
+    pm_rows = db.session.execute(
+        select(WorkOrder.asset_id, func.max(WorkOrder.end_date))
+        .where(WorkOrder.asset_id.in_(ids), WorkOrder.type == WorkOrderType.preventive,
+               WorkOrder.status == WorkOrderStatus.closed, WorkOrder.end_date <= as_of)
+        .group_by(WorkOrder.asset_id)
+    ).all()
+    schedule_rows = db.session.execute(
+        select(PreventiveSchedule.asset_id, func.max(PreventiveSchedule.last_executed))
+        .where(PreventiveSchedule.asset_id.in_(ids), PreventiveSchedule.last_executed <= as_of.date())
+        .group_by(PreventiveSchedule.asset_id)
+    ).all()
+    for asset_id, last in pm_rows + schedule_rows:
+        if last is not None:
+            position = np.searchsorted(asset_ids, asset_id)
+            last_pm[position] = max(last_pm[position], last.toordinal())
+    days_since_pm = np.minimum(as_of.toordinal() - last_pm, MAX_DAYS_SINCE_PM)
+
+    corrective_counts = np.zeros(k)
+    since = as_of - timedelta(days=CORRECTIVE_LOOKBACK_DAYS)
+    for asset_id, count in db.session.execute(
+        select(WorkOrder.asset_id, func.count(WorkOrder.id))
+        .where(WorkOrder.asset_id.in_(ids), WorkOrder.type == WorkOrderType.corrective,
+               WorkOrder.created_date > since, WorkOrder.created_date <= as_of)
+        .group_by(WorkOrder.asset_id)
+    ):
+        corrective_counts[np.searchsorted(asset_ids, asset_id)] = count
+    corrective_rate = corrective_counts * 365.0 / CORRECTIVE_LOOKBACK_DAYS
+    return days_since_pm, corrective_rate
+
+
+def compute_features(asset_ids, as_of, window_days=DEFAULT_WINDOW_DAYS, sensor_type=DEFAULT_SENSOR_TYPE):
+    """
+    Matriz (activos x FEATURES) a la fecha 'as_of' (datetime) y el número de
+    lecturas usadas por activo. 'asset_ids' debe venir ordenado.
+    """
+    asset_ids = np.asarray(asset_ids, dtype=np.int64)
+    rms, slope, peaks, counts = _sensor_features(asset_ids, as_of, window_days, sensor_type)
+    days_since_pm, corrective_rate = _work_order_features(asset_ids, as_of)
+    return np.column_stack([rms, slope, peaks, days_since_pm, corrective_rate]), counts
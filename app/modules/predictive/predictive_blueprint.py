@@ -0,0 +1,97 @@
+import click
+from flask import Blueprint, jsonify, request
+from .risk_service import (
+    refresh_scores, get_ranking, create_predictive_orders, train_model,
+    DEFAULT_ORDER_THRESHOLD, DEFAULT_TRAINING_SNAPSHOTS, DEFAULT_SNAPSHOT_STEP_DAYS, DEFAULT_HORIZON_DAYS
+)
+from .validations import validate_ranking_params
+
+predictive_bp = Blueprint(
+    'predictive',
+    __name__,
+    url_prefix='/predictive'
+)
+
+# --- Rutas de la API (JSON) ---
+
+@predictive_bp.route('/api/ranking', methods=['GET'])
+def api_get_ranking():
+    """
+    Activos ordenados por riesgo de falla (desde el caché de puntajes).
+    """
+    args = request.args.to_dict()
+    errors = validate_ranking_params(args)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    ranking, error = get_ranking(
+        site_id=int(args['site_id']) if args.get('site_id') else None,
+        limit=int(args.get('limit') or 50),
+        min_score=float(args.get('min_score') or 0.0),
+    )
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(ranking), 200
+
+@predictive_bp.route('/api/refresh', methods=['POST'])
+def api_refresh_scores():
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'errors': {'general': "Se esperaba un objeto JSON."}}), 400
+    result, error = refresh_scores(full=bool(data.get('full')))
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 200
+
+@predictive_bp.route('/api/work-orders', methods=['POST'])
+def api_create_predictive_orders():
+    """
+    Crea OTs predictivas para los activos sobre el umbral de riesgo.
+    """
+    data = request.get_json(silent=True) or {}
+    errors = validate_ranking_params(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    orders, error = create_predictive_orders(
+        threshold=float(data.get('threshold') or DEFAULT_ORDER_THRESHOLD),
+        site_id=int(data['site_id']) if data.get('site_id') else None,
+        user_id=data.get('user_id'),
+    )
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify([order.to_dict() for order in orders]), 201
+
+# --- Comandos CLI ---
+
+@predictive_bp.cli.command('refresh')
+@click.option('--full', is_flag=True, help='Recalcula todos los activos.')
+@click.option('--create-orders', is_flag=True, help='Crea OTs predictivas sobre el umbral.')
+@click.option('--threshold', default=DEFAULT_ORDER_THRESHOLD, show_default=True)
+def refresh_command(full, create_orders, threshold):
+    """
+    Actualiza el caché de puntajes de riesgo: flask predictive refresh
+    """
+    result, error = refresh_scores(full=full)
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"Activos recalculados: {result['refreshed']} (modelo {result['model_version']})")
+    if create_orders:
+        orders, error = create_predictive_orders(threshold=threshold)
+        if error:
+            raise click.ClickException(error['message'])
+        click.echo(f"OTs predictivas creadas: {len(orders)}")
+
+@predictive_bp.cli.command('train')
+@click.option('--snapshots', default=DEFAULT_TRAINING_SNAPSHOTS, show_default=True)
+@click.option('--step-days', default=DEFAULT_SNAPSHOT_STEP_DAYS, show_default=True)
+@click.option('--horizon-days', default=DEFAULT_HORIZON_DAYS, show_default=True)
+def train_command(snapshots, step_days, horizon_days):
+    """
+    Entrena el modelo de riesgo con el historial local: flask predictive train
+    """
+    result, error = train_model(snapshots=snapshots, step_days=step_days, horizon_days=horizon_days)
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"Modelo {result['version']} guardado en {result['path']} - "
+               f"Muestras: {result['samples']} - Positivos: {result['positives']} - AUC: {result['auc']}")
@@ -0,0 +1,117 @@
+import json
+import os
+from datetime import datetime
+import numpy as np
+from flask import current_app
+from .feature_service import FEATURES
+
+MODEL_FILENAME = 'predictive_model.json'
+
+# Modelo de partida mientras no se entrene uno con datos locales: pesos
+# heurísticos sobre features estandarizadas (más vibración, tendencia al alza,
+# picos, preventivo atrasado y fallas frecuentes => más riesgo).
+DEFAULT_MODEL = {
+    'version': 'default',
+    'features': list(FEATURES),
+    'mean': [1.0, 0.0, 1.0, 90.0, 1.0],
+    'scale': [1.0, 0.05, 3.0, 90.0, 2.0],
+    'weights': [0.8, 0.6, 0.7, 0.5, 0.9],
+    'bias': -2.0,
+}
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class RiskModel:
+    """
+    Regresión logística sobre features estandarizadas. Se entrena fuera de
+    línea con NumPy (CPU) y se guarda como JSON en la carpeta instance.
+    """
+
+    def __init__(self, mean, scale, weights, bias, version, features=FEATURES, metrics=None):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.version = version
+        self.features = list(features)
+        self.metrics = metrics or {}
+
+    def predict(self, X):
+        return _sigmoid(((X - self.mean) / self.scale) @ self.weights + self.bias)
+
+    @classmethod
+    def fit(cls, X, y, l2=1.0, iterations=2000, learning_rate=0.1):
+        """
+        Descenso de gradiente por lotes completos con regularización L2 y
+        clases balanceadas (las fallas son pocas frente a los casos sanos).
+        """
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        Z = (X - mean) / scale
+        n, k = Z.shape
+        positives = max(y.sum(), 1.0)
+        sample_weight = np.where(y == 1, n / (2.0 * positives), n / (2.0 * max(n - positives, 1.0)))
+
+        weights = np.zeros(k)
+        bias = 0.0
+        for _ in range(iterations):
+            error = (_sigmoid(Z @ weights + bias) - y) * sample_weight
+            weights -= learning_rate * (Z.T @ error / n + l2 * weights / n)
+            bias -= learning_rate * error.mean()
+
+        model = cls(mean, scale, weights, bias, version=datetime.utcnow().strftime('%Y%m%d%H%M%S'))
+        model.metrics = {'samples': int(n), 'positives': int(y.sum()), 'auc': roc_auc(y, model.predict(X))}
+        return model
+
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'features': self.features,
+            'mean': self.mean.tolist(),
+            'scale': self.scale.tolist(),
+            'weights': self.weights.tolist(),
+            'bias': self.bias,
+            'metrics': self.metrics,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['mean'], data['scale'], data['weights'], data['bias'],
+                   data['version'], data.get('features', FEATURES), data.get('metrics'))
+
+
+def roc_auc(y, scores):
+    """
+    AUC por rangos (Mann-Whitney); None si solo hay una clase.
+    """
+    positives = y.sum()
+    negatives = len(y) - positives
+    if positives == 0 or negatives == 0:
+        return None
+    ranks = np.empty(len(scores))
+    ranks[np.argsort(scores, kind='mergesort')] = np.arange(1, len(scores) + 1)
+    return float((ranks[y == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def model_path():
+    return current_app.config.get('PREDICTIVE_MODEL_PATH') or os.path.join(current_app.instance_path, MODEL_FILENAME)
+
+
+def load_model():
+    path = model_path()
+    if not os.path.exists(path):
+        return RiskModel.from_dict(DEFAULT_MODEL)
+    with open(path) as f:
+        return RiskModel.from_dict(json.load(f))
+
+
+def save_model(model):
+    path = model_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(model.to_dict(), f, indent=2)
+    return path
@@ -0,0 +1,191 @@
+from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import select, delete, insert, func, or_
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import (
+    db, Asset, AssetRiskScore, SensorReading, WorkOrder, WorkOrderType, WorkOrderStatus
+)
+from app.modules.maintenance.corrective_service import calculate_priority
+from .feature_service import compute_features, DEFAULT_WINDOW_DAYS
+from .risk_model import RiskModel, load_model, save_model
+
+ASSET_BATCH_SIZE = 500
+DEFAULT_MAX_AGE_HOURS = 24      # Los días desde el último PM cambian aunque no lleguen datos
+DEFAULT_TRAINING_SNAPSHOTS = 12
+DEFAULT_SNAPSHOT_STEP_DAYS = 30
+DEFAULT_HORIZON_DAYS = 30
+DEFAULT_ORDER_THRESHOLD = 0.7
+
+
+def _stale_asset_ids(now, max_age_hours):
+    """
+    Activos cuyo puntaje hay que recalcular: sin puntaje, con lecturas nuevas,
+    con órdenes creadas o cerradas desde el último cálculo, o con puntaje viejo.
+    """
+    watermark, last_run = db.session.execute(
+        select(func.coalesce(func.max(AssetRiskScore.last_reading_id), 0), func.max(AssetRiskScore.computed_date))
+    ).one()
+
+    unscored = select(Asset.id).where(~Asset.id.in_(select(AssetRiskScore.asset_id)))
+    with_readings = select(SensorReading.asset_id).where(SensorReading.id > watermark).distinct()
+    stale = select(AssetRiskScore.asset_id).where(AssetRiskScore.computed_date < now - timedelta(hours=max_age_hours))
+    queries = [unscored, with_readings, stale]
+    if last_run is not None:
+        queries.append(
+            select(WorkOrder.asset_id)
+            .where(or_(WorkOrder.created_date > last_run, WorkOrder.end_date > last_run))
+            .distinct()
+        )
+    ids = set()
+    for query in queries:
+        ids.update(db.session.execute(query).scalars())
+    ids.discard(None)
+    return sorted(ids)
+
+
+def refresh_scores(full=False, window_days=DEFAULT_WINDOW_DAYS, max_age_hours=DEFAULT_MAX_AGE_HOURS):
+    """
+    Recalcula el puntaje de riesgo de los activos afectados (o de todos con
+    full=True) por lotes de ASSET_BATCH_SIZE y reemplaza sus filas en bloque.
+    """
+    now = datetime.utcnow()
+    try:
+        model = load_model()
+        max_reading_id = db.session.execute(select(func.coalesce(func.max(SensorReading.id), 0))).scalar()
+        if full:
+            asset_ids = db.session.execute(select(Asset.id).order_by(Asset.id)).scalars().all()
+        else:
+            asset_ids = _stale_asset_ids(now, max_age_hours)
+
+        table = AssetRiskScore.__table__
+        for i in range(0, len(asset_ids), ASSET_BATCH_SIZE):
+            batch = asset_ids[i:i + ASSET_BATCH_SIZE]
+            X, counts = compute_features(batch, now, window_days=window_days)
+            scores = model.predict(X)
+            sites = dict(db.session.execute(select(Asset.id, Asset.site_id).where(Asset.id.in_(batch))).all())
+            rows = [{
+                'asset_id': asset_id, 'site_id': sites.get(asset_id), 'score': float(score),
+                'rms': float(x[0]), 'slope': float(x[1]), 'peaks': int(x[2]),
+                'days_since_pm': float(x[3]), 'corrective_rate': float(x[4]), 'readings': int(n),
+                'last_reading_id': max_reading_id, 'model_version': model.version, 'computed_date': now,
+            } for asset_id, x, score, n in zip(batch, X.tolist(), scores.tolist(), counts.tolist())]
+            db.session.execute(delete(table).where(table.c.asset_id.in_(batch)))
+            db.session.execute(insert(table), rows)
+        db.session.commit()
+        return {'refreshed': len(asset_ids), 'model_version': model.version}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al calcular los puntajes de riesgo: {e}", 'status': 500}
+
+
+def get_ranking(site_id=None, limit=50, min_score=0.0):
+    """
+    Activos ordenados por riesgo, leídos del caché (sin tocar las lecturas).
+    """
+    try:
+        query = (
+            select(AssetRiskScore, Asset.name, Asset.unique_code, Asset.criticality)
+            .join(Asset, Asset.id == AssetRiskScore.asset_id)
+            .where(AssetRiskScore.score >= min_score)
+            .order_by(AssetRiskScore.score.desc())
+            .limit(limit)
+        )
+        if site_id:
+            query = query.where(AssetRiskScore.site_id == site_id)
+        ranking = []
+        for score, name, code, criticality in db.session.execute(query):
+            item = score.to_dict()
+            item.update(asset_name=name, asset_code=code, criticality=criticality)
+            ranking.append(item)
+        return ranking, None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al consultar el ranking de riesgo: {e}", 'status': 500}
+
+
+def _describe(score):
+    return (
+        f"Mantenimiento predictivo: riesgo de falla estimado {score.score:.0%} "
+        f"(RMS {score.rms:.2f}, tendencia {score.slope:+.3f}/día, {score.peaks} picos, "
+        f"{score.days_since_pm:.0f} días desde el último preventivo, "
+        f"{score.corrective_rate:.1f} correctivos/año)."
+    )
+
+
+def create_predictive_orders(threshold=DEFAULT_ORDER_THRESHOLD, site_id=None, user_id=None):
+    """
+    Crea una OT predictiva para cada activo con riesgo >= threshold que no tenga
+    ya una abierta.
+    """
+    try:
+        open_predictive = select(WorkOrder.asset_id).where(
+            WorkOrder.type == WorkOrderType.predictive, WorkOrder.status != WorkOrderStatus.closed
+        )
+        query = (
+            select(AssetRiskScore, Asset.criticality)
+            .join(Asset, Asset.id == AssetRiskScore.asset_id)
+            .where(AssetRiskScore.score >= threshold, ~AssetRiskScore.asset_id.in_(open_predictive))
+            .order_by(AssetRiskScore.score.desc())
+        )
+        if site_id:
+            query = query.where(AssetRiskScore.site_id == site_id)
+
+        orders = []
+        for score, criticality in db.session.execute(query):
+            impact = 'critical' if score.score >= 0.9 else 'high' if score.score >= 0.8 else 'medium'
+            orders.append(WorkOrder(
+                asset_id=score.asset_id,
+                site_id=score.site_id,
+                type=WorkOrderType.predictive,
+                priority=calculate_priority(criticality, impact),
+                status=WorkOrderStatus.created,
+                description=_describe(score),
+                created_by_user_id=user_id,
+            ))
+        db.session.add_all(orders)
+        db.session.commit()
+        return orders, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al crear las órdenes predictivas: {e}", 'status': 500}
+
+
+def train_model(snapshots=DEFAULT_TRAINING_SNAPSHOTS, step_days=DEFAULT_SNAPSHOT_STEP_DAYS,
+                horizon_days=DEFAULT_HORIZON_DAYS, window_days=DEFAULT_WINDOW_DAYS):
+    """
+    Entrena el modelo con el historial local: en cada fecha de corte se calculan
+    las features de todos los activos y la etiqueta es si tuvieron un correctivo
+    en los 'horizon_days' siguientes. Pensado para correr fuera de línea (CLI).
+    """
+    try:
+        asset_ids = db.session.execute(select(Asset.id).order_by(Asset.id)).scalars().all()
+        if not asset_ids:
+            return None, {'message': 'No hay activos para entrenar el modelo', 'status': 400}
+
+        latest = datetime.utcnow() - timedelta(days=horizon_days)
+        blocks_X, blocks_y = [], []
+        for k in range(snapshots):
+            as_of = latest - timedelta(days=k * step_days)
+            horizon_end = as_of + timedelta(days=horizon_days)
+            failed = set(db.session.execute(
+                select(WorkOrder.asset_id).where(
+                    WorkOrder.type == WorkOrderType.corrective,
+                    WorkOrder.created_date > as_of, WorkOrder.created_date <= horizon_end,
+                ).distinct()
+            ).scalars())
+            for i in range(0, len(asset_ids), ASSET_BATCH_SIZE):
+                batch = asset_ids[i:i + ASSET_BATCH_SIZE]
+                X, _ = compute_features(batch, as_of, window_days=window_days)
+                blocks_X.append(X)
+                blocks_y.append(np.fromiter((a in failed for a in batch), dtype=np.float64, count=len(batch)))
+
+        X, y = np.vstack(blocks_X), np.concatenate(blocks_y)
+        if y.sum() == 0:
+            return None, {'message': 'El historial no tiene correctivos para aprender', 'status': 400}
+        l2 = current_app.config.get('PREDICTIVE_L2', 1.0)
+        model = RiskModel.fit(X, y, l2=l2)
+        path = save_model(model)
+        return {'version': model.version, 'path': path, **model.metrics}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al entrenar el modelo: {e}", 'status': 500}
@@ -0,0 +1,32 @@
+MAX_RANKING_LIMIT = 500
+
+
+def validate_ranking_params(args):
+    """
+    Valida 'site_id', 'limit' y 'min_score' del ranking de riesgo.
+    """
+    if not isinstance(args, dict):
+        return {'general': "Se esperaba un objeto JSON."}
+    errors = {}
+    for field in ['site_id', 'limit']:
+        value = args.get(field)
+        if value in (None, ''):
+            continue
+        try:
+            if int(value) <= 0:
+                raise ValueError
+        except (ValueError, TypeError):
+            errors[field] = f"El campo '{field}' debe ser un entero positivo."
+    if not errors.get('limit') and args.get('limit') and int(args['limit']) > MAX_RANKING_LIMIT:
+        errors['limit'] = f"El límite máximo es {MAX_RANKING_LIMIT}."
+
+    for field in ['min_score', 'threshold']:
+        value = args.get(field)
+        if value in (None, ''):
+            continue
+        try:
+            if not 0.0 <= float(value) <= 1.0:
+                raise ValueError
+        except (ValueError, TypeError):
+            errors[field] = f"El campo '{field}' debe ser un número entre 0 y 1."
+    return errors
@@ -0,0 +1 @@
+# This file makes the 'reports' directory a Python package
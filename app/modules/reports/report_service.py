@@ -0,0 +1,131 @@
+import json
+from datetime import datetime
+from sqlalchemy import select, or_, and_
+from app.models import (
+    db, Asset, WorkOrder, Permit, Checklist, ChecklistExecution
+)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+WORK_ORDER_COLUMNS = [
+    'id', 'asset_id', 'asset_code', 'asset_name', 'type', 'priority', 'status',
+    'description', 'created_date', 'start_date', 'end_date', 'estimated_time',
+    'actual_time', 'assigned_to_user_id', 'materials_used', 'permits', 'checklists',
+]
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _group_by_work_order(rows):
+    grouped = {}
+    for work_order_id, item in rows:
+        grouped.setdefault(work_order_id, []).append(item)
+    return grouped
+
+
+def _related_for_chunk(work_order_ids):
+    """
+    Carga permisos y checklists de todo un bloque de órdenes con una consulta por tabla.
+    """
+    permits = _group_by_work_order(
+        (r.work_order_id, {
+            'id': r.id, 'type': r.type,
+            'issued_date': _iso(r.issued_date), 'expiry_date': _iso(r.expiry_date),
+        })
+        for r in db.session.execute(
+            select(Permit.id, Permit.work_order_id, Permit.type, Permit.issued_date, Permit.expiry_date)
+            .where(Permit.work_order_id.in_(work_order_ids))
+        )
+    )
+    checklists = _group_by_work_order(
+        (r.work_order_id, {'id': r.id, 'name': r.name, 'tasks': r.tasks})
+        for r in db.session.execute(
+            select(Checklist.id, Checklist.work_order_id, Checklist.name, Checklist.tasks)
+            .where(Checklist.work_order_id.in_(work_order_ids))
+        )
+    )
+    executions = _group_by_work_order(
+        (r.work_order_id, {
+            'id': r.id, 'name': f'Ejecución #{r.id}', 'executed_date': _iso(r.executed_date),
+            'anomalies_found': r.anomalies_found,
+        })
+        for r in db.session.execute(
+            select(ChecklistExecution.id, ChecklistExecution.work_order_id,
+                   ChecklistExecution.executed_date, ChecklistExecution.anomalies_found)
+            .where(ChecklistExecution.work_order_id.in_(work_order_ids))
+        )
+    )
+    for work_order_id, items in executions.items():
+        checklists.setdefault(work_order_id, []).extend(items)
+    return permits, checklists
+
+
+def iter_work_order_history(site_id, year, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Generador de bloques de órdenes de trabajo de una planta y un año, con sus
+    materiales, permisos y checklists.
+
+    Las órdenes se leen con un cursor del lado del servidor (yield_per) y las
+    relaciones se cargan por bloque, de modo que la memoria depende solo de
+    'chunk_size' y no del tamaño del reporte.
+    """
+    start = datetime(year, 1, 1)
+    end = datetime(year + 1, 1, 1)
+    query = (
+        select(
+            WorkOrder.id, WorkOrder.asset_id, Asset.unique_code, Asset.name,
+            WorkOrder.type, WorkOrder.priority, WorkOrder.status, WorkOrder.description,
+            WorkOrder.created_date, WorkOrder.start_date, WorkOrder.end_date,
+            WorkOrder.estimated_time, WorkOrder.actual_time, WorkOrder.assigned_to_user_id,
+            WorkOrder.materials_used,
+        )
+        .outerjoin(Asset, Asset.id == WorkOrder.asset_id)
+        .where(
+            or_(WorkOrder.site_id == site_id,
+                and_(WorkOrder.site_id.is_(None), Asset.site_id == site_id)),
+            WorkOrder.created_date >= start,
+            WorkOrder.created_date < end,
+        )
+        .order_by(WorkOrder.id)
+        .execution_options(yield_per=chunk_size)
+    )
+
+    for rows in db.session.execute(query).partitions():
+        permits, checklists = _related_for_chunk([r.id for r in rows])
+        yield [
+            {
+                'id': r.id,
+                'asset_id': r.asset_id,
+                'asset_code': r.unique_code,
+                'asset_name': r.name,
+                'type': r.type.name if r.type else None,
+                'priority': r.priority.name if r.priority else None,
+                'status': r.status.name if r.status else None,
+                'description': r.description,
+                'created_date': _iso(r.created_date),
+                'start_date': _iso(r.start_date),
+                'end_date': _iso(r.end_date),
+                'estimated_time': r.estimated_time,
+                'actual_time': r.actual_time,
+                'assigned_to_user_id': r.assigned_to_user_id,
+                'materials_used': r.materials_used,
+                'permits': permits.get(r.id, []),
+                'checklists': checklists.get(r.id, []),
+            }
+            for r in rows
+        ]
+
+
+def flatten(record):
+    """
+    Convierte un registro anidado en una fila plana (CSV/XLSX); las listas se serializan como JSON.
+    """
+    row = []
+    for column in WORK_ORDER_COLUMNS:
+        value = record[column]
+        if column in ('materials_used', 'permits', 'checklists'):
+            value = json.dumps(value, ensure_ascii=False) if value else ''
+        row.append(value)
+    return row
@@ -0,0 +1,50 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from .report_service import iter_work_order_history, flatten, WORK_ORDER_COLUMNS, DEFAULT_CHUNK_SIZE
+from .validations import validate_history_report
+from .writers import csv_stream, ndjson_stream, xlsx_stream
+
+reports_bp = Blueprint(
+    'reports',
+    __name__,
+    url_prefix='/reports'
+)
+
+MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# --- Rutas de la API ---
+
+@reports_bp.route('/api/work-orders/history', methods=['GET'])
+def api_work_order_history():
+    """
+    Exporta (en streaming) todas las órdenes de trabajo de una planta y un año,
+    con sus materiales, permisos y checklists.
+    """
+    errors = validate_history_report(request.args)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    site_id = int(request.args['site_id'])
+    year = int(request.args['year'])
+    report_format = request.args.get('format', 'csv')
+
+    chunks = iter_work_order_history(site_id, year, chunk_size=DEFAULT_CHUNK_SIZE)
+    if report_format == 'csv':
+        body = csv_stream(WORK_ORDER_COLUMNS, chunks, flatten)
+    elif report_format == 'xlsx':
+        body = xlsx_stream(WORK_ORDER_COLUMNS, chunks, flatten, sheet_name='Ordenes')
+    else:
+        body = ndjson_stream(chunks)
+
+    filename = f'ordenes_planta{site_id}_{year}.{report_format}'
+    return Response(
+        stream_with_context(body),
+        mimetype=MIMETYPES[report_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no',  # Evita que un proxy nginx acumule la respuesta
+        },
+    )
@@ -0,0 +1,25 @@
+
+REPORT_FORMATS = ('csv', 'xlsx', 'ndjson')
+
+def validate_history_report(args):
+    """
+    Valida los parámetros del reporte de historial de órdenes de trabajo.
+    """
+    errors = {}
+    for field in ['site_id', 'year']:
+        value = args.get(field)
+        if not value:
+            errors[field] = f"El campo '{field}' es obligatorio."
+            continue
+        try:
+            int(value)
+        except (ValueError, TypeError):
+            errors[field] = f"El campo '{field}' debe ser un número entero."
+
+    if not errors and not 1900 <= int(args['year']) <= 9998:
+        errors['year'] = "El año no es válido."
+
+    report_format = args.get('format', 'csv')
+    if report_format not in REPORT_FORMATS:
+        errors['format'] = f"El formato debe ser uno de: {', '.join(REPORT_FORMATS)}."
+    return errors
@@ -0,0 +1,168 @@
+import csv
+import io
+import json
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+# Excel admite como máximo 1.048.576 filas por hoja (incluida la cabecera)
+XLSX_MAX_ROWS = 1048575
+
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def csv_stream(header, chunks, flatten):
+    """
+    Genera el CSV bloque a bloque: la cabecera sale de inmediato.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue().encode('utf-8')
+    for records in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(flatten(r) for r in records)
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_stream(chunks):
+    """
+    Genera NDJSON (un objeto JSON por línea) bloque a bloque.
+    """
+    for records in chunks:
+        yield ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records).encode('utf-8')
+
+
+class _StreamSink:
+    """
+    Destino no 'seekable' para zipfile: acumula lo escrito hasta que se drena.
+    """
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _drain(sink):
+    # Un bloque vacío cerraría la respuesta 'chunked' antes de tiempo
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def _cell(value):
+    if value is None or value == '':
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(values):
+    return '<row>' + ''.join(_cell(v) for v in values) + '</row>'
+
+
+_SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+               '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+def _workbook_parts(sheet_count, sheet_name):
+    ns_rel = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+    overrides = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, sheet_count + 1)
+    )
+    sheets = ''.join(
+        f'<sheet name="{sheet_name}{"" if i == 1 else f" {i}"}" sheetId="{i}" r:id="rId{i}"/>'
+        for i in range(1, sheet_count + 1)
+    )
+    sheet_rels = ''.join(
+        f'<Relationship Id="rId{i}" Type="{ns_rel}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, sheet_count + 1)
+    )
+    return {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f'{overrides}</Types>'
+        ),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{ns_rel}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ),
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            f'xmlns:r="{ns_rel}"><sheets>{sheets}</sheets></workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{sheet_rels}</Relationships>'
+        ),
+    }
+
+
+def xlsx_stream(header, chunks, flatten, sheet_name='Datos'):
+    """
+    Genera un XLSX mínimo (hojas con cadenas en línea) sin cargarlo en memoria.
+
+    El ZIP se escribe sobre un destino no 'seekable' (con descriptores de datos)
+    y se drena tras cada bloque. Si se supera el límite de filas de Excel, se
+    abre una hoja nueva; el libro y los tipos de contenido se escriben al final.
+    """
+    sink = _StreamSink()
+    archive = zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED)
+    header_xml = _row(header)
+    sheet_count = 1
+    rows_in_sheet = 0
+
+    entry = archive.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True)
+    entry.write((_SHEET_HEAD + header_xml).encode('utf-8'))
+    yield from _drain(sink)
+
+    for records in chunks:
+        parts = []
+        for record in records:
+            if rows_in_sheet >= XLSX_MAX_ROWS:
+                entry.write((''.join(parts) + _SHEET_TAIL).encode('utf-8'))
+                entry.close()
+                parts = []
+                sheet_count += 1
+                rows_in_sheet = 0
+                entry = archive.open(f'xl/worksheets/sheet{sheet_count}.xml', mode='w', force_zip64=True)
+                entry.write((_SHEET_HEAD + header_xml).encode('utf-8'))
+            parts.append(_row(flatten(record)))
+            rows_in_sheet += 1
+        entry.write(''.join(parts).encode('utf-8'))
+        yield from _drain(sink)
+
+    entry.write(_SHEET_TAIL.encode('utf-8'))
+    entry.close()
+    for name, content in _workbook_parts(sheet_count, sheet_name).items():
+        archive.writestr(name, content)
+    archive.close()
+    yield from _drain(sink)
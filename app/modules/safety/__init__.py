@@ -0,0 +1 @@
+# This file makes the 'safety' directory a Python package
@@ -0,0 +1,142 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import select, func, case, literal, union_all
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db, Asset, Incident, WorkOrder
+from app.services.tenancy import accessible_site_ids
+
+DEFAULT_WINDOW_DAYS = 30
+DEFAULT_DETAIL_LIMIT = 200
+
+_incidents = Incident.__table__
+_work_orders = WorkOrder.__table__
+_assets = Asset.__table__
+
+
+def _preceding_work_orders(start, end):
+    """
+    Una sola consulta con funciones de ventana: incidentes y OTs del mismo
+    activo se ordenan en una línea de tiempo, un conteo acumulado de OTs
+    numera los tramos y cada incidente toma la primera fila de su tramo, que
+    es la última OT anterior (o ninguna). Devuelve una fila por incidente.
+    """
+    work_date = func.coalesce(_work_orders.c.end_date, _work_orders.c.start_date, _work_orders.c.created_date)
+    timeline = union_all(
+        select(_incidents.c.asset_id, _incidents.c.incident_date.label('event_date'),
+               literal(1).label('is_incident'), _incidents.c.id.label('event_id'))
+        .where(_incidents.c.asset_id.isnot(None), _incidents.c.incident_date.between(start, end)),
+        # Las OTs se leen desde antes del inicio para encontrar la anterior al primer incidente
+        select(_work_orders.c.asset_id, work_date, literal(0), _work_orders.c.id)
+        .where(_work_orders.c.asset_id.isnot(None), work_date <= end,
+               _work_orders.c.asset_id.in_(
+                   select(_incidents.c.asset_id).where(_incidents.c.incident_date.between(start, end))
+               )),
+    ).subquery('timeline')
+
+    # A igual fecha, la OT va antes que el incidente
+    order = (timeline.c.event_date, timeline.c.is_incident, timeline.c.event_id)
+    numbered = select(
+        timeline,
+        func.count(case((timeline.c.is_incident == 0, 1))).over(
+            partition_by=timeline.c.asset_id, order_by=order, rows=(None, 0)
+        ).label('segment'),
+    ).subquery('numbered')
+
+    segment = (numbered.c.asset_id, numbered.c.segment)
+    numbered_order = (numbered.c.event_date, numbered.c.is_incident, numbered.c.event_id)
+    matched = select(
+        numbered.c.asset_id, numbered.c.event_id, numbered.c.event_date, numbered.c.is_incident,
+        func.first_value(case((numbered.c.is_incident == 0, numbered.c.event_id))).over(
+            partition_by=segment, order_by=numbered_order).label('work_order_id'),
+        func.first_value(case((numbered.c.is_incident == 0, numbered.c.event_date))).over(
+            partition_by=segment, order_by=numbered_order).label('work_date'),
+    ).subquery('matched')
+
+    query = (
+        select(matched.c.event_id.label('incident_id'), matched.c.event_date.label('incident_date'),
+               matched.c.asset_id, _assets.c.site_id, _incidents.c.type, _incidents.c.severity,
+               matched.c.work_order_id, matched.c.work_date, _work_orders.c.type.label('work_order_type'))
+        .select_from(
+            matched.join(_incidents, _incidents.c.id == matched.c.event_id)
+            .join(_assets, _assets.c.id == matched.c.asset_id)
+            .outerjoin(_work_orders, _work_orders.c.id == matched.c.work_order_id)
+        )
+        .where(matched.c.is_incident == 1)
+        .order_by(matched.c.event_date.desc(), matched.c.event_id.desc())
+    )
+    return query
+
+
+def _as_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, str):  # SQLite devuelve texto desde las subconsultas
+        return datetime.fromisoformat(value)
+    return datetime.combine(value, time.min)
+
+
+def _ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def correlate_incidents(start, end, window_days=DEFAULT_WINDOW_DAYS, site_id=None, limit=DEFAULT_DETAIL_LIMIT):
+    """
+    Relaciona cada incidente del rango con la última OT del mismo activo. Un
+    incidente cuenta como precedido si esa OT terminó a lo sumo 'window_days'
+    días antes; se resume por severidad y por tipo de OT.
+    """
+    try:
+        query = _preceding_work_orders(datetime.combine(start, time.min), datetime.combine(end, time.max))
+        site_ids = accessible_site_ids()
+        if site_ids is not None:
+            query = query.where(_assets.c.site_id.in_(site_ids))
+        if site_id:
+            query = query.where(_assets.c.site_id == site_id)
+
+        window = timedelta(days=window_days)
+        incidents = []
+        by_severity = {}
+        by_work_order_type = {}
+        for row in db.session.execute(query):
+            incident_date = _as_datetime(row.incident_date)
+            work_date = _as_datetime(row.work_date)
+            gap = incident_date - work_date if work_date else None
+            preceded = gap is not None and gap <= window
+            severity = row.severity.value if row.severity else None
+            stats = by_severity.setdefault(severity, {'incidents': 0, 'preceded': 0})
+            stats['incidents'] += 1
+            if preceded:
+                stats['preceded'] += 1
+                wo_type = row.work_order_type.value if row.work_order_type else None
+                by_work_order_type[wo_type] = by_work_order_type.get(wo_type, 0) + 1
+            incidents.append({
+                'incident_id': row.incident_id,
+                'incident_date': incident_date.isoformat(),
+                'asset_id': row.asset_id,
+                'site_id': row.site_id,
+                'type': row.type.value if row.type else None,
+                'severity': severity,
+                'preceding_work_order': {
+                    'id': row.work_order_id,
+                    'type': row.work_order_type.value if row.work_order_type else None,
+                    'date': work_date.isoformat(),
+                    'days_before': round(gap.total_seconds() / 86400, 2),
+                } if preceded else None,
+            })
+
+        total = len(incidents)
+        preceded_total = sum(s['preceded'] for s in by_severity.values())
+        for stats in by_severity.values():
+            stats['share'] = _ratio(stats['preceded'], stats['incidents'])
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'window_days': window_days,
+            'incidents_total': total,
+            'preceded': preceded_total,
+            'share': _ratio(preceded_total, total),
+            'by_severity': by_severity,
+            'by_work_order_type': by_work_order_type,
+            'incidents': incidents[:limit],
+        }, None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al correlacionar incidentes y órdenes: {e}", 'status': 500}
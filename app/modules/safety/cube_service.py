@@ -0,0 +1,231 @@
+from collections import Counter
+from datetime import date
+from sqlalchemy import select, insert, delete, func
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db, Asset, Audit, Category, Incident, Permit, SafetyCubeCell, Site, WorkOrder
+from app.services.upsert import increment_row
+
+SOURCES = ('incident', 'audit', 'permit')
+# Dimensiones del cubo por las que se puede agrupar y filtrar
+DIMENSIONS = {
+    'month': SafetyCubeCell.month,
+    'site': SafetyCubeCell.site_id,
+    'category': SafetyCubeCell.category_id,
+    'source': SafetyCubeCell.source,
+    'kind': SafetyCubeCell.kind,
+    'severity': SafetyCubeCell.severity,
+}
+REBUILD_BATCH_SIZE = 50000
+
+_cells = SafetyCubeCell.__table__
+_assets = Asset.__table__
+_work_orders = WorkOrder.__table__
+
+
+def month_of(value):
+    return date(value.year, value.month, 1)
+
+
+def _label(value):
+    return value.value if hasattr(value, 'value') else (value or '')
+
+
+def cell_key(source, day, site_id, category_id, kind, severity=None):
+    """
+    Clave de la celda del cubo (mes, planta, categoría, origen, tipo, severidad);
+    None si el registro no tiene fecha y no cuenta en el cubo.
+    """
+    if day is None:
+        return None
+    return (month_of(day), site_id or 0, category_id or 0, source, _label(kind)[:64], _label(severity))
+
+
+def resolve_assets(connection, asset_ids):
+    """
+    {asset_id: (site_id, category_id)} en una sola consulta.
+    """
+    asset_ids = {a for a in asset_ids if a is not None}
+    if not asset_ids:
+        return {}
+    return {row.id: (row.site_id, row.category_id) for row in connection.execute(
+        select(_assets.c.id, _assets.c.site_id, _assets.c.category_id).where(_assets.c.id.in_(asset_ids))
+    )}
+
+
+def resolve_work_orders(connection, work_order_ids):
+    """
+    {work_order_id: (site_id, category_id)}: la planta de la OT (o la de su
+    activo) y la categoría del activo.
+    """
+    work_order_ids = {w for w in work_order_ids if w is not None}
+    if not work_order_ids:
+        return {}
+    rows = connection.execute(
+        select(_work_orders.c.id, func.coalesce(_work_orders.c.site_id, _assets.c.site_id).label('site_id'),
+               _assets.c.category_id)
+        .select_from(_work_orders.outerjoin(_assets, _assets.c.id == _work_orders.c.asset_id))
+        .where(_work_orders.c.id.in_(work_order_ids))
+    )
+    return {row.id: (row.site_id, row.category_id) for row in rows}
+
+
+def apply_cell_deltas(connection, deltas):
+    """
+    Suma los incrementos a las celdas con un upsert: dos transacciones que
+    abren la misma celda nueva no chocan en la clave primaria.
+    """
+    columns = ('month', 'site_id', 'category_id', 'source', 'kind', 'severity')
+    for key, delta in deltas.items():
+        if delta:
+            increment_row(connection, _cells, dict(zip(columns, key)), {'events': delta})
+
+
+def _count_source(connection, counts, query, source, resolver):
+    for rows in connection.execute(query.execution_options(yield_per=REBUILD_BATCH_SIZE)).partitions():
+        dims = resolver(connection, [row.ref for row in rows])
+        for row in rows:
+            site_id, category_id = dims.get(row.ref, (getattr(row, 'site_id', None), None))
+            key = cell_key(source, row.day, site_id, category_id, row.kind, getattr(row, 'severity', None))
+            if key:
+                counts[key] += 1
+
+
+def rebuild_cubes():
+    """
+    Recalcula el cubo completo desde incidentes, auditorías y permisos (tras
+    una carga masiva o si cambió la planta o categoría de los activos).
+    """
+    try:
+        connection = db.session.connection()
+        counts = Counter()
+        incidents = Incident.__table__
+        audits = Audit.__table__
+        permits = Permit.__table__
+        _count_source(connection, counts, select(
+            incidents.c.asset_id.label('ref'), incidents.c.incident_date.label('day'),
+            incidents.c.type.label('kind'), incidents.c.severity
+        ), 'incident', resolve_assets)
+        _count_source(connection, counts, select(
+            audits.c.id.label('ref'), audits.c.audit_date.label('day'), audits.c.type.label('kind'), audits.c.site_id
+        ), 'audit', lambda connection, ids: {})
+        _count_source(connection, counts, select(
+            permits.c.work_order_id.label('ref'), permits.c.issued_date.label('day'), permits.c.type.label('kind')
+        ), 'permit', resolve_work_orders)
+
+        connection.execute(delete(_cells))
+        columns = ('month', 'site_id', 'category_id', 'source', 'kind', 'severity')
+        rows = [dict(zip(columns, key), events=events) for key, events in counts.items()]
+        if rows:
+            connection.execute(insert(_cells), rows)
+        db.session.commit()
+        return {'cells': len(rows), 'events': sum(counts.values())}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al recalcular el cubo de seguridad: {e}", 'status': 500}
+
+
+def _filtered(query, filters, start_month=None, end_month=None):
+    for name, value in filters.items():
+        query = query.where(DIMENSIONS[name] == value)
+    if start_month:
+        query = query.where(SafetyCubeCell.month >= start_month)
+    if end_month:
+        query = query.where(SafetyCubeCell.month <= end_month)
+    return query
+
+
+def _names(model, ids):
+    ids = {i for i in ids if i}
+    if not ids:
+        return {}
+    return dict(db.session.execute(select(model.id, model.name).where(model.id.in_(ids))).all())
+
+
+def _serialize(name, value):
+    return value.isoformat()[:7] if name == 'month' else value
+
+
+def query_cube(group_by, filters, start_month=None, end_month=None):
+    """
+    Eventos agrupados por las dimensiones pedidas y filtrados por otras: cada
+    nivel de detalle es una consulta sobre el cubo, nunca sobre los eventos.
+    """
+    try:
+        columns = [DIMENSIONS[name] for name in group_by]
+        query = _filtered(select(*columns, func.sum(SafetyCubeCell.events).label('events')), filters,
+                          start_month, end_month)
+        if columns:
+            query = query.group_by(*columns).order_by(*columns)
+        rows = db.session.execute(query).all()
+
+        sites = _names(Site, (row[group_by.index('site')] for row in rows)) if 'site' in group_by else {}
+        categories = _names(Category, (row[group_by.index('category')] for row in rows)) if 'category' in group_by else {}
+        result = []
+        for row in rows:
+            if row.events is None:
+                continue
+            item = {name: _serialize(name, value) for name, value in zip(group_by, row)}
+            if 'site' in item:
+                item['site_name'] = sites.get(item['site'])
+            if 'category' in item:
+                item['category_name'] = categories.get(item['category'])
+            item['events'] = int(row.events)
+            result.append(item)
+        return {'group_by': group_by, 'filters': filters, 'cells': result,
+                'total': sum(item['events'] for item in result)}, None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al consultar el cubo de seguridad: {e}", 'status': 500}
+
+
+def shift_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _months(start_month, end_month):
+    months = []
+    while start_month <= end_month:
+        months.append(start_month)
+        start_month = shift_months(start_month, 1)
+    return months
+
+
+def get_trend(filters, start_month, end_month, split_by=None):
+    """
+    Serie mensual (meses sin eventos en 0), opcionalmente una por valor de
+    'split_by', con el total del periodo y el del periodo anterior de igual largo.
+    """
+    try:
+        months = _months(start_month, end_month)
+        previous_start = shift_months(start_month, -len(months))
+        split = DIMENSIONS[split_by] if split_by else None
+
+        query = select(SafetyCubeCell.month, *([split] if split is not None else []), func.sum(SafetyCubeCell.events))
+        query = _filtered(query, filters, previous_start, end_month)
+        query = query.group_by(SafetyCubeCell.month, *([split] if split is not None else []))
+
+        series = {}
+        previous = {}
+        for row in db.session.execute(query).all():
+            key = row[1] if split is not None else 'all'
+            if row[0] < start_month:
+                previous[key] = previous.get(key, 0) + int(row[-1])
+            else:
+                series.setdefault(key, {})[row[0]] = int(row[-1])
+
+        result = []
+        for key in sorted(set(series) | set(previous), key=str):
+            values = [series.get(key, {}).get(month, 0) for month in months]
+            total = sum(values)
+            before = previous.get(key, 0)
+            result.append({
+                'key': key,
+                'values': values,
+                'total': total,
+                'previous_total': before,
+                'change': round((total - before) / before, 4) if before else None,
+            })
+        return {'months': [m.isoformat()[:7] for m in months], 'split_by': split_by, 'filters': filters,
+                'series': result}, None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al calcular la tendencia de seguridad: {e}", 'status': 500}
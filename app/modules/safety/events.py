@@ -0,0 +1,105 @@
+from collections import Counter
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models import Audit, Incident, Permit
+from .cube_service import apply_cell_deltas, cell_key, resolve_assets, resolve_work_orders
+
+# Atributos que definen la celda de cada registro (fecha, referencia, tipo, severidad)
+TRACKED = {
+    Incident: ('incident', 'incident_date', 'asset_id', 'type', 'severity'),
+    Audit: ('audit', 'audit_date', 'site_id', 'type', None),
+    Permit: ('permit', 'issued_date', 'work_order_id', 'type', None),
+}
+
+
+def _current(obj, attr):
+    return getattr(obj, attr) if attr else None
+
+
+def _previous(obj, attr):
+    if not attr:
+        return None
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.added:
+        return None
+    return history.unchanged[0] if history.unchanged else None
+
+
+def _stored(obj, attr):
+    """
+    Valor guardado en la base, sin los cambios pendientes del objeto.
+    """
+    if not attr:
+        return None
+    getattr(obj, attr)  # Carga el atributo si está expirado
+    return _previous(obj, attr)
+
+
+def _changed(obj, attrs):
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs if attr)
+
+
+def _collect_deleted_before_flush(session, flush_context, instances):
+    # Los borrados se leen antes del flush: después sus atributos expirados ya no se pueden cargar
+    session.info['safety_deleted'] = [
+        (-1, type(obj), *(_stored(obj, a) for a in TRACKED[type(obj)][1:]))
+        for obj in session.deleted if type(obj) in TRACKED
+    ]
+
+
+def _update_cubes_after_flush(session, flush_context):
+    """
+    Mantiene el cubo de seguridad en la misma transacción: +1 por registro
+    nuevo, -1 por borrado y, si cambia una dimensión, se mueve de celda.
+    """
+    facts = []  # (signo, modelo, fecha, referencia, tipo, severidad)
+    for obj in session.new:
+        if type(obj) in TRACKED:
+            _, *attrs = TRACKED[type(obj)]
+            facts.append((1, type(obj), *(_current(obj, a) for a in attrs)))
+    facts.extend(session.info.pop('safety_deleted', ()))
+    for obj in session.dirty:
+        if type(obj) in TRACKED and obj not in session.deleted:
+            _, *attrs = TRACKED[type(obj)]
+            if _changed(obj, attrs):
+                facts.append((-1, type(obj), *(_stored(obj, a) for a in attrs)))
+                facts.append((1, type(obj), *(_current(obj, a) for a in attrs)))
+    if not facts:
+        return
+
+    connection = session.connection()
+    assets = resolve_assets(connection, [f[3] for f in facts if f[1] is Incident])
+    work_orders = resolve_work_orders(connection, [f[3] for f in facts if f[1] is Permit])
+    deltas = Counter()
+    for sign, model, day, ref, kind, severity in facts:
+        if model is Incident:
+            site_id, category_id = assets.get(ref, (None, None))
+        elif model is Permit:
+            site_id, category_id = work_orders.get(ref, (None, None))
+        else:
+            site_id, category_id = ref, None
+        key = cell_key(TRACKED[model][0], day, site_id, category_id, kind, severity)
+        if key:
+            deltas[key] += sign
+    apply_cell_deltas(connection, deltas)
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+def register_events():
+    # Con active_history el valor anterior se carga antes de cambiarlo, aunque
+    # el objeto esté expirado, y la celda de origen se puede descontar
+    for model, (_, *attrs) in TRACKED.items():
+        for attr in filter(None, attrs):
+            attribute = getattr(model, attr)
+            if not event.contains(attribute, 'set', _keep_previous_value):
+                event.listen(attribute, 'set', _keep_previous_value, retval=True, active_history=True)
+    for name, fn in [('before_flush', _collect_deleted_before_flush),
+                     ('after_flush', _update_cubes_after_flush)]:
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
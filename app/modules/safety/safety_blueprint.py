@@ -0,0 +1,81 @@
+import click
+from flask import Blueprint, jsonify, request
+from app.services.db_routing import read_only
+from .cube_service import query_cube, get_trend, rebuild_cubes
+from .correlation_service import correlate_incidents, DEFAULT_WINDOW_DAYS
+from .validations import parse_cube_filters, parse_group_by, resolve_trend_range, parse_correlation_params
+
+safety_bp = Blueprint(
+    'safety',
+    __name__,
+    url_prefix='/safety'
+)
+
+# --- Rutas de la API ---
+
+@safety_bp.route('/api/cube', methods=['GET'])
+@read_only
+def api_query_cube():
+    """
+    Eventos de seguridad agrupados por 'group_by' (p. ej. site,severity) y
+    filtrados por dimensión: cada paso del drill-down agrega un filtro o una dimensión.
+    """
+    filters, start, end, errors = parse_cube_filters(request.args)
+    group_by, error = parse_group_by(request.args.get('group_by'))
+    if error:
+        errors['group_by'] = error
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    result, error = query_cube(group_by, filters, start, end)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 200
+
+@safety_bp.route('/api/trend', methods=['GET'])
+@read_only
+def api_get_trend():
+    filters, start, end, errors = parse_cube_filters(request.args)
+    split_by, error = parse_group_by(request.args.get('split_by'))
+    if error or (split_by and len(split_by) > 1):
+        errors['split_by'] = error or "El campo 'split_by' admite una sola dimensión."
+    if not errors:
+        start, end, error = resolve_trend_range(start, end)
+        if error:
+            errors['from'] = error
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    result, error = get_trend(filters, start, end, split_by[0] if split_by else None)
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 200
+
+@safety_bp.route('/api/incidents/correlation', methods=['GET'])
+@read_only
+def api_correlate_incidents():
+    """
+    Incidentes del rango con la última OT del mismo activo y la proporción
+    precedida por una OT dentro de 'window_days'.
+    """
+    params, errors = parse_correlation_params(request.args)
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    result, error = correlate_incidents(params['start'], params['end'],
+                                        params['window_days'] or DEFAULT_WINDOW_DAYS, params['site_id'])
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 200
+
+# --- Comandos CLI ---
+
+@safety_bp.cli.command('rebuild')
+def rebuild_command():
+    """
+    Recalcula el cubo de seguridad desde cero: flask safety rebuild
+    """
+    result, error = rebuild_cubes()
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"Cubo de seguridad recalculado: {result['cells']} celdas, {result['events']} eventos.")
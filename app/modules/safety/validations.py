@@ -0,0 +1,98 @@
+from datetime import date
+from .cube_service import DIMENSIONS, SOURCES, shift_months
+
+DEFAULT_TREND_MONTHS = 12
+MAX_TREND_MONTHS = 60
+MAX_WINDOW_DAYS = 365
+# Años admitidos en 'from'/'to': deja margen para desplazar el rango sin salir de date
+MIN_YEAR = 1900
+MAX_YEAR = 2100
+
+
+def _parse_month(value):
+    year, month = value.split('-')
+    if not MIN_YEAR <= int(year) <= MAX_YEAR:
+        raise ValueError(value)
+    return date(int(year), int(month), 1)
+
+
+def parse_cube_filters(args):
+    """
+    Filtros de dimensión ('site_id', 'category_id', 'source', 'kind', 'severity')
+    y rango de meses ('from' y 'to', YYYY-MM). Devuelve (filters, start, end, errors).
+    """
+    errors = {}
+    filters = {}
+    for field, name in (('site_id', 'site'), ('category_id', 'category')):
+        if args.get(field):
+            try:
+                filters[name] = int(args[field])
+            except ValueError:
+                errors[field] = f"El campo '{field}' debe ser un entero."
+    if args.get('source'):
+        if args['source'] in SOURCES:
+            filters['source'] = args['source']
+        else:
+            errors['source'] = f"El campo 'source' debe ser uno de: {', '.join(SOURCES)}."
+    for field in ('kind', 'severity'):
+        if args.get(field):
+            filters[field] = args[field]
+
+    months = {}
+    for field in ('from', 'to'):
+        months[field] = None
+        if args.get(field):
+            try:
+                months[field] = _parse_month(args[field])
+            except ValueError:
+                errors[field] = f"El campo '{field}' debe tener formato YYYY-MM (años {MIN_YEAR}-{MAX_YEAR})."
+    if not errors and months['from'] and months['to'] and months['from'] > months['to']:
+        errors['from'] = "El mes inicial no puede ser posterior al final."
+    return filters, months['from'], months['to'], errors
+
+
+def parse_group_by(value):
+    """
+    'group_by' es una lista separada por comas de dimensiones del cubo.
+    """
+    names = [name.strip() for name in (value or '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in DIMENSIONS]
+    if unknown:
+        return None, f"Dimensiones desconocidas: {', '.join(unknown)}. Válidas: {', '.join(DIMENSIONS)}."
+    return list(dict.fromkeys(names)), None
+
+
+def resolve_trend_range(start, end, today=None):
+    """
+    Por defecto, los últimos DEFAULT_TREND_MONTHS meses hasta el actual.
+    """
+    end = end or date(*(today or date.today()).timetuple()[:2], 1)
+    start = start or shift_months(end, -(DEFAULT_TREND_MONTHS - 1))
+    if shift_months(start, MAX_TREND_MONTHS) <= end:
+        return None, None, f"La tendencia admite como máximo {MAX_TREND_MONTHS} meses."
+    return start, end, None
+
+
+def parse_correlation_params(args):
+    """
+    Valida 'start' y 'end' (YYYY-MM-DD, obligatorios), 'window_days' y 'site_id'.
+    """
+    errors = {}
+    params = {'window_days': None, 'site_id': None}
+    for field in ('start', 'end'):
+        try:
+            params[field] = date.fromisoformat(args.get(field, ''))
+        except ValueError:
+            errors[field] = f"El campo '{field}' es obligatorio y debe tener formato YYYY-MM-DD."
+    if not errors and params['start'] > params['end']:
+        errors['start'] = "La fecha de inicio no puede ser posterior a la fecha de fin."
+    for field, maximum in (('window_days', MAX_WINDOW_DAYS), ('site_id', None)):
+        if args.get(field):
+            try:
+                params[field] = int(args[field])
+                if params[field] <= 0 or (maximum and params[field] > maximum):
+                    raise ValueError
+            except ValueError:
+                errors[field] = f"El campo '{field}' debe ser un entero positivo" + (
+                    f" de hasta {maximum}." if maximum else ".")
+    return params, errors
@@ -0,0 +1 @@
+# This file makes the 'sync' directory a Python package
@@ -0,0 +1,225 @@
+from datetime import datetime
+from sqlalchemy import event, inspect, select, update, insert, delete, tuple_, and_, or_
+from sqlalchemy.orm import Session
+from app.models import Asset, Checklist, ChangeLog, Procedure, SyncState, WorkOrder
+
+# Entidades que se sincronizan con los dispositivos móviles
+SYNC_ENTITIES = {
+    WorkOrder: 'work_order',
+    Checklist: 'checklist',
+    Asset: 'asset',
+    Procedure: 'procedure',
+}
+
+
+def _entity_name(obj):
+    return SYNC_ENTITIES.get(type(obj))
+
+
+def _previous(obj, attr):
+    history = inspect(obj).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(obj, attr)
+
+
+def _record(changes, obj, op, is_new=False):
+    """
+    Acumula el último estado de cada entidad en la transacción. Se guarda además
+    el destinatario al inicio (técnico de la OT, planta del activo, activo u OT
+    del checklist), que recibirá un 'delete' si cambia.
+    """
+    entity = _entity_name(obj)
+    key = (entity, obj.id)
+    change = changes.get(key)
+    if change is None or change.get('bulk'):
+        change = changes[key] = {'entity': entity, 'entity_id': obj.id}
+        if not is_new:
+            if entity == 'work_order':
+                change['previous_user_id'] = _previous(obj, 'assigned_to_user_id')
+            elif entity == 'asset':
+                change['previous_site_id'] = _previous(obj, 'site_id')
+            elif entity == 'checklist' and any(inspect(obj).attrs[a].history.deleted
+                                                 for a in ('asset_id', 'work_order_id')):
+                change['previous_owner'] = {'asset_id': _previous(obj, 'asset_id'),
+                                            'work_order_id': _previous(obj, 'work_order_id')}
+    change['op'] = op
+    if entity == 'work_order':
+        change.update(user_id=obj.assigned_to_user_id, site_id=obj.site_id)
+    elif entity == 'asset':
+        change['site_id'] = obj.site_id
+    elif entity == 'checklist':
+        change.update(asset_id=obj.asset_id, work_order_id=obj.work_order_id)
+
+
+def _collect_after_flush(session, flush_context):
+    changes = session.info.setdefault('sync_changes', {})
+    for obj in session.new:
+        if _entity_name(obj):
+            _record(changes, obj, 'upsert', is_new=True)
+    for obj in session.dirty:
+        if _entity_name(obj) and session.is_modified(obj, include_collections=False):
+            _record(changes, obj, 'upsert')
+    for obj in session.deleted:
+        if _entity_name(obj):
+            _record(changes, obj, 'delete')
+
+
+def record_bulk_changes(session, entity, entity_ids):
+    """
+    Registra como 'upsert' las entidades modificadas con UPDATE de Core (sin
+    pasar por el flush del ORM). Sus datos de alcance se leen antes del commit.
+    """
+    changes = session.info.setdefault('sync_changes', {})
+    for entity_id in entity_ids:
+        changes.setdefault((entity, entity_id), {'entity': entity, 'entity_id': entity_id,
+                                                 'op': 'upsert', 'bulk': True})
+
+
+def _fill_bulk(session, changes):
+    by_entity = {}
+    for change in changes:
+        if change.get('bulk'):
+            by_entity.setdefault(change['entity'], {})[change['entity_id']] = change
+    if 'asset' in by_entity:
+        ids = list(by_entity['asset'])
+        for asset_id, site_id in session.execute(select(Asset.id, Asset.site_id).where(Asset.id.in_(ids))):
+            by_entity['asset'][asset_id]['site_id'] = site_id
+    if 'work_order' in by_entity:
+        ids = list(by_entity['work_order'])
+        for wo_id, user_id, site_id in session.execute(
+                select(WorkOrder.id, WorkOrder.assigned_to_user_id, WorkOrder.site_id).where(WorkOrder.id.in_(ids))):
+            by_entity['work_order'][wo_id].update(user_id=user_id, site_id=site_id)
+    if 'checklist' in by_entity:
+        ids = list(by_entity['checklist'])
+        for checklist_id, asset_id, wo_id in session.execute(
+                select(Checklist.id, Checklist.asset_id, Checklist.work_order_id).where(Checklist.id.in_(ids))):
+            by_entity['checklist'][checklist_id].update(asset_id=asset_id, work_order_id=wo_id)
+
+
+def _checklist_sites(session, changes):
+    # Planta de cada checklist (por su activo o su OT) con dos consultas como máximo
+    asset_ids = {c['asset_id'] for c in changes if c.get('asset_id')}
+    wo_ids = {c['work_order_id'] for c in changes if c.get('work_order_id') and not c.get('asset_id')}
+    asset_sites = dict(session.execute(
+        select(Asset.id, Asset.site_id).where(Asset.id.in_(asset_ids))
+    ).all()) if asset_ids else {}
+    wo_sites = dict(session.execute(
+        select(WorkOrder.id, WorkOrder.site_id).where(WorkOrder.id.in_(wo_ids))
+    ).all()) if wo_ids else {}
+    for change in changes:
+        change['site_id'] = asset_sites.get(change.get('asset_id')) or wo_sites.get(change.get('work_order_id'))
+
+
+def _moved_checklists(session, changes):
+    """
+    Checklists de los activos que cambiaron de planta: se mudan con su activo.
+    """
+    moved = {c['entity_id']: c['previous_site_id'] for c in changes
+             if c['entity'] == 'asset' and c['op'] == 'upsert' and c.get('previous_site_id') is not None
+             and c['previous_site_id'] != c.get('site_id')}
+    if not moved:
+        return []
+    listed = {c['entity_id'] for c in changes if c['entity'] == 'checklist'}
+    return [
+        {'entity': 'checklist', 'entity_id': checklist_id, 'op': 'upsert', 'asset_id': asset_id,
+         'work_order_id': wo_id, 'previous_site_id': moved[asset_id]}
+        for checklist_id, asset_id, wo_id in session.execute(
+            select(Checklist.id, Checklist.asset_id, Checklist.work_order_id).where(Checklist.asset_id.in_(moved))
+        )
+        if checklist_id not in listed
+    ]
+
+
+def _change_rows(session, changes):
+    _fill_bulk(session, changes)
+    changes = changes + _moved_checklists(session, changes)
+    checklists = [c for c in changes if c['entity'] == 'checklist']
+    _checklist_sites(session, checklists)
+    # Planta anterior de los checklists que cambiaron de activo u OT
+    owners = [dict(c['previous_owner'], change=c) for c in checklists if c.get('previous_owner')]
+    _checklist_sites(session, owners)
+    for owner in owners:
+        owner['change']['previous_site_id'] = owner['site_id']
+
+    rows = []
+    for change in changes:
+        previous_site = change.get('previous_site_id')
+        if (change['entity'] != 'work_order' and change['op'] == 'upsert' and previous_site is not None
+                and previous_site != change.get('site_id')):
+            # Antes del 'upsert': un dispositivo que ve todas las plantas lo conserva
+            rows.append({'entity': change['entity'], 'entity_id': change['entity_id'], 'op': 'delete',
+                         'site_id': previous_site, 'user_id': None})
+        rows.append({'entity': change['entity'], 'entity_id': change['entity_id'], 'op': change['op'],
+                     'site_id': change.get('site_id'), 'user_id': change.get('user_id')})
+        previous = change.get('previous_user_id')
+        if change['entity'] == 'work_order' and previous is not None and previous != change.get('user_id'):
+            rows.append({'entity': 'work_order', 'entity_id': change['entity_id'], 'op': 'delete',
+                         'site_id': change.get('site_id'), 'user_id': previous})
+    return rows
+
+
+def _allocate_sequence(session, count):
+    """
+    Reserva 'count' números de secuencia. El UPDATE bloquea la fila del contador
+    hasta el commit, así el orden de las secuencias es el orden de los commits y
+    un cliente nunca salta un cambio que aún no era visible.
+    """
+    state = SyncState.__table__
+    result = session.execute(update(state).where(state.c.id == 1).values(last_seq=state.c.last_seq + count))
+    if result.rowcount == 0:
+        session.execute(insert(state).values(id=1, last_seq=count, purged_through=0))
+        return 1
+    return session.execute(select(state.c.last_seq).where(state.c.id == 1)).scalar() - count + 1
+
+
+def _write_change_log(session):
+    """
+    Antes del commit: numera los cambios de la transacción y reemplaza las filas
+    anteriores de las mismas entidades (el registro queda compactado).
+    """
+    if session.dirty or session.new or session.deleted:
+        session.flush()
+    changes = session.info.pop('sync_changes', None)
+    if not changes:
+        return
+    rows = _change_rows(session, list(changes.values()))
+    first = _allocate_sequence(session, len(rows))
+    now = datetime.utcnow()
+    for offset, row in enumerate(rows):
+        row.update(seq=first + offset, changed_date=now)
+
+    table = ChangeLog.__table__
+    by_entity = {}
+    for row in rows:
+        by_entity.setdefault(row['entity'], set()).add(row['entity_id'])
+    for entity, ids in by_entity.items():
+        # Una sola fila 'upsert' por entidad; los 'delete' son por destinatario
+        # (técnico en las OTs, planta en el resto) y se reemplazan por otro del mismo
+        column = table.c.user_id if entity == 'work_order' else table.c.site_id
+        recipient = 'user_id' if entity == 'work_order' else 'site_id'
+        pairs = [(r['entity_id'], r[recipient]) for r in rows
+                 if r['entity'] == entity and r[recipient] is not None]
+        condition = and_(table.c.entity_id.in_(ids), table.c.op == 'upsert')
+        if pairs:
+            condition = or_(condition, tuple_(table.c.entity_id, column).in_(pairs))
+        session.execute(delete(table).where(table.c.entity == entity, condition))
+    session.execute(insert(table), rows)
+
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('sync_changes', None)
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+def register_events():
+    # El destinatario anterior hace falta aunque la entidad esté expirada tras un commit
+    for attr in (WorkOrder.assigned_to_user_id, Asset.site_id, Checklist.asset_id, Checklist.work_order_id):
+        if not event.contains(attr, 'set', _keep_previous_value):
+            event.listen(attr, 'set', _keep_previous_value, retval=True, active_history=True)
+    for name, fn in [('after_flush', _collect_after_flush),
+                     ('before_commit', _write_change_log),
+                     ('after_soft_rollback', _discard_after_rollback)]:
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
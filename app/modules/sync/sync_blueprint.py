@@ -0,0 +1,92 @@
+import click
+from flask import Blueprint, current_app, jsonify, request
+from app.services.db_routing import read_only
+from app.services.tenancy import current_user_id
+from .sync_service import resolve_scope, get_changes, get_snapshot, push_changes, purge_tombstones, DEFAULT_TOMBSTONE_DAYS
+from .validations import parse_page_params, validate_push
+
+sync_bp = Blueprint(
+    'sync',
+    __name__,
+    url_prefix='/sync'
+)
+
+def _device_scope():
+    user_id = current_user_id() or request.args.get('user_id', type=int)
+    if not user_id:
+        return None, {'message': "Se requiere un usuario autenticado o el parámetro 'user_id'", 'status': 400}
+    return resolve_scope(user_id)
+
+# --- Rutas de la API ---
+
+@sync_bp.route('/api/changes', methods=['GET'])
+@read_only
+def api_get_changes():
+    """
+    Cambios desde 'token' para el dispositivo del técnico. Sin token se responde
+    410: la primera carga se hace con /sync/api/snapshot.
+    """
+    params, errors = parse_page_params(request.args, 'token')
+    if errors:
+        return jsonify({'errors': errors}), 400
+    scope, error = _device_scope()
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    if params['token'] is None:
+        return jsonify({'error': 'Falta el token; descargue primero los datos completos', 'reset': True}), 410
+
+    result, error = get_changes(scope, params['token'], params['limit'])
+    if error:
+        return jsonify({'error': error['message'], 'reset': error['status'] == 410}), error['status']
+    return jsonify(result), 200
+
+@sync_bp.route('/api/snapshot', methods=['GET'])
+@read_only
+def api_get_snapshot():
+    params, errors = parse_page_params(request.args, 'cursor')
+    if errors:
+        return jsonify({'errors': errors}), 400
+    scope, error = _device_scope()
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+
+    result, error = get_snapshot(scope, params['cursor'], params['limit'])
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+    return jsonify(result), 200
+
+@sync_bp.route('/api/push', methods=['POST'])
+def api_push_changes():
+    """
+    Sube en lote los cambios hechos sin conexión; cada cambio vuelve como
+    'applied', 'conflict' (con la versión del servidor) o 'rejected'.
+    """
+    data = request.get_json()
+    errors = validate_push(data)
+    if errors:
+        return jsonify({'errors': errors}), 400
+    scope, error = _device_scope()
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+
+    results, error = push_changes(scope, data['changes'])
+    if error:
+        return jsonify({'error': error['message']}), error['status']
+
+    summary = {status: sum(1 for r in results if r['status'] == status) for status in ('applied', 'conflict', 'rejected')}
+    return jsonify({'results': results, **summary}), 200
+
+# --- Comandos CLI ---
+
+@sync_bp.cli.command('purge')
+@click.option('--days', type=int, default=None, help='Antigüedad mínima de los borrados (SYNC_TOMBSTONE_DAYS).')
+def purge_command(days):
+    """
+    Purga los borrados antiguos del registro de cambios: flask sync purge
+    """
+    if days is None:
+        days = current_app.config.get('SYNC_TOMBSTONE_DAYS', DEFAULT_TOMBSTONE_DAYS)
+    purged, error = purge_tombstones(days)
+    if error:
+        raise click.ClickException(error['message'])
+    click.echo(f"{purged} borrados purgados (más de {days} días).")
@@ -0,0 +1,259 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, func, and_, or_, tuple_, true
+from sqlalchemy.orm import selectinload
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db, Asset, ChangeLog, Checklist, Procedure, SyncState, User, WorkOrder
+from .validations import parse_pushed_fields
+
+# Orden de la descarga inicial: primero las referencias, al final las OTs
+SNAPSHOT_ORDER = ['procedure', 'asset', 'checklist', 'work_order']
+MODELS = {'work_order': WorkOrder, 'checklist': Checklist, 'asset': Asset, 'procedure': Procedure}
+DEFAULT_TOMBSTONE_DAYS = 30
+
+
+def _serialize_work_order(wo):
+    data = wo.to_dict()
+    data.update(site_id=wo.site_id, estimated_time=wo.estimated_time, actual_time=wo.actual_time,
+                materials_used=wo.materials_used, comments=wo.comments, signature=wo.signature)
+    return data
+
+
+def _serialize(entity, obj):
+    return _serialize_work_order(obj) if entity == 'work_order' else obj.to_dict()
+
+
+def _load(entity, ids):
+    query = select(MODELS[entity]).where(MODELS[entity].id.in_(ids))
+    if entity == 'work_order':
+        query = query.options(selectinload(WorkOrder.asset))
+    return {obj.id: obj for obj in db.session.execute(query).scalars()}
+
+
+def _sync_state():
+    state = db.session.execute(select(SyncState.last_seq, SyncState.purged_through).where(SyncState.id == 1)).first()
+    return (state.last_seq, state.purged_through) if state else (0, 0)
+
+
+def resolve_scope(user_id):
+    """
+    Alcance del dispositivo: OTs asignadas al técnico y activos y checklists de
+    su planta (todas, si el usuario no tiene planta). Los procedimientos son globales.
+    """
+    user = db.session.get(User, user_id)
+    if not user:
+        return None, {'message': 'Usuario no encontrado', 'status': 404}
+    return {'user_id': user.id, 'site_id': user.site_id}, None
+
+
+def _change_scope(scope):
+    site_clause = true() if scope['site_id'] is None else or_(
+        ChangeLog.site_id == scope['site_id'], ChangeLog.site_id.is_(None)
+    )
+    return or_(
+        and_(ChangeLog.entity == 'work_order', ChangeLog.user_id == scope['user_id']),
+        and_(ChangeLog.entity != 'work_order', site_clause),
+    )
+
+
+def get_changes(scope, token, limit):
+    """
+    Cambios posteriores a 'token', uno por entidad (el registro está compactado),
+    con los datos actuales cargados en bloque por entidad. Si el token es anterior
+    a la última purga de borrados, el cliente debe volver a descargar todo (410).
+    """
+    try:
+        head, purged_through = _sync_state()
+        if token < purged_through or token > head:
+            return None, {'message': 'El token de sincronización expiró; descargue de nuevo los datos', 'status': 410}
+
+        rows = db.session.execute(
+            select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+            .where(ChangeLog.seq > token, ChangeLog.seq <= head, _change_scope(scope))
+            .order_by(ChangeLog.seq)
+            .limit(limit + 1)
+        ).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        ids = {}
+        for row in rows:
+            if row.op == 'upsert':
+                ids.setdefault(row.entity, set()).add(row.entity_id)
+        loaded = {entity: _load(entity, entity_ids) for entity, entity_ids in ids.items()}
+
+        changes = []
+        for row in rows:
+            obj = loaded.get(row.entity, {}).get(row.entity_id) if row.op == 'upsert' else None
+            change = {'seq': row.seq, 'entity': row.entity, 'id': row.entity_id, 'op': 'upsert' if obj else 'delete'}
+            if obj is not None:
+                change['data'] = _serialize(row.entity, obj)
+            changes.append(change)
+
+        next_token = rows[-1].seq if has_more else head
+        return {'changes': changes, 'next_token': next_token, 'has_more': has_more}, None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al consultar los cambios: {e}", 'status': 500}
+
+
+def _scope_clause(entity, scope):
+    """
+    Condición que deja solo las filas de 'entity' dentro del alcance del dispositivo.
+    """
+    site_id = scope['site_id']
+    if entity == 'work_order':
+        return WorkOrder.assigned_to_user_id == scope['user_id']
+    if entity == 'asset' and site_id is not None:
+        return Asset.site_id == site_id
+    if entity == 'checklist' and site_id is not None:
+        checklist_site = func.coalesce(
+            select(Asset.site_id).where(Asset.id == Checklist.asset_id).scalar_subquery(),
+            select(WorkOrder.site_id).where(WorkOrder.id == Checklist.work_order_id).scalar_subquery(),
+        )
+        return or_(checklist_site == site_id, checklist_site.is_(None))
+    return true()
+
+
+def _snapshot_query(entity, scope):
+    query = select(MODELS[entity]).where(_scope_clause(entity, scope))
+    if entity == 'work_order':
+        query = query.options(selectinload(WorkOrder.asset))
+    return query
+
+
+def _in_scope(entity, scope, ids):
+    model = MODELS[entity]
+    return set(db.session.execute(
+        select(model.id).where(model.id.in_(ids), _scope_clause(entity, scope))
+    ).scalars())
+
+
+def _parse_cursor(cursor):
+    token, entity, last_id = cursor.split(':')
+    if entity not in MODELS:
+        raise ValueError
+    return int(token), entity, int(last_id)
+
+
+def get_snapshot(scope, cursor, limit):
+    """
+    Descarga inicial paginada por (entidad, id). El token se fija en la primera
+    página y viaja en el cursor: al terminar, los cambios desde ese token cubren
+    lo modificado durante la descarga.
+    """
+    try:
+        if cursor:
+            token, entity, last_id = _parse_cursor(cursor)
+        else:
+            token, entity, last_id = _sync_state()[0], SNAPSHOT_ORDER[0], 0
+    except ValueError:
+        return None, {'message': 'Cursor de descarga no válido', 'status': 400}
+
+    try:
+        items = []
+        next_cursor = None
+        for name in SNAPSHOT_ORDER[SNAPSHOT_ORDER.index(entity):]:
+            model = MODELS[name]
+            start = last_id if name == entity else 0
+            objs = db.session.execute(
+                _snapshot_query(name, scope).where(model.id > start).order_by(model.id).limit(limit - len(items) + 1)
+            ).scalars().all()
+            page = objs[:limit - len(items)]
+            items.extend({'entity': name, 'id': obj.id, 'data': _serialize(name, obj)} for obj in page)
+            if len(objs) > len(page):
+                next_cursor = f'{token}:{name}:{page[-1].id}' if page else f'{token}:{name}:{start}'
+                break
+        return {'items': items, 'token': token, 'next_cursor': next_cursor}, None
+    except SQLAlchemyError as e:
+        return None, {'message': f"Error al generar la descarga inicial: {e}", 'status': 500}
+
+
+def _latest_sequences(keys):
+    if not keys:
+        return {}
+    return {
+        (entity, entity_id): seq for entity, entity_id, seq in db.session.execute(
+            select(ChangeLog.entity, ChangeLog.entity_id, func.max(ChangeLog.seq))
+            .where(tuple_(ChangeLog.entity, ChangeLog.entity_id).in_(list(keys)))
+            .group_by(ChangeLog.entity, ChangeLog.entity_id)
+        )
+    }
+
+
+def push_changes(scope, changes):
+    """
+    Aplica en una sola transacción los cambios hechos sin conexión. Un cambio
+    sobre una entidad modificada en el servidor después de su 'base_token' es un
+    conflicto: no se aplica y se devuelve la versión del servidor para resolverlo
+    en el dispositivo. Solo se aceptan cambios sobre entidades que están en la
+    descarga del dispositivo (las mismas condiciones que _snapshot_query).
+    """
+    try:
+        keys = {(c['entity'], int(c['id'])) for c in changes}
+        loaded, allowed = {}, {}
+        for entity in {entity for entity, _ in keys}:
+            entity_ids = {entity_id for e, entity_id in keys if e == entity}
+            loaded[entity] = _load(entity, entity_ids)
+            allowed[entity] = _in_scope(entity, scope, entity_ids)
+        latest = _latest_sequences(keys)
+
+        results, applied = [], []
+        for change in changes:
+            entity, entity_id = change['entity'], int(change['id'])
+            result = {'entity': entity, 'id': entity_id}
+            results.append(result)
+            obj = loaded[entity].get(entity_id)
+            if obj is None:
+                result.update(status='rejected', errors={'id': 'La entidad no existe.'})
+                continue
+            if entity_id not in allowed[entity]:
+                message = ('La orden de trabajo no está asignada a este técnico.' if entity == 'work_order'
+                           else 'La entidad no pertenece a la planta del técnico.')
+                result.update(status='rejected', errors={'id': message})
+                continue
+            server_seq = latest.get((entity, entity_id), 0)
+            if server_seq > int(change['base_token']):
+                result.update(status='conflict', server_seq=server_seq, server_data=_serialize(entity, obj))
+                continue
+            values, errors = parse_pushed_fields(entity, change['fields'])
+            if errors:
+                result.update(status='rejected', errors=errors)
+                continue
+            for field, value in values.items():
+                setattr(obj, field, value)
+            result['status'] = 'applied'
+            applied.append(result)
+
+        db.session.commit()
+        # Secuencia resultante de cada cambio aplicado: nueva 'base_token' en el dispositivo
+        sequences = _latest_sequences({(r['entity'], r['id']) for r in applied})
+        for result in applied:
+            result['seq'] = sequences.get((result['entity'], result['id']))
+        return results, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al aplicar los cambios sin conexión: {e}", 'status': 500}
+
+
+def purge_tombstones(days=DEFAULT_TOMBSTONE_DAYS):
+    """
+    Borra los 'delete' con más de 'days' días. Los clientes con un token anterior
+    al último borrado purgado reciben 410 y vuelven a descargar todo.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    table = ChangeLog.__table__
+    try:
+        purged_seq = db.session.execute(
+            select(func.max(table.c.seq)).where(table.c.op == 'delete', table.c.changed_date < cutoff)
+        ).scalar()
+        if purged_seq is None:
+            return 0, None
+        result = db.session.execute(delete(table).where(table.c.op == 'delete', table.c.seq <= purged_seq))
+        state = SyncState.__table__
+        db.session.execute(
+            update(state).where(state.c.id == 1, state.c.purged_through < purged_seq).values(purged_through=purged_seq)
+        )
+        db.session.commit()
+        return result.rowcount, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al purgar los borrados sincronizados: {e}", 'status': 500}
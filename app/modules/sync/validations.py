@@ -0,0 +1,108 @@
+from datetime import datetime
+from app.models import WorkOrderStatus
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+MAX_PUSH_BATCH = 200
+
+# Campos que un técnico puede modificar sin conexión, por entidad
+PUSHABLE_FIELDS = {
+    'work_order': ['status', 'comments', 'actual_time', 'start_date', 'end_date', 'materials_used', 'signature'],
+    'checklist': ['tasks'],
+}
+
+
+def _non_negative_int(value):
+    value = int(value)
+    if value < 0:
+        raise ValueError
+    return value
+
+
+def parse_page_params(args, cursor_field):
+    """
+    Valida 'limit' y el cursor o token de la página. Devuelve (params, errors).
+    """
+    errors = {}
+    params = {'limit': DEFAULT_PAGE_SIZE, cursor_field: args.get(cursor_field) or None}
+    if args.get('limit'):
+        try:
+            params['limit'] = int(args['limit'])
+            if not 0 < params['limit'] <= MAX_PAGE_SIZE:
+                raise ValueError
+        except ValueError:
+            errors['limit'] = f"El campo 'limit' debe ser un entero entre 1 y {MAX_PAGE_SIZE}."
+    if cursor_field == 'token' and params['token'] is not None:
+        try:
+            params['token'] = _non_negative_int(params['token'])
+        except ValueError:
+            errors['token'] = "El token de sincronización debe ser un entero no negativo."
+    return params, errors
+
+
+def validate_push(data):
+    """
+    Valida la estructura de una subida de cambios sin conexión:
+    {'changes': [{'entity', 'id', 'base_token', 'fields'}]}.
+    """
+    errors = {}
+    if not isinstance(data, dict) or not isinstance(data.get('changes'), list) or not data['changes']:
+        errors['changes'] = "Se requiere la lista 'changes' con al menos un cambio."
+        return errors
+    if len(data['changes']) > MAX_PUSH_BATCH:
+        errors['changes'] = f"Se admiten como máximo {MAX_PUSH_BATCH} cambios por petición."
+        return errors
+
+    for i, change in enumerate(data['changes']):
+        if not isinstance(change, dict):
+            errors[f'changes[{i}]'] = "Cada cambio debe ser un objeto."
+            continue
+        entity = change.get('entity')
+        if entity not in PUSHABLE_FIELDS:
+            errors[f'changes[{i}].entity'] = f"Entidad no válida. Opciones: {', '.join(PUSHABLE_FIELDS)}."
+            continue
+        for field in ['id', 'base_token']:
+            try:
+                _non_negative_int(change.get(field))
+            except (ValueError, TypeError):
+                errors[f'changes[{i}].{field}'] = f"El campo '{field}' es obligatorio y debe ser un entero no negativo."
+        fields = change.get('fields')
+        if not isinstance(fields, dict) or not fields:
+            errors[f'changes[{i}].fields'] = "El campo 'fields' debe ser un objeto con al menos un valor."
+            continue
+        unknown = set(fields) - set(PUSHABLE_FIELDS[entity])
+        if unknown:
+            errors[f'changes[{i}].fields'] = (
+                f"Campos no modificables: {', '.join(sorted(unknown))}. "
+                f"Permitidos: {', '.join(PUSHABLE_FIELDS[entity])}."
+            )
+    return errors
+
+
+def parse_pushed_fields(entity, fields):
+    """
+    Convierte los valores subidos a los tipos del modelo. Devuelve (values, errors);
+    un error rechaza solo ese cambio, no el lote.
+    """
+    values, errors = {}, {}
+    for field, value in fields.items():
+        try:
+            if field == 'status':
+                values[field] = WorkOrderStatus[value]
+            elif field in ('start_date', 'end_date'):
+                values[field] = datetime.fromisoformat(value) if value else None
+            elif field == 'actual_time':
+                values[field] = _non_negative_int(value) if value is not None else None
+            elif field in ('materials_used', 'tasks'):
+                if value is not None and not isinstance(value, list):
+                    raise ValueError
+                values[field] = value
+            else:
+                if value is not None and not isinstance(value, str):
+                    raise ValueError
+                if field == 'signature' and value and len(value) > 255:
+                    raise ValueError
+                values[field] = value
+        except (KeyError, ValueError, TypeError):
+            errors[field] = f"Valor no válido para '{field}'."
+    return values, errors
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from extensions import mail  # Asumiendo que inicializaste mail en otro lado
 from services.notifications import NotificationService
+from modules.inventory.reorder_service import request_parts as create_part_requests
+from modules.inventory.validations import validate_parts_request
 
 # Definimos el Blueprint
 maintenance_bp = Blueprint('maintenance', __name__, url_prefix='/api/v1/maintenance')
@@ -74,6 +76,23 @@ def report_delay():
 @maintenance_bp.route('/request-parts', methods=['POST'])
 def request_parts():
     data = request.get_json()
-    # Lógica para enviar correo al almacén
-    # ...
-    return jsonify({"message": "Solicitud enviada a almacén"}), 200
\ No newline at end of file
+
+    # 'parts' es una lista de {"spare_part_id": ..., "quantity": ...}
+    required = ['machine_name', 'parts']
+    if not isinstance(data, dict) or validate_payload(data, required):
+        return jsonify({"error": "Faltan datos para solicitar repuestos"}), 400
+
+    # Mismas reglas que /inventory/api/purchase-requests
+    errors = validate_parts_request(data)
+    if errors:
+        return jsonify({"errors": errors}), 400
+
+    # Se generan (o acumulan) las solicitudes de compra pendientes en un solo commit
+    purchase_requests, error = create_part_requests(data['parts'], user_id=data.get('technician_id'))
+    if error:
+        return jsonify({"error": error['message']}), error['status']
+
+    return jsonify({
+        "message": "Solicitud enviada a almacén",
+        "purchase_request_ids": [pr.id for pr in purchase_requests]
+    }), 200
\ No newline at end of file
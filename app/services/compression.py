@@ -0,0 +1,73 @@
+"""
+Compresión gzip/brotli de las respuestas grandes según Accept-Encoding.
+
+Las respuestas en streaming (SSE) y los archivos (send_file) no se tocan. Las
+que traen ETag fuerte (caché de respuestas) guardan su versión comprimida, así
+un listado cacheado no se vuelve a comprimir en cada petición.
+"""
+import gzip
+from flask import request
+from .response_cache import LocalBackend
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/html', 'text/plain', 'text/css', 'text/csv',
+    'application/javascript', 'image/svg+xml',
+}
+DEFAULT_MIN_SIZE = 1024
+# Sufijos del ETag de las variantes comprimidas (el caché de respuestas los reconoce)
+ENCODINGS = ('br', 'gzip')
+
+_compressed = LocalBackend(max_entries=256)
+
+
+def _choose_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(body, encoding, app):
+    if encoding == 'br':
+        return brotli.compress(body, quality=app.config.get('COMPRESS_BR_QUALITY', 5))
+    return gzip.compress(body, compresslevel=app.config.get('COMPRESS_GZIP_LEVEL', 6), mtime=0)
+
+
+def init_compression(app):
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code != 200
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = _choose_encoding()
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE):
+            return response
+
+        etag, weak = response.get_etag()
+        key = f'{etag}-{encoding}' if etag and not weak else None
+        compressed = _compressed.get(key) if key else None
+        if compressed is None:
+            compressed = _compress(body, encoding, app)
+            if key:
+                _compressed.set(key, compressed)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak)
+        return response
@@ -0,0 +1,147 @@
+"""
+Enrutamiento de lecturas a réplicas.
+
+Las vistas marcadas con @read_only envían sus SELECT a uno de los binds listados
+en SQLALCHEMY_REPLICA_BINDS. Todo lo demás va al primario: escrituras (flush o
+DML), cualquier lectura posterior a una escritura en la misma sesión y, durante
+REPLICA_STICKY_SECONDS, las peticiones del cliente que acaba de escribir
+(lectura de lo propio escrito). Una réplica que falla queda fuera de servicio
+REPLICA_RETRY_SECONDS y la petición se reintenta en el primario.
+"""
+import random
+import time
+from functools import wraps
+from threading import Lock
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as BaseSession
+
+READ_ONLY_KEY = 'maintech.read_only'
+FORCE_PRIMARY_KEY = 'maintech.force_primary'
+REPLICA_FAILED_KEY = 'maintech.replica_failed'
+WROTE_KEY = 'maintech.wrote'
+STICKY_COOKIE = 'maintech_primary_until'
+
+_down_until = {}
+_health_lock = Lock()
+
+
+def healthy_replicas():
+    keys = current_app.config.get('SQLALCHEMY_REPLICA_BINDS') or []
+    now = time.monotonic()
+    with _health_lock:
+        return [k for k in keys if _down_until.get(k, 0) <= now]
+
+
+def mark_replica_down(key):
+    retry = current_app.config.get('REPLICA_RETRY_SECONDS', 30)
+    with _health_lock:
+        _down_until[key] = time.monotonic() + retry
+    current_app.logger.warning(f"Réplica '{key}' fuera de servicio durante {retry}s; se usa el primario")
+
+
+class RoutingSession(Session):
+    """
+    Sesión de Flask-SQLAlchemy que elige primario o réplica en get_bind.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not self._may_use_replica(clause):
+            return engine
+
+        engines = self._db.engines
+        if engine is not engines.get(None):
+            return engine  # Modelos con un bind propio no se enrutan
+        candidates = [k for k in healthy_replicas() if k in engines]
+        if not candidates:
+            return engine
+        key = self.info.get('replica_key')
+        if key not in candidates:
+            key = random.choice(candidates)
+            self.info['replica_key'] = key
+        return engines[key]
+
+    def _may_use_replica(self, clause):
+        if self._flushing or (clause is not None and getattr(clause, 'is_dml', False)):
+            self.info['wrote'] = True
+            return False
+        if self.info.get('wrote') or not has_request_context():
+            return False
+        environ = request.environ
+        return bool(environ.get(READ_ONLY_KEY)) and not environ.get(FORCE_PRIMARY_KEY)
+
+
+def _recently_wrote():
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_only(view):
+    """
+    Marca una vista como de solo lectura: sus consultas pueden ir a una réplica.
+    Si la réplica falla (aunque el servicio capture el error y devuelva una
+    respuesta), la vista se repite una vez contra el primario.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        environ = request.environ
+        environ[READ_ONLY_KEY] = not _recently_wrote()
+        try:
+            response = view(*args, **kwargs)
+        except Exception:
+            if not environ.get(REPLICA_FAILED_KEY):
+                raise
+            response = None
+        if environ.get(REPLICA_FAILED_KEY) and not environ.get(FORCE_PRIMARY_KEY):
+            current_app.extensions['sqlalchemy'].session.rollback()
+            environ[FORCE_PRIMARY_KEY] = True
+            response = view(*args, **kwargs)
+        return response
+    return wrapper
+
+
+def _replica_error(context):
+    """
+    handle_error: un error en el engine de una réplica la saca de servicio.
+    """
+    if not has_request_context() or not request.environ.get(READ_ONLY_KEY):
+        return
+    engines = current_app.extensions['sqlalchemy'].engines
+    for key in current_app.config.get('SQLALCHEMY_REPLICA_BINDS') or []:
+        if engines.get(key) is context.engine:
+            mark_replica_down(key)
+            request.environ[REPLICA_FAILED_KEY] = key
+            return
+
+
+def _remember_write(session):
+    if session.info.get('wrote') and has_request_context():
+        request.environ[WROTE_KEY] = True
+
+
+def _set_sticky_cookie(response):
+    if request.environ.get(WROTE_KEY):
+        seconds = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+        response.set_cookie(STICKY_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True)
+    return response
+
+
+def init_db_routing(app):
+    app.after_request(_set_sticky_cookie)
+    if not event.contains(BaseSession, 'after_commit', _remember_write):
+        event.listen(BaseSession, 'after_commit', _remember_write)
+    if not event.contains(Engine, 'handle_error', _replica_error):
+        event.listen(Engine, 'handle_error', _replica_error)
+
+
+def replica_binds_from_env(uris):
+    """
+    Convierte 'uri1,uri2' en (SQLALCHEMY_BINDS, SQLALCHEMY_REPLICA_BINDS).
+    """
+    binds = {f'replica_{i}': uri.strip() for i, uri in enumerate(uris.split(','), start=1) if uri.strip()}
+    return binds, list(binds)
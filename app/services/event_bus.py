@@ -0,0 +1,150 @@
+import itertools
+import json
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBroker:
+    """
+    Broker en proceso: numera los eventos y los entrega al bus del mismo worker.
+    """
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._deliver = None
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, events):
+        # Numerar y entregar bajo el mismo lock: los ids llegan al bus en orden
+        with self._lock:
+            numbered = [dict(event, id=next(self._ids)) for event in events]
+            self._deliver(numbered)
+
+
+# Numera y publica en un solo paso atómico: como Redis ejecuta el script sin
+# intercalar otros comandos, los mensajes salen del canal en orden de id.
+_PUBLISH_SCRIPT = """
+local last = redis.call('INCRBY', KEYS[1], tonumber(ARGV[2]))
+local first = last - tonumber(ARGV[2]) + 1
+redis.call('PUBLISH', KEYS[2], '{"first": ' .. first .. ', "events": ' .. ARGV[1] .. '}')
+return last
+"""
+
+
+class RedisBroker:
+    """
+    Broker compartido entre workers sobre un cliente Redis (redis-py o uno con
+    register_script/pubsub). Los ids salen de un contador común, así un
+    Last-Event-ID vale en cualquier worker.
+    """
+
+    def __init__(self, client, channel='maintech:live'):
+        self.client = client
+        self.channel = channel
+        self._thread = None
+        self._publish = client.register_script(_PUBLISH_SCRIPT)
+
+    def start(self, deliver):
+        if self._thread is not None:
+            return
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+
+        def listen():
+            for message in pubsub.listen():
+                try:
+                    payload = json.loads(message['data'])
+                    first = int(payload['first'])
+                    deliver([dict(event, id=first + i) for i, event in enumerate(payload['events'])])
+                except (TypeError, ValueError, KeyError):
+                    logger.warning("Mensaje inválido en el canal de eventos en vivo")
+
+        self._thread = threading.Thread(target=listen, name='live-events-redis', daemon=True)
+        self._thread.start()
+
+    def publish(self, events):
+        self._publish(keys=[f'{self.channel}:seq', self.channel], args=[json.dumps(events), len(events)])
+
+
+class EventBus:
+    """
+    Bus de publicación/suscripción para eventos en vivo.
+
+    Los eventos confirmados se guardan en un buffer circular compartido; cada
+    cliente solo recuerda el último id que vio y espera en una única condición,
+    sin cola ni hilo propio. Con un worker gevent la espera es cooperativa, por
+    lo que un worker sostiene miles de conexiones inactivas.
+    """
+
+    def __init__(self, broker=None, buffer_size=2000):
+        self.broker = broker
+        self._buffer = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._last_id = 0
+
+    def init_app(self, app):
+        self.broker = app.config.get('LIVE_EVENTS_BROKER') or self.broker or LocalBroker()
+        size = app.config.get('LIVE_EVENTS_BUFFER_SIZE', self._buffer.maxlen)
+        if size != self._buffer.maxlen:
+            self._buffer = deque(self._buffer, maxlen=size)
+        self.broker.start(self._deliver)
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, events):
+        """
+        events: lista de dicts con 'type', 'site_id', 'asset_id' y 'data'.
+        """
+        if events:
+            self.broker.publish(events)
+
+    def _deliver(self, events):
+        with self._condition:
+            for event in events:
+                if event['id'] > self._last_id:
+                    self._buffer.append(event)
+                    self._last_id = event['id']
+                else:
+                    self._insert_late(event)
+            self._condition.notify_all()
+
+    def _insert_late(self, event):
+        """
+        Ubica en orden un evento que llega después de otro con id mayor. Los
+        brokers entregan en orden de id; esto cubre entregas fuera de orden para
+        que read() no las descarte (un cursor que ya pasó ese id no lo verá).
+        """
+        position = len(self._buffer)
+        while position and self._buffer[position - 1]['id'] > event['id']:
+            position -= 1
+        if position and self._buffer[position - 1]['id'] == event['id']:
+            return  # Duplicado
+        if position == 0 and len(self._buffer) == self._buffer.maxlen:
+            return  # Más viejo que todo lo que cabe en el buffer
+        if len(self._buffer) == self._buffer.maxlen:
+            self._buffer.popleft()
+            position -= 1
+        self._buffer.insert(position, event)
+
+    def read(self, cursor, timeout):
+        """
+        Espera hasta 'timeout' segundos eventos posteriores a 'cursor'.
+        Devuelve (eventos, perdidos); 'perdidos' indica que el buffer ya descartó
+        parte de lo ocurrido desde 'cursor' y el cliente debe recargar su estado.
+        """
+        with self._condition:
+            if cursor > self._last_id:
+                return [], True  # Id de otro arranque del broker
+            self._condition.wait_for(lambda: self._last_id > cursor, timeout=timeout)
+            if self._last_id <= cursor:
+                return [], False
+            lost = bool(self._buffer) and self._buffer[0]['id'] > cursor + 1
+            return [event for event in self._buffer if event['id'] > cursor], lost
@@ -0,0 +1,69 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import db, IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 128
+DEFAULT_TTL_HOURS = 24
+
+
+def request_fingerprint(data):
+    """
+    Hash estable del cuerpo: la misma clave con otro contenido es un error del cliente.
+    """
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def find_responses(keys, ttl_hours=DEFAULT_TTL_HOURS):
+    """
+    Respuestas vigentes (de menos de 'ttl_hours') para las claves dadas:
+    {key: IdempotencyKey}. Las vencidas que la purga aún no borró se eliminan en
+    la transacción en curso, así la clave vuelve a usarse como nueva.
+    """
+    keys = [k for k in keys if k]
+    if not keys:
+        return {}
+    cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(keys),
+                                                    IdempotencyKey.created_date < cutoff))
+    rows = db.session.execute(select(IdempotencyKey).where(IdempotencyKey.key.in_(keys),
+                                                           IdempotencyKey.created_date >= cutoff)).scalars()
+    return {row.key: row for row in rows}
+
+
+def check_replay(stored, endpoint, fingerprint):
+    """
+    Devuelve (respuesta, error) para una clave ya usada: la respuesta original
+    si el endpoint y el cuerpo coinciden, o un 422 si la clave se reutilizó en
+    otro endpoint o con otro cuerpo.
+    """
+    if stored.endpoint != endpoint:
+        return None, {'message': f"La clave de idempotencia '{stored.key}' ya se usó en otro endpoint", 'status': 422}
+    if stored.request_hash != fingerprint:
+        return None, {'message': f"La clave de idempotencia '{stored.key}' ya se usó con otro contenido", 'status': 422}
+    return (stored.response, stored.status_code), None
+
+
+def remember(key, endpoint, fingerprint, status_code, response):
+    """
+    Agrega la respuesta a la sesión: se guarda en la misma transacción que el
+    efecto, así un reintento nunca ve un efecto sin su respuesta ni al revés.
+    """
+    db.session.add(IdempotencyKey(
+        key=key, endpoint=endpoint, request_hash=fingerprint,
+        status_code=status_code, response=response,
+    ))
+
+
+def purge_expired_keys(ttl_hours=DEFAULT_TTL_HOURS):
+    try:
+        cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+        result = db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_date < cutoff))
+        db.session.commit()
+        return {'purged': result.rowcount}, None
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return None, {'message': f"Error al purgar claves de idempotencia: {e}", 'status': 500}
@@ -0,0 +1,78 @@
+"""
+Serialización JSON de las respuestas de la API.
+
+Con orjson instalado las respuestas se codifican directamente a bytes en C;
+sin él se usa json de la biblioteca estándar con las mismas conversiones:
+Decimal (columnas Numeric) como número, fechas en ISO 8601, enums por su valor
+y filas de SQLAlchemy (select de columnas) como objetos, sin pasar por to_dict().
+"""
+import dataclasses
+import decimal
+import enum
+import json
+import uuid
+from datetime import date, datetime, time
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.engine import Row, RowMapping
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, Row):
+        return o._asdict()
+    if isinstance(o, RowMapping):
+        return dict(o)
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    # Solo llegan aquí con el codificador estándar: orjson los resuelve solo
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, enum.Enum):
+        return o.value
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Objeto de tipo {type(o).__name__} no serializable a JSON")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de la app (app.json). Las respuestas son compactas y sin
+    ordenar claves, también en modo debug.
+    """
+
+    sort_keys = False
+    compact = True
+    orjson_options = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.dumps(obj, default=_default, option=self.orjson_options).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def dumps_bytes(self, obj):
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=self.orjson_options)
+        return self.dumps(obj).encode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
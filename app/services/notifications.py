@@ -32,6 +32,34 @@ class NotificationService:
         except Exception as e:
             logger.error(f"Error al preparar el hilo de correo: {e}")
 
+    def _async_send_bulk(self, app, messages):
+        """Envía un lote de correos reutilizando una sola conexión SMTP."""
+        with app.app_context():
+            try:
+                with self.mail.connect() as conn:
+                    for msg in messages:
+                        conn.send(msg)
+                logger.info(f"✅ Lote de {len(messages)} correos enviado")
+            except Exception as e:
+                logger.error(f"❌ Error crítico enviando lote de correos: {str(e)}")
+
+    def send_bulk(self, notifications):
+        """
+        Envía muchos correos en un único hilo y una única conexión.
+        'notifications' es una lista de (subject, recipients, template, context).
+        """
+        try:
+            app = current_app._get_current_object()
+            messages = []
+            for subject, recipients, template, context in notifications:
+                msg = Message(subject, recipients=recipients)
+                msg.html = render_template(f"emails/{template}.html", **context)
+                messages.append(msg)
+            if messages:
+                Thread(target=self._async_send_bulk, args=(app, messages)).start()
+        except Exception as e:
+            logger.error(f"Error al preparar el lote de correos: {e}")
+
     # --- Métodos de Negocio Específicos ---
 
     def notify_start(self, data):
@@ -0,0 +1,166 @@
+"""
+Caché en proceso de las tablas de referencia: categorías, ubicaciones,
+fabricantes, modelos, tipos de habilidad y almacenes.
+
+Cada tabla se guarda como una instantánea inmutable (tuplas con nombre e
+índices de solo lectura) marcada con la versión de la tabla en la caché de
+respuestas. Esa versión sube al confirmar una transacción que modifica la
+tabla; con RESPONSE_CACHE_BACKEND compartido el contador es común a todos los
+workers. Las versiones se consultan una vez por petición (y de nuevo tras un
+commit) y, si una cambió, la tabla se relee entera del primario con una sola
+consulta. Las búsquedas por id o nombre no tocan la base de datos.
+
+Sin backend compartido cada proceso solo ve sus propios commits: las
+instantáneas se releen además cada REFERENCE_CACHE_LOCAL_TTL segundos (30) y,
+si un id no aparece, una vez más (a lo sumo cada MISS_RELOAD_SECONDS), para
+no rechazar una fila creada por otro worker.
+"""
+import time
+from collections import namedtuple
+from threading import Lock
+from types import MappingProxyType
+from flask import has_request_context, request
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.models import db, Category, Location, Manufacturer, Model, SkillType, Warehouse
+
+# Tabla -> (modelo, columnas de la instantánea)
+TABLES = {
+    'category': (Category, ('id', 'name')),
+    'location': (Location, ('id', 'name', 'parent_id', 'site_id')),
+    'manufacturer': (Manufacturer, ('id', 'name')),
+    'model': (Model, ('id', 'name', 'manufacturer_id')),
+    'skill_type': (SkillType, ('id', 'name')),
+    'warehouse': (Warehouse, ('id', 'name', 'site_id', 'location_id')),
+}
+ENVIRON_KEY = 'maintech.reference_versions'
+DEFAULT_LOCAL_TTL = 30
+MISS_RELOAD_SECONDS = 1.0
+
+_ROW_TYPES = {name: namedtuple(f'{model.__name__}Ref', columns) for name, (model, columns) in TABLES.items()}
+
+
+class ReferenceTable:
+    """
+    Instantánea inmutable de una tabla de referencia.
+    """
+
+    __slots__ = ('name', 'version', 'loaded_at', 'rows', '_by_id', '_by_name')
+
+    def __init__(self, name, version, rows):
+        self.name = name
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.rows = tuple(rows)
+        self._by_id = MappingProxyType({row.id: row for row in self.rows})
+        by_name = {}
+        for row in self.rows:
+            by_name.setdefault((row.name or '').casefold(), []).append(row.id)
+        self._by_name = MappingProxyType({key: tuple(ids) for key, ids in by_name.items()})
+
+    def get(self, id_, site_ids=None):
+        """
+        Fila con ese id, o None. Con 'site_ids' (plantas accesibles), las filas
+        de otra planta cuentan como inexistentes.
+        """
+        row = self._by_id.get(id_)
+        if row is not None and site_ids is not None and getattr(row, 'site_id', None) not in site_ids:
+            return None
+        return row
+
+    def name_of(self, id_):
+        row = self._by_id.get(id_)
+        return row.name if row is not None else None
+
+    def ids_named(self, name):
+        return self._by_name.get((name or '').casefold(), ())
+
+    def __contains__(self, id_):
+        return id_ in self._by_id
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class ReferenceCache:
+
+    def __init__(self):
+        self._tables = {}
+        self._locks = {name: Lock() for name in TABLES}
+        self._response_cache = None
+        self.local_ttl = DEFAULT_LOCAL_TTL
+
+    def init_app(self, app, response_cache):
+        # Las versiones son las de la caché de respuestas, que ya las sube en cada commit
+        self._response_cache = response_cache
+        self.local_ttl = app.config.get('REFERENCE_CACHE_LOCAL_TTL', DEFAULT_LOCAL_TTL)
+        app.extensions['reference_data'] = self
+        if not event.contains(Session, 'after_commit', _forget_request_versions):
+            event.listen(Session, 'after_commit', _forget_request_versions)
+
+    def _versions(self):
+        if not has_request_context():
+            return dict(zip(TABLES, self._response_cache.versions(list(TABLES))))
+        versions = request.environ.get(ENVIRON_KEY)
+        if versions is None:
+            versions = dict(zip(TABLES, self._response_cache.versions(list(TABLES))))
+            request.environ[ENVIRON_KEY] = versions
+        return versions
+
+    def _load(self, name, version):
+        model, columns = TABLES[name]
+        table = model.__table__
+        row_type = _ROW_TYPES[name]
+        # Siempre del primario y fuera de la sesión: lo confirmado, sin réplicas ni filtro de planta
+        with db.engine.connect() as connection:
+            rows = connection.execute(select(*(table.c[c] for c in columns)).order_by(table.c.id)).all()
+        return ReferenceTable(name, version, (row_type(*row) for row in rows))
+
+    @property
+    def versions_are_local(self):
+        return self._response_cache.shared is None
+
+    def _is_current(self, snapshot, version, max_age):
+        if snapshot is None or snapshot.version != version:
+            return False
+        return max_age is None or time.monotonic() - snapshot.loaded_at <= max_age
+
+    def table(self, name, max_age=None):
+        """
+        Instantánea vigente de la tabla; se relee si su versión cambió o, con
+        versiones locales, si tiene más de 'max_age' (o local_ttl) segundos.
+        """
+        version = self._versions()[name]
+        if max_age is None and self.versions_are_local:
+            max_age = self.local_ttl
+        snapshot = self._tables.get(name)
+        if self._is_current(snapshot, version, max_age):
+            return snapshot
+        with self._locks[name]:
+            snapshot = self._tables.get(name)
+            if not self._is_current(snapshot, version, max_age):
+                snapshot = self._load(name, version)
+                self._tables[name] = snapshot
+        return snapshot
+
+    def get(self, name, id_, site_ids=None):
+        row = self.table(name).get(id_, site_ids)
+        if row is None and self.versions_are_local:
+            # Puede haberla creado otro proceso: su versión no llega aquí
+            row = self.table(name, max_age=MISS_RELOAD_SECONDS).get(id_, site_ids)
+        return row
+
+    def name_of(self, name, id_):
+        return self.table(name).name_of(id_)
+
+    def clear(self):
+        self._tables = {}
+
+
+def _forget_request_versions(session):
+    # Tras un commit, la siguiente búsqueda de la petición vuelve a mirar las versiones
+    if has_request_context():
+        request.environ.pop(ENVIRON_KEY, None)
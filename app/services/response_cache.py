@@ -0,0 +1,213 @@
+import hashlib
+import logging
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from flask import request, make_response, current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBackend:
+    """
+    Backend en proceso: caché LRU de respuestas y contadores de versión locales.
+    Sirve para un solo worker y como sustituto en pruebas.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_versions(self, names):
+        with self._lock:
+            return [self._versions.get(name, 0) for name in names]
+
+    def incr(self, name):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            return self._versions[name]
+
+
+class RedisBackend:
+    """
+    Backend compartido entre workers sobre un cliente tipo Redis
+    (cualquier objeto con get/set/mget/incr).
+    """
+
+    def __init__(self, client, prefix='maintech:cache:', default_ttl=300):
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl or self.default_ttl)
+
+    def get_versions(self, names):
+        values = self.client.mget([f'{self.prefix}v:{name}' for name in names])
+        return [int(v) if v is not None else 0 for v in values]
+
+    def incr(self, name):
+        return self.client.incr(f'{self.prefix}v:{name}')
+
+
+class ResponseCache:
+    """
+    Caché de respuestas JSON con invalidación por versión de tabla y ETag fuerte.
+
+    Cada vista cacheada declara las tablas de las que depende. Cuando se confirma
+    una transacción que modificó alguna de ellas, su contador de versión sube; la
+    ETag deriva de (endpoint, argumentos normalizados, versiones), por lo que un
+    'If-None-Match' vigente se responde con 304 sin consultar la base de datos.
+    """
+
+    def __init__(self, backend=None, max_entries=1024):
+        self.local = LocalBackend(max_entries=max_entries)
+        self.shared = backend
+        self.key_functions = []
+
+    def init_app(self, app):
+        self.shared = app.config.get('RESPONSE_CACHE_BACKEND', self.shared)
+        self.local.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', self.local.max_entries)
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        for name, fn in [('after_flush', self._collect_after_flush),
+                         ('do_orm_execute', self._collect_bulk_statement),
+                         ('after_commit', self._bump_after_commit),
+                         ('after_soft_rollback', self._discard_after_rollback)]:
+            if not event.contains(Session, name, fn):
+                event.listen(Session, name, fn)
+
+    # --- Versiones ---
+
+    @property
+    def versions_backend(self):
+        return self.shared or self.local
+
+    def versions(self, tables):
+        return self.versions_backend.get_versions(tables)
+
+    def bump(self, tables):
+        for table in tables:
+            self.versions_backend.incr(table)
+
+    def _collect_after_flush(self, session, flush_context):
+        touched = session.info.setdefault('cache_touched_tables', set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            table = getattr(obj, '__tablename__', None)
+            if table:
+                touched.add(table)
+
+    def _collect_bulk_statement(self, orm_execute_state):
+        # INSERT/UPDATE/DELETE en bloque ejecutados con session.execute() no pasan por el flush
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, 'table', None)
+            if table is not None:
+                touched = orm_execute_state.session.info.setdefault('cache_touched_tables', set())
+                touched.add(table.name)
+
+    def _bump_after_commit(self, session):
+        touched = session.info.pop('cache_touched_tables', None)
+        if touched:
+            try:
+                self.bump(touched)
+            except Exception as e:
+                logger.error(f"Error al invalidar la caché de respuestas: {e}")
+
+    def _discard_after_rollback(self, session, previous_transaction):
+        session.info.pop('cache_touched_tables', None)
+
+    # --- Claves y ETags ---
+
+    def request_key(self):
+        """
+        Clave de caché: endpoint, argumentos de ruta y query string normalizada
+        (orden estable, sin valores vacíos).
+        """
+        args = sorted((k, v) for k, values in request.args.lists() for v in values if v != '')
+        view_args = sorted((request.view_args or {}).items())
+        parts = [request.endpoint, repr(view_args), repr(args)]
+        parts += [str(fn()) for fn in self.key_functions]
+        return '|'.join(parts)
+
+    def key_function(self, fn):
+        """
+        Registra una función que aporta contexto adicional a la clave (p. ej. el tenant).
+        """
+        self.key_functions.append(fn)
+        return fn
+
+    def cached(self, *tables, ttl=None):
+        """
+        Decorador para vistas GET cuyo resultado depende solo de las tablas indicadas.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not getattr(self, 'enabled', True):
+                    return view(*args, **kwargs)
+
+                key = self.request_key()
+                versions = self.versions(tables)
+                tag = '|'.join(f'{t}:{v}' for t, v in zip(tables, versions))
+                etag = hashlib.sha1(f'{key}#{tag}'.encode('utf-8')).hexdigest()
+
+                # También vale el ETag de la variante comprimida (services/compression.py);
+                # el 304 repite la misma forma que recibió el cliente con el 200
+                matched = next((candidate for candidate in (etag, f'{etag}-br', f'{etag}-gzip')
+                                if candidate in request.if_none_match), None)
+                if matched:
+                    response = current_app.response_class(status=304)
+                    response.set_etag(matched)
+                    response.headers['Cache-Control'] = 'no-cache'
+                    return response
+
+                cache_key = f'{key}#{tag}'
+                entry = self.local.get(cache_key)
+                if entry is None and self.shared is not None:
+                    entry = self.shared.get(cache_key)
+                if entry is not None:
+                    body, mimetype = _split_entry(entry)
+                    response = current_app.response_class(body, status=200, mimetype=mimetype)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    stored = _join_entry(response.get_data(), response.mimetype)
+                    self.local.set(cache_key, stored, ttl)
+                    if self.shared is not None:
+                        self.shared.set(cache_key, stored, ttl)
+
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+            return wrapper
+        return decorator
+
+
+def _join_entry(body, mimetype):
+    return mimetype.encode('ascii') + b'\n' + body
+
+
+def _split_entry(entry):
+    mimetype, _, body = entry.partition(b'\n')
+    return body, mimetype.decode('ascii')
@@ -0,0 +1,38 @@
+"""
+Estado compartido entre procesos sobre Redis.
+
+Con REDIS_URL definida, los eventos en vivo y la caché de respuestas usan un
+Redis común: los workers web, `flask ingest serve` y `flask jobs worker` ven los
+mismos eventos y los mismos contadores de versión. Sin ella cada proceso tiene
+los suyos (LocalBroker y LocalBackend).
+"""
+from .event_bus import LocalBroker, RedisBroker
+from .response_cache import RedisBackend
+
+
+def redis_client_from_url(url):
+    try:
+        import redis
+    except ImportError:  # pragma: no cover - dependencia opcional
+        raise RuntimeError("REDIS_URL está definida pero el paquete 'redis' no está instalado (pip install redis)")
+    # Sin decode_responses: la caché guarda cuerpos de respuesta en bytes
+    return redis.Redis.from_url(url)
+
+
+def configure_shared_state(app, url):
+    client = redis_client_from_url(url)
+    app.config['LIVE_EVENTS_BROKER'] = RedisBroker(client)
+    app.config['RESPONSE_CACHE_BACKEND'] = RedisBackend(client)
+
+
+def local_state_components(live_events, response_cache):
+    """
+    Nombres de las piezas que solo existen en este proceso; vacío si eventos en
+    vivo y caché de respuestas son compartidos.
+    """
+    local = []
+    if isinstance(live_events.broker, LocalBroker):
+        local.append('LIVE_EVENTS_BROKER')
+    if response_cache.shared is None:
+        local.append('RESPONSE_CACHE_BACKEND')
+    return local
@@ -0,0 +1,107 @@
+"""
+Aislamiento por planta/empresa (multi-tenant) sobre una única base de datos.
+
+Las consultas ORM de los modelos con 'site_id' reciben automáticamente un
+criterio 'site_id IN (...)' mediante with_loader_criteria, incluidas las cargas
+perezosas de relaciones. El conjunto de plantas accesibles se calcula una vez
+por petición y se guarda en el entorno WSGI de la propia petición.
+"""
+from flask import g, has_request_context, session as http_session, request, current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, with_loader_criteria
+from app.models import db, User, Role, Site, Asset, WorkOrder, Warehouse, Location, SafetyCubeCell
+
+# Modelos filtrados por planta
+SCOPED_MODELS = (Asset, WorkOrder, Warehouse, Location, SafetyCubeCell)
+
+SKIP_OPTION = 'skip_tenant_filter'
+ENVIRON_KEY = 'maintech.tenant_sites'
+
+
+def current_user_id():
+    """
+    Identifica al usuario de la petición: g.current_user_id (si un login lo fijó),
+    la sesión de Flask o, si está configurada, la cabecera de un proxy autenticado.
+    """
+    user_id = g.get('current_user_id') or http_session.get('user_id')
+    header = current_app.config.get('TENANT_USER_HEADER')
+    if not user_id and header:
+        user_id = request.headers.get(header)
+    try:
+        return int(user_id) if user_id else None
+    except (TypeError, ValueError):
+        return None
+
+
+def accessible_site_ids():
+    """
+    Plantas accesibles para el usuario actual, calculadas una vez por petición.
+    Devuelve None si no hay restricción (sin usuario o administrador global).
+    """
+    if not has_request_context():
+        return None
+    # Se guarda en la petición y no en g: el contexto de aplicación puede compartirse entre peticiones
+    if ENVIRON_KEY in request.environ:
+        return request.environ[ENVIRON_KEY]
+
+    sites = None
+    user_id = current_user_id()
+    if user_id:
+        user = db.session.execute(
+            select(User.role, User.site_id, User.company_id).where(User.id == user_id),
+            execution_options={SKIP_OPTION: True}
+        ).first()
+        if user is None:
+            sites = ()
+        elif user.role == Role.admin and user.company_id:
+            sites = tuple(db.session.scalars(
+                select(Site.id).where(Site.company_id == user.company_id),
+                execution_options={SKIP_OPTION: True}
+            ))
+        elif user.role == Role.admin:
+            sites = None
+        else:
+            sites = (user.site_id,) if user.site_id else ()
+    request.environ[ENVIRON_KEY] = sites
+    return sites
+
+
+def _add_tenant_criteria(orm_execute_state):
+    if not orm_execute_state.is_select or orm_execute_state.execution_options.get(SKIP_OPTION):
+        return
+    site_ids = accessible_site_ids()
+    if site_ids is None:
+        return
+    orm_execute_state.statement = orm_execute_state.statement.options(*[
+        with_loader_criteria(model, lambda cls: cls.site_id.in_(site_ids), include_aliases=True)
+        for model in SCOPED_MODELS
+    ], with_loader_criteria(Site, lambda cls: cls.id.in_(site_ids), include_aliases=True))
+
+
+def _default_site_before_flush(session, flush_context, instances):
+    """
+    Los registros nuevos sin planta heredan la única planta del usuario.
+    """
+    site_ids = accessible_site_ids()
+    if not site_ids or len(site_ids) != 1:
+        return
+    for obj in session.new:
+        if isinstance(obj, SCOPED_MODELS) and obj.site_id is None:
+            obj.site_id = site_ids[0]
+
+
+def tenant_cache_key():
+    """
+    Parte de la clave de la caché de respuestas: dos tenants nunca comparten respuesta.
+    """
+    site_ids = accessible_site_ids()
+    return 'all' if site_ids is None else ','.join(map(str, sorted(site_ids)))
+
+
+def init_tenancy(app, response_cache=None):
+    for name, fn in [('do_orm_execute', _add_tenant_criteria),
+                     ('before_flush', _default_site_before_flush)]:
+        if not event.contains(Session, name, fn):
+            event.listen(Session, name, fn)
+    if response_cache is not None and tenant_cache_key not in response_cache.key_functions:
+        response_cache.key_function(tenant_cache_key)
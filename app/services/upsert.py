@@ -0,0 +1,73 @@
+from sqlalchemy import insert, update
+
+
+def dialect_insert(dialect_name, table):
+    """
+    INSERT propio del motor con soporte de ON CONFLICT / ON DUPLICATE KEY,
+    o None si el motor no tiene uno.
+    """
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as insert_for_dialect
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_for_dialect
+    elif dialect_name in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as insert_for_dialect
+    else:
+        return None
+    return insert_for_dialect(table)
+
+
+def increment_row(connection, table, keys, deltas, defaults=None):
+    """
+    Suma 'deltas' a la fila de 'table' identificada por 'keys' (su clave
+    primaria o un índice único) con un único INSERT ... ON CONFLICT DO UPDATE:
+    dos transacciones que crean la misma fila a la vez no chocan. 'defaults'
+    completa las demás columnas de una fila nueva. En otros motores, UPDATE y,
+    si no existe, INSERT.
+    """
+    row = dict(defaults or {})
+    row.update(deltas)
+    row.update(keys)
+    statement = dialect_insert(connection.dialect.name, table)
+    if statement is not None:
+        statement = statement.values(**row)
+        if connection.dialect.name in ('mysql', 'mariadb'):
+            increments = {name: table.c[name] + statement.inserted[name] for name in deltas}
+            connection.execute(statement.on_duplicate_key_update(**increments))
+        else:
+            increments = {name: table.c[name] + statement.excluded[name] for name in deltas}
+            connection.execute(statement.on_conflict_do_update(index_elements=list(keys), set_=increments))
+        return
+
+    criteria = [table.c[k] == v for k, v in keys.items()]
+    values = {name: table.c[name] + delta for name, delta in deltas.items()}
+    result = connection.execute(update(table).where(*criteria).values(**values))
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(**row))
+
+
+def upsert_row(connection, table, keys, values):
+    """
+    Crea la fila de 'table' identificada por 'keys' (su clave primaria o un
+    índice único) o sobrescribe en ella 'values', con un único INSERT ... ON
+    CONFLICT DO UPDATE: dos transacciones que crean la misma fila a la vez no
+    chocan. Las columnas que no están en 'values' conservan su valor. En otros
+    motores, UPDATE y, si no existe, INSERT.
+    """
+    row = dict(values)
+    row.update(keys)
+    statement = dialect_insert(connection.dialect.name, table)
+    if statement is not None:
+        statement = statement.values(**row)
+        if connection.dialect.name in ('mysql', 'mariadb'):
+            assignments = {name: statement.inserted[name] for name in values}
+            connection.execute(statement.on_duplicate_key_update(**assignments))
+        else:
+            assignments = {name: statement.excluded[name] for name in values}
+            connection.execute(statement.on_conflict_do_update(index_elements=list(keys), set_=assignments))
+        return
+
+    criteria = [table.c[k] == v for k, v in keys.items()]
+    result = connection.execute(update(table).where(*criteria).values(**values))
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(**row))
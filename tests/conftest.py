@@ -0,0 +1,16 @@
+import pytest
+from flask import Flask
+from app.models import db
+from app.services.json_provider import FastJSONProvider
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.json = FastJSONProvider(app)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,26 @@
+from app.services.event_bus import EventBus
+
+
+def _event(event_id):
+    return {'id': event_id, 'type': 'work_order.created', 'site_id': 1, 'asset_id': None, 'data': {}}
+
+
+def test_out_of_order_delivery_reaches_reader():
+    bus = EventBus(buffer_size=10)
+    bus._deliver([_event(2)])
+    bus._deliver([_event(1)])
+
+    events, lost = bus.read(0, timeout=0)
+
+    assert [event['id'] for event in events] == [1, 2]
+    assert lost is False
+
+
+def test_late_event_is_not_duplicated():
+    bus = EventBus(buffer_size=10)
+    bus._deliver([_event(1), _event(2)])
+    bus._deliver([_event(1)])
+
+    events, _ = bus.read(0, timeout=0)
+
+    assert [event['id'] for event in events] == [1, 2]
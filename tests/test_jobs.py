@@ -0,0 +1,61 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+import pytest
+from app.models import db, Job, JobStatus
+from app.modules.jobs.job_service import claim_jobs, enqueue_job
+from app.modules.jobs.registry import JOBS, register_job
+from app.modules.jobs.runner import execute
+from app.modules.jobs.worker import JobWorker
+
+
+def test_revalue_job_receives_as_of_as_date(app):
+    job, error = enqueue_job('assets.revalue', {'as_of': '2026-01-01'})
+    assert error is None
+
+    outcome = execute(app, job.name, job.params)
+
+    assert outcome['error'] is None
+    assert outcome['result']['as_of'] == '2026-01-01'
+
+
+@pytest.mark.parametrize('value', [20260101, '01/01/2026', True])
+def test_enqueue_rejects_invalid_dates(app, value):
+    job, error = enqueue_job('expiry.sweep', {'today': value})
+    assert job is None
+    assert error['status'] == 400
+
+
+_release = threading.Event()
+
+
+def _blocking_job():
+    _release.wait(5)
+    return {'done': True}
+
+
+def test_timed_out_job_keeps_its_lease_until_the_thread_ends(app):
+    register_job('tests.blocking', 'test_jobs:_blocking_job', kind='io', timeout=0)
+    _release.clear()
+    job, _ = enqueue_job('tests.blocking')
+    worker = JobWorker(app, processes=1, threads=1)
+    pools = {'cpu': None, 'io': ThreadPoolExecutor(1)}
+    try:
+        worker._dispatch(pools)
+        worker._check_timeouts(pools)
+
+        stored = db.session.get(Job, job.id)
+        db.session.refresh(stored)
+        assert stored.status == JobStatus.running and stored.lease_owner == worker.owner
+        assert worker._busy('io') == 1
+        assert claim_jobs('other-worker', ['tests.blocking'], 1) == []
+
+        _release.set()
+        done, _ = wait(set(worker._timed_out), timeout=5)
+        worker._collect(done)
+        db.session.refresh(stored)
+        assert stored.status == JobStatus.queued and 'Tiempo máximo' in stored.error
+        assert worker._busy('io') == 0
+    finally:
+        _release.set()
+        pools['io'].shutdown()
+        JOBS.pop('tests.blocking', None)
@@ -0,0 +1,18 @@
+from sqlalchemy import insert
+from app.models import db, Category
+from app.services.reference_cache import ReferenceCache
+from app.services.response_cache import ResponseCache
+
+
+def test_row_created_by_another_process_is_found_without_shared_versions(app):
+    cache = ReferenceCache()
+    cache.init_app(app, ResponseCache())
+    assert cache.get('category', 1) is None
+
+    # Otro worker: confirma la fila, pero su versión sube solo en su propio proceso
+    with db.engine.begin() as connection:
+        connection.execute(insert(Category.__table__).values(id=1, name='Bombas'))
+    assert cache.get('category', 1) is None  # Recién releída: no se vuelve a leer en cada fallo
+
+    cache.table('category').loaded_at -= 2
+    assert cache.get('category', 1).name == 'Bombas'
@@ -0,0 +1,188 @@
+from datetime import date, datetime, timedelta
+import pytest
+from app.models import (
+    db, Asset, ChangeLog, Checklist, Role, Site, User, WorkOrder, WorkOrderStatus, WorkOrderType
+)
+from app.modules.assets.valuation_service import revalue_assets
+from app.modules.sync.events import register_events
+from app.modules.sync.sync_service import get_changes, get_snapshot, push_changes, purge_tombstones
+
+
+@pytest.fixture(autouse=True)
+def sync_events(app):
+    register_events()
+
+
+@pytest.fixture
+def asset(app):
+    db.session.add_all([Site(id=1, name='Norte'), Site(id=2, name='Sur')])
+    asset = Asset(unique_code='P-1', name='Bomba', site_id=1, value_initial=1000, value_current=1000,
+                  depreciation_method='straight_line', purchase_date=date(2020, 1, 1))
+    db.session.add(asset)
+    db.session.commit()
+    return asset
+
+
+def _changes(site_id, token=0, user_id=99):
+    result, error = get_changes({'user_id': user_id, 'site_id': site_id}, token, 100)
+    assert error is None
+    return [(c['entity'], c['id'], c['op']) for c in result['changes']], result['next_token']
+
+
+def test_core_revaluation_is_logged(app, asset):
+    _, token = _changes(1)
+
+    summary, error = revalue_assets(as_of=date(2026, 1, 1))
+
+    assert error is None and summary['updated'] == 1
+    assert _changes(1, token)[0] == [('asset', asset.id, 'upsert')]
+
+
+def test_asset_moving_site_sends_delete_to_old_site(app, asset):
+    checklist = Checklist(name='Diaria', asset_id=asset.id)
+    db.session.add(checklist)
+    db.session.commit()
+    _, token = _changes(1)
+
+    asset.site_id = 2
+    db.session.commit()
+
+    assert sorted(_changes(1, token)[0]) == [('asset', asset.id, 'delete'), ('checklist', checklist.id, 'delete')]
+    assert sorted(_changes(2, token)[0]) == [('asset', asset.id, 'upsert'), ('checklist', checklist.id, 'upsert')]
+    # Un dispositivo sin planta recibe el 'delete' antes del 'upsert' y conserva el activo
+    assert [c for c in _changes(None, token)[0] if c[0] == 'asset'] == [('asset', asset.id, 'delete'),
+                                                                        ('asset', asset.id, 'upsert')]
+
+
+def test_checklist_moving_to_other_site_asset(app, asset):
+    other = Asset(unique_code='P-2', name='Motor', site_id=2)
+    checklist = Checklist(name='Diaria', asset_id=asset.id)
+    db.session.add_all([other, checklist])
+    db.session.commit()
+    _, token = _changes(1)
+
+    checklist.asset_id = other.id
+    db.session.commit()
+
+    assert _changes(1, token)[0] == [('checklist', checklist.id, 'delete')]
+    assert _changes(2, token)[0] == [('checklist', checklist.id, 'upsert')]
+
+
+@pytest.fixture
+def technicians(app):
+    db.session.add_all([User(id=1, username='ana', password_hash='x', role=Role.technician, site_id=1),
+                        User(id=2, username='luis', password_hash='x', role=Role.technician, site_id=1)])
+    db.session.commit()
+
+
+def _work_order(asset, user_id):
+    work_order = WorkOrder(asset_id=asset.id, site_id=asset.site_id, type=WorkOrderType.corrective,
+                           status=WorkOrderStatus.assigned, assigned_to_user_id=user_id, description='Fuga')
+    db.session.add(work_order)
+    db.session.commit()
+    return work_order
+
+
+def test_sequences_are_consecutive_per_commit(app, asset):
+    head = ChangeLog.query.order_by(ChangeLog.seq.desc()).first().seq
+    db.session.add_all([Asset(unique_code='P-2', name='Motor', site_id=1),
+                        Asset(unique_code='P-3', name='Válvula', site_id=1)])
+    db.session.commit()
+
+    assert [row.seq for row in ChangeLog.query.order_by(ChangeLog.seq)][-2:] == [head + 1, head + 2]
+
+
+def test_change_log_keeps_one_row_per_entity(app, asset):
+    for name in ('Bomba A', 'Bomba B', 'Bomba C'):
+        asset.name = name
+        db.session.commit()
+
+    rows = ChangeLog.query.filter_by(entity='asset', entity_id=asset.id).all()
+    assert [row.op for row in rows] == ['upsert']
+    changes, _ = _changes(1)
+    assert changes == [('asset', asset.id, 'upsert')]
+
+
+def test_compaction_keeps_delete_for_previous_site(app, asset):
+    asset.site_id = 2
+    db.session.commit()
+    asset.name = 'Bomba B'
+    db.session.commit()
+
+    assert _changes(1)[0] == [('asset', asset.id, 'delete')]
+    assert _changes(2)[0] == [('asset', asset.id, 'upsert')]
+
+
+def test_reassigned_work_order_is_deleted_for_previous_technician(app, asset, technicians):
+    work_order = _work_order(asset, 1)
+    _, token = _changes(1, user_id=1)
+
+    work_order.assigned_to_user_id = 2
+    db.session.commit()
+
+    assert ('work_order', work_order.id, 'delete') in _changes(1, token, user_id=1)[0]
+    assert ('work_order', work_order.id, 'upsert') in _changes(1, token, user_id=2)[0]
+
+
+def test_push_conflicts_when_server_changed_after_base_token(app, asset, technicians):
+    work_order = _work_order(asset, 1)
+    scope = {'user_id': 1, 'site_id': 1}
+    _, base_token = _changes(1, user_id=1)
+    work_order.comments = 'Cambiado en el servidor'
+    db.session.commit()
+
+    results, error = push_changes(scope, [{'entity': 'work_order', 'id': work_order.id,
+                                           'base_token': base_token, 'fields': {'comments': 'Desde el móvil'}}])
+
+    assert error is None
+    assert results[0]['status'] == 'conflict'
+    assert results[0]['server_data']['comments'] == 'Cambiado en el servidor'
+
+    _, token = _changes(1, user_id=1)
+    results, _ = push_changes(scope, [{'entity': 'work_order', 'id': work_order.id,
+                                       'base_token': token, 'fields': {'comments': 'Desde el móvil'}}])
+    assert results[0]['status'] == 'applied'
+    assert results[0]['seq'] > token
+    assert db.session.get(WorkOrder, work_order.id).comments == 'Desde el móvil'
+
+
+def test_push_rejects_work_order_of_other_technician(app, asset, technicians):
+    work_order = _work_order(asset, 2)
+
+    results, _ = push_changes({'user_id': 1, 'site_id': 1}, [{'entity': 'work_order', 'id': work_order.id,
+                                                              'base_token': 0, 'fields': {'comments': 'x'}}])
+
+    assert results[0]['status'] == 'rejected'
+
+
+def test_snapshot_pages_through_entities_with_a_fixed_token(app, asset):
+    db.session.add_all([Asset(unique_code=f'P-{i}', name='Motor', site_id=1) for i in range(2, 5)])
+    db.session.commit()
+    scope = {'user_id': 99, 'site_id': 1}
+
+    seen, cursor, tokens = [], None, set()
+    while True:
+        page, error = get_snapshot(scope, cursor, 2)
+        assert error is None
+        seen.extend((item['entity'], item['id']) for item in page['items'])
+        tokens.add(page['token'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert len(seen) == len(set(seen)) == 4
+    assert len(tokens) == 1
+    assert get_snapshot(scope, 'x:asset:1', 2)[1]['status'] == 400
+
+
+def test_token_before_purged_delete_gets_410(app, asset):
+    asset.site_id = 2
+    db.session.commit()
+    ChangeLog.query.filter_by(op='delete').update({'changed_date': datetime.utcnow() - timedelta(days=60)})
+    db.session.commit()
+
+    purged, error = purge_tombstones(days=30)
+
+    assert error is None and purged == 1
+    result, error = get_changes({'user_id': 99, 'site_id': 1}, 0, 100)
+    assert result is None and error['status'] == 410
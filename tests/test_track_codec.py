@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from app.modules.fleet.track_codec import COORD_SCALE, decode_track, encode_track, to_fixed
+
+
+def test_round_trip_in_degrees():
+    times = np.arange(1_700_000_000, 1_700_000_600)
+    lats = -34.6037 + np.linspace(0, 0.01, len(times))
+    lons = -58.3816 + np.sin(np.linspace(0, 3, len(times))) * 0.02
+
+    decoded_times, decoded_lats, decoded_lons = decode_track(encode_track(times, lats, lons))
+
+    assert decoded_times.tolist() == times.tolist()
+    assert decoded_lats.tolist() == to_fixed(lats).tolist()
+    assert decoded_lons.tolist() == to_fixed(lons).tolist()
+
+
+def test_round_trip_scaled():
+    times = [100, 101, 103]
+    lats, lons = to_fixed([10.5, 10.500001, 10.6]), to_fixed([-70.0, -70.1, -69.9])
+
+    _, decoded_lats, decoded_lons = decode_track(encode_track(times, lats, lons, scaled=True))
+
+    assert decoded_lats.tolist() == lats.tolist()
+    assert decoded_lons.tolist() == lons.tolist()
+
+
+def test_integer_degrees_are_not_taken_as_scaled():
+    _, lats, lons = decode_track(encode_track([0], [45], [10]))
+
+    assert lats.tolist() == [45 * COORD_SCALE]
+    assert lons.tolist() == [10 * COORD_SCALE]
+
+
+def test_scaled_rejects_floats():
+    with pytest.raises(ValueError):
+        encode_track([0, 1], [45.0, 45.1], [10.0, 10.1], scaled=True)
+
+
+def test_single_point():
+    times, lats, lons = decode_track(encode_track([1_700_000_000], [-33.45], [-70.66]))
+
+    assert times.tolist() == [1_700_000_000]
+    assert lats.tolist() == [-33_450_000]
+    assert lons.tolist() == [-70_660_000]
+
+
+def test_large_jumps_use_wide_columns():
+    times = [0, 1, 86_400 * 365]
+    lats, lons = [-89.999999, 89.999999, -89.999999], [-180.0, 180.0, 0.0]
+
+    decoded_times, decoded_lats, decoded_lons = decode_track(encode_track(times, lats, lons))
+
+    assert decoded_times.tolist() == times
+    assert decoded_lats.tolist() == to_fixed(lats).tolist()
+    assert decoded_lons.tolist() == to_fixed(lons).tolist()
+
+
+def test_empty_track_is_rejected():
+    with pytest.raises(ValueError):
+        encode_track([], [], [])
+
+
+def test_mismatched_columns_are_rejected():
+    with pytest.raises(ValueError):
+        encode_track([0, 1], [1.0], [1.0, 2.0])